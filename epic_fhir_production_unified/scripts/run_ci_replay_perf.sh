@@ -0,0 +1,39 @@
+#!/bin/bash
+
+# CI Script for running the offline performance harness
+# Replays recorded FHIR resources from a local server with injected latency,
+# 429s and 5xx errors, and fails if a benchmark falls below MIN_THROUGHPUT or
+# its median throughput drops more than MAX_REGRESSION below BASELINE_PATH.
+# Refresh the baseline by running this script with REPORT_PATH pointing at it.
+
+set -e  # Exit on any error
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+RECORDING_DIR="${RECORDING_DIR:-$SCRIPT_DIR/../tests/data}"
+REPORT_PATH="${REPORT_PATH:-replay_perf_report.json}"
+BASELINE_PATH="${BASELINE_PATH:-$SCRIPT_DIR/replay_perf_baseline.json}"
+
+echo "==== Running Epic FHIR Replay Performance Tests ===="
+
+python -m epic_fhir_integration.testing.harness \
+    --recording "$RECORDING_DIR" \
+    --page-size "${PAGE_SIZE:-2}" \
+    --latency-ms "${LATENCY_MS:-20}" \
+    --jitter-ms "${JITTER_MS:-5}" \
+    --rate-429 "${RATE_429:-0.05}" \
+    --rate-5xx "${RATE_5XX:-0.02}" \
+    --seed "${SEED:-42}" \
+    --repeat "${REPEAT:-3}" \
+    --min-throughput "${MIN_THROUGHPUT:-10}" \
+    --baseline "$BASELINE_PATH" \
+    --max-regression "${MAX_REGRESSION:-0.5}" \
+    --report "$REPORT_PATH"
+
+# If we're in CI, make report available as artifact
+if [ -n "$CI" ] && [ -n "$CI_ARTIFACTS_DIR" ]; then
+    mkdir -p "$CI_ARTIFACTS_DIR/reports"
+    cp "$REPORT_PATH" "$CI_ARTIFACTS_DIR/reports/"
+    echo "Report copied to CI artifacts directory"
+fi
+
+echo "==== Replay performance tests complete ===="
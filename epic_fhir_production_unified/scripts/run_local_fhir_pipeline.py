@@ -448,6 +448,72 @@ def run_fetch_token(base_dir: Path, datasets: Dict[str, Any], mock_mode=False) -
         return False
 
 
+def write_synthetic_bronze(
+    bronze_dir: Path,
+    patient_id: str,
+    resource_types: List[str],
+    extra_patients: int = 0
+) -> Dict[str, int]:
+    """
+    Write synthetic, referentially consistent resources as bronze bundles.
+    
+    Resources come from epic_fhir_integration.testing.synthetic, seeded so
+    runs are reproducible. The requested patient is always generated; extra
+    patients add load. For production-scale data, run the generator module
+    directly, which streams NDJSON or Parquet.
+    
+    Args:
+        bronze_dir: Bronze FHIR raw directory
+        patient_id: Patient ID of the first patient
+        resource_types: Resource types to write; types the generator does not
+                        support are ignored
+        extra_patients: Number of additional synthetic patients
+    
+    Returns:
+        Dictionary mapping resource types to the number of resources written
+    """
+    from epic_fhir_integration.testing.synthetic import (
+        RESOURCE_TYPES as SYNTHETIC_RESOURCE_TYPES,
+        SyntheticConfig,
+        SyntheticFHIRGenerator,
+    )
+    
+    config = SyntheticConfig(
+        patient_ids=[patient_id] + [f"synthetic-{i}" for i in range(extra_patients)]
+    )
+    resource_types = [t for t in resource_types if t in SYNTHETIC_RESOURCE_TYPES]
+    bundles = {res_type: [] for res_type in resource_types}
+    for resource in SyntheticFHIRGenerator(config).iter_resources(resource_types):
+        bundles[resource["resourceType"]].append({"resource": resource})
+    
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    for res_type, entries in bundles.items():
+        resource_dir = bronze_dir / res_type
+        resource_dir.mkdir(parents=True, exist_ok=True)
+        bundle_with_metadata = {
+            "metadata": {
+                "patient_id": patient_id,
+                "resource_type": res_type,
+                "created_at": datetime.datetime.now().isoformat(),
+                "is_mock": True,
+                "seed": config.seed,
+                "entry_count": len(entries)
+            },
+            "bundle": {
+                "resourceType": "Bundle",
+                "type": "searchset",
+                "total": len(entries),
+                "entry": entries
+            }
+        }
+        with open(resource_dir / f"{timestamp}_bundle.json", 'w') as f:
+            json.dump(bundle_with_metadata, f)
+        
+        logger.info(f"Created synthetic data for {res_type} with {len(entries)} resources")
+    
+    return {res_type: len(entries) for res_type, entries in bundles.items()}
+
+
 def run_extract_resources(
     base_dir: Path, 
     datasets: Dict[str, Any], 
@@ -499,8 +565,11 @@ def run_extract_resources(
             # Remove duplicates
             resource_types = list(set(resource_types))
             
-            # Create mock data for each resource type
-            for res_type in resource_types:
+            # Clinical types come from the synthetic generator
+            written = write_synthetic_bronze(bronze_dir, patient_id, resource_types)
+            
+            # Create minimal mock data for the remaining resource types
+            for res_type in [t for t in resource_types if t not in written]:
                 resource_dir = bronze_dir / res_type
                 resource_dir.mkdir(parents=True, exist_ok=True)
                 
@@ -514,56 +583,16 @@ def run_extract_resources(
                 
                 # Add mock entries
                 for i in range(5):
-                    entry = {
+                    bundle["entry"].append({
                         "resource": {
                             "resourceType": res_type,
                             "id": f"mock-{res_type.lower()}-{i}",
                             "meta": {
                                 "lastUpdated": datetime.datetime.now().isoformat()
-                            }
-                        }
-                    }
-                    
-                    # Add patient reference for non-patient resources
-                    if res_type != "Patient":
-                        entry["resource"]["subject"] = {"reference": f"Patient/{patient_id}"}
-                    
-                    # Add resource-specific fields
-                    if res_type == "Patient":
-                        entry["resource"]["name"] = [{"family": "Test", "given": ["Patient"]}]
-                        entry["resource"]["gender"] = "unknown"
-                        entry["resource"]["birthDate"] = "1970-01-01"
-                    elif res_type == "Observation":
-                        entry["resource"]["status"] = "final"
-                        # Add proper code with coding array
-                        entry["resource"]["code"] = {
-                            "coding": [
-                                {
-                                    "system": "http://loinc.org",
-                                    "code": f"test-code-{i}",
-                                    "display": f"Test Observation {i}"
-                                }
-                            ],
-                            "text": f"Test Observation {i}"
+                            },
+                            "subject": {"reference": f"Patient/{patient_id}"}
                         }
-                        # Add required category element
-                        entry["resource"]["category"] = [
-                            {
-                                "coding": [
-                                    {
-                                        "system": "http://terminology.hl7.org/CodeSystem/observation-category",
-                                        "code": "laboratory",
-                                        "display": "Laboratory"
-                                    }
-                                ]
-                            }
-                        ]
-                        entry["resource"]["valueQuantity"] = {"value": 100 + i, "unit": "mg/dL"}
-                    elif res_type == "Condition":
-                        entry["resource"]["clinicalStatus"] = {"text": "active"}
-                        entry["resource"]["code"] = {"text": f"Test Condition {i}"}
-                    
-                    bundle["entry"].append(entry)
+                    })
                 
                 # Save bundle with metadata
                 bundle_with_metadata = {
@@ -669,6 +698,89 @@ def run_extract_resources(
         return False
 
 
+def run_extract_from_fhir_server(
+    base_dir: Path,
+    datasets: Dict[str, Any],
+    patient_id: str,
+    fhir_base_url: str,
+    resource_type: Optional[str] = None,
+    strict_mode: bool = False
+) -> bool:
+    """
+    Extract the patient's resources from a FHIR server without authentication.
+    
+    Used with a local replay server (epic_fhir_integration.testing.replay_server)
+    so the pipeline can run end-to-end offline. Resources are written as
+    bundles in the same bronze layout as the other extraction modes.
+    
+    Args:
+        base_dir: Base directory containing code
+        datasets: Dataset objects
+        patient_id: Patient ID to extract
+        fhir_base_url: Base URL of the FHIR server
+        resource_type: Optional specific resource to extract
+        strict_mode: Whether to fail when no resources are extracted
+    
+    Returns:
+        Success status
+    """
+    start_time = time.time()
+    logger.info(f"Extracting resources for patient {patient_id} from {fhir_base_url}")
+    
+    try:
+        from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+        
+        with open(base_dir / "config" / "resources_config.yaml", 'r') as f:
+            resources_config = yaml.safe_load(f)
+        resource_types = [resource_type] if resource_type else sorted({
+            res_key.split("/")[0] for res_key in resources_config.get("resources", {})
+        })
+        
+        client = FHIRClient(fhir_base_url)
+        bronze_dir = datasets["bronze_fhir_raw"].path
+        total = 0
+        for res_type in resource_types:
+            params = {"_id": patient_id} if res_type == "Patient" else {"patient": patient_id}
+            resources = list(client.search_resources(res_type, params))
+            
+            resource_dir = bronze_dir / res_type
+            resource_dir.mkdir(parents=True, exist_ok=True)
+            bundle_with_metadata = {
+                "metadata": {
+                    "patient_id": patient_id,
+                    "resource_type": res_type,
+                    "created_at": datetime.datetime.now().isoformat(),
+                    "source": fhir_base_url
+                },
+                "bundle": {
+                    "resourceType": "Bundle",
+                    "type": "searchset",
+                    "total": len(resources),
+                    "entry": [{"resource": resource} for resource in resources]
+                }
+            }
+            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+            with open(resource_dir / f"{timestamp}_bundle.json", 'w') as f:
+                json.dump(bundle_with_metadata, f, indent=2)
+            
+            logger.info(f"Extracted {len(resources)} {res_type} resources")
+            total += len(resources)
+        
+        elapsed = time.time() - start_time
+        logger.info(f"Extraction completed in {elapsed:.2f} seconds, {total} resources, "
+                    f"resilience: {json.dumps(client.resilience_metrics())}")
+        
+        if total == 0 and strict_mode:
+            logger.error("Strict mode enabled - failing due to no extracted resources")
+            return False
+        return True
+    except Exception as e:
+        elapsed = time.time() - start_time
+        logger.error(f"Error extracting from {fhir_base_url} after {elapsed:.2f} seconds: {str(e)}")
+        logger.debug(f"Extraction error details: {traceback.format_exc()}")
+        return False
+
+
 def check_bronze_file_compatibility(bronze_path: Path) -> bool:
     """
     Check if bronze files are in a compatible format for transformation.
@@ -1474,13 +1586,14 @@ def summarize_results(output_dir: Path, patient_id: str = None):
     print(divider)
 
 
-def create_mock_data(output_dir: Path, patient_id: str) -> bool:
+def create_mock_data(output_dir: Path, patient_id: str, extra_patients: int = 0) -> bool:
     """
     Create mock data for testing in the bronze layer.
     
     Args:
         output_dir: Base output directory
         patient_id: Patient ID to use
+        extra_patients: Number of additional synthetic patients
     
     Returns:
         Success status
@@ -1496,105 +1609,7 @@ def create_mock_data(output_dir: Path, patient_id: str) -> bool:
         # Define resource types to create
         resource_types = ["Patient", "Encounter", "Observation", "Condition", "MedicationRequest"]
         
-        for res_type in resource_types:
-            logger.debug(f"Creating mock data for resource type: {res_type}")
-            
-            # Create resource directory
-            resource_dir = bronze_dir / res_type
-            resource_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Create mock bundle
-            bundle = {
-                "resourceType": "Bundle",
-                "type": "searchset",
-                "total": 5,
-                "entry": []
-            }
-            
-            # Add mock entries
-            for i in range(5):
-                entry = {
-                    "resource": {
-                        "resourceType": res_type,
-                        "id": f"mock-{res_type.lower()}-{i}",
-                        "meta": {
-                            "lastUpdated": datetime.datetime.now().isoformat()
-                        }
-                    }
-                }
-                
-                # Add patient reference for non-patient resources
-                if res_type != "Patient":
-                    entry["resource"]["subject"] = {"reference": f"Patient/{patient_id}"}
-                
-                # Add resource-specific fields
-                if res_type == "Patient":
-                    entry["resource"]["name"] = [{"family": "Test", "given": ["Patient"]}]
-                    entry["resource"]["gender"] = "unknown"
-                    entry["resource"]["birthDate"] = "1970-01-01"
-                elif res_type == "Observation":
-                    entry["resource"]["status"] = "final"
-                    # Add proper code with coding array
-                    entry["resource"]["code"] = {
-                        "coding": [
-                            {
-                                "system": "http://loinc.org",
-                                "code": f"test-code-{i}",
-                                "display": f"Test Observation {i}"
-                            }
-                        ],
-                        "text": f"Test Observation {i}"
-                    }
-                    # Add required category element
-                    entry["resource"]["category"] = [
-                        {
-                            "coding": [
-                                {
-                                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
-                                    "code": "laboratory",
-                                    "display": "Laboratory"
-                                }
-                            ]
-                        }
-                    ]
-                    entry["resource"]["valueQuantity"] = {"value": 100 + i, "unit": "mg/dL"}
-                elif res_type == "Condition":
-                    entry["resource"]["clinicalStatus"] = {"text": "active"}
-                    entry["resource"]["code"] = {"text": f"Test Condition {i}"}
-                elif res_type == "Encounter":
-                    entry["resource"]["status"] = "finished"
-                    entry["resource"]["class"] = {"code": "AMB"}
-                    entry["resource"]["period"] = {
-                        "start": "2023-01-01T08:00:00Z",
-                        "end": "2023-01-01T09:00:00Z"
-                    }
-                elif res_type == "MedicationRequest":
-                    entry["resource"]["status"] = "active"
-                    entry["resource"]["intent"] = "order"
-                    entry["resource"]["medicationCodeableConcept"] = {"text": f"Test Medication {i}"}
-                
-                bundle["entry"].append(entry)
-            
-            # Save bundle with metadata
-            bundle_with_metadata = {
-                "metadata": {
-                    "patient_id": patient_id,
-                    "resource_type": res_type,
-                    "created_at": datetime.datetime.now().isoformat(),
-                    "entry_count": len(bundle["entry"])
-                },
-                "bundle": bundle
-            }
-            
-            # Write to file
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            bundle_filename = f"{timestamp}_bundle_{res_type.lower()}.json"
-            bundle_path = resource_dir / bundle_filename
-            
-            with open(bundle_path, 'w') as f:
-                json.dump(bundle_with_metadata, f, indent=2)
-            
-            logger.info(f"Created mock data for {res_type} with {len(bundle['entry'])} resources")
+        write_synthetic_bronze(bronze_dir, patient_id, resource_types, extra_patients)
         
         # Now create mock silver data (just directories for now)
         silver_dir = output_dir / "silver" / "fhir_normalized"
@@ -1645,6 +1660,10 @@ def main():
     parser.add_argument('--mock', action='store_true', help='Use mock mode for API calls')
     parser.add_argument('--no-spark', action='store_true', help='Skip Spark operations')
     parser.add_argument('--strict', action='store_true', help='Run in strict mode with no mock data fallbacks')
+    parser.add_argument('--synthetic-patients', type=int, default=0,
+                       help='Additional synthetic patients to generate in mock mode')
+    parser.add_argument('--fhir-base-url',
+                       help='Extract from this FHIR server without a token, e.g. a local replay server')
     args = parser.parse_args()
     
     # Setup debug logging if requested
@@ -1660,6 +1679,10 @@ def main():
         logger.error("Strict mode requires real API calls (--mock=false)")
         sys.exit(1)
     
+    if args.fhir_base_url and args.mock:
+        logger.error("Cannot use both --fhir-base-url and --mock flags together")
+        sys.exit(1)
+    
     # Validate arguments
     if not args.patient_id:
         logger.error("Patient ID is required")
@@ -1702,7 +1725,7 @@ def main():
         os.environ["MOCK_API_CALLS"] = "true"
         
         # Generate mock data upfront
-        create_mock_data(output_dir, args.patient_id)
+        create_mock_data(output_dir, args.patient_id, args.synthetic_patients)
     
     # Create dataset structure
     try:
@@ -1735,7 +1758,9 @@ def main():
     success = {}
     
     # Token refresh
-    if 'token' in steps_to_run:
+    if 'token' in steps_to_run and args.fhir_base_url:
+        logger.info(f"Skipping token fetch step for {args.fhir_base_url}")
+    elif 'token' in steps_to_run:
         token_start = time.time()
         logger.info("Starting token fetch step")
         success['token'] = run_fetch_token(base_dir, datasets, mock_mode=mock_mode)
@@ -1753,6 +1778,8 @@ def main():
                 # In mock mode, the extraction is already done by create_mock_data
                 success['extract'] = True
                 logger.info("Using pre-generated mock data")
+            elif args.fhir_base_url:
+                success['extract'] = run_extract_from_fhir_server(base_dir, datasets, args.patient_id, args.fhir_base_url, strict_mode=args.strict)
             else:
                 success['extract'] = run_extract_resources(base_dir, datasets, args.patient_id, mock_mode=mock_mode, strict_mode=args.strict)
             step_timings['extract'] = time.time() - extract_start
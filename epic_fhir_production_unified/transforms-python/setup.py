@@ -28,6 +28,18 @@ setup(
         "python-dateutil>=2.8.2",
     ],
     extras_require={
+        "async": [
+            "httpx[http2]>=0.24.0",
+        ],
+        "zstd": [
+            "zstandard>=0.21.0",
+        ],
+        "compression": [
+            "brotli>=1.0.9",
+        ],
+        "parquet": [
+            "pyarrow>=10.0.0",
+        ],
         "analytics": [
             "pyspark>=3.2.0",
             "pathling-client>=6.0.0",
@@ -30,6 +30,10 @@ from epic_fhir_integration.infrastructure.api_clients.fhir_client import (
     create_fhir_client,
     FHIRClient,
 )
+from epic_fhir_integration.infrastructure.api_clients.async_fhir_client import (
+    create_async_fhir_client,
+    AsyncFHIRClient,
+)
 from epic_fhir_integration.domain.bronze.resource_extractor import (
     extract_resource,
     extract_all_resources,
@@ -45,6 +49,8 @@ __all__ = [
     "get_token_with_retry",
     "create_fhir_client",
     "FHIRClient",
+    "create_async_fhir_client",
+    "AsyncFHIRClient",
     # Logging
     "get_logger",
     "log_with_context",
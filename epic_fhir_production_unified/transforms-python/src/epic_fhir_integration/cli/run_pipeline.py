@@ -15,6 +15,7 @@ from datetime import datetime
 from epic_fhir_integration.api_clients.fhir_client import create_fhir_client
 from epic_fhir_integration.api_clients.jwt_auth import get_or_refresh_token
 from epic_fhir_integration.bronze.resource_extractor import extract_all_resources
+from epic_fhir_integration.domain.bronze.full_refresh import full_refresh
 from epic_fhir_integration.utils.logging import configure_logging, get_logger
 
 # Configure logging
@@ -59,6 +60,33 @@ def run_bronze_extraction(resource_types=None, max_pages=50):
     return resources
 
 
+def run_full_refresh(output_dir, resource_types=None, use_bulk_export=True):
+    """Run a full refresh of the specified resource types into a bronze directory.
+    
+    Args:
+        output_dir: Root of the bronze layout.
+        resource_types: List of resource types to extract. If None, uses defaults.
+        use_bulk_export: Whether to use FHIR Bulk Data $export.
+        
+    Returns:
+        BulkExportResult listing the written files.
+    """
+    logger.info("Starting full refresh", resource_types=resource_types, output_dir=output_dir)
+    
+    start_time = time.time()
+    result = full_refresh(
+        output_dir,
+        resource_types=resource_types,
+        client=create_fhir_client(),
+        use_bulk_export=use_bulk_export,
+    )
+    
+    logger.info("Completed full refresh",
+               duration=f"{time.time() - start_time:.2f}s",
+               files=sum(len(paths) for paths in result.files.values()))
+    return result
+
+
 def main():
     """Main entry point for the pipeline CLI."""
     parser = argparse.ArgumentParser(description="Run the Epic FHIR pipeline")
@@ -76,6 +104,24 @@ def main():
         default=50
     )
     
+    parser.add_argument(
+        "--full-refresh",
+        help="Extract everything into --output-dir, using $export when available",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--output-dir", "-o",
+        help="Bronze output directory for --full-refresh",
+        default=os.environ.get("FHIR_OUTPUT_DIR", "output/bronze")
+    )
+    
+    parser.add_argument(
+        "--no-bulk-export",
+        help="Use paged searches instead of $export for --full-refresh",
+        action="store_true"
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         help="Enable verbose logging",
@@ -92,11 +138,18 @@ def main():
     resource_types = [r.strip() for r in args.resources.split(",") if r.strip()]
     
     try:
-        # Run bronze extraction
-        resources = run_bronze_extraction(
-            resource_types=resource_types,
-            max_pages=args.max_pages
-        )
+        if args.full_refresh:
+            run_full_refresh(
+                args.output_dir,
+                resource_types=resource_types,
+                use_bulk_export=not args.no_bulk_export,
+            )
+        else:
+            # Run bronze extraction
+            resources = run_bronze_extraction(
+                resource_types=resource_types,
+                max_pages=args.max_pages
+            )
         
         # Success
         logger.info("Pipeline completed successfully")
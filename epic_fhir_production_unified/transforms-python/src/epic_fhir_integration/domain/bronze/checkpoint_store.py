@@ -0,0 +1,198 @@
+"""
+Durable extraction checkpoints.
+
+This module records, per resource type and window, the ``next`` link of the
+last page that was durably persisted together with the position of the output
+writer and the highest ``meta.lastUpdated`` seen. A restarted extraction reads
+the cursor back and continues from the exact page instead of the watermark.
+"""
+
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Cursor states
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETE = "complete"
+
+
+@dataclass
+class ExtractionCursor:
+    """Progress of one extraction (a resource type within a window)."""
+
+    resource_type: str
+    window: str = ""
+    next_url: Optional[str] = None
+    max_last_updated: Optional[str] = None
+    pages: int = 0
+    records: int = 0
+    status: str = STATUS_IN_PROGRESS
+    writer_position: Dict[str, Any] = field(default_factory=dict)
+    state: Dict[str, Any] = field(default_factory=dict)
+    updated_at: Optional[str] = None
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether the extraction ran to the last page."""
+        return self.status == STATUS_COMPLETE
+
+
+class CheckpointStore:
+    """SQLite-backed store of extraction cursors.
+
+    Every save is committed with ``synchronous=FULL`` so that a cursor is on
+    disk before the extraction moves on to the next page. The store can be
+    shared between threads.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Open (or create) a checkpoint store.
+
+        Args:
+            path: SQLite database file. Use ":memory:" for a transient store.
+        """
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extraction_cursors (
+                    resource_type TEXT NOT NULL,
+                    window_key TEXT NOT NULL,
+                    next_url TEXT,
+                    max_last_updated TEXT,
+                    pages INTEGER NOT NULL,
+                    records INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    writer_position TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (resource_type, window_key)
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(extraction_cursors)")}
+            if "state" not in columns:
+                # Stores created before cursors carried extraction state
+                self._conn.execute(
+                    "ALTER TABLE extraction_cursors ADD COLUMN state TEXT NOT NULL DEFAULT '{}'"
+                )
+            self._conn.commit()
+
+    def get(self, resource_type: str, window: str = "") -> Optional[ExtractionCursor]:
+        """Get the cursor of an extraction.
+
+        Args:
+            resource_type: FHIR resource type.
+            window: Window key, e.g. the ``_lastUpdated`` range.
+
+        Returns:
+            The stored cursor, or None if there is none.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resource_type, window_key, next_url, max_last_updated, pages, records, "
+                "status, writer_position, state, updated_at FROM extraction_cursors "
+                "WHERE resource_type = ? AND window_key = ?",
+                (resource_type, window),
+            ).fetchone()
+        return self._to_cursor(row) if row else None
+
+    def list_cursors(self, resource_type: Optional[str] = None) -> List[ExtractionCursor]:
+        """List stored cursors.
+
+        Args:
+            resource_type: Optional resource type to filter on.
+
+        Returns:
+            Cursors ordered by resource type and window.
+        """
+        query = (
+            "SELECT resource_type, window_key, next_url, max_last_updated, pages, records, "
+            "status, writer_position, state, updated_at FROM extraction_cursors"
+        )
+        args: tuple = ()
+        if resource_type:
+            query += " WHERE resource_type = ?"
+            args = (resource_type,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY resource_type, window_key", args).fetchall()
+        return [self._to_cursor(row) for row in rows]
+
+    def save(self, cursor: ExtractionCursor) -> None:
+        """Durably store a cursor, replacing any previous one.
+
+        Args:
+            cursor: Cursor to store.
+        """
+        cursor.updated_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cursors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cursor.resource_type,
+                    cursor.window,
+                    cursor.next_url,
+                    cursor.max_last_updated,
+                    cursor.pages,
+                    cursor.records,
+                    cursor.status,
+                    json.dumps(cursor.writer_position),
+                    json.dumps(cursor.state),
+                    cursor.updated_at,
+                ),
+            )
+            self._conn.commit()
+
+    def delete(self, resource_type: str, window: Optional[str] = None) -> None:
+        """Delete the cursors of a resource type, or of one of its windows.
+
+        Args:
+            resource_type: FHIR resource type.
+            window: Optional window key. If not provided, all windows are deleted.
+        """
+        with self._lock:
+            if window is None:
+                self._conn.execute(
+                    "DELETE FROM extraction_cursors WHERE resource_type = ?", (resource_type,)
+                )
+            else:
+                self._conn.execute(
+                    "DELETE FROM extraction_cursors WHERE resource_type = ? AND window_key = ?",
+                    (resource_type, window),
+                )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_cursor(row) -> ExtractionCursor:
+        return ExtractionCursor(
+            resource_type=row[0],
+            window=row[1],
+            next_url=row[2],
+            max_last_updated=row[3],
+            pages=row[4],
+            records=row[5],
+            status=row[6],
+            writer_position=json.loads(row[7]),
+            state=json.loads(row[8]),
+            updated_at=row[9],
+        )
@@ -14,8 +14,10 @@ import os
 
 from epic_fhir_integration.api_clients.fhir_client import create_fhir_client
 from epic_fhir_integration.bronze.resource_extractor import (
-    extract_resource, resources_to_spark_df, last_watermark, find_max_updated_time
+    extract_resource, resources_to_spark_df, load_watermark
 )
+from epic_fhir_integration.domain.bronze.projection import elements_for
+from epic_fhir_integration.domain.bronze.time_windows import extract_resource_windowed
 from epic_fhir_integration.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -27,8 +29,12 @@ logger = get_logger(__name__)
     Config("resource_type", ""),
     Config("max_pages", 50),
     Config("batch_size", 100),
+    Config("time_windows", 1),
+    Config("max_workers", 4),
+    Config("project_elements", True),
 )
-def compute(ctx, output, resource_type, max_pages, batch_size):
+def compute(ctx, output, resource_type, max_pages, batch_size, time_windows, max_workers,
+            project_elements):
     """Extract FHIR resources from Epic API and write to Bronze dataset.
     
     Args:
@@ -37,38 +43,73 @@ def compute(ctx, output, resource_type, max_pages, batch_size):
         resource_type: FHIR resource type to extract.
         max_pages: Maximum number of pages to retrieve.
         batch_size: Batch size for API requests.
+        time_windows: Number of ``_lastUpdated`` windows to extract in parallel.
+                      1 keeps the single linear search.
+        max_workers: Maximum number of windows extracted at once.
+        project_elements: Whether to request only the elements read by the
+                          resource type's default silver extract spec. Turn
+                          off when the silver transform uses a custom spec.
     """
     if not resource_type:
         raise ValueError("resource_type config parameter is required")
     
     # Get last watermark for incremental load
-    watermark = last_watermark(ctx)
+    watermark = load_watermark(ctx)
     logger.info(f"Starting {resource_type} bronze extraction", 
                resource_type=resource_type,
-               watermark=watermark)
+               watermark=watermark.last_updated,
+               boundary_ids=len(watermark.boundary_ids or []))
     
     # Create FHIR client - now using Foundry secret manager if available
     client = create_fhir_client()
     
+    params = {"_count": batch_size}
+    elements = elements_for(resource_type) if project_elements else None
+    if elements:
+        params["_elements"] = ",".join(elements)
+        logger.info(f"Projecting {resource_type} to silver elements",
+                    resource_type=resource_type,
+                    elements=len(elements))
+    
     # Extract resources
-    resources = extract_resource(
-        client=client,
-        resource_type=resource_type,
-        params={"_count": batch_size},
-        max_pages=max_pages,
-        last_updated_since=watermark,
-    )
+    if time_windows > 1:
+        result = extract_resource_windowed(
+            client=client,
+            resource_type=resource_type,
+            since=watermark.last_updated or "1900-01-01T00:00:00Z",
+            num_windows=time_windows,
+            max_workers=max_workers,
+            params=params,
+        )
+        # A gap in the range must not be skipped by advancing the watermark
+        if result.failed_windows:
+            raise RuntimeError(
+                f"{len(result.failed_windows)} {resource_type} windows failed: "
+                f"{sorted(result.failed_windows)}"
+            )
+        resources = watermark.filter_new(result.resources)
+    else:
+        resources = extract_resource(
+            client=client,
+            resource_type=resource_type,
+            params=params,
+            max_pages=max_pages,
+            watermark=watermark,
+        )
     
     # Convert to Spark DataFrame
     spark = ctx.spark_session
     resources_df = resources_to_spark_df(resources, spark)
     
-    # Find the latest update timestamp for the next watermark
+    # The next watermark is committed by Foundry together with the output
+    # transaction, so a failed write never advances it
     if resources:
-        next_watermark = find_max_updated_time(resources)
-        if next_watermark:
-            logger.info("Setting next watermark", watermark=next_watermark)
-            ctx.set_next_watermark(next_watermark)
+        next_watermark = watermark.advance(resources)
+        if next_watermark != watermark:
+            logger.info("Setting next watermark",
+                        watermark=next_watermark.last_updated,
+                        boundary_ids=len(next_watermark.boundary_ids or []))
+            ctx.set_next_watermark(next_watermark.to_json())
     
     # Write to output with partitioning
     logger.info(f"Writing {resource_type} bronze dataset", 
@@ -0,0 +1,92 @@
+"""
+Full-refresh extraction into the bronze file layout.
+
+Full refreshes use FHIR Bulk Data ``$export`` by default: the server prepares
+NDJSON files asynchronously and they are downloaded in parallel, which is far
+cheaper than paging through every search result. Servers that do not accept
+the export fall back to paged searches. Both paths write through NDJSONWriter,
+so the partitions have the same layout and manifest either way, and both
+replace the partition of the ingest date rather than adding to it.
+"""
+
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import List, Optional, Union
+
+from epic_fhir_integration.api_clients.fhir_client import FHIRClient, create_fhir_client
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_resource_to_ndjson,
+    get_resource_list,
+)
+from epic_fhir_integration.infrastructure.api_clients.bulk_export import (
+    BulkExportClient,
+    BulkExportNotSupported,
+    BulkExportResult,
+    bronze_partition_dir,
+    replace_partition,
+    staging_dir,
+)
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def full_refresh(
+    output_dir: Union[str, Path],
+    resource_types: Optional[List[str]] = None,
+    client: Optional[FHIRClient] = None,
+    use_bulk_export: bool = True,
+    group_id: Optional[str] = None,
+    ingest_date: Optional[date] = None,
+    download_workers: int = 4,
+    max_pages: Optional[int] = None,
+    compression: Optional[str] = None,
+) -> BulkExportResult:
+    """Extract every resource of the given types into the bronze layout.
+
+    Args:
+        output_dir: Root of the bronze layout.
+        resource_types: Resource types to extract. If not provided, uses the
+                        ``INGEST_RESOURCES`` environment variable.
+        client: Optional FHIR client. If not provided, a new one will be created.
+        use_bulk_export: Whether to try ``$export`` before paged searches.
+        group_id: Optional Group ID to scope the export to a cohort.
+        ingest_date: Ingest date partition. Defaults to today.
+        download_workers: Number of export files downloaded concurrently.
+        max_pages: Optional page limit per resource type for the search fallback.
+        compression: Optional compression of the written files, "gzip" or "zstd".
+
+    Returns:
+        BulkExportResult listing the written files per resource type.
+    """
+    client = client or create_fhir_client()
+    resource_types = resource_types or get_resource_list()
+
+    if use_bulk_export:
+        exporter = BulkExportClient(client, download_workers=download_workers,
+                                    compression=compression)
+        try:
+            return exporter.export(
+                output_dir,
+                resource_types=resource_types,
+                group_id=group_id,
+                ingest_date=ingest_date,
+            )
+        except BulkExportNotSupported as e:
+            logger.warning("Bulk export not available, falling back to paged search",
+                           error=str(e))
+
+    result = BulkExportResult()
+    for resource_type in resource_types:
+        directory = bronze_partition_dir(output_dir, resource_type, ingest_date)
+        staging = staging_dir(directory)
+        shutil.rmtree(staging, ignore_errors=True)
+        files = extract_resource_to_ndjson(
+            client, staging, resource_type, max_pages=max_pages, prefix="search",
+            compression=compression,
+        )
+        replace_partition(staging, directory)
+        result.files[resource_type] = [directory / f.path for f in files]
+        result.resource_counts[resource_type] = sum(f.records for f in files)
+    return result
@@ -0,0 +1,420 @@
+"""
+Streaming NDJSON writer for the bronze file layout.
+
+Resources are appended as compact NDJSON lines while pages arrive, so memory
+use stays flat regardless of extract size. Output is optionally gzip- or
+zstd-compressed and rotated at a configurable size. A manifest lists every
+finished file, so downstream readers can start before the extraction ends.
+"""
+
+import gzip
+import io
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# File name of the manifest written next to the data files
+MANIFEST_NAME = "_manifest.json"
+
+# File extensions by compression codec
+_EXTENSIONS = {None: ".ndjson", "gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+
+@dataclass
+class NDJSONFile:
+    """A finished data file listed in the manifest."""
+
+    path: str
+    records: int
+    bytes: int
+    compression: Optional[str]
+
+
+def _fsync_write(path: Path, data: str) -> None:
+    """Atomically replace a small file, fsyncing it before the rename."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class NDJSONWriter:
+    """Append FHIR resources to rotating, optionally compressed NDJSON files.
+
+    Files are named ``<prefix>-<n><ext>`` inside ``directory``. A file is
+    listed in the manifest only once it is closed, so every listed file is
+    complete and safe to read.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        prefix: str = "part",
+        compression: Optional[str] = None,
+        max_file_bytes: int = 128 * 1024 * 1024,
+        compression_level: Optional[int] = None,
+        fsync: bool = True,
+    ):
+        """Initialize a new writer.
+
+        Args:
+            directory: Output directory, created if missing.
+            prefix: File name prefix.
+            compression: None, "gzip" or "zstd".
+            max_file_bytes: Size on disk at which a new file is started.
+            compression_level: Optional codec-specific compression level.
+            fsync: Whether checkpoints and rotation fsync data to disk.
+
+        Raises:
+            ValueError: If the compression codec is unknown.
+            ImportError: If zstd is requested but zstandard is not installed.
+        """
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstandard package is required for zstd compression. "
+                "Install it with 'pip install zstandard'."
+            )
+
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.compression = compression
+        self.max_file_bytes = max_file_bytes
+        self.compression_level = compression_level
+        self.fsync = fsync
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = read_manifest(self.directory)
+        # Appending to an existing directory keeps the files already listed
+        self.files: List[NDJSONFile] = [NDJSONFile(**f) for f in manifest.get("files", [])]
+        self.metadata: Dict[str, Any] = manifest.get("metadata", {})
+        self._opened_manifest = manifest
+        self.records_written = 0
+
+        self._raw = None
+        self._stream = None
+        self._path: Optional[Path] = None
+        self._file_records = 0
+        self._closed = False
+
+    @property
+    def manifest_path(self) -> Path:
+        """Path of the manifest file."""
+        return self.directory / MANIFEST_NAME
+
+    def _next_path(self) -> Path:
+        index = len(self.files)
+        while True:
+            path = self.directory / f"{self.prefix}-{index:05d}{_EXTENSIONS[self.compression]}"
+            if not path.exists():
+                return path
+            index += 1
+
+    def _wrap(self, raw):
+        """Wrap a binary file in the configured compression codec."""
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.compression_level or 6)
+        if self.compression == "zstd":
+            compressor = zstandard.ZstdCompressor(level=self.compression_level or 3)
+            return compressor.stream_writer(raw, closefd=False)
+        return raw
+
+    @staticmethod
+    def _encode(resource: Dict[str, Any]) -> bytes:
+        return (json.dumps(resource, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _open(self) -> None:
+        self._path = self._next_path()
+        self._raw = open(self._path, "wb")
+        self._file_records = 0
+        self._stream = self._wrap(self._raw)
+
+    def _finish_file(self) -> None:
+        """Close the current file and list it in the manifest."""
+        if self._raw is None:
+            return
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        if self.fsync:
+            os.fsync(self._raw.fileno())
+        self._raw.close()
+
+        if self._file_records:
+            self.files.append(NDJSONFile(
+                path=self._path.name,
+                records=self._file_records,
+                bytes=self._path.stat().st_size,
+                compression=self.compression,
+            ))
+        else:
+            self._path.unlink()
+
+        self._raw = self._stream = self._path = None
+        self._write_manifest(complete=False)
+
+    def _write_manifest(self, complete: bool) -> None:
+        manifest = {
+            "updated": datetime.now(timezone.utc).isoformat(),
+            "complete": complete,
+            "records": sum(f.records for f in self.files),
+            "files": [asdict(f) for f in self.files],
+            "metadata": self.metadata,
+        }
+        if self.fsync:
+            _fsync_write(self.manifest_path, json.dumps(manifest, indent=2))
+        else:
+            self.manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    def write(self, resource: Dict[str, Any]) -> None:
+        """Append one resource.
+
+        Args:
+            resource: FHIR resource dictionary.
+        """
+        if self._closed:
+            raise ValueError("Writer is closed")
+        if self._raw is None:
+            self._open()
+
+        self._stream.write(self._encode(resource))
+        self._file_records += 1
+        self.records_written += 1
+
+        if self._raw.tell() >= self.max_file_bytes:
+            self._finish_file()
+
+    def write_many(self, resources: Iterable[Dict[str, Any]]) -> int:
+        """Append several resources.
+
+        Args:
+            resources: FHIR resource dictionaries.
+
+        Returns:
+            Number of resources written.
+        """
+        count = 0
+        for resource in resources:
+            self.write(resource)
+            count += 1
+        return count
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Flush buffered data to disk.
+
+        Data written before a checkpoint survives a crash of this process. For
+        compressed files the codec is flushed as well, so the bytes on disk
+        decode up to this point.
+
+        Returns:
+            Position of the writer: current file, records in it and the number
+            of finished files.
+        """
+        if self._raw is not None:
+            if self.compression == "zstd":
+                self._stream.flush(zstandard.FLUSH_BLOCK)
+            else:
+                self._stream.flush()
+            self._raw.flush()
+            if self.fsync:
+                os.fsync(self._raw.fileno())
+
+        return {
+            "file": self._path.name if self._path else None,
+            "file_records": self._file_records,
+            "finished_files": len(self.files),
+            "records": self.records_written,
+        }
+
+    def recover(self, position: Dict[str, Any]) -> None:
+        """Roll the output back to a position returned by ``checkpoint``.
+
+        Used when resuming an interrupted extraction: files finished after the
+        checkpoint are deleted, and the file that was being written is cut back
+        to the records it held at the checkpoint and listed in the manifest.
+        The extraction then continues from the page after the checkpoint
+        without duplicating or losing records.
+
+        Args:
+            position: Writer position stored with the extraction cursor.
+
+        Raises:
+            ValueError: If the writer has already written data.
+        """
+        if self._raw is not None or self._closed:
+            raise ValueError("recover() must be called before writing")
+
+        finished = position.get("finished_files", len(self.files))
+        self.files = self.files[:finished]
+        keep = {f.path for f in self.files}
+        current = position.get("file")
+        current_records = position.get("file_records", 0)
+
+        pattern = f"{self.prefix}-*{_EXTENSIONS[self.compression]}"
+        for path in sorted(self.directory.glob(pattern)):
+            if path.name in keep:
+                continue
+            if path.name == current and current_records:
+                self._truncate(path, current_records)
+                self.files.append(NDJSONFile(
+                    path=path.name,
+                    records=current_records,
+                    bytes=path.stat().st_size,
+                    compression=self.compression,
+                ))
+            else:
+                path.unlink()
+
+        self.records_written = position.get("records", sum(f.records for f in self.files))
+        self._write_manifest(complete=False)
+        logger.info("Recovered NDJSON output",
+                    directory=str(self.directory),
+                    files=len(self.files),
+                    records=self.records_written)
+
+    def _truncate(self, path: Path, records: int) -> None:
+        """Rewrite a data file keeping only its first records."""
+        lines = []
+        try:
+            for resource in iter_ndjson(path):
+                lines.append(resource)
+                if len(lines) == records:
+                    break
+        except (EOFError, OSError, ValueError):
+            # The tail after the last checkpoint may be cut off mid-stream
+            pass
+        if len(lines) < records:
+            raise ValueError(f"{path} holds fewer records than its checkpoint")
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as raw:
+            stream = self._wrap(raw)
+            for resource in lines:
+                stream.write(self._encode(resource))
+            if stream is not raw:
+                stream.close()
+            raw.flush()
+            if self.fsync:
+                os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+
+    def close(self, metadata: Optional[Dict[str, Any]] = None) -> List[NDJSONFile]:
+        """Finish the current file and mark the manifest complete.
+
+        Args:
+            metadata: Optional entries to merge into the manifest metadata.
+                      They are committed in the same atomic manifest write
+                      that lists the final file, e.g. an extraction watermark.
+
+        Returns:
+            All files listed in the manifest.
+        """
+        if not self._closed:
+            self._finish_file()
+            if metadata:
+                self.metadata.update(metadata)
+            self._write_manifest(complete=True)
+            self._closed = True
+            logger.info("Closed NDJSON writer",
+                        directory=str(self.directory),
+                        files=len(self.files),
+                        records=self.records_written)
+        return self.files
+
+    def discard(self) -> None:
+        """Delete everything this writer wrote and restore the manifest it found.
+
+        Used when an extraction without a durable cursor fails: its rerun
+        starts over from the committed watermark, so neither the file being
+        written nor files finished during the failed run may stay listed.
+        """
+        if self._closed:
+            raise ValueError("Writer is closed")
+        if self._raw is not None:
+            if self._stream is not self._raw:
+                self._stream.close()
+            self._raw.close()
+            self._path.unlink()
+            self._raw = self._stream = self._path = None
+
+        kept = len(self._opened_manifest.get("files", []))
+        for f in self.files[kept:]:
+            (self.directory / f.path).unlink(missing_ok=True)
+        self.files = self.files[:kept]
+        self.records_written = 0
+        if self._opened_manifest:
+            _fsync_write(self.manifest_path, json.dumps(self._opened_manifest, indent=2))
+        else:
+            self.manifest_path.unlink(missing_ok=True)
+        self._closed = True
+        logger.info("Discarded NDJSON output", directory=str(self.directory))
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Keep what was written, but leave the manifest marked incomplete
+            self._finish_file()
+            self._closed = True
+
+
+def read_manifest(directory: Union[str, Path]) -> Dict[str, Any]:
+    """Read the manifest of an NDJSON output directory.
+
+    Args:
+        directory: Output directory of an NDJSONWriter.
+
+    Returns:
+        Manifest dictionary, empty if no manifest exists yet.
+    """
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_ndjson(path: Union[str, Path]) -> Iterable[Dict[str, Any]]:
+    """Iterate over the resources in an NDJSON file, compressed or not.
+
+    Args:
+        path: Data file path.
+
+    Yields:
+        FHIR resource dictionaries.
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        f = gzip.open(path, "rt", encoding="utf-8")
+    elif path.suffix == ".zst":
+        if zstandard is None:
+            raise ImportError("zstandard package is required to read zstd files")
+        f = io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+            encoding="utf-8",
+        )
+    else:
+        f = open(path, "r", encoding="utf-8")
+
+    with f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,281 @@
+"""
+Patient fan-out extraction for patient-scoped resources.
+
+Resources marked ``patient_scoped: true`` in ``resources_config.yaml`` are
+searched per patient (``patient=<id>``). This module schedules those searches
+for a cohort of Patient IDs across a worker pool. Retries are left to the
+client's resilience layer; a patient whose searches still fail is reported and
+not checkpointed, so the next run picks it up. Completed patients are
+checkpointed so that an interrupted refresh resumes where it stopped.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+import yaml
+
+from epic_fhir_integration.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.metrics.collector import (
+    MetricsCollector,
+    get_collector_instance,
+)
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Used when resources_config.yaml cannot be found
+DEFAULT_PATIENT_SCOPED_RESOURCES = ["Encounter", "Observation", "Condition"]
+
+# Repository-level resource configuration, overridable via RESOURCES_CONFIG_PATH
+_RESOURCES_CONFIG_PATH = Path(__file__).resolve().parents[5] / "config" / "resources_config.yaml"
+
+
+def get_patient_scoped_resources(config_path: Optional[Union[str, Path]] = None) -> List[str]:
+    """Get the enabled, patient-scoped resource types from the resource config.
+
+    Args:
+        config_path: Optional path to ``resources_config.yaml``. Defaults to
+                     ``RESOURCES_CONFIG_PATH`` or the repository config.
+
+    Returns:
+        Resource types ordered by configured priority.
+    """
+    path = Path(config_path or os.environ.get("RESOURCES_CONFIG_PATH", _RESOURCES_CONFIG_PATH))
+    if not path.exists():
+        logger.warning("Resource config not found, using defaults", path=str(path))
+        return list(DEFAULT_PATIENT_SCOPED_RESOURCES)
+
+    with open(path, "r") as f:
+        resources = (yaml.safe_load(f) or {}).get("resources", {})
+
+    scoped = [
+        (settings.get("priority", 99), resource_type)
+        for resource_type, settings in resources.items()
+        if settings.get("enabled", True) and settings.get("patient_scoped", False)
+    ]
+    return [resource_type for _, resource_type in sorted(scoped)]
+
+
+@dataclass
+class FanoutResult:
+    """Outcome of a patient fan-out run."""
+
+    resources: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    completed_patients: int = 0
+    skipped_patients: int = 0
+    failed_patients: Dict[str, str] = field(default_factory=dict)
+    resource_counts: Dict[str, int] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def resource_count(self) -> int:
+        """Total number of distinct resources extracted."""
+        return sum(self.resource_counts.values())
+
+    @property
+    def patients_per_second(self) -> float:
+        """Completed patients per second of wall-clock time."""
+        return self.completed_patients / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def resources_per_second(self) -> float:
+        """Extracted resources per second of wall-clock time."""
+        return self.resource_count / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class PatientFanoutScheduler:
+    """Schedule patient-scoped searches for a cohort across a worker pool."""
+
+    def __init__(
+        self,
+        client: FHIRClient,
+        resource_types: Optional[List[str]] = None,
+        max_workers: int = 8,
+        params: Optional[Dict[str, Any]] = None,
+        max_pages: Optional[int] = None,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+        checkpoint_every: int = 100,
+        metrics: Optional[MetricsCollector] = None,
+        collect_resources: bool = True,
+    ):
+        """Initialize a new scheduler.
+
+        Args:
+            client: FHIR client shared by all workers.
+            resource_types: Resource types to search per patient. Defaults to
+                            the patient-scoped types in the resource config.
+            max_workers: Number of patients processed concurrently.
+            params: Optional additional search parameters for every search.
+            max_pages: Optional page limit per search (default: unlimited).
+            checkpoint_path: Optional JSON file recording completed patients.
+            checkpoint_every: Number of completed patients between checkpoint writes.
+            metrics: Metrics collector. Defaults to the shared collector.
+            collect_resources: Whether to keep extracted resources in the result.
+                               Disable for large cohorts that stream results
+                               through ``on_patient_complete``.
+        """
+        self.client = client
+        self.resource_types = resource_types or get_patient_scoped_resources()
+        self.max_workers = max_workers
+        self.params = params or {}
+        self.max_pages = max_pages
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.checkpoint_every = checkpoint_every
+        self.metrics = metrics or get_collector_instance()
+        self.collect_resources = collect_resources
+
+        self._lock = threading.Lock()
+        self._completed: Set[str] = set()
+        self._unsaved = 0
+
+    def _load_checkpoint(self) -> Set[str]:
+        if not self.checkpoint_path or not self.checkpoint_path.exists():
+            return set()
+        with open(self.checkpoint_path, "r") as f:
+            return set(json.load(f).get("completed_patients", []))
+
+    def _save_checkpoint(self) -> None:
+        if not self.checkpoint_path:
+            return
+        with self._lock:
+            completed = sorted(self._completed)
+            self._unsaved = 0
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a crash never leaves a truncated checkpoint
+        tmp_path = self.checkpoint_path.with_suffix(self.checkpoint_path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"completed_patients": completed}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _extract_patient(self, patient_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Run every scoped search for one patient.
+
+        Each request already draws on the client's retry budget and circuit
+        breaker, so a failure here is final for this run.
+        """
+        results = {}
+        for resource_type in self.resource_types:
+            params = dict(self.params)
+            params["patient"] = patient_id
+            results[resource_type] = self.client.get_all_resources(
+                resource_type=resource_type,
+                params=params,
+                max_pages=self.max_pages,
+            )
+        return results
+
+    def run(
+        self,
+        patient_ids: Iterable[str],
+        on_patient_complete: Optional[Callable[[str, Dict[str, List[Dict[str, Any]]]], None]] = None,
+    ) -> FanoutResult:
+        """Extract the scoped resources for every patient in the cohort.
+
+        Args:
+            patient_ids: Patient IDs, e.g. from the Patient extraction. Duplicates
+                         are ignored.
+            on_patient_complete: Optional callback invoked with each patient's
+                                 resources, before the patient is checkpointed.
+
+        Returns:
+            FanoutResult with deduplicated resources and throughput statistics.
+        """
+        self._completed = self._load_checkpoint()
+        cohort = list(dict.fromkeys(pid for pid in patient_ids if pid))
+        pending = [pid for pid in cohort if pid not in self._completed]
+
+        result = FanoutResult(
+            resources={resource_type: [] for resource_type in self.resource_types},
+            resource_counts={resource_type: 0 for resource_type in self.resource_types},
+            skipped_patients=len(cohort) - len(pending),
+        )
+        seen: Dict[str, Set[str]] = {resource_type: set() for resource_type in self.resource_types}
+
+        logger.info("Starting patient fan-out",
+                    patients=len(pending),
+                    skipped=result.skipped_patients,
+                    resource_types=self.resource_types,
+                    max_workers=self.max_workers)
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._extract_patient, pid): pid for pid in pending}
+            for future in as_completed(futures):
+                patient_id = futures[future]
+                try:
+                    patient_resources = future.result()
+                except Exception as e:
+                    logger.error("Patient extraction failed",
+                                 patient_id=patient_id,
+                                 error=str(e))
+                    result.failed_patients[patient_id] = str(e)
+                    continue
+
+                if on_patient_complete:
+                    on_patient_complete(patient_id, patient_resources)
+
+                # Resources shared between patients (e.g. group encounters) are kept once
+                for resource_type, resources in patient_resources.items():
+                    for resource in resources:
+                        resource_id = resource.get("id")
+                        if resource_id in seen[resource_type]:
+                            continue
+                        if resource_id:
+                            seen[resource_type].add(resource_id)
+                        result.resource_counts[resource_type] += 1
+                        if self.collect_resources:
+                            result.resources[resource_type].append(resource)
+
+                result.completed_patients += 1
+                with self._lock:
+                    self._completed.add(patient_id)
+                    self._unsaved += 1
+                    save = self._unsaved >= self.checkpoint_every
+                if save:
+                    self._save_checkpoint()
+
+        self._save_checkpoint()
+        result.elapsed_seconds = time.monotonic() - start
+
+        self._record_metrics(result)
+        logger.info("Completed patient fan-out",
+                    patients=result.completed_patients,
+                    failed=len(result.failed_patients),
+                    resources=result.resource_count,
+                    patients_per_second=round(result.patients_per_second, 2),
+                    resources_per_second=round(result.resources_per_second, 2))
+        return result
+
+    def _record_metrics(self, result: FanoutResult) -> None:
+        metrics = [
+            {"step": "extract", "name": "fanout_patients_completed",
+             "value": result.completed_patients},
+            {"step": "extract", "name": "fanout_patients_failed",
+             "value": len(result.failed_patients)},
+            {"step": "extract", "name": "fanout_patients_per_second",
+             "value": result.patients_per_second},
+            {"step": "extract", "name": "fanout_resources_per_second",
+             "value": result.resources_per_second},
+        ]
+        for resource_type, count in result.resource_counts.items():
+            metrics.append({"step": "extract", "name": "fanout_resource_count",
+                            "value": count, "resource_type": resource_type})
+        self.metrics.record_batch(metrics)
+
+
+def extract_patient_ids(patients: Iterable[Dict[str, Any]]) -> List[str]:
+    """Get the IDs of extracted Patient resources.
+
+    Args:
+        patients: Patient resources.
+
+    Returns:
+        Patient IDs in input order, without duplicates.
+    """
+    return list(dict.fromkeys(p["id"] for p in patients if p.get("id")))
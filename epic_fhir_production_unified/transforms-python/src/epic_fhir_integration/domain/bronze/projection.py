@@ -0,0 +1,135 @@
+"""
+Element projection of FHIR searches derived from the silver extract specs.
+
+The silver transforms read a few dozen paths per resource through the
+Pathling extract specs in ``domain/silver/extract_specs``. Extractions that
+only feed those transforms can ask the server for just the top-level elements
+the specs use, with the ``_elements`` search parameter, which cuts the bytes
+on the wire and the JSON parsing cost. ``id`` and ``meta`` are always
+requested, as incremental extraction relies on ``meta.lastUpdated``.
+
+Set ``FHIR_ELEMENTS_OPT_OUT`` to a comma-separated list of resource types (or
+``*``) to fetch full resources for those types.
+"""
+
+import functools
+import os
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Union
+
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Specs of the silver transforms, read as files to keep bronze free of silver imports
+EXTRACT_SPEC_DIR = Path(__file__).resolve().parent.parent / "silver" / "extract_specs"
+
+# Elements requested whatever the specs select
+ALWAYS_INCLUDED = ("id", "meta")
+
+# Choice elements ([x]) used by the specs; ``_elements`` takes the base name
+CHOICE_ELEMENTS = {
+    "abatement",
+    "deceased",
+    "effective",
+    "medication",
+    "multipleBirth",
+    "occurrence",
+    "onset",
+    "performed",
+    "reported",
+    "value",
+}
+
+_ELEMENT_PATTERN = re.compile(r"\s*([A-Za-z][A-Za-z0-9_]*)")
+
+# A ``select`` entry: ``- path: <expression> ; as: <column>``
+_PATH_PATTERN = re.compile(r"^\s*-\s*path:\s*(.+?)\s*$")
+
+
+def top_level_element(expression: str) -> Optional[str]:
+    """Get the top-level element a FHIRPath expression reads.
+
+    Args:
+        expression: FHIRPath expression relative to the resource, e.g.
+                    ``subject.reference.substring(8)``.
+
+    Returns:
+        Element name as accepted by ``_elements`` (choice elements by their
+        base name), or None if the expression does not start with an element.
+    """
+    match = _ELEMENT_PATTERN.match(expression)
+    if match is None:
+        return None
+    name = match.group(1)
+    for base in CHOICE_ELEMENTS:
+        if name.startswith(base) and name[len(base):len(base) + 1].isupper():
+            return base
+    return name
+
+
+def spec_expressions(text: str) -> List[str]:
+    """Get the FHIRPath expressions selected by an extract spec.
+
+    The specs put the column alias on the path line (``<expression> ; as:
+    <name>``), which is not valid YAML, so they are read line by line.
+
+    Args:
+        text: Extract spec contents.
+
+    Returns:
+        Expressions in spec order.
+    """
+    expressions = []
+    for line in text.splitlines():
+        match = _PATH_PATTERN.match(line)
+        if match:
+            expression = match.group(1).split(" ; ", 1)[0].split(" #", 1)[0].strip()
+            if expression:
+                expressions.append(expression)
+    return expressions
+
+
+@functools.lru_cache(maxsize=None)
+def _spec_elements(spec_path: Path) -> tuple:
+    elements: Set[str] = set(ALWAYS_INCLUDED)
+    for expression in spec_expressions(spec_path.read_text()):
+        element = top_level_element(expression)
+        if element is not None:
+            elements.add(element)
+    return tuple(sorted(elements))
+
+
+def get_elements_opt_out() -> Set[str]:
+    """Get the resource types opted out of projection via ``FHIR_ELEMENTS_OPT_OUT``."""
+    value = os.getenv("FHIR_ELEMENTS_OPT_OUT", "")
+    return {t.strip() for t in value.split(",") if t.strip()}
+
+
+def elements_for(
+    resource_type: str,
+    spec_dir: Union[str, Path] = EXTRACT_SPEC_DIR,
+    opt_out: Optional[Iterable[str]] = None,
+) -> Optional[List[str]]:
+    """Get the ``_elements`` projection for a resource type.
+
+    Args:
+        resource_type: FHIR resource type.
+        spec_dir: Directory of ``<resource_type>.yaml`` extract specs.
+        opt_out: Resource types (or "*") to fetch in full. Defaults to
+                 ``FHIR_ELEMENTS_OPT_OUT``.
+
+    Returns:
+        Sorted element names, or None if the type is opted out or has no
+        extract spec, in which case full resources must be fetched.
+    """
+    opt_out = get_elements_opt_out() if opt_out is None else set(opt_out)
+    if resource_type in opt_out or "*" in opt_out:
+        return None
+    spec_path = Path(spec_dir) / f"{resource_type}.yaml"
+    if not spec_path.is_file():
+        return None
+    elements = list(_spec_elements(spec_path.resolve()))
+    logger.debug("Derived element projection", resource_type=resource_type, elements=elements)
+    return elements
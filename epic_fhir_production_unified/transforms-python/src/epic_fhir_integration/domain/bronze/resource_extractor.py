@@ -8,14 +8,31 @@ from the Epic API and writing them to Bronze datasets in Foundry.
 import json
 import os
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional, Any, Union
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 import pyspark.sql.functions as F
 from pyspark.sql import DataFrame, SparkSession
 from pyspark.sql.types import StructType, StructField, StringType, TimestampType, DateType
 
-from epic_fhir_integration.api_clients.fhir_client import FHIRClient, create_fhir_client
+from epic_fhir_integration.api_clients.fhir_client import (
+    FHIRClient,
+    create_fhir_client,
+    get_next_link,
+)
+from epic_fhir_integration.domain.bronze.checkpoint_store import (
+    STATUS_COMPLETE,
+    CheckpointStore,
+    ExtractionCursor,
+)
+from epic_fhir_integration.domain.bronze.projection import elements_for
+from epic_fhir_integration.domain.bronze.ndjson_writer import (
+    NDJSONFile,
+    NDJSONWriter,
+    read_manifest,
+)
+from epic_fhir_integration.domain.bronze.watermark import Watermark, resource_last_updated
+from epic_fhir_integration.utils.fhir_datetime import parse_fhir_instant
 from epic_fhir_integration.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -34,18 +51,15 @@ def get_resource_list() -> List[str]:
     return [r.strip() for r in resources_env.split(",") if r.strip()]
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=30),
-    retry=retry_if_exception_type((ConnectionError, TimeoutError)),
-    reraise=True
-)
 def extract_resource(
     client: FHIRClient,
     resource_type: str,
     params: Optional[Dict[str, Any]] = None,
     max_pages: int = 50,
     last_updated_since: Optional[str] = None,
+    prefetch_pages: int = 0,
+    watermark: Optional[Watermark] = None,
+    elements: Optional[List[str]] = None,
 ) -> List[Dict[str, Any]]:
     """Extract resources of specified type from the Epic API.
     
@@ -55,15 +69,25 @@ def extract_resource(
         params: Optional search parameters.
         max_pages: Maximum number of pages to retrieve.
         last_updated_since: Optional timestamp to fetch only resources updated since.
+        prefetch_pages: Number of pages to fetch ahead in the background.
+        watermark: Optional incremental watermark. Takes precedence over
+                   last_updated_since; resources already ingested at the
+                   boundary instant are filtered out.
+        elements: Optional top-level elements to request with ``_elements``,
+                  e.g. from ``elements_for``.
         
     Returns:
         List of FHIR resources.
     """
     # Default params
-    params = params or {}
+    params = dict(params or {})
+    if elements:
+        params["_elements"] = ",".join(elements)
     
     # Add last updated parameter if provided
-    if last_updated_since:
+    if watermark is not None and watermark.last_updated:
+        params["_lastUpdated"] = watermark.search_param()
+    elif last_updated_since:
         params["_lastUpdated"] = f"gt{last_updated_since}"
     
     logger.info(f"Extracting {resource_type} resources", 
@@ -76,7 +100,10 @@ def extract_resource(
             resource_type=resource_type,
             params=params,
             max_pages=max_pages,
+            prefetch_pages=prefetch_pages,
         )
+        if watermark is not None:
+            resources = watermark.filter_new(resources)
         
         logger.info(f"Extracted {resource_type} resources", 
                   resource_type=resource_type, 
@@ -86,10 +113,146 @@ def extract_resource(
         logger.error(f"Error extracting {resource_type} resources", 
                     resource_type=resource_type,
                     error=str(e))
-        # Reraise to trigger retry if applicable
+        # Requests have already been retried by the client
         raise
 
 
+def extract_resource_to_ndjson(
+    client: FHIRClient,
+    output_dir: Union[str, Path],
+    resource_type: str,
+    params: Optional[Dict[str, Any]] = None,
+    max_pages: Optional[int] = None,
+    last_updated_since: Optional[str] = None,
+    prefetch_pages: int = 1,
+    compression: Optional[str] = None,
+    max_file_bytes: int = 128 * 1024 * 1024,
+    prefix: str = "part",
+    checkpoint_store: Optional[CheckpointStore] = None,
+    window: Optional[str] = None,
+    incremental: bool = False,
+    elements: Optional[List[str]] = None,
+) -> List[NDJSONFile]:
+    """Stream resources of specified type from the Epic API to NDJSON files.
+    
+    Unlike ``extract_resource``, resources are never accumulated in memory:
+    each page is appended to the output as it arrives and checkpointed to disk.
+    With a checkpoint store, the ``next`` link of every persisted page is
+    recorded, and a rerun after a failure continues from that exact page.
+    
+    In incremental mode the watermark of the previous run is read from the
+    output manifest and only the delta is requested. The advanced watermark
+    is written in the same atomic manifest update that lists the final file,
+    so data and watermark are committed together. Without a checkpoint store
+    a failed run is discarded, since its rerun starts over from the old
+    watermark.
+    
+    Args:
+        client: FHIR client to use.
+        output_dir: Directory for the NDJSON files and their manifest.
+        resource_type: FHIR resource type (e.g., "Patient", "Observation").
+        params: Optional search parameters.
+        max_pages: Maximum number of pages to retrieve (default: unlimited).
+        last_updated_since: Optional timestamp to fetch only resources updated since.
+        prefetch_pages: Number of pages to fetch ahead while writing.
+        compression: None, "gzip" or "zstd".
+        max_file_bytes: Size at which output files are rotated.
+        prefix: Output file name prefix.
+        checkpoint_store: Optional store of durable page cursors.
+        window: Cursor key within the resource type. Defaults to the
+                ``_lastUpdated`` search parameter.
+        incremental: Whether to extract only resources past the watermark
+                     stored in the output manifest.
+        elements: Optional top-level elements to request with ``_elements``,
+                  e.g. from ``elements_for``.
+        
+    Returns:
+        Files listed in the output manifest.
+    """
+    params = dict(params or {})
+    if elements:
+        params["_elements"] = ",".join(elements)
+    base = read_watermark(output_dir) if incremental else None
+    if base is not None and base.last_updated:
+        params["_lastUpdated"] = base.search_param()
+    elif last_updated_since:
+        params["_lastUpdated"] = f"gt{last_updated_since}"
+    if window is None:
+        last_updated = params.get("_lastUpdated", "")
+        window = ",".join(last_updated) if isinstance(last_updated, list) else str(last_updated)
+    
+    cursor = None
+    if checkpoint_store is not None:
+        cursor = checkpoint_store.get(resource_type, window)
+        if cursor is not None and cursor.is_complete:
+            logger.info(f"{resource_type} extraction already complete",
+                       resource_type=resource_type,
+                       window=window,
+                       records=cursor.records)
+            return [NDJSONFile(**f) for f in read_manifest(output_dir).get("files", [])]
+        if cursor is None:
+            cursor = ExtractionCursor(resource_type=resource_type, window=window)
+    
+    start_url = cursor.next_url if cursor is not None else None
+    advanced = base
+    if base is not None and cursor is not None and "watermark" in cursor.state:
+        advanced = Watermark.from_dict(cursor.state["watermark"])
+    logger.info(f"Streaming {resource_type} resources to NDJSON",
+               resource_type=resource_type,
+               params=params,
+               output_dir=str(output_dir),
+               resumed_from=start_url)
+    
+    with NDJSONWriter(output_dir, prefix=prefix, compression=compression,
+                      max_file_bytes=max_file_bytes) as writer:
+        if cursor is not None and cursor.writer_position:
+            writer.recover(cursor.writer_position)
+        
+        try:
+            pages = client.iter_pages(resource_type, params, max_pages, prefetch_pages,
+                                      start_url=start_url)
+            for page in pages:
+                resources = [
+                    entry["resource"] for entry in page.get("entry", []) if entry.get("resource")
+                ]
+                if base is not None:
+                    resources = base.filter_new(resources)
+                    advanced = advanced.advance(resources)
+                writer.write_many(resources)
+                position = writer.checkpoint()
+            
+                # The page is durable on disk; now move the cursor past it
+                if cursor is not None:
+                    page_max = find_max_updated_time(resources)
+                    if page_max and (not cursor.max_last_updated or
+                                     parse_fhir_instant(page_max) > parse_fhir_instant(cursor.max_last_updated)):
+                        cursor.max_last_updated = page_max
+                    if advanced is not None:
+                        cursor.state["watermark"] = advanced.to_dict()
+                    cursor.next_url = get_next_link(page)
+                    cursor.pages += 1
+                    cursor.records += len(resources)
+                    cursor.writer_position = position
+                    checkpoint_store.save(cursor)
+        except BaseException:
+            # Without a cursor the rerun starts over from the old watermark
+            if cursor is None:
+                writer.discard()
+            raise
+        
+        writer.close(metadata={"watermark": advanced.to_dict()} if advanced is not None else None)
+    
+    if cursor is not None:
+        cursor.status = STATUS_COMPLETE
+        checkpoint_store.save(cursor)
+    
+    logger.info(f"Streamed {resource_type} resources",
+               resource_type=resource_type,
+               count=writer.records_written,
+               files=len(writer.files))
+    return writer.files
+
+
 def resources_to_spark_df(
     resources: List[Dict[str, Any]], 
     spark: Optional[SparkSession] = None
@@ -174,25 +337,68 @@ def last_watermark(ctx, default="1900-01-01T00:00:00Z"):
     return ctx.get_last_watermark() or default
 
 
+def load_watermark(ctx) -> Watermark:
+    """Get the incremental watermark from the transform context.
+    
+    Watermarks stored as a plain instant by earlier runs are accepted.
+    
+    Args:
+        ctx: Transform context.
+        
+    Returns:
+        Watermark, empty if none is found.
+    """
+    return Watermark.from_json(ctx.get_last_watermark())
+
+
+def read_watermark(output_dir: Union[str, Path]) -> Watermark:
+    """Get the incremental watermark committed with NDJSON output.
+    
+    Full refreshes write ``ingest_date=<date>`` partitions below the same
+    directory, with the export's transactionTime as watermark. The newest
+    watermark of the directory and its complete partitions is returned, so
+    an incremental run continues from the last full refresh.
+    
+    Args:
+        output_dir: Directory of an NDJSONWriter.
+        
+    Returns:
+        Watermark, empty if the output has none.
+    """
+    output_dir = Path(output_dir)
+    manifest = read_manifest(output_dir)
+    watermark = Watermark.from_dict(manifest.get("metadata", {}).get("watermark"))
+    for partition in sorted(output_dir.glob("ingest_date=*")):
+        manifest = read_manifest(partition)
+        if not manifest.get("complete"):
+            continue
+        candidate = Watermark.from_dict(manifest.get("metadata", {}).get("watermark"))
+        if candidate.instant is not None and (
+                watermark.instant is None or candidate.instant > watermark.instant):
+            watermark = candidate
+    return watermark
+
+
 def find_max_updated_time(resources: List[Dict[str, Any]]) -> Optional[str]:
     """Find the maximum lastUpdated value from a list of resources.
     
+    Values are compared as instants, so timezone offsets and fractional
+    seconds are ordered correctly.
+    
     Args:
         resources: List of FHIR resources.
         
     Returns:
-        Maximum lastUpdated value, or None if not found.
+        Maximum lastUpdated value as it appears in the resource, or None if not found.
     """
-    update_times = []
+    max_time = None
+    max_value = None
     for resource in resources:
-        meta = resource.get("meta", {})
-        last_updated = meta.get("lastUpdated")
-        if last_updated:
-            update_times.append(last_updated)
-    
-    if update_times:
-        return max(update_times)
-    return None
+        updated = resource_last_updated(resource)
+        if updated is not None and (max_time is None or updated > max_time):
+            max_time = updated
+            max_value = resource["meta"]["lastUpdated"]
+    return max_value
 
 
 def extract_all_resources(
@@ -201,6 +407,8 @@ def extract_all_resources(
     params: Optional[Dict[str, Any]] = None,
     max_pages: int = 50,
     last_updated_since: Optional[str] = None,
+    prefetch_pages: int = 0,
+    project_elements: bool = False,
 ) -> Dict[str, List[Dict[str, Any]]]:
     """Extract multiple FHIR resource types from the Epic API.
     
@@ -210,6 +418,9 @@ def extract_all_resources(
         params: Optional search parameters.
         max_pages: Maximum number of pages to retrieve per resource type.
         last_updated_since: Optional timestamp to fetch only resources updated since.
+        prefetch_pages: Number of pages to fetch ahead in the background.
+        project_elements: Whether to request only the elements the silver
+                          extract specs read (see ``elements_for``).
         
     Returns:
         Dictionary mapping resource types to lists of resources.
@@ -235,10 +446,71 @@ def extract_all_resources(
                 params=params,
                 max_pages=max_pages,
                 last_updated_since=last_updated_since,
+                prefetch_pages=prefetch_pages,
+                elements=elements_for(resource_type) if project_elements else None,
             )
             result[resource_type] = resources
         except Exception as e:
             logger.error(f"Failed to extract {resource_type}", error=str(e))
             result[resource_type] = []
     
-    return result 
\ No newline at end of file
+    return result 
+
+
+def extract_all_resources_to_ndjson(
+    output_dir: Union[str, Path],
+    client: Optional[FHIRClient] = None,
+    resource_types: Optional[List[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+    max_pages: Optional[int] = None,
+    last_updated_since: Optional[str] = None,
+    compression: Optional[str] = None,
+    checkpoint_store: Optional[CheckpointStore] = None,
+    incremental: bool = False,
+    project_elements: bool = False,
+) -> Dict[str, List[NDJSONFile]]:
+    """Stream multiple FHIR resource types to NDJSON, one directory per type.
+    
+    With a checkpoint store, resource types finished by an earlier run are
+    skipped and an interrupted type resumes from its last persisted page.
+    
+    Args:
+        output_dir: Root output directory; each type is written to ``<output_dir>/<type>``.
+        client: Optional FHIR client. If not provided, a new one will be created.
+        resource_types: List of resource types to extract. If not provided, uses environment variable.
+        params: Optional search parameters.
+        max_pages: Maximum number of pages to retrieve per resource type.
+        last_updated_since: Optional timestamp to fetch only resources updated since.
+        compression: None, "gzip" or "zstd".
+        checkpoint_store: Optional store of durable page cursors.
+        incremental: Whether to extract only the delta since each type's
+                     stored watermark.
+        project_elements: Whether to request only the elements the silver
+                          extract specs read (see ``elements_for``). Types
+                          without a spec or listed in ``FHIR_ELEMENTS_OPT_OUT``
+                          are fetched in full.
+        
+    Returns:
+        Dictionary mapping resource types to their output files.
+    """
+    if client is None:
+        client = create_fhir_client()
+    
+    if resource_types is None:
+        resource_types = get_resource_list()
+    
+    return {
+        resource_type: extract_resource_to_ndjson(
+            client=client,
+            output_dir=Path(output_dir) / resource_type,
+            resource_type=resource_type,
+            params=params,
+            max_pages=max_pages,
+            last_updated_since=last_updated_since,
+            compression=compression,
+            checkpoint_store=checkpoint_store,
+            incremental=incremental,
+            elements=elements_for(resource_type) if project_elements else None,
+        )
+        for resource_type in resource_types
+    }
@@ -0,0 +1,386 @@
+"""
+Time-sliced parallel extraction for Bronze backfills.
+
+A single ``_lastUpdated=gt{watermark}`` search is one linear cursor: every
+page waits on the previous page's next link. This module splits the range from
+the watermark to now into disjoint ``_lastUpdated`` windows (``ge``/``lt``
+pairs), extracts the windows concurrently and merges the results. With an
+output directory and a checkpoint store, every window is streamed to its own
+NDJSON directory and recorded as complete only once its files are on disk, so
+a rerun reads completed windows back instead of requesting them again. The
+windows are then merged by streaming into ``<output_dir>/merged``, so memory
+holds resource IDs rather than resources.
+"""
+
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from epic_fhir_integration.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.domain.bronze.checkpoint_store import (
+    CheckpointStore,
+    ExtractionCursor,
+)
+from epic_fhir_integration.domain.bronze.ndjson_writer import NDJSONWriter, iter_ndjson
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_resource_to_ndjson,
+)
+from epic_fhir_integration.domain.bronze.watermark import resource_last_updated
+from epic_fhir_integration.utils.fhir_datetime import (
+    format_fhir_instant,
+    parse_fhir_instant,
+)
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# A range ending "now" ends at the start of the current minute, so that plans
+# made within the same minute have the same window boundaries
+WINDOW_GRAIN = timedelta(minutes=1)
+
+# Directory under output_dir holding the merged, deduplicated windows
+MERGED_DIRNAME = "merged"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """Half-open ``[start, end)`` range of ``meta.lastUpdated`` values."""
+
+    start: datetime
+    end: datetime
+
+    @property
+    def key(self) -> str:
+        """Stable identifier of the window, used for checkpoints."""
+        return f"{format_fhir_instant(self.start)}/{format_fhir_instant(self.end)}"
+
+    @property
+    def dirname(self) -> str:
+        """File system safe form of the key, used for the window's output."""
+        return self.key.replace(":", "").replace("/", "_")
+
+    def to_search_param(self) -> List[str]:
+        """Build the ``_lastUpdated`` search parameter values for the window.
+
+        Returns:
+            List of prefixed values, sent as repeated ``_lastUpdated`` parameters.
+        """
+        return [f"ge{format_fhir_instant(self.start)}", f"lt{format_fhir_instant(self.end)}"]
+
+
+@dataclass
+class WindowCheckpoint:
+    """Progress record for a completed window."""
+
+    window: str
+    resource_count: int
+    max_last_updated: Optional[str] = None
+
+
+@dataclass
+class WindowedExtractionResult:
+    """Merged output of a windowed extraction.
+
+    Without an output directory the merged resources are held in
+    ``resources``; with one they are written to ``files`` instead and
+    ``resources`` stays empty.
+    """
+
+    resources: List[Dict[str, Any]] = field(default_factory=list)
+    files: List[Path] = field(default_factory=list)
+    resource_count: int = 0
+    checkpoints: Dict[str, WindowCheckpoint] = field(default_factory=dict)
+    failed_windows: Dict[str, str] = field(default_factory=dict)
+
+    def iter_resources(self) -> Iterable[Dict[str, Any]]:
+        """Iterate over the merged resources, reading them from files if written."""
+        if not self.files:
+            yield from self.resources
+            return
+        for path in self.files:
+            yield from iter_ndjson(path)
+
+    @property
+    def max_last_updated(self) -> Optional[str]:
+        """Latest ``meta.lastUpdated`` across completed windows."""
+        values = [c.max_last_updated for c in self.checkpoints.values() if c.max_last_updated]
+        if not values:
+            return None
+        return max(values, key=parse_fhir_instant)
+
+
+def _truncate(value: datetime, grain: timedelta) -> datetime:
+    return value - (value - _EPOCH) % grain
+
+
+def plan_time_windows(
+    since: Union[str, datetime],
+    until: Optional[Union[str, datetime]] = None,
+    num_windows: int = 8,
+    grain: timedelta = WINDOW_GRAIN,
+) -> List[TimeWindow]:
+    """Split a ``_lastUpdated`` range into disjoint, contiguous windows.
+
+    Boundaries are rounded to whole seconds so that they format cleanly as
+    FHIR instants; windows that collapse to zero length are dropped. The
+    boundaries depend only on the range, so window keys match between runs
+    for the same range.
+
+    Args:
+        since: Start of the range (inclusive), typically the last watermark.
+        until: End of the range (exclusive). Defaults to now, truncated to grain.
+        num_windows: Number of windows to split the range into.
+        grain: Granularity of the default range end.
+
+    Returns:
+        Windows in chronological order.
+
+    Raises:
+        ValueError: If num_windows is not positive.
+    """
+    if num_windows < 1:
+        raise ValueError("num_windows must be at least 1")
+
+    start = parse_fhir_instant(since)
+    if until is not None:
+        end = parse_fhir_instant(until)
+    else:
+        end = _truncate(datetime.now(timezone.utc), grain)
+    if end <= start:
+        return []
+
+    step = (end - start) / num_windows
+    boundaries = [start]
+    for i in range(1, num_windows):
+        boundary = (start + step * i).replace(microsecond=0)
+        if boundary > boundaries[-1]:
+            boundaries.append(boundary)
+    boundaries.append(end)
+
+    return [TimeWindow(lo, hi) for lo, hi in zip(boundaries, boundaries[1:]) if hi > lo]
+
+
+def _pinned_until(checkpoint_store: CheckpointStore, resource_type: str,
+                  since: Union[str, datetime]) -> str:
+    """Get the range end of the extraction starting at since.
+
+    The end is fixed by the first run and stored, so that a rerun after a
+    failure plans the same windows and can skip the completed ones.
+    """
+    key = f"plan:{format_fhir_instant(since)}"
+    cursor = checkpoint_store.get(resource_type, key)
+    if cursor is None or "until" not in cursor.state:
+        until = _truncate(datetime.now(timezone.utc), WINDOW_GRAIN)
+        cursor = ExtractionCursor(resource_type=resource_type, window=key,
+                                  state={"until": format_fhir_instant(until)})
+        checkpoint_store.save(cursor)
+    return cursor.state["until"]
+
+
+def _window_checkpoint(window: TimeWindow, resources: Iterable[Dict[str, Any]]) -> WindowCheckpoint:
+    count, newest = 0, None
+    for resource in resources:
+        count += 1
+        last_updated = resource_last_updated(resource)
+        if last_updated is not None and (newest is None or last_updated > newest):
+            newest = last_updated
+    return WindowCheckpoint(
+        window=window.key,
+        resource_count=count,
+        max_last_updated=format_fhir_instant(newest) if newest is not None else None,
+    )
+
+
+def _newest_positions(resources: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Find the position of the newest version of each resource ID.
+
+    Of versions with equal or unknown ``meta.lastUpdated`` the first is kept.
+    """
+    newest: Dict[str, Tuple[Optional[datetime], int]] = {}
+    for position, resource in enumerate(resources):
+        resource_id = resource.get("id")
+        if resource_id is None:
+            continue
+        new_time = resource_last_updated(resource)
+        existing = newest.get(resource_id)
+        if existing is None or (new_time is not None and (existing[0] is None or new_time > existing[0])):
+            newest[resource_id] = (new_time, position)
+    return {resource_id: position for resource_id, (_, position) in newest.items()}
+
+
+def _deduplicate(resources: Callable[[], Iterable[Dict[str, Any]]]) -> Iterable[Dict[str, Any]]:
+    """Yield the newest version of each resource in two streaming passes.
+
+    Args:
+        resources: Function returning a fresh iterator over the resources
+                   in merge order; it is called twice.
+    """
+    positions = _newest_positions(resources())
+    for position, resource in enumerate(resources()):
+        resource_id = resource.get("id")
+        if resource_id is None or positions[resource_id] == position:
+            yield resource
+
+
+def extract_resource_windowed(
+    client: FHIRClient,
+    resource_type: str,
+    since: Union[str, datetime],
+    until: Optional[Union[str, datetime]] = None,
+    num_windows: int = 8,
+    max_workers: int = 4,
+    params: Optional[Dict[str, Any]] = None,
+    max_pages_per_window: Optional[int] = None,
+    completed_windows: Optional[Dict[str, WindowCheckpoint]] = None,
+    on_window_complete: Optional[Callable[[WindowCheckpoint], None]] = None,
+    checkpoint_store: Optional[CheckpointStore] = None,
+    output_dir: Optional[Union[str, Path]] = None,
+    compression: Optional[str] = None,
+) -> WindowedExtractionResult:
+    """Extract resources by pulling ``_lastUpdated`` windows concurrently.
+
+    Results are merged in window order and deduplicated by resource ID. A
+    resource updated while the extraction runs can appear in two windows; the
+    version with the latest ``meta.lastUpdated`` is kept. With output_dir the
+    merge streams the window files into ``<output_dir>/merged`` in two
+    passes, so no window is held in memory.
+
+    Args:
+        client: FHIR client to use. Its rate limiter is shared by all windows.
+        resource_type: FHIR resource type (e.g., "Observation").
+        since: Start of the range (inclusive), typically the last watermark.
+        until: End of the range (exclusive). Defaults to now, truncated to
+               the minute; with a checkpoint store, the end chosen by the
+               first run for the same since is reused.
+        num_windows: Number of windows to split the range into.
+        max_workers: Maximum number of windows extracted at once.
+        params: Optional additional search parameters.
+        max_pages_per_window: Optional page limit per window (default: unlimited).
+        completed_windows: Checkpoints from a previous run; these windows are
+                           skipped and their resources are not returned. Only
+                           pass windows whose resources the caller persisted.
+        on_window_complete: Optional callback invoked with each new checkpoint.
+                            Without output_dir the window's resources exist
+                            only in the returned result, so a checkpoint must
+                            not be recorded as complete before the caller has
+                            persisted that result.
+        checkpoint_store: Optional durable store of window cursors. Requires
+                          output_dir.
+        output_dir: Optional directory; each window is streamed to
+                    ``<output_dir>/<window.dirname>`` and the merged result
+                    to ``<output_dir>/merged``, which is rewritten on every
+                    run. Windows completed by an earlier run are read from
+                    there without requests, and an interrupted window
+                    resumes from its last persisted page.
+        compression: None, "gzip" or "zstd" for the window and merged files.
+
+    Returns:
+        WindowedExtractionResult with the merged resources (or, with
+        output_dir, the merged files) and per-window checkpoints.
+
+    Raises:
+        ValueError: If checkpoint_store is given without output_dir.
+    """
+    if checkpoint_store is not None and output_dir is None:
+        raise ValueError("checkpoint_store requires output_dir: a window may only be "
+                         "recorded as complete once its resources are on disk")
+    if until is None and checkpoint_store is not None:
+        until = _pinned_until(checkpoint_store, resource_type, since)
+    windows = plan_time_windows(since, until, num_windows)
+    completed_windows = dict(completed_windows or {})
+    pending = [w for w in windows if w.key not in completed_windows]
+    persisted = set()
+    if checkpoint_store is not None:
+        persisted = {c.window for c in checkpoint_store.list_cursors(resource_type) if c.is_complete}
+
+    logger.info("Starting windowed extraction",
+                resource_type=resource_type,
+                windows=len(windows),
+                skipped=len(windows) - len(pending),
+                persisted=len([w for w in pending if w.key in persisted]),
+                max_workers=max_workers)
+
+    def extract_window(window: TimeWindow) -> Union[List[Dict[str, Any]], List[Path]]:
+        window_params = dict(params or {})
+        window_params["_lastUpdated"] = window.to_search_param()
+        if output_dir is None:
+            return client.get_all_resources(
+                resource_type=resource_type,
+                params=window_params,
+                max_pages=max_pages_per_window,
+            )
+        # The cursor is marked complete only after the window's files are closed
+        directory = Path(output_dir) / window.dirname
+        files = extract_resource_to_ndjson(
+            client=client,
+            output_dir=directory,
+            resource_type=resource_type,
+            params=window_params,
+            max_pages=max_pages_per_window,
+            compression=compression,
+            checkpoint_store=checkpoint_store,
+            window=window.key,
+        )
+        return [directory / f.path for f in files]
+
+    result = WindowedExtractionResult(
+        checkpoints={w.key: completed_windows[w.key] for w in windows if w.key in completed_windows}
+    )
+    window_output: Dict[str, Union[List[Dict[str, Any]], List[Path]]] = {}
+
+    def read_window(key: str) -> Iterable[Dict[str, Any]]:
+        if output_dir is None:
+            yield from window_output.get(key, [])
+            return
+        for path in window_output.get(key, []):
+            yield from iter_ndjson(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(extract_window, w): w for w in pending}
+        for future in as_completed(futures):
+            window = futures[future]
+            try:
+                window_output[window.key] = future.result()
+            except Exception as e:
+                logger.error("Window extraction failed",
+                             resource_type=resource_type,
+                             window=window.key,
+                             error=str(e))
+                result.failed_windows[window.key] = str(e)
+                continue
+
+            checkpoint = _window_checkpoint(window, read_window(window.key))
+            result.checkpoints[window.key] = checkpoint
+            logger.info("Window extracted",
+                        resource_type=resource_type,
+                        window=window.key,
+                        count=checkpoint.resource_count)
+            if on_window_complete and window.key not in persisted:
+                on_window_complete(checkpoint)
+
+    # Merge in window order, keeping the newest version of each resource
+    def read_windows() -> Iterable[Dict[str, Any]]:
+        for window in windows:
+            yield from read_window(window.key)
+
+    merged = _deduplicate(read_windows)
+    if output_dir is None:
+        result.resources = list(merged)
+        result.resource_count = len(result.resources)
+    else:
+        merged_dir = Path(output_dir) / MERGED_DIRNAME
+        shutil.rmtree(merged_dir, ignore_errors=True)
+        with NDJSONWriter(merged_dir, compression=compression) as writer:
+            result.resource_count = writer.write_many(merged)
+        result.files = [merged_dir / f.path for f in writer.files]
+
+    logger.info("Completed windowed extraction",
+                resource_type=resource_type,
+                count=result.resource_count,
+                failed_windows=len(result.failed_windows))
+    return result
@@ -0,0 +1,167 @@
+"""
+Incremental extraction watermarks.
+
+A watermark is the highest ``meta.lastUpdated`` instant ingested so far,
+together with the IDs of the resources that carry exactly that instant.
+Incremental searches use ``_lastUpdated=ge<instant>`` so that resources
+sharing the boundary instant are not skipped, and the boundary IDs filter out
+the ones that were already ingested. Instants are compared as points in time,
+so offsets such as ``+02:00`` and fractional seconds order correctly.
+"""
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from epic_fhir_integration.utils.fhir_datetime import parse_fhir_instant
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def resource_last_updated(resource: Dict[str, Any]) -> Optional[datetime]:
+    """Get the parsed ``meta.lastUpdated`` of a resource.
+
+    Args:
+        resource: FHIR resource dictionary.
+
+    Returns:
+        Timezone-aware datetime, or None if missing or invalid.
+    """
+    value = (resource.get("meta") or {}).get("lastUpdated")
+    if not value:
+        return None
+    try:
+        return parse_fhir_instant(value)
+    except ValueError:
+        logger.warning("Invalid lastUpdated", resource_id=resource.get("id"), value=value)
+        return None
+
+
+@dataclass
+class Watermark:
+    """Position of an incremental extraction."""
+
+    last_updated: Optional[str] = None
+    # None means every resource at last_updated was ingested (``gt`` semantics)
+    boundary_ids: Optional[List[str]] = field(default_factory=list)
+
+    @property
+    def instant(self) -> Optional[datetime]:
+        """Parsed watermark instant."""
+        return parse_fhir_instant(self.last_updated) if self.last_updated else None
+
+    def search_param(self) -> Optional[str]:
+        """Build the ``_lastUpdated`` search parameter for the next delta.
+
+        Returns:
+            ``ge<instant>``, or None if nothing has been ingested yet.
+        """
+        return f"ge{self.last_updated}" if self.last_updated else None
+
+    def is_new(self, resource: Dict[str, Any]) -> bool:
+        """Check whether a resource is past the watermark.
+
+        Args:
+            resource: FHIR resource dictionary.
+
+        Returns:
+            False for resources before the watermark instant and for boundary
+            resources that were already ingested.
+        """
+        return self._is_new(resource, self.instant)
+
+    def _is_new(self, resource: Dict[str, Any], instant: Optional[datetime]) -> bool:
+        if instant is None:
+            return True
+        updated = resource_last_updated(resource)
+        if updated is None:
+            return True
+        if updated < instant:
+            return False
+        if updated == instant:
+            return self.boundary_ids is not None and resource.get("id") not in self.boundary_ids
+        return True
+
+    def filter_new(self, resources: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop resources that were ingested by an earlier run.
+
+        Args:
+            resources: FHIR resources returned by a ``ge`` search.
+
+        Returns:
+            Resources past the watermark, in input order.
+        """
+        instant = self.instant
+        return [resource for resource in resources if self._is_new(resource, instant)]
+
+    def advance(self, resources: Iterable[Dict[str, Any]]) -> "Watermark":
+        """Compute the watermark after ingesting resources.
+
+        Args:
+            resources: Newly ingested FHIR resources.
+
+        Returns:
+            New Watermark; self is not modified.
+        """
+        instant = self.instant
+        last_updated = self.last_updated
+        boundary_ids = None if self.boundary_ids is None else set(self.boundary_ids)
+
+        for resource in resources:
+            updated = resource_last_updated(resource)
+            if updated is None:
+                continue
+            if instant is None or updated > instant:
+                instant = updated
+                last_updated = resource["meta"]["lastUpdated"]
+                boundary_ids = set()
+            if updated == instant and resource.get("id") and boundary_ids is not None:
+                boundary_ids.add(resource["id"])
+
+        return Watermark(
+            last_updated=last_updated,
+            boundary_ids=None if boundary_ids is None else sorted(boundary_ids),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the watermark to a dictionary."""
+        boundary_ids = None if self.boundary_ids is None else list(self.boundary_ids)
+        return {"last_updated": self.last_updated, "boundary_ids": boundary_ids}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Watermark":
+        """Deserialize a watermark from a dictionary."""
+        data = data or {}
+        boundary_ids = data.get("boundary_ids", [])
+        return cls(last_updated=data.get("last_updated"),
+                   boundary_ids=None if boundary_ids is None else list(boundary_ids))
+
+    def to_json(self) -> str:
+        """Serialize the watermark to a JSON string."""
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, value: Optional[str]) -> "Watermark":
+        """Deserialize a watermark from a JSON string.
+
+        Plain instants, as stored by earlier versions of the bronze transforms,
+        are accepted. Those versions searched with ``gt``, so every resource at
+        the instant is treated as already ingested.
+
+        Args:
+            value: Serialized watermark or plain instant.
+
+        Returns:
+            Watermark instance.
+        """
+        if not value:
+            return cls()
+        try:
+            data = json.loads(value)
+        except ValueError:
+            return cls(last_updated=value, boundary_ids=None)
+        if isinstance(data, dict):
+            return cls.from_dict(data)
+        return cls(last_updated=str(data), boundary_ids=None)
@@ -10,10 +10,22 @@ from epic_fhir_integration.api_clients.jwt_auth import (
     get_token_with_retry,
 )
 from .fhir_client import FHIRClient, create_fhir_client
+from .async_fhir_client import AsyncFHIRClient, create_async_fhir_client
+from .bulk_export import BulkExportClient, BulkExportError
+from .batch_executor import BatchExecutor, BatchResult
+from .resilience import CircuitOpenError, ResilienceManager
 
 __all__ = [
     "get_or_refresh_token",
     "get_token_with_retry",
     "FHIRClient",
-    "create_fhir_client"
+    "create_fhir_client",
+    "AsyncFHIRClient",
+    "create_async_fhir_client",
+    "BulkExportClient",
+    "BulkExportError",
+    "BatchExecutor",
+    "BatchResult",
+    "CircuitOpenError",
+    "ResilienceManager",
 ] 
\ No newline at end of file
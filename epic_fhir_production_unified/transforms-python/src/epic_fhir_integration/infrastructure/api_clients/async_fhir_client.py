@@ -0,0 +1,457 @@
+"""
+Asynchronous FHIR client module for Epic FHIR API integration.
+
+This module provides an asyncio counterpart to ``FHIRClient`` for bulk
+extraction workloads. Requests share a bounded, keep-alive connection pool
+(HTTP/2 when the ``h2`` package is installed) so that many searches and reads
+can be in flight at once instead of waiting on each round trip.
+"""
+
+import asyncio
+import importlib.util
+import os
+import random
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from epic_fhir_integration.infrastructure.api_clients.resilience import (
+    RETRY_STATUS_CODES,
+)
+from epic_fhir_integration.utils.logging import get_logger
+from epic_fhir_integration.utils.rate_limiter import (
+    TokenBucketRateLimiter,
+    get_shared_rate_limiter,
+    parse_retry_after,
+)
+
+logger = get_logger(__name__)
+
+# HTTP/2 support in httpx requires the optional ``h2`` package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _get_token_manager():
+    from epic_fhir_integration.api_clients.jwt_auth import get_token_manager
+    return get_token_manager()
+
+
+class AsyncFHIRClient:
+    """Asyncio client for interacting with FHIR APIs.
+
+    Exposes the same ``get_resource``/``search_resources``/``batch_get_resources``
+    surface as ``FHIRClient``, but as coroutines and async generators.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        access_token: Optional[str] = None,
+        token_provider=None,
+        timeout: int = 30,
+        max_retries: int = 3,
+        retry_backoff_factor: float = 0.5,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        transport=None,
+    ):
+        """Initialize a new asynchronous FHIR client.
+
+        Args:
+            base_url: Base URL of the FHIR API.
+            access_token: Optional access token for authentication.
+            token_provider: Optional callable (sync or async) that returns an
+                            access token. Called for every request if
+                            access_token is None, so it should cache the
+                            token itself (e.g. a TokenManager). If it has an
+                            ``invalidate`` method, it is called with a token
+                            rejected by a 401 and the request is replayed once.
+            timeout: Request timeout in seconds.
+            max_retries: Maximum number of retries for failed requests.
+            retry_backoff_factor: Backoff factor for retries.
+            max_connections: Maximum number of pooled connections.
+            max_keepalive_connections: Maximum number of idle keep-alive connections.
+            keepalive_expiry: Seconds an idle connection is kept open.
+            http2: Whether to negotiate HTTP/2 when the server supports it.
+            rate_limiter: Optional rate limiter, typically shared between clients.
+            transport: Optional httpx transport, mainly for testing.
+
+        Raises:
+            ImportError: If httpx is not installed.
+        """
+        if httpx is None:
+            raise ImportError(
+                "httpx package is required for AsyncFHIRClient. "
+                "Install it with 'pip install httpx[http2]'."
+            )
+
+        self.base_url = base_url.rstrip("/")
+        self.access_token = access_token
+        self.token_provider = token_provider
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff_factor = retry_backoff_factor
+        self.max_connections = max_connections
+        self.rate_limiter = rate_limiter
+
+        if http2 and not HTTP2_AVAILABLE:
+            logger.debug("h2 package not installed, falling back to HTTP/1.1")
+
+        self._client = httpx.AsyncClient(
+            http2=http2 and HTTP2_AVAILABLE,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+
+        logger.info("Initialized async FHIR client",
+                    base_url=self.base_url,
+                    max_connections=max_connections)
+
+    async def __aenter__(self) -> "AsyncFHIRClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self._client.aclose()
+
+    async def _get_token(self) -> Optional[str]:
+        """Get the access token for a request.
+
+        A provider is asked on every request so that refreshed tokens are
+        picked up. Synchronous providers run in the default executor, since a
+        refresh blocks on the token endpoint.
+
+        Returns:
+            Access token, or None if the client has no credentials.
+        """
+        if self.access_token or not self.token_provider:
+            return self.access_token
+        if asyncio.iscoroutinefunction(self.token_provider):
+            return await self.token_provider()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.token_provider)
+
+    async def _get_headers(self, token: Optional[str] = None) -> Dict[str, str]:
+        """Get request headers with authentication.
+
+        Args:
+            token: Optional access token. Defaults to the current token.
+
+        Returns:
+            Dictionary of HTTP headers.
+        """
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+
+        if token is None:
+            token = await self._get_token()
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        return headers
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """Compute the delay before the next retry attempt.
+
+        Args:
+            attempt: Number of the attempt that just failed (1-based).
+            response: Optional response carrying a Retry-After header.
+
+        Returns:
+            Delay in seconds.
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+
+        delay = self.retry_backoff_factor * (2 ** (attempt - 1))
+        return delay * (0.5 + random.random())
+
+    def _handle_response(self, response) -> Dict[str, Any]:
+        """Check an HTTP response for errors and decode it.
+
+        Args:
+            response: httpx response object.
+
+        Returns:
+            Response data as dictionary.
+
+        Raises:
+            httpx.HTTPStatusError: If the request fails.
+        """
+        if response.is_error:
+            logger.error("FHIR API error",
+                         status_code=response.status_code,
+                         response=response.text[:500])
+            response.raise_for_status()
+
+        return response.json()
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Send a request, retrying transport errors and retryable statuses.
+
+        A 401 with a token provider that supports ``invalidate`` discards the
+        rejected token and replays the request once with a fresh one.
+
+        Args:
+            method: HTTP method.
+            url: Absolute request URL.
+            params: Optional query parameters.
+            json_body: Optional JSON request body.
+
+        Returns:
+            Response data as dictionary.
+        """
+        attempt = 0
+        replayed = False
+        while True:
+            attempt += 1
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            token = await self._get_token()
+            try:
+                response = await self._client.request(
+                    method,
+                    url,
+                    headers=await self._get_headers(token),
+                    params=params,
+                    json=json_body,
+                )
+            except httpx.TransportError as e:
+                if attempt > self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning("Transport error, retrying",
+                               url=url, attempt=attempt, delay=delay, error=str(e))
+                await asyncio.sleep(delay)
+                continue
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_response(response.status_code, response.headers)
+
+            # A token revoked or expired early: refresh it and replay once
+            invalidate = getattr(self.token_provider, "invalidate", None)
+            if response.status_code == 401 and invalidate is not None and not replayed:
+                replayed = True
+                attempt -= 1
+                logger.warning("Access token rejected, refreshing", url=url)
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, invalidate, token)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt <= self.max_retries:
+                # A 429 has already paused the rate limiter for Retry-After
+                if response.status_code == 429 and self.rate_limiter is not None:
+                    delay = 0.0
+                else:
+                    delay = self._retry_delay(attempt, response)
+                logger.warning("Retryable FHIR response, retrying",
+                               url=url, status_code=response.status_code,
+                               attempt=attempt, delay=delay)
+                await asyncio.sleep(delay)
+                continue
+
+            return self._handle_response(response)
+
+    async def get_resource(
+        self,
+        resource_type: str,
+        resource_id: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Get a FHIR resource by type and optional ID.
+
+        Args:
+            resource_type: FHIR resource type (e.g., "Patient", "Observation").
+            resource_id: Optional resource ID.
+            params: Optional query parameters.
+
+        Returns:
+            Resource data as dictionary.
+        """
+        url = f"{self.base_url}/{resource_type}"
+        if resource_id:
+            url = f"{url}/{resource_id}"
+
+        logger.debug("Fetching FHIR resource",
+                     resource_type=resource_type,
+                     resource_id=resource_id,
+                     params=params)
+
+        return await self._request("GET", url, params=params)
+
+    async def search_resources(
+        self,
+        resource_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_limit: Optional[int] = None,
+        total_limit: Optional[int] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Search for FHIR resources with pagination.
+
+        Args:
+            resource_type: FHIR resource type (e.g., "Patient", "Observation").
+            params: Optional search parameters.
+            page_limit: Maximum number of pages to retrieve.
+            total_limit: Maximum total number of resources to retrieve.
+
+        Yields:
+            FHIR resource dictionaries.
+        """
+        params = params or {}
+        url = f"{self.base_url}/{resource_type}"
+
+        resource_count = 0
+        page_count = 0
+
+        logger.info("Starting async FHIR search",
+                    resource_type=resource_type,
+                    params=params)
+
+        while url:
+            if page_limit and page_count >= page_limit:
+                logger.info("Page limit reached", page_count=page_count)
+                break
+
+            # Only use params on the first request; next links carry them
+            data = await self._request(
+                "GET", url, params=params if page_count == 0 else None
+            )
+            page_count += 1
+
+            for entry in data.get("entry", []):
+                resource = entry.get("resource", {})
+                if resource:
+                    yield resource
+                    resource_count += 1
+
+                    if total_limit and resource_count >= total_limit:
+                        logger.info("Resource limit reached", resource_count=resource_count)
+                        return
+
+            url = None
+            for link in data.get("link", []):
+                if link.get("relation") == "next":
+                    url = link.get("url")
+                    break
+
+            if not url:
+                logger.info("No more pages", page_count=page_count, resource_count=resource_count)
+
+    async def get_all_resources(
+        self,
+        resource_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_pages: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Get all resources of a given type using pagination.
+
+        Args:
+            resource_type: FHIR resource type (e.g., "Patient", "Observation").
+            params: Optional query parameters.
+            max_pages: Maximum number of pages to retrieve (default: 50).
+
+        Returns:
+            List of resources.
+        """
+        return [
+            resource
+            async for resource in self.search_resources(
+                resource_type=resource_type,
+                params=params,
+                page_limit=max_pages,
+            )
+        ]
+
+    async def batch_get_resources(
+        self,
+        resource_type: str,
+        resource_ids: List[str],
+        max_concurrency: Optional[int] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get multiple resources by ID concurrently.
+
+        Args:
+            resource_type: FHIR resource type (e.g., "Patient", "Observation").
+            resource_ids: List of resource IDs to fetch.
+            max_concurrency: Maximum number of requests in flight. Defaults to
+                             the connection pool size.
+
+        Returns:
+            Dictionary mapping resource IDs to resources.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_connections)
+
+        async def fetch_resource(resource_id):
+            async with semaphore:
+                try:
+                    return resource_id, await self.get_resource(resource_type, resource_id)
+                except Exception as e:
+                    logger.error("Error fetching resource",
+                                 resource_type=resource_type,
+                                 resource_id=resource_id,
+                                 error=str(e))
+                    return resource_id, None
+
+        logger.info("Batch getting resources",
+                    resource_type=resource_type,
+                    count=len(resource_ids))
+
+        results = {}
+        for resource_id, resource in await asyncio.gather(
+            *(fetch_resource(resource_id) for resource_id in resource_ids)
+        ):
+            if resource:
+                results[resource_id] = resource
+
+        logger.info("Completed batch get",
+                    resource_type=resource_type,
+                    fetched=len(results),
+                    requested=len(resource_ids))
+        return results
+
+
+def create_async_fhir_client(**kwargs) -> AsyncFHIRClient:
+    """Create a configured asynchronous FHIR client with authentication.
+
+    Args:
+        **kwargs: Additional keyword arguments passed to AsyncFHIRClient.
+
+    Returns:
+        Configured AsyncFHIRClient instance.
+    """
+    epic_base_url = os.environ.get("EPIC_BASE_URL")
+    if not epic_base_url:
+        raise ValueError("EPIC_BASE_URL environment variable not set")
+
+    if "rate_limiter" not in kwargs:
+        from epic_fhir_integration.utils.config import get_api_config
+        kwargs["rate_limiter"] = get_shared_rate_limiter(
+            epic_base_url,
+            requests_per_minute=get_api_config().requests_per_minute,
+        )
+
+    return AsyncFHIRClient(base_url=epic_base_url, token_provider=_get_token_manager(), **kwargs)
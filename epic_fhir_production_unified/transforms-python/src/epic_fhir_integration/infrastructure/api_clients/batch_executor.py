@@ -0,0 +1,256 @@
+"""
+FHIR batch Bundle execution with automatic chunking.
+
+Sending many reads as one ``batch`` Bundle turns thousands of round trips into
+a handful, but servers cap the number of entries and the size of a request.
+This module splits the requests into chunks bounded by entry count and
+payload size, submits the chunks concurrently through the client (and so
+through its rate limiter), re-splits chunks the server rejects as too large,
+and returns the results in the order of the original requests.
+"""
+
+import json
+import re
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Diagnostics of a 400 that rejects the size of a Bundle rather than its content
+_SIZE_REJECTION = re.compile(r"too (?:large|big|many)|exceed", re.IGNORECASE)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one entry of a batch request."""
+
+    index: int
+    status: str
+    resource: Optional[Dict[str, Any]] = None
+    outcome: Optional[Dict[str, Any]] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the server answered the entry with a 2xx status."""
+        return self.status.startswith("2")
+
+
+def create_batch_bundle(requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create a FHIR batch Bundle containing multiple operations.
+
+    Args:
+        requests: Request objects, each with "method", "url" and optionally
+                  "resource" and "fullUrl", e.g. ``{"method": "GET", "url": "Patient/123"}``.
+
+    Returns:
+        Batch request Bundle.
+    """
+    bundle = {"resourceType": "Bundle", "type": "batch", "entry": []}
+    for request in requests:
+        method = request.get("method", "GET")
+        entry: Dict[str, Any] = {"request": {"method": method, "url": request.get("url", "")}}
+        if "resource" in request and method in ("POST", "PUT"):
+            entry["resource"] = request["resource"]
+        if "fullUrl" in request:
+            entry["fullUrl"] = request["fullUrl"]
+        elif method == "POST":
+            # Temporary ID so that other entries can reference the new resource
+            entry["fullUrl"] = f"urn:uuid:{uuid.uuid4()}"
+        bundle["entry"].append(entry)
+    return bundle
+
+
+def process_batch_response(
+    response: Dict[str, Any], indexes: List[int]
+) -> List[BatchResult]:
+    """Convert a batch-response Bundle to results.
+
+    Args:
+        response: Response Bundle from the server.
+        indexes: Request indexes of the entries sent, in Bundle order.
+
+    Returns:
+        One result per request.
+
+    Raises:
+        ValueError: If the response is not a batch-response Bundle for the
+                    requests sent.
+    """
+    if response.get("resourceType") != "Bundle" or response.get("type") != "batch-response":
+        raise ValueError("Invalid batch response bundle")
+    entries = response.get("entry", [])
+    if len(entries) != len(indexes):
+        raise ValueError(
+            f"Batch response has {len(entries)} entries for {len(indexes)} requests"
+        )
+
+    results = []
+    for index, entry in zip(indexes, entries):
+        entry_response = entry.get("response", {})
+        results.append(BatchResult(
+            index=index,
+            status=str(entry_response.get("status", "")),
+            resource=entry.get("resource"),
+            outcome=entry_response.get("outcome"),
+        ))
+    return results
+
+
+def is_size_rejection(error: Exception) -> bool:
+    """Check whether a failed batch submission was rejected for its size.
+
+    Args:
+        error: Exception raised while submitting a Bundle.
+
+    Returns:
+        True for a 413, or a 400 whose body reports too large a request or
+        too many entries.
+    """
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code == 413:
+        return True
+    return status_code == 400 and bool(_SIZE_REJECTION.search(response.text or ""))
+
+
+def _error_result(index: int, error: str) -> BatchResult:
+    return BatchResult(
+        index=index,
+        status="error",
+        outcome={"resourceType": "OperationOutcome",
+                 "issue": [{"severity": "error", "code": "exception", "diagnostics": error}]},
+    )
+
+
+class BatchExecutor:
+    """Execute FHIR requests as concurrently submitted batch Bundles."""
+
+    def __init__(
+        self,
+        client,
+        max_entries: int = 100,
+        max_payload_bytes: int = 1024 * 1024,
+        max_workers: int = 4,
+    ):
+        """Initialize a new batch executor.
+
+        Args:
+            client: FHIRClient used to submit the Bundles.
+            max_entries: Maximum number of entries per Bundle.
+            max_payload_bytes: Maximum serialized size of a Bundle's entries.
+            max_workers: Maximum number of Bundles in flight.
+
+        Raises:
+            ValueError: If a limit is not positive.
+        """
+        if max_entries < 1 or max_payload_bytes < 1 or max_workers < 1:
+            raise ValueError("Batch limits must be positive")
+        self.client = client
+        self.max_entries = max_entries
+        self.max_payload_bytes = max_payload_bytes
+        self.max_workers = max_workers
+
+    def _chunk(self, requests: List[Dict[str, Any]]) -> List[List[int]]:
+        """Split request indexes into chunks within the entry and size limits.
+
+        A single request larger than the size limit gets a chunk of its own.
+        """
+        chunks: List[List[int]] = []
+        current: List[int] = []
+        current_bytes = 0
+        for index, request in enumerate(requests):
+            size = len(json.dumps(request, separators=(",", ":")).encode("utf-8"))
+            if current and (len(current) >= self.max_entries
+                            or current_bytes + size > self.max_payload_bytes):
+                chunks.append(current)
+                current, current_bytes = [], 0
+            current.append(index)
+            current_bytes += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _submit(self, requests: List[Dict[str, Any]], chunk: List[int]) -> List[BatchResult]:
+        bundle = create_batch_bundle([requests[i] for i in chunk])
+        response = self.client._request("POST", self.client.base_url, json=bundle)
+        return process_batch_response(self.client._handle_response(response), chunk)
+
+    def execute(self, requests: List[Dict[str, Any]]) -> List[BatchResult]:
+        """Execute requests in as few batch round trips as the limits allow.
+
+        A chunk the server rejects for its size (see ``is_size_rejection``)
+        is split in half and both halves are resubmitted. Any other failure
+        of a chunk, e.g. a 5xx after the client's retries, a 401 or an open
+        circuit, is final: every entry of the chunk is reported with status
+        "error" instead of resubmitting smaller chunks against a failing
+        server.
+
+        Args:
+            requests: Request objects as accepted by ``create_batch_bundle``.
+
+        Returns:
+            One result per request, in request order.
+        """
+        if not requests:
+            return []
+
+        chunks = self._chunk(requests)
+        logger.info("Executing batch requests",
+                    requests=len(requests),
+                    chunks=len(chunks),
+                    max_workers=self.max_workers)
+
+        results: List[Optional[BatchResult]] = [None] * len(requests)
+        resplits = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self._submit, requests, chunk): chunk for chunk in chunks}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    try:
+                        chunk_results = future.result()
+                    except Exception as e:
+                        if len(chunk) > 1 and is_size_rejection(e):
+                            resplits += 1
+                            middle = len(chunk) // 2
+                            logger.warning("Batch chunk rejected for its size, splitting",
+                                           entries=len(chunk), error=str(e))
+                            for half in (chunk[:middle], chunk[middle:]):
+                                pending[executor.submit(self._submit, requests, half)] = half
+                            continue
+                        logger.error("Batch chunk failed",
+                                     entries=len(chunk),
+                                     first_url=requests[chunk[0]].get("url"),
+                                     error=str(e))
+                        for index in chunk:
+                            results[index] = _error_result(index, str(e))
+                        continue
+
+                    for result in chunk_results:
+                        results[result.index] = result
+
+        failed = sum(1 for r in results if not r.ok)
+        logger.info("Completed batch requests",
+                    requests=len(requests),
+                    failed=failed,
+                    resplits=resplits)
+        return results
+
+
+def read_requests(resource_type: str, resource_ids: List[str]) -> List[Dict[str, Any]]:
+    """Build batch read requests for resources of one type.
+
+    Args:
+        resource_type: FHIR resource type.
+        resource_ids: Resource IDs to read.
+
+    Returns:
+        Request objects for ``BatchExecutor.execute``.
+    """
+    return [{"method": "GET", "url": f"{resource_type}/{resource_id}"} for resource_id in resource_ids]
+
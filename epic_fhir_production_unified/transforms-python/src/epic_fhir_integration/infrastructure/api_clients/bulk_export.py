@@ -0,0 +1,439 @@
+"""
+FHIR Bulk Data ``$export`` client for Epic FHIR API integration.
+
+This module implements the asynchronous request pattern of the FHIR Bulk Data
+Access specification: kick off an export, poll its status endpoint with
+backoff, then download the NDJSON output files in parallel. Downloads are
+streamed line by line into an NDJSONWriter per resource type, so exports land
+in the same bronze layout, with the same manifest, as paged searches.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import requests
+
+from epic_fhir_integration.domain.bronze.ndjson_writer import NDJSONWriter
+from epic_fhir_integration.domain.bronze.watermark import Watermark
+from epic_fhir_integration.utils.logging import get_logger
+from epic_fhir_integration.utils.rate_limiter import parse_retry_after
+
+logger = get_logger(__name__)
+
+# Chunk size used when streaming export files
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Kick-off statuses with which a server rejects $export as unsupported
+EXPORT_UNSUPPORTED_STATUSES = (400, 404, 405, 501)
+
+# Resources parsed from a download before they are handed to the shared writer
+WRITE_BATCH_SIZE = 1000
+
+
+class BulkExportError(Exception):
+    """Raised when a bulk export cannot be started, fails or times out."""
+
+
+class BulkExportNotSupported(BulkExportError):
+    """Raised when the server rejects the export kick-off request."""
+
+
+@dataclass
+class BulkExportResult:
+    """Files written by a completed bulk export."""
+
+    files: Dict[str, List[Path]] = field(default_factory=dict)
+    error_files: List[Path] = field(default_factory=list)
+    transaction_time: Optional[str] = None
+    resource_counts: Dict[str, int] = field(default_factory=dict)
+
+
+def bronze_partition_dir(
+    output_dir: Union[str, Path],
+    resource_type: str,
+    ingest_date: Optional[date] = None,
+) -> Path:
+    """Get the bronze directory for a resource type and ingest date.
+
+    Args:
+        output_dir: Root of the bronze layout.
+        resource_type: FHIR resource type.
+        ingest_date: Ingest date partition. Defaults to today.
+
+    Returns:
+        Path of the form ``<output_dir>/<resource_type>/ingest_date=<date>``.
+    """
+    ingest_date = ingest_date or date.today()
+    return Path(output_dir) / resource_type / f"ingest_date={ingest_date.isoformat()}"
+
+
+def staging_dir(partition: Union[str, Path]) -> Path:
+    """Get the directory a partition is written to before it replaces the old one.
+
+    The name starts with an underscore, so readers of the partitioned layout
+    skip it like ``_manifest.json``.
+    """
+    partition = Path(partition)
+    return partition.with_name(f"_{partition.name}.staging")
+
+
+def replace_partition(staging: Union[str, Path], partition: Union[str, Path]) -> None:
+    """Swap a completely written staging directory in for a partition.
+
+    Args:
+        staging: Directory returned by ``staging_dir``.
+        partition: Partition to replace, which need not exist yet.
+    """
+    staging, partition = Path(staging), Path(partition)
+    previous = partition.with_name(f"_{partition.name}.previous")
+    shutil.rmtree(previous, ignore_errors=True)
+    if partition.exists():
+        os.replace(partition, previous)
+    os.replace(staging, partition)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+class BulkExportClient:
+    """Client for FHIR Bulk Data ``$export`` operations.
+
+    Requests to the FHIR server go through the wrapped ``FHIRClient``, so they
+    share its authentication, retry policy and rate limiter.
+    """
+
+    def __init__(
+        self,
+        client,
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 120.0,
+        poll_timeout: float = 6 * 60 * 60,
+        download_workers: int = 4,
+        compression: Optional[str] = None,
+        max_file_bytes: int = 128 * 1024 * 1024,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Initialize a new bulk export client.
+
+        Args:
+            client: FHIRClient used for all requests.
+            poll_interval: Initial delay between status polls in seconds.
+            max_poll_interval: Upper bound for the poll backoff in seconds.
+            poll_timeout: Maximum time to wait for an export to complete.
+            download_workers: Number of files downloaded concurrently.
+            compression: Optional compression of the written files, "gzip"
+                         or "zstd".
+            max_file_bytes: Size at which the written files are rotated.
+            sleep: Sleep function, injectable for testing.
+        """
+        self.client = client
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.poll_timeout = poll_timeout
+        self.download_workers = download_workers
+        self.compression = compression
+        self.max_file_bytes = max_file_bytes
+        self._sleep = sleep
+
+    def kick_off(
+        self,
+        resource_types: Optional[List[str]] = None,
+        since: Optional[str] = None,
+        group_id: Optional[str] = None,
+        patient_level: bool = False,
+    ) -> str:
+        """Start an export and return its status URL.
+
+        Args:
+            resource_types: Optional resource types to export (``_type``).
+            since: Optional instant; only resources updated after it are exported.
+            group_id: Optional Group ID for a group-level export.
+            patient_level: Whether to run a patient-level export. Ignored if
+                           group_id is given.
+
+        Returns:
+            Status endpoint URL from the Content-Location header.
+
+        Raises:
+            BulkExportNotSupported: If the server does not support the export:
+                                    it answers 400, 404, 405 or 501, or 202
+                                    without a status URL.
+            requests.HTTPError: If the kick-off fails otherwise, e.g. with
+                                401, 403, 429 or 5xx.
+            BulkExportError: If the server answers with another status.
+        """
+        if group_id:
+            url = f"{self.client.base_url}/Group/{group_id}/$export"
+        elif patient_level:
+            url = f"{self.client.base_url}/Patient/$export"
+        else:
+            url = f"{self.client.base_url}/$export"
+
+        params = {}
+        if resource_types:
+            params["_type"] = ",".join(resource_types)
+        if since:
+            params["_since"] = since
+
+        logger.info("Starting bulk export", url=url, params=params)
+        response = self.client._request(
+            "GET",
+            url,
+            params=params,
+            headers={"Accept": "application/fhir+json", "Prefer": "respond-async"},
+        )
+
+        status_url = response.headers.get("Content-Location")
+        if response.status_code == 202 and status_url:
+            return status_url
+        if response.status_code == 202 or response.status_code in EXPORT_UNSUPPORTED_STATUSES:
+            raise BulkExportNotSupported(
+                f"Bulk export kick-off rejected with status {response.status_code}: "
+                f"{response.text[:500]}"
+            )
+        # Auth failures, throttling and outages must not look like missing support
+        response.raise_for_status()
+        raise BulkExportError(
+            f"Unexpected bulk export kick-off status {response.status_code}: "
+            f"{response.text[:500]}"
+        )
+
+    def poll(self, status_url: str) -> Dict[str, Any]:
+        """Poll an export status endpoint until the export completes.
+
+        Honours Retry-After when the server sends it and otherwise backs off
+        exponentially from ``poll_interval`` up to ``max_poll_interval``.
+
+        Args:
+            status_url: Status endpoint URL returned by ``kick_off``.
+
+        Returns:
+            Completion manifest.
+
+        Raises:
+            BulkExportError: If the export fails or does not finish in time.
+        """
+        deadline = time.monotonic() + self.poll_timeout
+        interval = self.poll_interval
+
+        while True:
+            response = self.client._request(
+                "GET", status_url, headers={"Accept": "application/json"}
+            )
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code != 202:
+                raise BulkExportError(
+                    f"Bulk export failed with status {response.status_code}: "
+                    f"{response.text[:500]}"
+                )
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            delay = retry_after if retry_after is not None else interval
+            interval = min(interval * 2, self.max_poll_interval)
+
+            if time.monotonic() + delay > deadline:
+                raise BulkExportError(f"Bulk export did not complete within {self.poll_timeout}s")
+
+            logger.info("Bulk export in progress",
+                        progress=response.headers.get("X-Progress"),
+                        delay=delay)
+            self._sleep(delay)
+
+    def cancel(self, status_url: str) -> None:
+        """Cancel a running export.
+
+        Args:
+            status_url: Status endpoint URL returned by ``kick_off``.
+        """
+        response = self.client._request("DELETE", status_url)
+        logger.info("Cancelled bulk export", status_code=response.status_code)
+
+    def _download_file(
+        self,
+        url: str,
+        writer: NDJSONWriter,
+        lock: threading.Lock,
+        requires_token: bool,
+    ) -> int:
+        """Stream one export file into a shared writer and checkpoint it.
+
+        Returns:
+            Number of resources written.
+        """
+        headers = {"Accept": "application/fhir+ndjson"}
+        if requires_token:
+            response = self.client._request("GET", url, headers=headers, stream=True)
+        else:
+            # Pre-signed storage URLs must not receive the API bearer token
+            response = self.client.session.get(
+                url, headers=headers, stream=True, timeout=self.client.timeout
+            )
+
+        count = 0
+        with response:
+            if not response.ok:
+                raise BulkExportError(
+                    f"Downloading {url} failed with status {response.status_code}"
+                )
+            batch = []
+            for line in response.iter_lines(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    with lock:
+                        count += writer.write_many(batch)
+                    batch = []
+            with lock:
+                count += writer.write_many(batch)
+                writer.checkpoint()
+
+        logger.debug("Downloaded export file", url=url, resources=count)
+        return count
+
+    def download(
+        self,
+        manifest: Dict[str, Any],
+        output_dir: Union[str, Path],
+        ingest_date: Optional[date] = None,
+    ) -> BulkExportResult:
+        """Download the output files of a completed export in parallel.
+
+        Each resource type is written by one NDJSONWriter with the prefix
+        ``bulk``; error files go to ``<output_dir>/_errors`` with the prefix
+        ``error``. Output is written to staging directories that replace the
+        partitions only once every file has been downloaded, so rerunning an
+        export for the same ingest date replaces its data and a failed
+        download leaves the previous partitions untouched. The manifests
+        record the export's transactionTime as watermark, so the next
+        incremental run can continue from it.
+
+        Args:
+            manifest: Completion manifest returned by ``poll``.
+            output_dir: Root of the bronze layout.
+            ingest_date: Ingest date partition. Defaults to today.
+
+        Returns:
+            BulkExportResult listing the written files.
+        """
+        requires_token = manifest.get("requiresAccessToken", True)
+        transaction_time = manifest.get("transactionTime")
+        result = BulkExportResult(transaction_time=transaction_time)
+
+        directories: Dict[Optional[str], Path] = {}
+        jobs = []
+        for item in manifest.get("output", []):
+            resource_type = item["type"]
+            directories.setdefault(
+                resource_type, bronze_partition_dir(output_dir, resource_type, ingest_date)
+            )
+            jobs.append((resource_type, item["url"]))
+        for item in manifest.get("error", []):
+            directories.setdefault(None, Path(output_dir) / "_errors")
+            jobs.append((None, item["url"]))
+
+        logger.info("Downloading bulk export files",
+                    files=len(jobs),
+                    workers=self.download_workers)
+
+        staging = {key: staging_dir(directory) for key, directory in directories.items()}
+        for directory in staging.values():
+            shutil.rmtree(directory, ignore_errors=True)
+
+        files = {}
+        with ExitStack() as stack:
+            # A failed download leaves the staged manifests incomplete
+            writers = {
+                key: stack.enter_context(NDJSONWriter(
+                    staging[key],
+                    prefix="error" if key is None else "bulk",
+                    compression=self.compression,
+                    max_file_bytes=self.max_file_bytes,
+                ))
+                for key, directory in directories.items()
+            }
+            locks = {key: threading.Lock() for key in writers}
+
+            with ThreadPoolExecutor(max_workers=self.download_workers) as executor:
+                futures = [
+                    (resource_type, executor.submit(
+                        self._download_file, url, writers[resource_type],
+                        locks[resource_type], requires_token,
+                    ))
+                    for resource_type, url in jobs
+                ]
+                for resource_type, future in futures:
+                    count = future.result()
+                    if resource_type is not None:
+                        result.resource_counts[resource_type] = \
+                            result.resource_counts.get(resource_type, 0) + count
+
+            metadata = None
+            if transaction_time:
+                metadata = {
+                    "transaction_time": transaction_time,
+                    "watermark": Watermark(last_updated=transaction_time,
+                                           boundary_ids=None).to_dict(),
+                }
+            for key, writer in writers.items():
+                files[key] = writer.close(metadata=metadata if key is not None else None)
+
+        for key, directory in directories.items():
+            replace_partition(staging[key], directory)
+            paths = [directory / f.path for f in files[key]]
+            if key is None:
+                result.error_files.extend(paths)
+            else:
+                result.files[key] = paths
+
+        if result.error_files:
+            logger.warning("Bulk export reported errors", error_files=len(result.error_files))
+        return result
+
+    def export(
+        self,
+        output_dir: Union[str, Path],
+        resource_types: Optional[List[str]] = None,
+        since: Optional[str] = None,
+        group_id: Optional[str] = None,
+        patient_level: bool = False,
+        ingest_date: Optional[date] = None,
+    ) -> BulkExportResult:
+        """Run an export end to end: kick off, poll and download.
+
+        Args:
+            output_dir: Root of the bronze layout.
+            resource_types: Optional resource types to export.
+            since: Optional instant; only resources updated after it are exported.
+            group_id: Optional Group ID for a group-level export.
+            patient_level: Whether to run a patient-level export.
+            ingest_date: Ingest date partition. Defaults to today.
+
+        Returns:
+            BulkExportResult listing the written files.
+        """
+        status_url = self.kick_off(resource_types, since, group_id, patient_level)
+        try:
+            manifest = self.poll(status_url)
+        except BulkExportError:
+            try:
+                self.cancel(status_url)
+            except requests.RequestException:
+                pass
+            raise
+
+        result = self.download(manifest, output_dir, ingest_date)
+        logger.info("Completed bulk export",
+                    transaction_time=result.transaction_time,
+                    files=sum(len(paths) for paths in result.files.values()))
+        return result
@@ -5,28 +5,130 @@ This module provides a generic client for interacting with FHIR APIs,
 including pagination, rate limiting, and error handling.
 """
 
+import gzip
 import json
+import queue
+import threading
 import time
 import uuid
 import os
-from typing import Any, Dict, Generator, List, Optional, Tuple, Union
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple, Union
 from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from epic_fhir_integration.infrastructure.api_clients.batch_executor import (
+    BatchExecutor,
+    BatchResult,
+    read_requests,
+)
+from epic_fhir_integration.infrastructure.api_clients.resilience import (
+    RETRY_STATUS_CODES,
+    ResilienceManager,
+    endpoint_for,
+    get_shared_resilience,
+    retry_delay,
+)
+from epic_fhir_integration.infrastructure.api_clients.response_cache import (
+    ResponseCache,
+    cache_key,
+)
 # Import only logging utilities to avoid circular imports
 from epic_fhir_integration.utils.logging import get_logger
+from epic_fhir_integration.utils.rate_limiter import (
+    TokenBucketRateLimiter,
+    get_shared_rate_limiter,
+)
 
-# Import auth function lazily to avoid circular dependencies
-def _get_token():
-    from epic_fhir_integration.api_clients.jwt_auth import get_token_with_retry
-    return get_token_with_retry()
+# Import auth lazily to avoid circular dependencies
+def _get_token_manager():
+    from epic_fhir_integration.api_clients.jwt_auth import get_assertion_pool, get_token_manager
+    manager = get_token_manager()
+    if manager.refresh_count == 0:
+        # Load the key and sign the first assertion while the caller sets up
+        get_assertion_pool().prefill()
+    return manager
 
 logger = get_logger(__name__)
 
+# Marks the end of a prefetched page stream
+_END_OF_PAGES = object()
+
+# Request bodies below this size are sent uncompressed
+COMPRESSION_MIN_BYTES = 1024
+
+
+def get_next_link(bundle: Dict[str, Any]) -> Optional[str]:
+    """Get the URL of the next page of a search result Bundle.
+    
+    Args:
+        bundle: Search result Bundle.
+        
+    Returns:
+        Next page URL, or None on the last page.
+    """
+    for link in bundle.get("link", []):
+        if link.get("relation") == "next":
+            return link.get("url")
+    return None
+
+
+def _prefetch(
+    iterator: Iterator[Any], depth: int
+) -> Generator[Any, None, None]:
+    """Run an iterator in a background thread, buffering up to depth items.
+    
+    Items are yielded in their original order. Exceptions raised by the
+    iterator are re-raised in the consumer. Closing the returned generator
+    stops the worker at its next hand-off.
+    
+    Args:
+        iterator: Iterator to drain in the background.
+        depth: Maximum number of buffered items.
+        
+    Yields:
+        Items from the iterator.
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def worker() -> None:
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_END_OF_PAGES)
+        except BaseException as e:
+            put(e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+    
+    thread = threading.Thread(target=worker, name="fhir-page-prefetch", daemon=True)
+    thread.start()
+    
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_PAGES:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
 
 class FHIRClient:
     """Generic client for interacting with FHIR APIs."""
@@ -39,34 +141,66 @@ class FHIRClient:
         timeout: int = 30,
         max_retries: int = 3,
         retry_backoff_factor: float = 0.5,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        requests_per_minute: Optional[float] = None,
+        response_cache: Optional[ResponseCache] = None,
+        cache_scope: str = "",
+        resilience: Optional[ResilienceManager] = None,
+        compress_requests: bool = False,
     ):
         """Initialize a new FHIR client.
         
+        Responses are negotiated with ``Accept-Encoding``: gzip and deflate
+        always, and br when the ``brotli`` package is installed.
+        
         Args:
             base_url: Base URL of the FHIR API.
             access_token: Optional access token for authentication.
             token_provider: Optional function that returns an access token.
-                            Will be called if access_token is None.
+                            Will be called for every request if access_token
+                            is None, so it should cache the token itself
+                            (e.g. a TokenManager). If it has an ``invalidate``
+                            method, it is called with a token rejected by a 401.
             timeout: Request timeout in seconds.
-            max_retries: Maximum number of retries for failed requests.
-            retry_backoff_factor: Backoff factor for retries.
+            max_retries: Retry budget of a request. Transport errors, 429
+                         and 5xx responses all draw from the same budget.
+            retry_backoff_factor: Base delay of the exponential retry backoff.
+            rate_limiter: Optional rate limiter, typically shared between clients.
+            requests_per_minute: Optional request rate for a client-private
+                                 rate limiter. Ignored if rate_limiter is given.
+            response_cache: Optional cache of resource reads, revalidated with
+                            conditional requests.
+            cache_scope: Auth scope of the credentials, e.g. the client ID.
+                         Cached responses are only reused within a scope.
+            resilience: Optional circuit breakers and adaptive concurrency,
+                        typically shared between clients. Defaults to a
+                        client-private manager.
+            compress_requests: Whether to gzip JSON request bodies (e.g.
+                               batch Bundles) of at least
+                               COMPRESSION_MIN_BYTES. The server must accept
+                               ``Content-Encoding: gzip``.
         """
         self.base_url = base_url.rstrip("/")
         self.access_token = access_token
         self.token_provider = token_provider
         self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff_factor = retry_backoff_factor
+        self.resilience = resilience or ResilienceManager()
+        self.compress_requests = compress_requests
+        self.response_cache = response_cache
+        self.cache_scope = cache_scope
+        
+        if rate_limiter is None and requests_per_minute:
+            rate_limiter = TokenBucketRateLimiter(requests_per_minute)
+        self.rate_limiter = rate_limiter
         
-        # Setup session with retry logic
+        # Retries are handled in _request, so the transport does not retry.
+        # The pool holds as many connections as requests may be in flight.
         self.session = requests.Session()
-        retry_strategy = Retry(
-            total=max_retries,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"],
-            backoff_factor=retry_backoff_factor,
-            respect_retry_after_header=True,
-        )
-        self.session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
-        self.session.mount("http://", HTTPAdapter(max_retries=retry_strategy))
+        adapter = HTTPAdapter(max_retries=0, pool_maxsize=self.resilience.concurrency.max_limit)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         
         logger.info("Initialized FHIR client", base_url=self.base_url)
     
@@ -81,14 +215,11 @@ class FHIRClient:
             "Content-Type": "application/json",
         }
         
-        # Add authorization header if access token is available
+        # Add authorization header if access token is available. A provider
+        # is asked on every request so that refreshed tokens are picked up.
         token = self.access_token
-        
-        # If no token but we have a token provider, get a token
         if not token and self.token_provider:
             token = self.token_provider()
-            # Store for future use
-            self.access_token = token
         
         if token:
             headers["Authorization"] = f"Bearer {token}"
@@ -107,15 +238,7 @@ class FHIRClient:
         Raises:
             requests.HTTPError: If the request fails.
         """
-        # Check for rate limiting response
-        if response.status_code == 429:
-            retry_after = response.headers.get("Retry-After", "60")
-            wait_time = int(retry_after)
-            logger.warning("Rate limited, waiting", seconds=wait_time)
-            time.sleep(wait_time)
-            response.raise_for_status()  # This will trigger a retry
-        
-        # Handle other errors
+        # Retryable errors have already used up the retry budget in _request
         if not response.ok:
             logger.error("FHIR API error", 
                         status_code=response.status_code, 
@@ -125,11 +248,120 @@ class FHIRClient:
         # Return JSON response data
         return response.json()
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        retry=retry_if_exception_type(requests.RequestException)
-    )
+    def _request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Send an HTTP request with retries, circuit breaking and rate limiting.
+        
+        Transport errors, 429 and 5xx responses are retried with exponential
+        backoff (or the server's Retry-After) until the retry budget of
+        ``max_retries`` is used up. Every attempt passes the endpoint's circuit
+        breaker, the adaptive concurrency limit and the rate limiter.
+        
+        Args:
+            method: HTTP method.
+            url: Request URL.
+            headers: Optional headers, merged over the default headers.
+            **kwargs: Additional arguments passed to the session.
+            
+        Returns:
+            HTTP response object. A retryable error status is returned once
+            the budget is used up.
+            
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open.
+            requests.RequestException: If a transport error persists.
+        """
+        if self.compress_requests and kwargs.get("json") is not None:
+            body = json.dumps(kwargs.pop("json")).encode("utf-8")
+            if len(body) >= COMPRESSION_MIN_BYTES:
+                body = gzip.compress(body)
+                headers = {**(headers or {}), "Content-Encoding": "gzip"}
+            kwargs["data"] = body
+        
+        endpoint = endpoint_for(self.base_url, url)
+        self.resilience.increment("requests")
+        attempt = 0
+        replayed = False
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            
+            request_headers = self._get_headers()
+            if headers:
+                request_headers.update(headers)
+            
+            token = self.resilience.before_attempt(endpoint)
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    headers=request_headers,
+                    timeout=self.timeout,
+                    **kwargs,
+                )
+            except requests.RequestException as e:
+                self.resilience.after_attempt(endpoint, token, None)
+                if not isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    raise
+                if attempt >= self.max_retries:
+                    self.resilience.increment("retry_budget_exhausted")
+                    raise
+                attempt += 1
+                self.resilience.increment("retries")
+                delay = retry_delay(attempt, self.retry_backoff_factor)
+                logger.warning("Transport error, retrying",
+                               url=url, attempt=attempt, delay=delay, error=str(e))
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.resilience.cancel_attempt(token)
+                raise
+            
+            self.resilience.after_attempt(endpoint, token, response.status_code)
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_response(response.status_code, response.headers)
+            
+            # A token revoked or expired early: refresh it and replay once
+            invalidate = getattr(self.token_provider, "invalidate", None)
+            if response.status_code == 401 and invalidate is not None and not replayed:
+                replayed = True
+                authorization = request_headers.get("Authorization", "")
+                logger.warning("Access token rejected, refreshing", url=url)
+                invalidate(authorization[len("Bearer "):] or None)
+                continue
+            
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            if attempt >= self.max_retries:
+                self.resilience.increment("retry_budget_exhausted")
+                return response
+            
+            attempt += 1
+            self.resilience.increment("retries")
+            # A 429 has already paused the rate limiter for Retry-After
+            if response.status_code == 429 and self.rate_limiter is not None:
+                delay = 0.0
+            else:
+                delay = retry_delay(attempt, self.retry_backoff_factor,
+                                    response.headers.get("Retry-After"))
+            logger.warning("Retryable FHIR response, retrying",
+                           url=url, status_code=response.status_code,
+                           attempt=attempt, delay=delay)
+            time.sleep(delay)
+    
+    def resilience_metrics(self) -> Dict[str, Any]:
+        """Get retry, circuit breaker and concurrency metrics.
+        
+        Returns:
+            Snapshot from the client's ResilienceManager.
+        """
+        return self.resilience.snapshot()
+    
     def get_resource(
         self, 
         resource_type: str, 
@@ -156,15 +388,30 @@ class FHIRClient:
                    resource_id=resource_id,
                    params=params)
         
+        # Reads are revalidated against the cache with a conditional request
+        cached = key = None
+        headers = None
+        if self.response_cache is not None and resource_id:
+            key = cache_key(url, params, self.cache_scope)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                headers = cached.conditional_headers()
+        
         # Make the request
-        response = self.session.get(
-            url,
-            headers=self._get_headers(),
-            params=params,
-            timeout=self.timeout,
-        )
+        response = self._request("GET", url, headers=headers, params=params)
+        
+        if response.status_code == 304 and cached is not None:
+            logger.debug("FHIR resource not modified, using cache",
+                        resource_type=resource_type,
+                        resource_id=resource_id)
+            self.response_cache.touch(key)
+            return json.loads(cached.body)
         
         result = self._handle_response(response)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if key is not None and (etag or last_modified):
+            self.response_cache.put(key, response.content, etag=etag, last_modified=last_modified)
         logger.debug("Received FHIR resource", 
                     resource_type=resource_type,
                     result_size=len(json.dumps(result)))
@@ -175,6 +422,7 @@ class FHIRClient:
         resource_type: str,
         params: Optional[Dict[str, Any]] = None,
         max_pages: int = 50,
+        prefetch_pages: int = 0,
     ) -> List[Dict[str, Any]]:
         """Get all resources of a given type using pagination.
         
@@ -182,6 +430,7 @@ class FHIRClient:
             resource_type: FHIR resource type (e.g., "Patient", "Observation").
             params: Optional query parameters.
             max_pages: Maximum number of pages to retrieve (default: 50).
+            prefetch_pages: Number of pages to fetch ahead in the background.
             
         Returns:
             List of resources.
@@ -201,6 +450,7 @@ class FHIRClient:
             resource_type=resource_type,
             params=params,
             page_limit=max_pages,
+            prefetch_pages=prefetch_pages,
         ):
             resources.append(resource)
             
@@ -209,33 +459,52 @@ class FHIRClient:
                    count=len(resources))
         return resources
     
-    def search_resources(
+    def iter_pages(
         self,
         resource_type: str,
         params: Optional[Dict[str, Any]] = None,
         page_limit: Optional[int] = None,
-        total_limit: Optional[int] = None,
+        prefetch_pages: int = 0,
+        start_url: Optional[str] = None,
     ) -> Generator[Dict[str, Any], None, None]:
-        """Search for FHIR resources with pagination.
+        """Iterate over the Bundle pages of a FHIR search.
         
         Args:
             resource_type: FHIR resource type (e.g., "Patient", "Observation").
             params: Optional search parameters.
             page_limit: Maximum number of pages to retrieve.
-            total_limit: Maximum total number of resources to retrieve.
+            prefetch_pages: Number of pages to fetch ahead of the caller in a
+                            background thread. 0 fetches pages on demand.
+            start_url: Optional ``next`` link of a previous search to resume
+                       from. params are ignored, as the link carries them.
             
         Yields:
-            FHIR resource dictionaries.
+            Search result Bundle dictionaries, in server order.
         """
-        params = params or {}
-        url = f"{self.base_url}/{resource_type}"
-        
-        resource_count = 0
+        pages = self._fetch_pages(resource_type, params or {}, page_limit, start_url)
+        if prefetch_pages > 0:
+            pages = _prefetch(pages, prefetch_pages)
+        return pages
+    
+    def _fetch_pages(
+        self,
+        resource_type: str,
+        params: Dict[str, Any],
+        page_limit: Optional[int],
+        start_url: Optional[str] = None,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Fetch search pages by following next links."""
+        url = start_url or f"{self.base_url}/{resource_type}"
         page_count = 0
         
+        # A resumed search continues from a next link, which carries the params
+        if start_url:
+            params = None
+        
         logger.info("Starting FHIR search", 
                    resource_type=resource_type, 
-                   params=params)
+                   params=params,
+                   resumed=bool(start_url))
         
         while url:
             # Check if we've hit the page limit
@@ -244,48 +513,100 @@ class FHIRClient:
                 break
             
             # Make the request
-            response = self.session.get(
+            response = self._request(
+                "GET",
                 url,
-                headers=self._get_headers(),
                 params=params if page_count == 0 else None,  # Only use params on first request
-                timeout=self.timeout,
             )
             
             data = self._handle_response(response)
             page_count += 1
             
-            # Process entries
-            entries = data.get("entry", [])
             logger.debug("Received page", 
                         page=page_count, 
-                        entries=len(entries))
-            
-            for entry in entries:
-                resource = entry.get("resource", {})
-                if resource:
-                    yield resource
-                    resource_count += 1
-                    
-                    # Check if we've hit the total limit
-                    if total_limit and resource_count >= total_limit:
-                        logger.info("Resource limit reached", resource_count=resource_count)
-                        return
+                        entries=len(data.get("entry", [])))
             
-            # Get the URL for the next page, if available
-            url = None
-            for link in data.get("link", []):
-                if link.get("relation") == "next":
-                    url = link.get("url")
-                    break
+            # Get the URL for the next page before handing the page out
+            url = get_next_link(data)
+            yield data
             
             if not url:
-                logger.info("No more pages", page_count=page_count, resource_count=resource_count)
+                logger.info("No more pages", page_count=page_count)
+    
+    def search_resources(
+        self,
+        resource_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_limit: Optional[int] = None,
+        total_limit: Optional[int] = None,
+        prefetch_pages: int = 0,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Search for FHIR resources with pagination.
+        
+        Args:
+            resource_type: FHIR resource type (e.g., "Patient", "Observation").
+            params: Optional search parameters.
+            page_limit: Maximum number of pages to retrieve.
+            total_limit: Maximum total number of resources to retrieve.
+            prefetch_pages: Number of pages to fetch ahead of the caller in a
+                            background thread, so network I/O overlaps with
+                            processing. Memory is bounded by this depth.
+            
+        Yields:
+            FHIR resource dictionaries.
+        """
+        resource_count = 0
+        pages = self.iter_pages(resource_type, params, page_limit, prefetch_pages)
+        
+        try:
+            for data in pages:
+                for entry in data.get("entry", []):
+                    resource = entry.get("resource", {})
+                    if resource:
+                        yield resource
+                        resource_count += 1
+                        
+                        # Check if we've hit the total limit
+                        if total_limit and resource_count >= total_limit:
+                            logger.info("Resource limit reached", resource_count=resource_count)
+                            return
+        finally:
+            # Stops the prefetch worker if the caller stops early
+            pages.close()
+    
+    def execute_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        max_entries: int = 100,
+        max_payload_bytes: int = 1024 * 1024,
+        max_workers: int = 4,
+    ) -> List[BatchResult]:
+        """Execute requests as chunked, concurrently submitted batch Bundles.
+        
+        Args:
+            requests: Request objects, each with "method", "url" and optionally "resource".
+            max_entries: Maximum number of entries per Bundle.
+            max_payload_bytes: Maximum serialized size of a Bundle's entries.
+            max_workers: Maximum number of Bundles in flight.
+            
+        Returns:
+            One BatchResult per request, in request order.
+        """
+        executor = BatchExecutor(
+            self,
+            max_entries=max_entries,
+            max_payload_bytes=max_payload_bytes,
+            max_workers=max_workers,
+        )
+        return executor.execute(requests)
     
     def batch_get_resources(
         self,
         resource_type: str,
         resource_ids: List[str],
         max_workers: int = 5,
+        use_batch: bool = False,
+        max_entries: int = 100,
     ) -> Dict[str, Dict[str, Any]]:
         """Get multiple resources by ID in parallel.
         
@@ -293,6 +614,9 @@ class FHIRClient:
             resource_type: FHIR resource type (e.g., "Patient", "Observation").
             resource_ids: List of resource IDs to fetch.
             max_workers: Maximum number of concurrent requests.
+            use_batch: Whether to read the resources through batch Bundles of
+                       up to max_entries reads instead of one request each.
+            max_entries: Maximum number of reads per batch Bundle.
             
         Returns:
             Dictionary mapping resource IDs to resources.
@@ -303,6 +627,21 @@ class FHIRClient:
                    resource_type=resource_type, 
                    count=len(resource_ids))
         
+        if use_batch:
+            batch_results = self.execute_batch(
+                read_requests(resource_type, resource_ids),
+                max_entries=max_entries,
+                max_workers=max_workers,
+            )
+            for resource_id, result in zip(resource_ids, batch_results):
+                if result.ok and result.resource:
+                    results[resource_id] = result.resource
+            logger.info("Completed batch get", 
+                       resource_type=resource_type,
+                       fetched=len(results),
+                       requested=len(resource_ids))
+            return results
+        
         # Function to fetch a single resource
         def fetch_resource(resource_id):
             try:
@@ -331,14 +670,60 @@ class FHIRClient:
 def create_fhir_client() -> FHIRClient:
     """Create a configured FHIR client with authentication.
     
+    The client shares the process-wide TokenManager. Until that manager has
+    fetched its first token, creating a client starts a background thread
+    that loads the private key and pre-signs JWT assertions, so that the
+    first token request does not wait for them. Tokens themselves are only
+    requested with the first API call.
+    
     Returns:
         Configured FHIRClient instance.
+    
+    Raises:
+        ValueError: If EPIC_BASE_URL is not set.
     """
     # Get Epic base URL from environment
     epic_base_url = os.environ.get("EPIC_BASE_URL")
     if not epic_base_url:
         raise ValueError("EPIC_BASE_URL environment variable not set")
     
-    # Create client with token provider instead of directly fetching token
-    # This avoids circular imports and defers token acquisition until needed
-    return FHIRClient(base_url=epic_base_url, token_provider=_get_token) 
\ No newline at end of file
+    # Share one rate limiter between all clients for the same endpoint
+    from epic_fhir_integration.utils.config import get_api_config
+    api_config = get_api_config()
+    rate_limiter = get_shared_rate_limiter(
+        epic_base_url,
+        requests_per_minute=api_config.requests_per_minute,
+    )
+    
+    # Optional on-disk cache of resource reads; set FHIR_CACHE_KEY to a
+    # Fernet key to encrypt the cached payloads at rest
+    response_cache = None
+    cache_dir = os.environ.get("FHIR_CACHE_DIR")
+    if cache_dir:
+        response_cache = ResponseCache(
+            cache_dir,
+            max_bytes=int(os.environ.get("FHIR_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+            encryption_key=os.environ.get("FHIR_CACHE_KEY"),
+        )
+    
+    # Share circuit breakers and the concurrency limit as well, so that all
+    # workers back off together when the API degrades
+    resilience = get_shared_resilience(
+        epic_base_url,
+        failure_threshold=api_config.circuit_failure_threshold,
+        reset_timeout=api_config.circuit_reset_seconds,
+        max_concurrency=api_config.max_concurrency,
+    )
+    
+    # The token manager fetches tokens on first use, but assertion signing
+    # starts now in a background thread (see _get_token_manager)
+    return FHIRClient(
+        base_url=epic_base_url,
+        token_provider=_get_token_manager(),
+        max_retries=api_config.max_retries,
+        rate_limiter=rate_limiter,
+        resilience=resilience,
+        response_cache=response_cache,
+        cache_scope=os.environ.get("EPIC_CLIENT_ID", ""),
+        compress_requests=os.environ.get("FHIR_COMPRESS_REQUESTS", "").lower() in ("1", "true", "yes"),
+    ) 
\ No newline at end of file
@@ -7,20 +7,48 @@ including token generation, exchange, refresh, and retry logic.
 
 import json
 import os
+import threading
 import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; the token file is then shared without locking
+    fcntl = None
 
 import jwt
 import requests
+from cryptography.hazmat.primitives import serialization
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from epic_fhir_integration.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
-# Cache for token data
-_token_cache = {}
+# Seconds before expiry at which tokens are refreshed; short-lived tokens
+# are refreshed after half their lifetime instead
+REFRESH_MARGIN_SECONDS = 300
+
+# Shortest delay of the background refresh timer
+MIN_REFRESH_INTERVAL_SECONDS = 1.0
+
+# Validity of a client assertion; Epic accepts at most 5 minutes
+ASSERTION_LIFETIME_SECONDS = 300
+
+# Parsed signing key and claims, loaded once per process
+_signing_config = None
+_signing_lock = threading.Lock()
+
+# Token managers by cache key
+_token_managers: Dict[str, "TokenManager"] = {}
+_token_managers_lock = threading.Lock()
 
 
 def get_secret(name: str) -> str:
@@ -54,52 +82,190 @@ def get_secret(name: str) -> str:
     raise ValueError(f"Secret {name} not found in Foundry secrets or environment variables")
 
 
-def build_jwt() -> str:
+@dataclass(frozen=True)
+class SigningConfig:
+    """Parsed key and claims shared by every client assertion."""
+    
+    private_key: Any
+    client_id: str
+    audience: str
+
+
+def load_private_key(pem: Union[str, bytes]) -> Any:
+    """Parse a PEM-encoded RSA private key.
+    
+    Parsing validates the key, which costs far more than signing; callers
+    should keep the result instead of passing the PEM to ``jwt.encode``.
+    
+    Args:
+        pem: PEM-encoded private key.
+        
+    Returns:
+        Private key object accepted by ``jwt.encode``.
+    """
+    if isinstance(pem, str):
+        pem = pem.encode("utf-8")
+    return serialization.load_pem_private_key(pem, password=None)
+
+
+def get_signing_config() -> SigningConfig:
+    """Get the parsed signing key and claims, loading them once per process.
+    
+    Returns:
+        SigningConfig built from the EPIC_PRIVATE_KEY, EPIC_CLIENT_ID and
+        EPIC_BASE_URL secrets.
+        
+    Raises:
+        ValueError: If the configuration is invalid.
+    """
+    global _signing_config
+    
+    with _signing_lock:
+        if _signing_config is not None:
+            return _signing_config
+        
+        # Load private key and client ID from secrets
+        private_key = load_private_key(get_secret("EPIC_PRIVATE_KEY"))
+        client_id = get_secret("EPIC_CLIENT_ID")
+        
+        # Get Epic base URL from environment or secrets
+        epic_base_url = os.environ.get("EPIC_BASE_URL")
+        if not epic_base_url:
+            try:
+                epic_base_url = get_secret("EPIC_BASE_URL")
+            except ValueError:
+                raise ValueError("EPIC_BASE_URL not found in environment or secrets")
+        
+        _signing_config = SigningConfig(
+            private_key=private_key,
+            client_id=client_id,
+            audience=f"{epic_base_url}/oauth2/token",
+        )
+        return _signing_config
+
+
+def clear_signing_config() -> None:
+    """Forget the cached signing key, e.g. after a key rotation."""
+    global _signing_config
+    
+    with _signing_lock:
+        _signing_config = None
+
+
+def build_jwt(config: Optional[SigningConfig] = None) -> str:
     """Build a JWT token for authentication with Epic.
     
+    Args:
+        config: Optional signing configuration. Defaults to the cached
+                configuration from ``get_signing_config``.
+    
     Returns:
         JWT token string.
         
     Raises:
         ValueError: If the configuration is invalid.
     """
-    # Load private key and client ID from secrets
-    private_key = get_secret("EPIC_PRIVATE_KEY")
-    client_id = get_secret("EPIC_CLIENT_ID")
-    
-    # Get Epic base URL from environment or secrets
-    epic_base_url = os.environ.get("EPIC_BASE_URL")
-    if not epic_base_url:
-        try:
-            epic_base_url = get_secret("EPIC_BASE_URL")
-        except ValueError:
-            raise ValueError("EPIC_BASE_URL not found in environment or secrets")
+    config = config or get_signing_config()
     
     # Prepare JWT claims
     now = int(time.time())
-    expiration = now + 300  # 5 minutes
+    expiration = now + ASSERTION_LIFETIME_SECONDS
     
     claims = {
-        "iss": client_id,  # Issuer is the client ID
-        "sub": client_id,  # Subject is also the client ID
-        "aud": f"{epic_base_url}/oauth2/token",
-        "jti": str(int(time.time() * 1000)),  # Unique ID based on timestamp
+        "iss": config.client_id,  # Issuer is the client ID
+        "sub": config.client_id,  # Subject is also the client ID
+        "aud": config.audience,
+        "jti": uuid.uuid4().hex,  # Must be unique per assertion
         "iat": now,
         "exp": expiration,
     }
     
     # Sign JWT
-    logger.info("Building JWT for token exchange", 
-                client_id=client_id,
-                epic_base_url=epic_base_url)
+    logger.debug("Building JWT for token exchange", 
+                 client_id=config.client_id,
+                 audience=config.audience)
     
     try:
-        return jwt.encode(claims, private_key, algorithm="RS384")
+        return jwt.encode(claims, config.private_key, algorithm="RS384")
     except Exception as e:
         logger.error("Failed to encode JWT", error=str(e))
         raise
 
 
+class AssertionPool:
+    """Small pool of pre-signed client assertions.
+    
+    Every assertion carries its own ``jti`` and is handed out once, so reuse
+    never replays an assertion. Assertions are signed ahead of time, e.g. in
+    the background while an executor starts up, and used until shortly
+    before their ``exp``, so a token exchange does not wait on key loading
+    and signing.
+    """
+    
+    def __init__(
+        self,
+        size: int = 2,
+        min_remaining: float = 60,
+        sign: Callable[[], str] = build_jwt,
+    ):
+        """Initialize a new assertion pool.
+        
+        Args:
+            size: Number of assertions kept ready.
+            min_remaining: Seconds of validity an assertion must have left to
+                           be handed out.
+            sign: Function returning a signed assertion.
+        """
+        self.size = size
+        self.min_remaining = min_remaining
+        self.sign = sign
+        self._assertions: Deque[Tuple[str, float]] = deque()
+        self._lock = threading.Lock()
+    
+    def _sign(self) -> Tuple[str, float]:
+        return self.sign(), time.time() + ASSERTION_LIFETIME_SECONDS
+    
+    def take(self) -> str:
+        """Get an unused assertion, signing one if none is ready.
+        
+        Returns:
+            Signed JWT assertion.
+        """
+        with self._lock:
+            while self._assertions:
+                assertion, expires = self._assertions.popleft()
+                if expires - time.time() > self.min_remaining:
+                    return assertion
+        return self._sign()[0]
+    
+    def fill(self) -> None:
+        """Sign assertions until the pool is full."""
+        while True:
+            with self._lock:
+                if len(self._assertions) >= self.size:
+                    return
+            assertion = self._sign()
+            with self._lock:
+                self._assertions.append(assertion)
+    
+    def prefill(self) -> threading.Thread:
+        """Fill the pool in a background thread.
+        
+        Returns:
+            The started thread.
+        """
+        def run():
+            try:
+                self.fill()
+            except Exception as e:
+                # take() signs on demand and reports the error to the caller
+                logger.warning("Could not pre-sign client assertions", error=str(e))
+        
+        thread = threading.Thread(target=run, name="jwt-prefill", daemon=True)
+        thread.start()
+        return thread
+
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, max=10))
 def exchange_for_access_token(jwt_token: str) -> Dict:
     """Exchange a JWT token for an access token.
@@ -158,12 +324,226 @@ def token_needs_refresh(token_data: Dict) -> bool:
         return True
     
     # Add a 5-minute buffer to ensure we refresh before expiration
-    buffer_seconds = 300  # 5 minutes
+    buffer_seconds = REFRESH_MARGIN_SECONDS
     current_time = datetime.now().timestamp()
     
     return current_time + buffer_seconds >= token_data["expiration_timestamp"]
 
 
+# Pre-signed assertions for token exchanges
+_assertion_pool = AssertionPool()
+
+
+def get_assertion_pool() -> AssertionPool:
+    """Get the process-wide pool of pre-signed client assertions."""
+    return _assertion_pool
+
+
+def _fetch_token() -> Dict:
+    return exchange_for_access_token(_assertion_pool.take())
+
+
+class TokenManager:
+    """Thread- and process-safe access token cache with proactive refresh.
+    
+    Only one token exchange is in flight at a time: concurrent callers wait
+    for it and share its result. With a cache file, worker processes share
+    the token as well, serialized by an ``fcntl`` lock so that only one of
+    them exchanges a JWT. A background timer refreshes the token shortly
+    before it expires, so requests never wait on a refresh in steady state.
+    
+    Instances are callable and can be passed as ``token_provider`` to
+    ``FHIRClient``, which calls ``invalidate`` when a request returns 401.
+    """
+    
+    def __init__(
+        self,
+        fetch_token: Callable[[], Dict] = _fetch_token,
+        cache_path: Optional[Union[str, Path]] = None,
+        refresh_margin: float = REFRESH_MARGIN_SECONDS,
+        background_refresh: bool = True,
+    ):
+        """Initialize a new token manager.
+        
+        Args:
+            fetch_token: Function returning token data with "access_token"
+                         and "expiration_timestamp", e.g. from
+                         ``exchange_for_access_token``.
+            cache_path: Optional token file shared between processes.
+            refresh_margin: Seconds before expiry at which the token is
+                            refreshed, at most half the token's lifetime.
+            background_refresh: Whether to refresh ahead of expiry in a
+                                background thread.
+        """
+        self.fetch_token = fetch_token
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self.refresh_count = 0
+        
+        self._token_data: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    def __call__(self) -> str:
+        return self.get_token()
+    
+    def _margin(self, token_data: Dict) -> float:
+        """Refresh margin of a token, clamped to half its lifetime."""
+        issued = token_data.get("issued_timestamp")
+        if issued is None:
+            return self.refresh_margin
+        lifetime = token_data["expiration_timestamp"] - issued
+        return max(min(self.refresh_margin, lifetime / 2), 0)
+    
+    def _is_valid(self, token_data: Optional[Dict]) -> bool:
+        if not token_data or "access_token" not in token_data:
+            return False
+        expires = token_data.get("expiration_timestamp")
+        return expires is None or time.time() + self._margin(token_data) < expires
+    
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the cross-process lock of the token file, if any."""
+        if self.cache_path is None or fcntl is None:
+            yield
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path.with_name(self.cache_path.name + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _read_file(self) -> Optional[Dict]:
+        if self.cache_path is None or not self.cache_path.exists():
+            return None
+        try:
+            return json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+    
+    def _write_file(self, token_data: Optional[Dict]) -> None:
+        if self.cache_path is None:
+            return
+        if token_data is None:
+            self.cache_path.unlink(missing_ok=True)
+            return
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        # The token is a credential: keep the file private to the user
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(token_data, f)
+        os.replace(tmp_path, self.cache_path)
+    
+    def _refresh_locked(self, force: bool) -> Dict:
+        """Refresh the token; the caller holds ``_lock``."""
+        with self._file_lock():
+            # Another process may have refreshed the token already
+            token_data = self._read_file()
+            if force or not self._is_valid(token_data):
+                logger.info("Refreshing access token")
+                token_data = self.fetch_token()
+                token_data.setdefault("issued_timestamp", time.time())
+                self.refresh_count += 1
+                self._write_file(token_data)
+        self._token_data = token_data
+        self._schedule_refresh(token_data)
+        return token_data
+    
+    def _schedule_refresh(self, token_data: Dict) -> None:
+        if not self.background_refresh or token_data.get("expiration_timestamp") is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = token_data["expiration_timestamp"] - self._margin(token_data) - time.time()
+        # Fire slightly inside the margin so that the token is due when the
+        # timer runs, but never in a tight loop, e.g. for an expired token
+        self._timer = threading.Timer(max(delay + 0.1, MIN_REFRESH_INTERVAL_SECONDS),
+                                      self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                if not self._is_valid(self._token_data):
+                    self._refresh_locked(force=False)
+        except Exception as e:
+            # The next get_token() retries synchronously
+            logger.warning("Background token refresh failed", error=str(e))
+    
+    def get_token(self, force_refresh: bool = False) -> str:
+        """Get a valid access token, refreshing it if needed.
+        
+        Args:
+            force_refresh: Whether to exchange a new token even if the cached
+                           one is still valid.
+            
+        Returns:
+            Access token string.
+        """
+        token_data = self._token_data
+        if not force_refresh and self._is_valid(token_data):
+            return token_data["access_token"]
+        
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if not force_refresh and self._is_valid(self._token_data):
+                return self._token_data["access_token"]
+            return self._refresh_locked(force=force_refresh)["access_token"]
+    
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Discard a token the server rejected.
+        
+        Only the given token is discarded, so that many requests failing with
+        the same stale token cause a single refresh.
+        
+        Args:
+            token: Rejected access token. If not provided, the current token.
+        """
+        with self._lock:
+            current = self._token_data
+            if current is None or (token is not None and current.get("access_token") != token):
+                return
+            logger.info("Invalidating rejected access token")
+            self._token_data = None
+            with self._file_lock():
+                file_data = self._read_file()
+                if file_data and file_data.get("access_token") == current.get("access_token"):
+                    self._write_file(None)
+    
+    def close(self) -> None:
+        """Stop the background refresh timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def get_token_manager(cache_key: str = "default") -> TokenManager:
+    """Get the shared token manager for a cache key.
+    
+    The token file is taken from the ``EPIC_TOKEN_CACHE_PATH`` environment
+    variable; without it the token is shared within the process only.
+    
+    Args:
+        cache_key: Key identifying the credentials.
+        
+    Returns:
+        TokenManager shared by all callers with the same key.
+    """
+    with _token_managers_lock:
+        manager = _token_managers.get(cache_key)
+        if manager is None:
+            cache_path = os.environ.get("EPIC_TOKEN_CACHE_PATH")
+            if cache_path and cache_key != "default":
+                cache_path = f"{cache_path}.{cache_key}"
+            manager = TokenManager(cache_path=cache_path)
+            _token_managers[cache_key] = manager
+        return manager
+
+
 def get_or_refresh_token(cache_key: str = "default") -> str:
     """Get a valid access token, refreshing if necessary.
     
@@ -173,26 +553,7 @@ def get_or_refresh_token(cache_key: str = "default") -> str:
     Returns:
         Valid access token string.
     """
-    global _token_cache
-    
-    # Check if we have a cached token
-    if cache_key in _token_cache:
-        token_data = _token_cache[cache_key]
-        
-        # Check if token needs refresh
-        if not token_needs_refresh(token_data):
-            logger.debug("Using cached token", cache_key=cache_key)
-            return token_data["access_token"]
-    
-    # Build JWT and exchange for access token
-    logger.info("Refreshing token", cache_key=cache_key)
-    jwt_token = build_jwt()
-    token_data = exchange_for_access_token(jwt_token)
-    
-    # Cache the new token
-    _token_cache[cache_key] = token_data
-    
-    return token_data["access_token"]
+    return get_token_manager(cache_key).get_token()
 
 
 def get_token_with_retry(max_retries: int = 3, backoff_factor: float = 1.5) -> str:
@@ -0,0 +1,439 @@
+"""
+Resilience layer for FHIR API requests.
+
+Retries used to be stacked (urllib3 ``Retry`` inside a tenacity decorator),
+so a single read could be sent nine times, and a degraded server kept being
+hit by every worker at full concurrency. This module provides the pieces the
+client combines instead:
+
+- a per-endpoint circuit breaker that fails fast while an endpoint keeps
+  failing and lets a single probe through after a cool-down,
+- an AIMD concurrency limiter that halves the number of requests in flight on
+  429/5xx responses and grows it back by one per round of successes,
+- counters describing both, exposed as metrics.
+
+The retry budget itself lives in ``FHIRClient._request``: every attempt of a
+request, whatever the failure, is drawn from one ``max_retries`` budget.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from epic_fhir_integration.utils.logging import get_logger
+from epic_fhir_integration.utils.rate_limiter import parse_retry_after
+
+logger = get_logger(__name__)
+
+# Status codes that are retried within the retry budget
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Circuit breaker states
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is rejected because its endpoint's circuit is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for endpoint {endpoint}, retry in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def retry_delay(
+    attempt: int,
+    backoff_factor: float,
+    retry_after: Optional[str] = None,
+    max_delay: float = 60.0,
+) -> float:
+    """Compute the delay before the next retry attempt.
+
+    Args:
+        attempt: Number of the attempt that just failed (1-based).
+        backoff_factor: Base delay in seconds, doubled for every attempt.
+        retry_after: Optional Retry-After header value, which takes precedence.
+        max_delay: Upper bound of the delay.
+
+    Returns:
+        Delay in seconds.
+    """
+    parsed = parse_retry_after(retry_after)
+    if parsed is not None:
+        return min(parsed, max_delay)
+    delay = backoff_factor * (2 ** (attempt - 1))
+    return min(delay * (0.5 + random.random()), max_delay)
+
+
+def endpoint_for(base_url: str, url: str) -> str:
+    """Name the endpoint of a request URL, e.g. "Observation" or "batch".
+
+    Args:
+        base_url: Base URL of the FHIR API.
+        url: Request URL.
+
+    Returns:
+        First path segment below the base URL, or "batch" for the base URL itself.
+    """
+    path = url[len(base_url):] if url.startswith(base_url) else urlparse(url).path
+    segment = path.split("?", 1)[0].strip("/").split("/", 1)[0]
+    return segment or "batch"
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker for one endpoint.
+
+    The circuit opens after ``failure_threshold`` consecutive failures. While
+    open, requests are rejected without being sent. After ``reset_timeout``
+    seconds one probe request is let through (half-open); its success closes
+    the circuit and its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a new circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit.
+            reset_timeout: Seconds the circuit stays open before a probe.
+            clock: Monotonic clock function, injectable for testing.
+        """
+        if failure_threshold < 1 or reset_timeout < 0:
+            raise ValueError("Invalid circuit breaker settings")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half_open"."""
+        with self._lock:
+            if self._state == CIRCUIT_OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return CIRCUIT_HALF_OPEN
+            return self._state
+
+    def allow(self, endpoint: str = "") -> None:
+        """Check that a request may be sent.
+
+        Args:
+            endpoint: Endpoint name for the error message.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                              probe already in flight.
+        """
+        with self._lock:
+            if self._state == CIRCUIT_CLOSED:
+                return
+            now = self._clock()
+            remaining = self._opened_at + self.reset_timeout - now
+            if remaining > 0:
+                raise CircuitOpenError(endpoint, remaining)
+            # A probe that never reported back does not block the circuit forever
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                raise CircuitOpenError(endpoint, self._probe_started + self.reset_timeout - now)
+            self._state = CIRCUIT_HALF_OPEN
+            self._probe_started = now
+
+    def record_success(self) -> None:
+        """Record a successful request, closing the circuit."""
+        with self._lock:
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> bool:
+        """Record a failed request.
+
+        Returns:
+            True if this failure opened the circuit.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == CIRCUIT_HALF_OPEN or (
+                self._state == CIRCUIT_CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = CIRCUIT_OPEN
+                self._opened_at = self._clock()
+                self._probe_started = None
+                return True
+            return False
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit adapted with additive increase, multiplicative decrease.
+
+    Each successful response raises the limit by ``1 / limit``, i.e. by one
+    per round of successful requests. A 429, 5xx or transport error
+    multiplies it by ``backoff_ratio``. Only the first overload signal of a
+    congestion episode shrinks the limit: requests sent before the last
+    decrease do not shrink it again.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff_ratio: float = 0.5,
+    ):
+        """Initialize a new concurrency limiter.
+
+        Args:
+            initial_limit: Starting number of requests allowed in flight.
+            min_limit: Lowest limit a decrease can reach.
+            max_limit: Highest limit an increase can reach.
+            backoff_ratio: Factor applied to the limit on overload.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit or not 0 < backoff_ratio < 1:
+            raise ValueError("Invalid concurrency limits")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._generation = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently in flight."""
+        return self._in_flight
+
+    def acquire(self) -> int:
+        """Block until a request may be sent.
+
+        Returns:
+            Token to pass to ``release``.
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            return self._generation
+
+    def release(self, token: int, overloaded: Optional[bool]) -> bool:
+        """Release a slot and adapt the limit to the request's outcome.
+
+        Args:
+            token: Token returned by ``acquire``.
+            overloaded: Whether the server signalled overload, or None to
+                        leave the limit unchanged.
+
+        Returns:
+            True if the limit was decreased.
+        """
+        decreased = False
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded is None:
+                pass
+            elif overloaded:
+                if token == self._generation:
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                    self._generation += 1
+                    decreased = True
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
+        if decreased:
+            logger.warning("Reduced FHIR request concurrency", limit=self.limit)
+        return decreased
+
+
+class ResilienceManager:
+    """Circuit breakers, adaptive concurrency and metrics for one FHIR API.
+
+    Shared by every client of the same API (see ``get_shared_resilience``), so
+    that all workers back off together when the server degrades.
+    """
+
+    COUNTERS = (
+        "requests",
+        "attempts",
+        "retries",
+        "retry_budget_exhausted",
+        "circuit_rejections",
+        "circuit_opened",
+        "overloads",
+        "concurrency_decreases",
+    )
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 32,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a new resilience manager.
+
+        Args:
+            failure_threshold: Consecutive failures that open an endpoint's circuit.
+            reset_timeout: Seconds a circuit stays open before a probe.
+            initial_concurrency: Starting number of requests in flight.
+            min_concurrency: Lowest concurrency limit.
+            max_concurrency: Highest concurrency limit.
+            clock: Monotonic clock function for the breakers.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial_limit=min(initial_concurrency, max_concurrency),
+            min_limit=min_concurrency,
+            max_limit=max_concurrency,
+        )
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._counters = {name: 0 for name in self.COUNTERS}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Get the circuit breaker of an endpoint, creating it on first use."""
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout, clock=self._clock
+                )
+            return self._breakers[endpoint]
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name] += amount
+
+    def before_attempt(self, endpoint: str) -> int:
+        """Admit one attempt of a request.
+
+        Blocks while the concurrency limit is reached.
+
+        Args:
+            endpoint: Endpoint of the request.
+
+        Returns:
+            Token to pass to ``after_attempt``.
+
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open.
+        """
+        try:
+            self.breaker(endpoint).allow(endpoint)
+        except CircuitOpenError:
+            self.increment("circuit_rejections")
+            raise
+        token = self.concurrency.acquire()
+        self.increment("attempts")
+        return token
+
+    def after_attempt(self, endpoint: str, token: int, status_code: Optional[int]) -> None:
+        """Report the outcome of an attempt admitted by ``before_attempt``.
+
+        Args:
+            endpoint: Endpoint of the request.
+            token: Token returned by ``before_attempt``.
+            status_code: Response status code, or None for a transport error.
+        """
+        overloaded = status_code is None or status_code in RETRY_STATUS_CODES
+        if overloaded:
+            self.increment("overloads")
+        if self.concurrency.release(token, overloaded):
+            self.increment("concurrency_decreases")
+
+        # Throttling is the concurrency limiter's job; the breaker tracks
+        # whether the endpoint is up at all
+        breaker = self.breaker(endpoint)
+        if status_code is None or status_code >= 500:
+            if breaker.record_failure():
+                self.increment("circuit_opened")
+                logger.error("Circuit opened for FHIR endpoint",
+                             endpoint=endpoint,
+                             reset_timeout=self.reset_timeout)
+        else:
+            breaker.record_success()
+
+    def cancel_attempt(self, token: int) -> None:
+        """Release an attempt that ended without an outcome, e.g. when interrupted."""
+        self.concurrency.release(token, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the current counters, concurrency and circuit states.
+
+        Returns:
+            Dictionary of metric names to values; ``circuits`` maps endpoints
+            to their breaker state.
+        """
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._counters)
+            breakers = dict(self._breakers)
+        snapshot["concurrency_limit"] = self.concurrency.limit
+        snapshot["in_flight"] = self.concurrency.in_flight
+        snapshot["circuits"] = {endpoint: b.state for endpoint, b in breakers.items()}
+        return snapshot
+
+    def record_metrics(self, collector=None, resource_type: Optional[str] = None) -> None:
+        """Record the current snapshot with a metrics collector.
+
+        Args:
+            collector: MetricsCollector. Defaults to the shared collector.
+            resource_type: Optional resource type the metrics relate to.
+        """
+        if collector is None:
+            from epic_fhir_integration.metrics.collector import get_collector_instance
+            collector = get_collector_instance()
+
+        snapshot = self.snapshot()
+        circuits = snapshot.pop("circuits")
+        metrics: List[Dict[str, Any]] = [
+            {"step": "extract", "name": f"fhir_{name}", "value": value,
+             "resource_type": resource_type}
+            for name, value in snapshot.items()
+        ]
+        metrics.append({
+            "step": "extract",
+            "name": "fhir_open_circuits",
+            "value": sum(1 for state in circuits.values() if state != CIRCUIT_CLOSED),
+            "resource_type": resource_type,
+            "details": circuits,
+        })
+        collector.record_batch(metrics)
+
+
+# Managers shared by every client talking to the same API
+_shared_managers: Dict[str, ResilienceManager] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_resilience(name: str = "default", **kwargs: Any) -> ResilienceManager:
+    """Get a process-wide resilience manager, creating it on first use.
+
+    Args:
+        name: Manager name, typically one per API endpoint.
+        **kwargs: ``ResilienceManager`` arguments used when it is created.
+
+    Returns:
+        Shared ResilienceManager instance.
+    """
+    with _shared_lock:
+        if name not in _shared_managers:
+            _shared_managers[name] = ResilienceManager(**kwargs)
+        return _shared_managers[name]
@@ -0,0 +1,219 @@
+"""
+On-disk cache of FHIR read responses for conditional requests.
+
+Reads of slowly changing resources (Patient, Practitioner, Organization) are
+cached together with their ``ETag`` and ``Last-Modified`` validators. The next
+read sends ``If-None-Match``/``If-Modified-Since`` and a ``304 Not Modified``
+is answered from the cache, which saves the transfer and the re-download of
+unchanged payloads. Entries are keyed by URL and auth scope, evicted least
+recently used once the cache exceeds its size bound, and can be encrypted at
+rest with Fernet because the payloads contain PHI.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """A cached response body with its validators."""
+
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Build the headers of a conditional request revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None, scope: str = "") -> str:
+    """Build the cache key of a request.
+
+    Args:
+        url: Request URL.
+        params: Optional query parameters.
+        scope: Auth scope, e.g. the client ID, so that responses are never
+               shared between credentials.
+
+    Returns:
+        Hex digest identifying the request.
+    """
+    material = json.dumps([scope, url, sorted((params or {}).items())], default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of response bodies on disk.
+
+    Bodies are stored as one file per entry; an SQLite index holds the
+    validators, sizes and access times. The cache can be shared between
+    threads.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: int = 256 * 1024 * 1024,
+        encryption_key: Optional[Union[str, bytes]] = None,
+    ):
+        """Open (or create) a response cache.
+
+        Args:
+            directory: Cache directory, created if missing.
+            max_bytes: Maximum total size of the stored bodies.
+            encryption_key: Optional Fernet key. If given, bodies are
+                            encrypted at rest.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._fernet = Fernet(encryption_key) if encryption_key else None
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / "index.db"), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get a cached response.
+
+        Args:
+            key: Key from ``cache_key``.
+
+        Returns:
+            The cached response, or None if there is none or it cannot be read.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                data = self._path(key).read_bytes()
+                body = self._fernet.decrypt(data) if self._fernet else data
+            except (OSError, InvalidToken) as e:
+                # Missing file or an entry written with another key
+                logger.warning("Dropping unreadable cache entry", key=key, error=type(e).__name__)
+                self._remove(key)
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return CachedResponse(body=body, etag=row[0], last_modified=row[1])
+
+    def put(
+        self,
+        key: str,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Store a response, evicting least recently used entries if needed.
+
+        Args:
+            key: Key from ``cache_key``.
+            body: Response body.
+            etag: ETag header of the response.
+            last_modified: Last-Modified header of the response.
+        """
+        data = self._fernet.encrypt(body) if self._fernet else body
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with self._lock:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, etag, last_modified, len(data), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as revalidated, e.g. after a 304 response."""
+        with self._lock:
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def _remove(self, key: str) -> None:
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            evicted += 1
+        logger.debug("Evicted cache entries", count=evicted, size=total)
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored bodies in bytes."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            for (key,) in self._conn.execute("SELECT key FROM entries").fetchall():
+                self._remove(key)
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the index database."""
+        with self._lock:
+            self._conn.close()
@@ -7,10 +7,14 @@ These narratives are structured for optimal LLM processing.
 """
 
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+from urllib.parse import parse_qs, urlencode, urlparse
 import logging
 
+import requests
 from pyspark.sql import DataFrame, SparkSession
 import pyspark.sql.functions as F
 
@@ -23,87 +27,270 @@ FHIRClient = Any  # Type alias for static type checking
 logger = get_logger(__name__)
 
 
+# Resource types fetched for a patient chart by default
+DEFAULT_CHART_RESOURCES = [
+    "Observation", 
+    "Condition", 
+    "MedicationRequest", 
+    "DiagnosticReport", 
+    "Procedure", 
+    "Encounter", 
+    "DocumentReference",
+    "AllergyIntolerance",
+    "Immunization"
+]
+
+# Statuses with which a server rejects Patient/$everything as unsupported
+EVERYTHING_UNSUPPORTED_STATUSES = (400, 404, 501)
+
+# Maximum number of _revinclude pages requested through clients without
+# paging support, matching FHIRClient.get_all_resources
+MAX_REVINCLUDE_PAGES = 50
+
+
+class PatientChart(dict):
+    """
+    In-memory index of one patient's resources.
+    
+    Maps resource types to lists of resources, like the dictionaries accepted
+    by ``generate_patient_narrative``, and additionally indexes resources by
+    ``Type/id``. Resources can be added concurrently while pages stream in;
+    a resource returned by several queries is kept once.
+    """
+    
+    def __init__(self, patient_id: str):
+        super().__init__()
+        self.patient_id = patient_id
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def add(self, resource: Dict[str, Any]) -> bool:
+        """
+        Add a resource to the chart.
+        
+        Args:
+            resource: FHIR resource
+            
+        Returns:
+            True if the resource was new
+        """
+        resource_type = resource.get("resourceType")
+        if not resource_type or resource_type == "OperationOutcome":
+            return False
+        key = f"{resource_type}/{resource.get('id')}"
+        with self._lock:
+            if resource.get("id") and key in self._by_key:
+                return False
+            self._by_key[key] = resource
+            self.setdefault(resource_type, []).append(resource)
+        return True
+    
+    def add_bundle(self, bundle: Dict[str, Any]) -> int:
+        """
+        Add every resource of a Bundle page.
+        
+        Returns:
+            Number of new resources
+        """
+        return sum(
+            self.add(entry["resource"])
+            for entry in bundle.get("entry", [])
+            if entry.get("resource")
+        )
+    
+    def get_reference(self, reference: str) -> Optional[Dict[str, Any]]:
+        """Get a resource by a ``Type/id`` reference, or None if absent."""
+        return self._by_key.get(reference)
+    
+    @property
+    def patient(self) -> Optional[Dict[str, Any]]:
+        """The Patient resource, if fetched."""
+        return self.get_reference(f"Patient/{self.patient_id}")
+    
+    @property
+    def resource_count(self) -> int:
+        """Number of resources in the chart."""
+        return len(self._by_key)
+
+
+def _is_fhir_client(client: Any) -> bool:
+    """Whether the client is a FHIRClient, with paging and batch support."""
+    try:
+        from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient as _FHIRClient
+    except ImportError:
+        return False
+    return isinstance(client, _FHIRClient)
+
+
+def _next_link(bundle: Dict[str, Any]) -> Optional[str]:
+    """Get the ``next`` link of a Bundle page, or None on the last page."""
+    for link in bundle.get("link", []):
+        if link.get("relation") == "next":
+            return link.get("url")
+    return None
+
+
+def _everything_unsupported(error: Exception) -> bool:
+    """Whether a failed $everything request means the server does not support it."""
+    response = getattr(error, "response", None)
+    return (
+        isinstance(error, requests.HTTPError)
+        and response is not None
+        and response.status_code in EVERYTHING_UNSUPPORTED_STATUSES
+    )
+
+
+def _fetch_everything(
+    client: Any,
+    chart: PatientChart,
+    include_resources: List[str],
+    prefetch_pages: int,
+) -> None:
+    """Stream ``Patient/$everything`` pages into the chart."""
+    params = {"_type": ",".join(["Patient"] + include_resources)}
+    start_url = f"{client.base_url}/Patient/{chart.patient_id}/$everything?{urlencode(params)}"
+    for page in client.iter_pages("Patient", start_url=start_url, prefetch_pages=prefetch_pages):
+        chart.add_bundle(page)
+
+
+def _fetch_revincludes(
+    client: Any,
+    chart: PatientChart,
+    include_resources: List[str],
+    max_workers: int,
+    prefetch_pages: int,
+) -> None:
+    """Stream paged ``_revinclude`` searches, one per resource type, in parallel.
+
+    A failed search is raised rather than leaving its resource type out of
+    the chart.
+    """
+    def fetch_type(resource_type: str) -> None:
+        params = {
+            "_id": chart.patient_id,
+            "_revinclude": [f"{resource_type}:subject", f"{resource_type}:patient"],
+        }
+        try:
+            for page in client.iter_pages("Patient", params, prefetch_pages=prefetch_pages):
+                chart.add_bundle(page)
+        except Exception as e:
+            logger.warning("Failed to fetch patient resources",
+                           patient_id=chart.patient_id,
+                           resource_type=resource_type,
+                           error=str(e))
+            raise
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(fetch_type, include_resources))
+
+
 def fetch_patient_complete(
     client: Any,  # Use Any instead of FHIRClient to avoid hard dependency
     patient_id: str,
-    include_resources: Optional[List[str]] = None
-) -> Dict[str, Any]:
+    include_resources: Optional[List[str]] = None,
+    use_everything: bool = True,
+    max_workers: int = 4,
+    prefetch_pages: int = 1,
+) -> PatientChart:
     """
     Fetch a comprehensive view of a patient including related resources.
     
-    This function fetches a Patient resource and all related resources
-    specified in include_resources, using _include and _revinclude parameters
-    to optimize the number of API calls.
+    With a FHIRClient, ``Patient/$everything`` is tried first. If the server
+    does not support it, one paged ``_revinclude`` search per resource type
+    runs in parallel. Pages are streamed into the chart as they arrive.
+    Other clients, which only need ``get_resource``, get a single
+    ``_revinclude`` query whose ``next`` links are followed by repeating it
+    with each link's query parameters.
     
     Args:
         client: The FHIR client to use
         patient_id: The patient ID to fetch
         include_resources: List of resource types to include. If None, defaults
                           to a comprehensive set of clinically relevant resources
+        use_everything: Whether to try ``Patient/$everything`` first
+        max_workers: Maximum number of resource types fetched at once
+        prefetch_pages: Number of pages fetched ahead of processing per query
         
     Returns:
-        Dictionary with patient data and all related resources
+        PatientChart with patient data and all related resources, by type
+        
+    Raises:
+        requests.HTTPError: If a query fails. Only a 400, 404 or 501 answer
+                            to ``$everything`` falls back to the searches;
+                            a partial chart is never returned.
     """
     if include_resources is None:
-        include_resources = [
-            "Observation", 
-            "Condition", 
-            "MedicationRequest", 
-            "DiagnosticReport", 
-            "Procedure", 
-            "Encounter", 
-            "DocumentReference",
-            "AllergyIntolerance",
-            "Immunization"
-        ]
-    
-    # Get the patient resource first
-    patient = client.get_resource("Patient", patient_id)
-    
-    # Build _revinclude parameters for each resource type
-    # These tell the server to include resources that reference this patient
-    revinclude_params = [f"{resource}:subject" for resource in include_resources]
-    revinclude_params.extend([f"{resource}:patient" for resource in include_resources])
-    
-    # Now fetch the patient again with _revinclude to get related resources
-    # This is more efficient than separate queries for each resource type
-    params = {
-        "_id": patient_id,
-        "_revinclude": revinclude_params
-    }
-    
-    # Get the bundle with all related resources
-    bundle = client.get_resource("Patient", params=params)
-    
-    # Extract resources by type
-    resources_by_type = {
-        "Patient": [patient]
-    }
-    
-    if "entry" in bundle:
-        for entry in bundle.get("entry", []):
-            resource = entry.get("resource", {})
-            resource_type = resource.get("resourceType")
-            
-            # Skip the patient resource (we already have it)
-            if resource_type == "Patient" and resource.get("id") == patient_id:
-                continue
-                
-            # Add to resources by type
-            if resource_type not in resources_by_type:
-                resources_by_type[resource_type] = []
-            resources_by_type[resource_type].append(resource)
+        include_resources = DEFAULT_CHART_RESOURCES
+    
+    chart = PatientChart(patient_id)
+    
+    if _is_fhir_client(client):
+        fetched = False
+        if use_everything:
+            try:
+                _fetch_everything(client, chart, include_resources, prefetch_pages)
+                fetched = True
+            except requests.HTTPError as e:
+                if not _everything_unsupported(e):
+                    raise
+                logger.info("Patient $everything not available, using _revinclude searches",
+                            patient_id=patient_id, error=str(e))
+        if not fetched:
+            _fetch_revincludes(client, chart, include_resources, max_workers, prefetch_pages)
+        if chart.patient is None:
+            chart.add(client.get_resource("Patient", patient_id))
+    else:
+        # Get the patient resource first
+        chart.add(client.get_resource("Patient", patient_id))
+        
+        # Build _revinclude parameters for each resource type
+        # These tell the server to include resources that reference this patient
+        revinclude_params = [f"{resource}:subject" for resource in include_resources]
+        revinclude_params.extend([f"{resource}:patient" for resource in include_resources])
+        
+        bundle = client.get_resource("Patient", params={
+            "_id": patient_id,
+            "_revinclude": revinclude_params
+        })
+        chart.add_bundle(bundle)
+        
+        # get_resource only takes search parameters, so each next link is
+        # requested as the same search with the link's query. A server that
+        # repeats a link must not keep us requesting it forever.
+        next_url = _next_link(bundle)
+        seen_urls = set()
+        while next_url:
+            if next_url in seen_urls:
+                logger.warning("Repeated next link, stopping", patient_id=patient_id, url=next_url)
+                break
+            if len(seen_urls) + 1 >= MAX_REVINCLUDE_PAGES:
+                logger.warning("Page limit reached", patient_id=patient_id,
+                               page_count=len(seen_urls) + 1)
+                break
+            seen_urls.add(next_url)
+            params = parse_qs(urlparse(next_url).query, keep_blank_values=True)
+            bundle = client.get_resource("Patient", params={
+                name: values[0] if len(values) == 1 else values
+                for name, values in params.items()
+            })
+            chart.add_bundle(bundle)
+            next_url = _next_link(bundle)
+    
+    logger.info("Fetched patient chart",
+                patient_id=patient_id,
+                resources=chart.resource_count,
+                types=len(chart))
     
     # For certain resource types, we may need to do additional queries
     # DiagnosticReport may have results that weren't included
-    if "DiagnosticReport" in resources_by_type:
-        _fetch_diagnostic_report_results(client, resources_by_type)
+    if "DiagnosticReport" in chart:
+        _fetch_diagnostic_report_results(client, chart)
     
     # DocumentReference may have content that wasn't included
-    if "DocumentReference" in resources_by_type:
-        _fetch_document_content(client, resources_by_type)
+    if "DocumentReference" in chart:
+        _fetch_document_content(client, chart)
     
-    return resources_by_type
+    return chart
 
 
 def _fetch_diagnostic_report_results(client: Any, resources_by_type: Dict[str, List[Dict[str, Any]]]):
@@ -123,12 +310,19 @@ def _fetch_diagnostic_report_results(client: Any, resources_by_type: Dict[str, L
     # Fetch missing observations
     if missing_obs_ids:
         logger.info(f"Fetching {len(missing_obs_ids)} additional Observations referenced by DiagnosticReports")
-        observations = client.batch_get_resources("Observation", list(missing_obs_ids))
+        if _is_fhir_client(client):
+            observations = client.batch_get_resources(
+                "Observation", sorted(missing_obs_ids), use_batch=True
+            )
+        else:
+            observations = client.batch_get_resources("Observation", list(missing_obs_ids))
         
         # Add to resources_by_type
-        if "Observation" not in resources_by_type:
-            resources_by_type["Observation"] = []
-        resources_by_type["Observation"].extend(observations.values())
+        if isinstance(resources_by_type, PatientChart):
+            for observation in observations.values():
+                resources_by_type.add(observation)
+        else:
+            resources_by_type.setdefault("Observation", []).extend(observations.values())
 
 
 def _fetch_document_content(client: Any, resources_by_type: Dict[str, List[Dict[str, Any]]]):
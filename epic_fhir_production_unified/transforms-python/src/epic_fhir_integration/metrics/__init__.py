@@ -0,0 +1,22 @@
+"""
+Metrics collection for Epic FHIR integration.
+
+This package provides utilities for collecting pipeline metrics such as
+extraction throughput.
+"""
+
+from epic_fhir_integration.metrics.collector import (
+    MetricsCollector,
+    flush_metrics,
+    get_collector_instance,
+    record_metric,
+    record_metrics_batch,
+)
+
+__all__ = [
+    "MetricsCollector",
+    "flush_metrics",
+    "get_collector_instance",
+    "record_metric",
+    "record_metrics_batch",
+]
@@ -0,0 +1,254 @@
+"""
+Metrics collector for Epic FHIR integration.
+
+This module provides a facade for collecting metrics throughout the FHIR pipeline.
+It stores metrics in memory and can flush them to disk in Parquet format
+for analysis and reporting.
+"""
+
+import atexit
+import datetime
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+from epic_fhir_integration.utils.logging import get_logger
+
+try:
+    from pyspark.sql import SparkSession
+    HAS_SPARK = True
+except ImportError:
+    HAS_SPARK = False
+
+logger = get_logger(__name__)
+
+# Singleton instance for the metrics collector
+_COLLECTOR_INSTANCE = None
+_INSTANCE_LOCK = Lock()
+
+
+class MetricsCollector:
+    """Metrics collector for the Epic FHIR pipeline.
+
+    Records metrics in memory and flushes them to a Parquet file. Use
+    ``get_collector_instance`` to share one collector across the pipeline.
+    """
+
+    def __init__(self):
+        """Initialize the metrics collector."""
+        self.metrics: List[Dict[str, Any]] = []
+        self.lock = Lock()
+
+    def _format(
+        self,
+        step: str,
+        name: str,
+        value: Any,
+        metric_type: str,
+        resource_type: Optional[str],
+        details: Optional[Dict[str, Any]],
+        timestamp: datetime.datetime,
+    ) -> Dict[str, Any]:
+        return {
+            "step": step,
+            "name": name,
+            "value": value,
+            "metric_type": metric_type,
+            "timestamp": timestamp.isoformat(),
+            "resource_type": resource_type or "",
+            "details": json.dumps(details or {}),
+        }
+
+    def record(
+        self,
+        step: str,
+        name: str,
+        value: Any,
+        metric_type: str = "RUNTIME",
+        resource_type: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Record a metric.
+
+        Args:
+            step: Pipeline step (e.g., "extract", "transform", "load").
+            name: Metric name.
+            value: Metric value.
+            metric_type: Type of metric (RUNTIME, SCHEMA, QUALITY, etc.).
+            resource_type: Optional FHIR resource type.
+            details: Optional additional details.
+        """
+        metric = self._format(step, name, value, metric_type, resource_type, details,
+                              datetime.datetime.now())
+        with self.lock:
+            self.metrics.append(metric)
+
+    def record_batch(self, metrics: List[Dict[str, Any]]) -> None:
+        """Record multiple metrics with a single lock acquisition.
+
+        Args:
+            metrics: List of metric dictionaries with ``step``, ``name`` and
+                     ``value`` keys, and optional ``metric_type``,
+                     ``resource_type`` and ``details`` keys.
+        """
+        timestamp = datetime.datetime.now()
+
+        formatted_metrics = []
+        for metric in metrics:
+            if "step" not in metric or "name" not in metric or "value" not in metric:
+                logger.warning("Skipping invalid metric", metric=metric)
+                continue
+            formatted_metrics.append(self._format(
+                metric["step"],
+                metric["name"],
+                metric["value"],
+                metric.get("metric_type", "RUNTIME"),
+                metric.get("resource_type"),
+                metric.get("details"),
+                timestamp,
+            ))
+
+        if formatted_metrics:
+            with self.lock:
+                self.metrics.extend(formatted_metrics)
+
+    def _atexit_handler(self) -> None:
+        """Flush metrics when the process exits."""
+        try:
+            output_dir = os.environ.get("FHIR_OUTPUT_DIR", ".")
+            self.flush(Path(output_dir) / "metrics")
+        except Exception as e:
+            logger.error("Error flushing metrics on exit", error=str(e))
+
+    def flush(self, output_dir: Union[str, Path]) -> Optional[str]:
+        """Flush metrics to disk.
+
+        Args:
+            output_dir: Output directory.
+
+        Returns:
+            Path to the metrics file if successful, None otherwise.
+        """
+        with self.lock:
+            metrics, self.metrics = self.metrics, []
+
+        if not metrics:
+            logger.info("No metrics to flush")
+            return None
+
+        try:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            metrics_df = pd.DataFrame(metrics)
+            metrics_df["metric_version"] = "1.0"
+            # Values are heterogeneous (counts, rates, strings)
+            metrics_df["value"] = metrics_df["value"].astype(str)
+
+            output_path = output_dir / "performance_metrics.parquet"
+            self._write_metrics(metrics_df, output_path)
+
+            logger.info("Flushed metrics", count=len(metrics_df), path=str(output_path))
+            return str(output_path)
+        except Exception as e:
+            # Keep the metrics so a later flush can retry
+            with self.lock:
+                self.metrics = metrics + self.metrics
+            logger.error("Error flushing metrics", error=str(e))
+            return None
+
+    def _write_metrics(self, df: pd.DataFrame, output_path: Path) -> None:
+        """Write metrics with Spark if a session is active, otherwise with pandas.
+
+        Args:
+            df: Metrics dataframe.
+            output_path: Output path.
+        """
+        spark = SparkSession.getActiveSession() if HAS_SPARK else None
+        if spark is not None:
+            try:
+                spark.createDataFrame(df).write.mode("append").parquet(str(output_path))
+                return
+            except Exception as e:
+                logger.warning("Failed to write metrics using Spark, falling back to pandas",
+                               error=str(e))
+
+        if output_path.exists():
+            try:
+                df = pd.concat([pd.read_parquet(output_path), df], ignore_index=True)
+            except Exception as e:
+                logger.warning("Failed to read existing metrics, will overwrite", error=str(e))
+
+        df.to_parquet(output_path, index=False)
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Get all collected metrics."""
+        with self.lock:
+            return self.metrics.copy()
+
+    def clear(self) -> None:
+        """Clear all metrics."""
+        with self.lock:
+            self.metrics = []
+
+
+def get_collector_instance() -> MetricsCollector:
+    """Get the singleton metrics collector instance.
+
+    The shared collector flushes its remaining metrics when the process exits.
+
+    Returns:
+        MetricsCollector instance.
+    """
+    global _COLLECTOR_INSTANCE
+    with _INSTANCE_LOCK:
+        if _COLLECTOR_INSTANCE is None:
+            _COLLECTOR_INSTANCE = MetricsCollector()
+            atexit.register(_COLLECTOR_INSTANCE._atexit_handler)
+        return _COLLECTOR_INSTANCE
+
+
+def record_metric(
+    step: str,
+    name: str,
+    value: Any,
+    metric_type: str = "RUNTIME",
+    resource_type: Optional[str] = None,
+    details: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Record a metric using the singleton collector.
+
+    Args:
+        step: Pipeline step (e.g., "extract", "transform", "load").
+        name: Metric name.
+        value: Metric value.
+        metric_type: Type of metric (RUNTIME, SCHEMA, QUALITY, etc.).
+        resource_type: Optional FHIR resource type.
+        details: Optional additional details.
+    """
+    get_collector_instance().record(step, name, value, metric_type, resource_type, details)
+
+
+def record_metrics_batch(metrics: List[Dict[str, Any]]) -> None:
+    """Record multiple metrics using the singleton collector.
+
+    Args:
+        metrics: List of metric dictionaries, see ``MetricsCollector.record_batch``.
+    """
+    get_collector_instance().record_batch(metrics)
+
+
+def flush_metrics(output_dir: Union[str, Path]) -> Optional[str]:
+    """Flush metrics to disk using the singleton collector.
+
+    Args:
+        output_dir: Output directory.
+
+    Returns:
+        Path to the metrics file if successful, None otherwise.
+    """
+    return get_collector_instance().flush(output_dir)
@@ -0,0 +1,28 @@
+"""
+Offline testing tools for Epic FHIR integration.
+
+This package provides a local FHIR server that replays recorded resources
+with injected latency and errors, a harness that measures the clients and
+extractors against it, and a seeded generator of synthetic bronze data, so
+performance can be tested without Epic credentials.
+"""
+
+from epic_fhir_integration.testing.replay_server import (
+    FaultProfile,
+    Recording,
+    ReplayFHIRServer,
+    record_resources,
+)
+from epic_fhir_integration.testing.synthetic import (
+    SyntheticConfig,
+    SyntheticFHIRGenerator,
+)
+
+__all__ = [
+    "FaultProfile",
+    "Recording",
+    "ReplayFHIRServer",
+    "SyntheticConfig",
+    "SyntheticFHIRGenerator",
+    "record_resources",
+]
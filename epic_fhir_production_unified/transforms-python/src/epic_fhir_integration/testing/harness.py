@@ -0,0 +1,237 @@
+"""
+Offline performance harness.
+
+Runs FHIRClient searches, batch reads and the NDJSON extractor against a
+ReplayFHIRServer and reports throughput together with the client's retry,
+circuit breaker and concurrency counters. The report can gate CI on a
+minimum throughput and on the median throughput of a checked-in baseline
+report, so regressions show up without Epic credentials.
+
+Usage:
+    python -m epic_fhir_integration.testing.harness --recording <dir> \\
+        [--latency-ms 20] [--rate-429 0.05] [--rate-5xx 0.02] \\
+        [--repeat 3] [--report report.json] [--min-throughput 100] \\
+        [--baseline baseline.json] [--max-regression 0.5]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_all_resources_to_ndjson,
+)
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.testing.replay_server import (
+    FaultProfile,
+    Recording,
+    ReplayFHIRServer,
+    add_fault_arguments,
+    fault_profile_from_args,
+)
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class BenchmarkResult:
+    """Outcome of one benchmark."""
+
+    name: str
+    resources: int
+    seconds: float
+    requests: int
+    resilience: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def resources_per_second(self) -> float:
+        """Resources fetched per wall-clock second."""
+        return self.resources / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-serializable dictionary."""
+        result = asdict(self)
+        result["resources_per_second"] = round(self.resources_per_second, 2)
+        return result
+
+
+def _search_all(client: FHIRClient, recording: Recording, page_size: int) -> int:
+    return sum(
+        1
+        for resource_type in recording.resources
+        for _ in client.search_resources(resource_type, {"_count": page_size}, prefetch_pages=1)
+    )
+
+
+def _batch_read(client: FHIRClient, recording: Recording, page_size: int) -> int:
+    return sum(
+        len(client.batch_get_resources(
+            resource_type, [r["id"] for r in resources], use_batch=True))
+        for resource_type, resources in recording.resources.items()
+    )
+
+
+def _extract_ndjson(client: FHIRClient, recording: Recording, page_size: int) -> int:
+    with tempfile.TemporaryDirectory() as output_dir:
+        files = extract_all_resources_to_ndjson(
+            output_dir,
+            client=client,
+            resource_types=sorted(recording.resources),
+            params={"_count": page_size},
+        )
+    return sum(f.records for type_files in files.values() for f in type_files)
+
+
+BENCHMARKS: Dict[str, Callable[[FHIRClient, Recording, int], int]] = {
+    "search": _search_all,
+    "batch_read": _batch_read,
+    "extract_ndjson": _extract_ndjson,
+}
+
+
+def run_benchmarks(
+    recording: Recording,
+    faults: Optional[FaultProfile] = None,
+    page_size: int = 50,
+    benchmarks: Optional[List[str]] = None,
+    repeat: int = 1,
+    max_retries: int = 5,
+) -> List[BenchmarkResult]:
+    """Run benchmarks against a replay server started for the run.
+
+    Each repetition uses a new client, so the resilience counters and
+    adaptive concurrency of one run do not carry over to the next.
+
+    Args:
+        recording: Resources to serve.
+        faults: Latency and error injection of the server.
+        page_size: Search page size.
+        benchmarks: Names from BENCHMARKS. Defaults to all.
+        repeat: Number of runs per benchmark.
+        max_retries: Retry budget of the clients.
+
+    Returns:
+        One result per benchmark run.
+    """
+    results = []
+    with ReplayFHIRServer(recording, page_size=page_size, faults=faults) as server:
+        for name in benchmarks or list(BENCHMARKS):
+            for _ in range(repeat):
+                client = FHIRClient(server.base_url, max_retries=max_retries,
+                                    retry_backoff_factor=0.05)
+                requests_before = server.stats["requests"]
+                start = time.perf_counter()
+                resources = BENCHMARKS[name](client, recording, page_size)
+                result = BenchmarkResult(
+                    name=name,
+                    resources=resources,
+                    seconds=time.perf_counter() - start,
+                    requests=server.stats["requests"] - requests_before,
+                    resilience=client.resilience_metrics(),
+                )
+                logger.info("Benchmark finished", benchmark=name, resources=resources,
+                            seconds=round(result.seconds, 3),
+                            resources_per_second=round(result.resources_per_second, 2))
+                results.append(result)
+    return results
+
+
+def median_throughput(results: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    """Get the median throughput of each benchmark in a report.
+
+    Args:
+        results: The ``results`` entries of a harness report.
+
+    Returns:
+        Dictionary mapping benchmark names to median resources per second.
+    """
+    runs: Dict[str, List[float]] = {}
+    for result in results:
+        runs.setdefault(result["name"], []).append(result["resources_per_second"])
+    return {name: statistics.median(values) for name, values in runs.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the harness and write a JSON report.
+
+    Returns:
+        Exit code: 1 if a benchmark fetched fewer resources than recorded,
+        fell below ``--min-throughput`` or, with ``--baseline``, its median
+        throughput dropped by more than ``--max-regression``; else 0.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the FHIR clients against a replay server")
+    parser.add_argument("--recording", required=True, help="Directory of recorded resources")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS),
+                        help="Comma-separated benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per benchmark")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retry budget of the clients")
+    parser.add_argument("--report", help="Path of the JSON report")
+    parser.add_argument("--min-throughput", type=float, default=0.0,
+                        help="Fail if a benchmark fetches fewer resources per second")
+    parser.add_argument("--baseline",
+                        help="JSON report of a reference run to compare median throughput with")
+    parser.add_argument("--max-regression", type=float, default=0.5,
+                        help="Fraction by which median throughput may fall below the baseline")
+    add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+
+    recording = Recording.from_directory(args.recording)
+    faults = fault_profile_from_args(args)
+    results = run_benchmarks(
+        recording,
+        faults=faults,
+        page_size=args.page_size,
+        benchmarks=[b.strip() for b in args.benchmarks.split(",") if b.strip()],
+        repeat=args.repeat,
+        max_retries=args.max_retries,
+    )
+
+    report = {
+        "recording": str(args.recording),
+        "recorded_resources": recording.resource_count,
+        "faults": asdict(faults),
+        "page_size": args.page_size,
+        "results": [result.to_dict() for result in results],
+    }
+    regressed = []
+    if args.baseline:
+        baseline = median_throughput(json.loads(Path(args.baseline).read_text())["results"])
+        current = median_throughput(report["results"])
+        report["baseline"] = {
+            "path": str(args.baseline),
+            "max_regression": args.max_regression,
+            "median_resources_per_second": baseline,
+        }
+        regressed = [
+            name for name, value in current.items()
+            if name in baseline and value < baseline[name] * (1 - args.max_regression)
+        ]
+    output = json.dumps(report, indent=2)
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(output)
+    print(output)
+
+    failed = [
+        result.name for result in results
+        if result.resources < recording.resource_count
+        or result.resources_per_second < args.min_throughput
+    ]
+    if failed:
+        logger.error("Benchmarks below threshold", benchmarks=failed,
+                     min_throughput=args.min_throughput)
+    if regressed:
+        logger.error("Benchmarks regressed from baseline", benchmarks=regressed,
+                     baseline=args.baseline, max_regression=args.max_regression)
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,743 @@
+"""
+Local FHIR server replaying recorded resources.
+
+Resources recorded once from Epic (or taken from sample Bundles) are served
+from memory with the interactions the clients use: reads, searches,
+``$everything``, batch Bundles and Bulk Data ``$export``.
+Latency, page size and the rates of 429 and 5xx responses are configurable
+and the injected faults are drawn from a seeded generator, so throughput and
+resilience can be measured offline and compared between runs.
+
+Usage:
+    python -m epic_fhir_integration.testing.replay_server serve --recording <dir> \\
+        [--port 8080] [--latency-ms 50] [--rate-429 0.05] [--rate-5xx 0.01]
+    python -m epic_fhir_integration.testing.replay_server record --output <dir> \\
+        --types Patient,Observation
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from epic_fhir_integration.utils.fhir_datetime import (
+    format_fhir_instant,
+    parse_fhir_instant,
+)
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Search parameters that control paging rather than filter resources
+_PAGING_PARAMS = {"_count", "_page", "_elements"}
+
+
+@dataclass
+class FaultProfile:
+    """Latency and errors injected into every response."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after: float = 0.0
+    seed: int = 0
+
+
+class Recording:
+    """Recorded resources, indexed by type and ID."""
+
+    def __init__(self, resources: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        """Initialize a recording.
+
+        Args:
+            resources: Optional dictionary mapping resource types to resources.
+        """
+        self.resources: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        for resources_of_type in (resources or {}).values():
+            for resource in resources_of_type:
+                self.add(resource)
+
+    def add(self, resource: Dict[str, Any]) -> None:
+        """Add a resource, replacing a recorded resource with the same ID."""
+        key = f"{resource['resourceType']}/{resource.get('id')}"
+        resources = self.resources.setdefault(resource["resourceType"], [])
+        if key in self._by_id:
+            resources[resources.index(self._by_id[key])] = resource
+        else:
+            resources.append(resource)
+        self._by_id[key] = resource
+
+    def get(self, resource_type: str, resource_id: str) -> Optional[Dict[str, Any]]:
+        """Get a resource by type and ID."""
+        return self._by_id.get(f"{resource_type}/{resource_id}")
+
+    @property
+    def resource_count(self) -> int:
+        """Number of recorded resources."""
+        return len(self._by_id)
+
+    @staticmethod
+    def _iter_file(path: Path) -> Iterator[Dict[str, Any]]:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            if ".ndjson" in path.suffixes:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+                return
+            data = json.load(f)
+        # Bundles as returned by searches, or wrapped by the local pipeline
+        bundle = data.get("bundle", data)
+        if bundle.get("resourceType") == "Bundle":
+            for entry in bundle.get("entry", []):
+                if entry.get("resource"):
+                    yield entry["resource"]
+        elif "resourceType" in data:
+            yield data
+
+    @classmethod
+    def from_directory(cls, directory: Union[str, Path]) -> "Recording":
+        """Load every Bundle, resource and NDJSON file below a directory.
+
+        Args:
+            directory: Directory of ``*.json`` Bundles or resources and
+                       ``*.ndjson``/``*.ndjson.gz`` files.
+
+        Returns:
+            Recording of the resources found.
+        """
+        recording = cls()
+        for path in sorted(Path(directory).rglob("*")):
+            if path.is_file() and (path.suffix == ".json" or ".ndjson" in path.suffixes):
+                for resource in cls._iter_file(path):
+                    if resource.get("resourceType") and resource.get("id"):
+                        recording.add(resource)
+        logger.info("Loaded recording", directory=str(directory),
+                    resources=recording.resource_count,
+                    types=sorted(recording.resources))
+        return recording
+
+    def save(self, directory: Union[str, Path]) -> None:
+        """Write the recording as one ``<type>.ndjson`` file per resource type."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for resource_type, resources in self.resources.items():
+            with open(directory / f"{resource_type}.ndjson", "w", encoding="utf-8") as f:
+                for resource in resources:
+                    f.write(json.dumps(resource) + "\n")
+
+
+def _reference_ids(resource: Dict[str, Any], *elements: str) -> List[str]:
+    ids = []
+    for element in elements:
+        reference = (resource.get(element) or {}).get("reference", "")
+        if reference:
+            ids.append(reference.rsplit("/", 1)[-1])
+    return ids
+
+
+def _matches_date(value: Optional[str], conditions: List[str]) -> bool:
+    if not conditions:
+        return True
+    if not value:
+        return False
+    instant = parse_fhir_instant(value)
+    for condition in conditions:
+        prefix, bound = (condition[:2], condition[2:]) if condition[:2].isalpha() else ("eq", condition)
+        bound_instant = parse_fhir_instant(bound)
+        if not {
+            "eq": instant == bound_instant,
+            "gt": instant > bound_instant,
+            "ge": instant >= bound_instant,
+            "lt": instant < bound_instant,
+            "le": instant <= bound_instant,
+        }.get(prefix, False):
+            return False
+    return True
+
+
+def _etag(resource: Dict[str, Any]) -> str:
+    digest = hashlib.sha1(
+        json.dumps(resource, sort_keys=True).encode("utf-8"), usedforsecurity=False
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _project(resource: Dict[str, Any], elements: Optional[str]) -> Dict[str, Any]:
+    if not elements:
+        return resource
+    keep = set(elements.split(",")) | {"resourceType", "id", "meta"}
+    return {
+        key: value for key, value in resource.items()
+        if key in keep or any(key.startswith(e) and key[len(e):len(e) + 1].isupper() for e in keep)
+    }
+
+
+class ReplayFHIRServer:
+    """In-process HTTP server replaying a recording.
+
+    Supports reads (``GET /Type/id``, with weak ETags and ``If-None-Match``),
+    paged searches (``GET /Type`` with ``_id``, ``patient``/``subject``,
+    ``_lastUpdated``, ``_count`` and ``_elements``, plus ``_revinclude`` on
+    Patient), ``Patient/id/$everything``, ``batch`` Bundles posted to the base
+    URL, the Bulk Data ``$export`` kick-off, status and file endpoints and
+    ``GET /metadata``. Every response is delayed and may be replaced by an
+    injected 429 or 503 according to the fault profile; ``fail_next`` queues
+    specific failures ahead of that. Requests are logged in ``requests``.
+    """
+
+    def __init__(
+        self,
+        recording: Recording,
+        page_size: int = 50,
+        faults: Optional[FaultProfile] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        supports_everything: bool = True,
+        max_batch_entries: Optional[int] = None,
+        compress_responses: bool = True,
+        export_polls: int = 1,
+        export_file_size: int = 1000,
+        transaction_time: Optional[str] = None,
+    ):
+        """Initialize a replay server.
+
+        Args:
+            recording: Resources to serve.
+            page_size: Default number of resources per search page.
+            faults: Latency and error injection. Defaults to none.
+            host: Interface to listen on.
+            port: Port to listen on; 0 picks a free port.
+            supports_everything: Whether ``Patient/id/$everything`` is served;
+                                 otherwise it is answered with 404.
+            max_batch_entries: Optional number of batch entries above which a
+                               batch is rejected with 413.
+            compress_responses: Whether responses are gzipped for clients
+                                that accept it.
+            export_polls: Number of status polls answered with 202 before an
+                          export completes.
+            export_file_size: Resources per export output file.
+            transaction_time: Optional fixed transactionTime of exports.
+                              Defaults to the kick-off time.
+        """
+        self.recording = recording
+        self.page_size = page_size
+        self.faults = faults or FaultProfile()
+        self.supports_everything = supports_everything
+        self.max_batch_entries = max_batch_entries
+        self.compress_responses = compress_responses
+        self.export_polls = export_polls
+        self.export_file_size = export_file_size
+        self.transaction_time = transaction_time
+        self.stats = {"requests": 0, "responses_429": 0, "responses_5xx": 0, "resources_served": 0}
+        self.requests: List[Tuple[str, str, Dict[str, str]]] = []
+        self.request_bodies: List[bytes] = []
+        self.client_addresses: Set[Tuple[str, int]] = set()
+        self.exports: Dict[str, Dict[str, Any]] = {}
+        self._failures: List[Tuple[int, Dict[str, str]]] = []
+        self._random = random.Random(self.faults.seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL of the running server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayFHIRServer":
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,),
+                                        name="fhir-replay-server", daemon=True)
+        self._thread.start()
+        logger.info("Started replay FHIR server", base_url=self.base_url,
+                    resources=self.recording.resource_count)
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve requests in the calling thread until interrupted."""
+        logger.info("Serving replay FHIR server", base_url=self.base_url,
+                    resources=self.recording.resource_count)
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ReplayFHIRServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def fail_next(
+        self,
+        status: int,
+        count: int = 1,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Answer the next ``count`` requests with an error status.
+
+        Args:
+            status: HTTP status of the failures.
+            count: Number of requests to fail.
+            headers: Optional response headers, e.g. Retry-After.
+        """
+        with self._lock:
+            self._failures.extend([(status, headers or {})] * count)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def _record(
+        self,
+        method: str,
+        path: str,
+        headers: Dict[str, str],
+        client_address: Tuple[str, int],
+    ) -> Optional[Tuple[int, Dict[str, str]]]:
+        """Log a request and pop the queued failure for it, if any."""
+        with self._lock:
+            self.stats["requests"] += 1
+            self.requests.append((method, path, headers))
+            self.client_addresses.add(client_address)
+            return self._failures.pop(0) if self._failures else None
+
+    def _draw_fault(self) -> Optional[int]:
+        """Delay the response and pick an injected error status, if any."""
+        with self._lock:
+            jitter = self._random.uniform(-1, 1) * self.faults.jitter_ms
+            draw = self._random.random()
+        delay = max(0.0, self.faults.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+        if draw < self.faults.rate_429:
+            self._count("responses_429")
+            return 429
+        if draw < self.faults.rate_429 + self.faults.rate_5xx:
+            self._count("responses_5xx")
+            return 503
+        return None
+
+    def _referencing(self, resource_type: str, patient_ids: Set[str]) -> List[Dict[str, Any]]:
+        return [
+            resource for resource in self.recording.resources.get(resource_type, [])
+            if patient_ids & set(_reference_ids(resource, "subject", "patient"))
+        ]
+
+    def _page(
+        self,
+        path: str,
+        matches: List[Dict[str, Any]],
+        query: Dict[str, List[str]],
+    ) -> Dict[str, Any]:
+        """Build the requested page of a searchset, linking the next one."""
+        count = int(query.get("_count", [self.page_size])[0])
+        offset = int(query.get("_page", ["0"])[0])
+        page = matches[offset:offset + count]
+        elements = query.get("_elements", [None])[0]
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "total": len(matches),
+            "link": [],
+            "entry": [{"resource": _project(resource, elements)} for resource in page],
+        }
+        if offset + count < len(matches):
+            next_query = {k: v for k, v in query.items() if k != "_page"}
+            next_query["_page"] = [str(offset + count)]
+            bundle["link"].append({
+                "relation": "next",
+                "url": f"{self.base_url}/{path}?{urlencode(next_query, doseq=True)}",
+            })
+        self._count("resources_served", len(page))
+        return bundle
+
+    def search(self, resource_type: str, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Run a search and build the requested page.
+
+        Args:
+            resource_type: FHIR resource type.
+            query: Parsed query parameters.
+
+        Returns:
+            searchset Bundle with a ``next`` link unless it is the last page.
+        """
+        ids = {i for value in query.get("_id", []) for i in value.split(",")}
+        patients = {
+            value.rsplit("/", 1)[-1]
+            for name in ("patient", "subject")
+            for value in query.get(name, [])
+        }
+        matches = [
+            resource for resource in self.recording.resources.get(resource_type, [])
+            if (not ids or resource.get("id") in ids)
+            and (not patients or patients & set(_reference_ids(resource, "subject", "patient")))
+            and _matches_date((resource.get("meta") or {}).get("lastUpdated"),
+                              query.get("_lastUpdated", []))
+        ]
+        if resource_type == "Patient":
+            included = sorted({value.split(":")[0] for value in query.get("_revinclude", [])})
+            patient_ids = {resource.get("id") for resource in matches}
+            matches += [resource for included_type in included
+                        for resource in self._referencing(included_type, patient_ids)]
+        return self._page(resource_type, matches, query)
+
+    def everything(self, patient_id: str, query: Dict[str, List[str]]) -> Optional[Dict[str, Any]]:
+        """Build a page of ``Patient/id/$everything``.
+
+        Args:
+            patient_id: Patient ID.
+            query: Parsed query parameters; ``_type`` restricts the types.
+
+        Returns:
+            searchset Bundle, or None if the patient is not recorded.
+        """
+        patient = self.recording.get("Patient", patient_id)
+        if patient is None:
+            return None
+        types = query.get("_type", [",".join(self.recording.resources)])[0].split(",")
+        matches = [patient] + [resource for resource_type in types if resource_type != "Patient"
+                               for resource in self._referencing(resource_type, {patient_id})]
+        return self._page(f"Patient/{patient_id}/$everything", matches, query)
+
+    def batch(self, bundle: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer the GET entries of a batch Bundle."""
+        entries = []
+        for entry in bundle.get("entry", []):
+            parsed = urlparse(entry.get("request", {}).get("url", ""))
+            parts = [part for part in parsed.path.split("/") if part]
+            resource = None
+            if len(parts) == 1:
+                resource = self.search(parts[0], parse_qs(parsed.query))
+            elif len(parts) == 2:
+                resource = self.recording.get(parts[0], parts[1])
+                if resource is not None:
+                    self._count("resources_served")
+            if resource is None:
+                entries.append({"response": {"status": "404 Not Found"}})
+            else:
+                entries.append({"resource": resource, "response": {"status": "200 OK"}})
+        return {"resourceType": "Bundle", "type": "batch-response", "entry": entries}
+
+    def kick_off_export(self, query: Dict[str, List[str]]) -> str:
+        """Start an export of the ``_type`` resource types.
+
+        Returns:
+            Status endpoint URL.
+        """
+        types = query.get("_type", [",".join(self.recording.resources)])[0].split(",")
+        transaction_time = self.transaction_time or format_fhir_instant(datetime.now(timezone.utc))
+        with self._lock:
+            job_id = str(len(self.exports) + 1)
+            self.exports[job_id] = {"types": types, "polls": 0, "cancelled": False,
+                                    "transaction_time": transaction_time}
+        return f"{self.base_url}/_bulk/status/{job_id}"
+
+    def export_status(self, job_id: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Poll an export.
+
+        Returns:
+            202 and None while the export runs, 200 and the completion
+            manifest once it is done, or 404 and None for unknown or
+            cancelled exports.
+        """
+        with self._lock:
+            job = self.exports.get(job_id)
+            if job is None or job["cancelled"]:
+                return 404, None
+            job["polls"] += 1
+            if job["polls"] <= self.export_polls:
+                return 202, None
+        output = []
+        for resource_type in job["types"]:
+            resources = self.recording.resources.get(resource_type, [])
+            for index in range(0, len(resources), self.export_file_size):
+                output.append({
+                    "type": resource_type,
+                    "url": f"{self.base_url}/_bulk/files/{resource_type}/{index}",
+                    "count": len(resources[index:index + self.export_file_size]),
+                })
+        return 200, {
+            "transactionTime": job["transaction_time"],
+            "request": f"{self.base_url}/$export",
+            "requiresAccessToken": True,
+            "output": output,
+            "error": [],
+        }
+
+    def cancel_export(self, job_id: str) -> bool:
+        """Cancel an export; returns False for unknown exports."""
+        with self._lock:
+            if job_id not in self.exports:
+                return False
+            self.exports[job_id]["cancelled"] = True
+            return True
+
+    def export_file(self, resource_type: str, index: int) -> bytes:
+        """Get an export output file as NDJSON."""
+        resources = self.recording.resources.get(resource_type, [])[index:index + self.export_file_size]
+        self._count("resources_served", len(resources))
+        return "".join(json.dumps(resource) + "\n" for resource in resources).encode("utf-8")
+
+    def capability_statement(self) -> Dict[str, Any]:
+        """Describe the replayed resource types."""
+        return {
+            "resourceType": "CapabilityStatement",
+            "status": "active",
+            "kind": "instance",
+            "fhirVersion": "4.0.1",
+            "format": ["json"],
+            "rest": [{
+                "mode": "server",
+                "resource": [
+                    {"type": resource_type,
+                     "interaction": [{"code": "read"}, {"code": "search-type"}]}
+                    for resource_type in sorted(self.recording.resources)
+                ],
+            }],
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_bytes(self, status, payload, content_type, headers=None):
+                headers = dict(headers or {})
+                if (server.compress_responses and payload
+                        and "gzip" in self.headers.get("Accept-Encoding", "")):
+                    payload = gzip.compress(payload, compresslevel=1)
+                    headers["Content-Encoding"] = "gzip"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send(self, status, body, headers=None):
+                self._send_bytes(status, json.dumps(body).encode("utf-8"),
+                                 "application/fhir+json", headers)
+
+            def _outcome(self, status, diagnostics, headers=None):
+                self._send(status, {
+                    "resourceType": "OperationOutcome",
+                    "issue": [{"severity": "error", "code": "transient", "diagnostics": diagnostics}],
+                }, headers)
+
+            def _admit(self, method):
+                """Log the request and answer it with a queued or injected failure."""
+                failure = server._record(method, self.path, dict(self.headers), self.client_address)
+                if failure is not None:
+                    status, headers = failure
+                    self._outcome(status, "Queued failure", headers)
+                    return False
+                fault = server._draw_fault()
+                if fault is not None:
+                    headers = {"Retry-After": f"{server.faults.retry_after:g}"} if fault == 429 else None
+                    self._outcome(fault, "Injected fault", headers)
+                    return False
+                return True
+
+            def _read(self, resource_type, resource_id):
+                resource = server.recording.get(resource_type, resource_id)
+                if resource is None:
+                    self._outcome(404, f"{resource_type}/{resource_id} not found")
+                    return
+                etag = _etag(resource)
+                if self.headers.get("If-None-Match") == etag:
+                    self._send_bytes(304, b"", "application/fhir+json", {"ETag": etag})
+                    return
+                server._count("resources_served")
+                self._send(200, resource, {"ETag": etag})
+
+            def do_GET(self):
+                if not self._admit("GET"):
+                    return
+
+                parsed = urlparse(self.path)
+                parts = [part for part in parsed.path.split("/") if part]
+                query = parse_qs(parsed.query)
+                if parts == ["metadata"]:
+                    self._send(200, server.capability_statement())
+                elif parts and parts[-1] == "$export":
+                    self._send(202, {"resourceType": "OperationOutcome"},
+                               {"Content-Location": server.kick_off_export(query)})
+                elif len(parts) == 3 and parts[0] == "Patient" and parts[2] == "$everything":
+                    bundle = server.everything(parts[1], query) if server.supports_everything else None
+                    if bundle is None:
+                        self._outcome(404, f"{parsed.path} not found")
+                    else:
+                        self._send(200, bundle)
+                elif len(parts) == 3 and parts[:2] == ["_bulk", "status"]:
+                    status, manifest = server.export_status(parts[2])
+                    if status == 202:
+                        self._send(202, {"resourceType": "OperationOutcome"},
+                                   {"Retry-After": "0", "X-Progress": "in progress"})
+                    elif manifest is not None:
+                        self._send(200, manifest)
+                    else:
+                        self._outcome(status, f"Export {parts[2]} not found")
+                elif len(parts) == 4 and parts[:2] == ["_bulk", "files"]:
+                    self._send_bytes(200, server.export_file(parts[2], int(parts[3])),
+                                     "application/fhir+ndjson")
+                elif len(parts) == 1:
+                    self._send(200, server.search(parts[0], query))
+                elif len(parts) == 2:
+                    self._read(parts[0], parts[1])
+                else:
+                    self._outcome(404, f"{parsed.path} not found")
+
+            def do_DELETE(self):
+                if not self._admit("DELETE"):
+                    return
+                parts = [part for part in urlparse(self.path).path.split("/") if part]
+                if len(parts) == 3 and parts[:2] == ["_bulk", "status"] and server.cancel_export(parts[2]):
+                    self._send(202, {"resourceType": "OperationOutcome"})
+                else:
+                    self._outcome(404, f"{self.path} not found")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                with server._lock:
+                    server.request_bodies.append(body)
+                if not self._admit("POST"):
+                    return
+
+                bundle = json.loads(body or b"{}")
+                if urlparse(self.path).path.strip("/") or bundle.get("type") != "batch":
+                    self._outcome(400, "Only batch Bundles are supported")
+                    return
+                if (server.max_batch_entries is not None
+                        and len(bundle.get("entry", [])) > server.max_batch_entries):
+                    self._outcome(413, f"Batch has more than {server.max_batch_entries} entries")
+                    return
+                self._send(200, server.batch(bundle))
+
+        return Handler
+
+
+def record_resources(
+    client,
+    output_dir: Union[str, Path],
+    resource_types: List[str],
+    params: Optional[Dict[str, Any]] = None,
+    max_pages: Optional[int] = None,
+) -> Recording:
+    """Record search results from a live server for later replay.
+
+    Args:
+        client: FHIRClient connected to the server to record.
+        output_dir: Directory the recording is saved to.
+        resource_types: Resource types to record.
+        params: Optional search parameters, e.g. a patient filter.
+        max_pages: Optional page limit per resource type.
+
+    Returns:
+        The saved recording.
+    """
+    recording = Recording()
+    for resource_type in resource_types:
+        for resource in client.search_resources(resource_type, params, page_limit=max_pages):
+            recording.add(resource)
+    recording.save(output_dir)
+    logger.info("Recorded resources", output_dir=str(output_dir),
+                resources=recording.resource_count)
+    return recording
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the fault profile options to a command-line parser."""
+    parser.add_argument("--page-size", type=int, default=50, help="Resources per search page")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter around the latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--retry-after", type=float, default=0.0, help="Retry-After of injected 429s")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the fault generator")
+
+
+def fault_profile_from_args(args: argparse.Namespace) -> FaultProfile:
+    """Build a fault profile from parsed ``add_fault_arguments`` options."""
+    return FaultProfile(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Serve a recording, or record one from the configured Epic server."""
+    parser = argparse.ArgumentParser(description="Record and replay FHIR resources")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve a recording")
+    serve.add_argument("--recording", required=True, help="Directory of recorded resources")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    serve.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    add_fault_arguments(serve)
+
+    record = commands.add_parser("record", help="Record resources from EPIC_BASE_URL")
+    record.add_argument("--output", required=True, help="Directory to save the recording to")
+    record.add_argument("--types", required=True, help="Comma-separated resource types")
+    record.add_argument("--patient", help="Optional patient ID to restrict the searches to")
+    record.add_argument("--max-pages", type=int, help="Optional page limit per resource type")
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        from epic_fhir_integration.infrastructure.api_clients.fhir_client import (
+            create_fhir_client,
+        )
+        record_resources(
+            create_fhir_client(),
+            args.output,
+            [t.strip() for t in args.types.split(",") if t.strip()],
+            params={"patient": args.patient} if args.patient else None,
+            max_pages=args.max_pages,
+        )
+        return
+
+    server = ReplayFHIRServer(
+        Recording.from_directory(args.recording),
+        page_size=args.page_size,
+        faults=fault_profile_from_args(args),
+        host=args.host,
+        port=args.port,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
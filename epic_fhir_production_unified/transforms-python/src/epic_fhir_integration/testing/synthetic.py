@@ -0,0 +1,559 @@
+"""
+Seeded synthetic FHIR data for load testing.
+
+Generates Patients with Encounters, Conditions, Observations and
+MedicationRequests that reference each other consistently: every clinical
+resource points at its patient and at one of that patient's encounters, and
+medication orders point at one of the patient's conditions. Each patient is
+generated from its own seeded random stream, so any range of patients can be
+regenerated identically, independent of the others, and output can be
+sharded across processes.
+
+Output goes straight to the bronze layouts: NDJSON directories as written by
+``extract_all_resources_to_ndjson`` or Parquet files with the bronze
+DataFrame columns.
+
+Usage:
+    python -m epic_fhir_integration.testing.synthetic --output <dir> \\
+        --patients 100000 --observations 200 [--format parquet] [--seed 42]
+"""
+
+import argparse
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+from epic_fhir_integration.domain.bronze.ndjson_writer import NDJSONFile, NDJSONWriter
+from epic_fhir_integration.utils.fhir_datetime import (
+    format_fhir_instant,
+    parse_fhir_instant,
+)
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Resource types in generation order
+RESOURCE_TYPES = ["Patient", "Encounter", "Condition", "Observation", "MedicationRequest"]
+
+LOINC = "http://loinc.org"
+SNOMED = "http://snomed.info/sct"
+ICD10 = "http://hl7.org/fhir/sid/icd-10-cm"
+RXNORM = "http://www.nlm.nih.gov/research/umls/rxnorm"
+UCUM = "http://unitsofmeasure.org"
+
+_FAMILY_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas",
+    "Taylor", "Moore", "Jackson", "Martin", "Lee", "Nguyen", "Patel", "Kim", "Clark",
+]
+_GIVEN_NAMES = {
+    "female": ["Mary", "Patricia", "Jennifer", "Linda", "Elizabeth", "Maria", "Susan",
+               "Jessica", "Sarah", "Karen", "Aisha", "Mei", "Priya", "Ana"],
+    "male": ["James", "Robert", "John", "Michael", "David", "William", "Richard",
+             "Joseph", "Thomas", "Carlos", "Wei", "Raj", "Ahmed", "Luis"],
+}
+_CITIES = [
+    ("Madison", "WI", "53703"), ("Verona", "WI", "53593"), ("Chicago", "IL", "60601"),
+    ("Minneapolis", "MN", "55401"), ("Milwaukee", "WI", "53202"), ("Rockford", "IL", "61101"),
+]
+
+# (class code, display, weight, typical length in hours)
+_ENCOUNTER_CLASSES = [
+    ("AMB", "ambulatory", 0.75, 1),
+    ("EMER", "emergency", 0.15, 6),
+    ("IMP", "inpatient encounter", 0.10, 96),
+]
+
+# (SNOMED code, ICD-10 code, display)
+_CONDITIONS = [
+    ("44054006", "E11.9", "Type 2 diabetes mellitus"),
+    ("38341003", "I10", "Essential hypertension"),
+    ("55822004", "E78.5", "Hyperlipidemia"),
+    ("195967001", "J45.909", "Asthma"),
+    ("35489007", "F32.9", "Depressive disorder"),
+    ("709044004", "N18.9", "Chronic kidney disease"),
+    ("49436004", "I48.91", "Atrial fibrillation"),
+    ("13645005", "J44.9", "Chronic obstructive pulmonary disease"),
+    ("235595009", "K21.9", "Gastroesophageal reflux disease"),
+    ("414916001", "E66.9", "Obesity"),
+]
+
+# (LOINC code, display, category, UCUM unit, mean, standard deviation)
+_OBSERVATIONS = [
+    ("8867-4", "Heart rate", "vital-signs", "/min", 75, 12),
+    ("8480-6", "Systolic blood pressure", "vital-signs", "mm[Hg]", 125, 15),
+    ("8462-4", "Diastolic blood pressure", "vital-signs", "mm[Hg]", 80, 10),
+    ("8310-5", "Body temperature", "vital-signs", "Cel", 36.8, 0.4),
+    ("9279-1", "Respiratory rate", "vital-signs", "/min", 16, 3),
+    ("29463-7", "Body weight", "vital-signs", "kg", 80, 18),
+    ("39156-5", "Body mass index", "vital-signs", "kg/m2", 27, 5),
+    ("2345-7", "Glucose [Mass/volume] in Serum or Plasma", "laboratory", "mg/dL", 105, 25),
+    ("4548-4", "Hemoglobin A1c/Hemoglobin.total in Blood", "laboratory", "%", 6.1, 1.1),
+    ("2160-0", "Creatinine [Mass/volume] in Serum or Plasma", "laboratory", "mg/dL", 1.0, 0.3),
+    ("2093-3", "Cholesterol [Mass/volume] in Serum or Plasma", "laboratory", "mg/dL", 190, 35),
+    ("718-7", "Hemoglobin [Mass/volume] in Blood", "laboratory", "g/dL", 14, 1.5),
+    ("2823-3", "Potassium [Moles/volume] in Serum or Plasma", "laboratory", "mmol/L", 4.2, 0.4),
+    ("2951-2", "Sodium [Moles/volume] in Serum or Plasma", "laboratory", "mmol/L", 140, 3),
+]
+
+# (RxNorm code, display, dosage instruction)
+_MEDICATIONS = [
+    ("860975", "metformin hydrochloride 500 MG Oral Tablet", "500 mg by mouth twice daily"),
+    ("314076", "lisinopril 10 MG Oral Tablet", "10 mg by mouth once daily"),
+    ("617312", "atorvastatin 20 MG Oral Tablet", "20 mg by mouth at bedtime"),
+    ("197361", "amlodipine 5 MG Oral Tablet", "5 mg by mouth once daily"),
+    ("745679", "albuterol 0.09 MG/ACTUAT Metered Dose Inhaler", "2 puffs every 4 hours as needed"),
+    ("312938", "sertraline 50 MG Oral Tablet", "50 mg by mouth once daily"),
+    ("855332", "warfarin sodium 5 MG Oral Tablet", "5 mg by mouth once daily"),
+    ("198211", "omeprazole 20 MG Delayed Release Oral Capsule", "20 mg by mouth before breakfast"),
+]
+
+_TERMINOLOGY = "http://terminology.hl7.org/CodeSystem"
+
+
+@dataclass
+class SyntheticConfig:
+    """Cardinalities and time range of the synthetic data.
+
+    Counts of clinical resources are per patient.
+    """
+
+    patients: int = 100
+    encounters_per_patient: int = 10
+    conditions_per_patient: int = 3
+    observations_per_patient: int = 50
+    medications_per_patient: int = 4
+    seed: int = 42
+    start: datetime = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    end: datetime = datetime(2024, 12, 31, tzinfo=timezone.utc)
+    id_prefix: str = "syn"
+    patient_ids: Optional[List[str]] = None
+
+    @property
+    def patient_count(self) -> int:
+        """Number of patients, taking explicit patient IDs into account."""
+        return len(self.patient_ids) if self.patient_ids is not None else self.patients
+
+    def resource_counts(self) -> Dict[str, int]:
+        """Number of resources of each type the configuration generates."""
+        n = self.patient_count
+        return {
+            "Patient": n,
+            "Encounter": n * self.encounters_per_patient,
+            "Condition": n * self.conditions_per_patient,
+            "Observation": n * self.observations_per_patient,
+            "MedicationRequest": n * self.medications_per_patient,
+        }
+
+
+def _coding(system: str, code: str, display: str) -> Dict[str, Any]:
+    return {"system": system, "code": code, "display": display}
+
+
+def _category(code: str, system: str, display: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [{"coding": [_coding(system, code, display or code)]}]
+
+
+class SyntheticFHIRGenerator:
+    """Generates referentially consistent FHIR resources from a seed."""
+
+    def __init__(self, config: Optional[SyntheticConfig] = None):
+        """Initialize a generator.
+
+        Args:
+            config: Cardinalities, seed and time range. Defaults to
+                    SyntheticConfig().
+        """
+        self.config = config or SyntheticConfig()
+
+    def patient_id(self, index: int) -> str:
+        """Get the ID of the patient at an index."""
+        if self.config.patient_ids is not None:
+            return self.config.patient_ids[index]
+        return f"{self.config.id_prefix}-p{index}"
+
+    def _instant(self, rng: random.Random, after: Optional[datetime] = None) -> datetime:
+        start = after or self.config.start
+        span = max((self.config.end - start).total_seconds(), 0)
+        return start + timedelta(seconds=int(rng.random() * span))
+
+    def generate_patient(self, index: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Generate one patient and all of their resources.
+
+        Args:
+            index: Patient index, from 0 to ``config.patient_count - 1``.
+
+        Returns:
+            Dictionary mapping resource types to resources, in RESOURCE_TYPES
+            order.
+        """
+        config = self.config
+        rng = random.Random(f"{config.seed}:{index}")
+        patient_id = self.patient_id(index)
+        prefix = f"{config.id_prefix}-{index}"
+        subject = {"reference": f"Patient/{patient_id}"}
+
+        gender = rng.choice(["female", "male"])
+        birth_date = config.end - timedelta(days=int(rng.uniform(1, 95) * 365.25))
+        # Nothing about a patient is recorded before they were born
+        first_seen = max(config.start, birth_date)
+        city, state, postal_code = rng.choice(_CITIES)
+        patient = {
+            "resourceType": "Patient",
+            "id": patient_id,
+            "meta": {"lastUpdated": format_fhir_instant(self._instant(rng, first_seen))},
+            "identifier": [{
+                "use": "usual",
+                "type": {"coding": [_coding(f"{_TERMINOLOGY}/v2-0203", "MR", "Medical record number")]},
+                "system": "urn:oid:1.2.840.114350.1.13.0.1.7.5.737384.14",
+                "value": f"MRN{1000000 + index}",
+            }],
+            "active": True,
+            "name": [{
+                "use": "official",
+                "family": rng.choice(_FAMILY_NAMES),
+                "given": [rng.choice(_GIVEN_NAMES[gender])],
+            }],
+            "telecom": [{"system": "phone", "value": f"608-555-{rng.randint(0, 9999):04d}", "use": "home"}],
+            "gender": gender,
+            "birthDate": birth_date.date().isoformat(),
+            "address": [{
+                "use": "home",
+                "line": [f"{rng.randint(1, 9999)} {rng.choice(_FAMILY_NAMES)} St"],
+                "city": city,
+                "state": state,
+                "postalCode": postal_code,
+                "country": "US",
+            }],
+        }
+
+        # Encounters are in chronological order so their IDs sort by date
+        encounter_starts = sorted(self._instant(rng, first_seen) for _ in range(config.encounters_per_patient))
+        encounters = []
+        for j, start in enumerate(encounter_starts):
+            code, display, _, hours = rng.choices(
+                _ENCOUNTER_CLASSES, weights=[c[2] for c in _ENCOUNTER_CLASSES])[0]
+            end = start + timedelta(minutes=int(hours * 60 * rng.uniform(0.5, 1.5)))
+            encounters.append({
+                "resourceType": "Encounter",
+                "id": f"{prefix}-enc{j}",
+                "meta": {"lastUpdated": format_fhir_instant(end)},
+                "status": "finished",
+                "class": _coding(f"{_TERMINOLOGY}/v3-ActCode", code, display),
+                "type": [{"text": display.capitalize() + " visit"}],
+                "subject": subject,
+                "period": {"start": format_fhir_instant(start), "end": format_fhir_instant(end)},
+            })
+
+        def pick_encounter() -> Optional[Dict[str, Any]]:
+            return rng.choice(encounters) if encounters else None
+
+        def context(encounter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            return {"encounter": {"reference": f"Encounter/{encounter['id']}"}} if encounter else {}
+
+        def encounter_time(encounter: Optional[Dict[str, Any]]) -> datetime:
+            if encounter is None:
+                return self._instant(rng, first_seen)
+            return parse_fhir_instant(encounter["period"]["start"]) + timedelta(minutes=rng.randint(0, 59))
+
+        conditions = []
+        for j, (snomed, icd10, display) in enumerate(
+                rng.sample(_CONDITIONS, min(config.conditions_per_patient, len(_CONDITIONS)))
+                + [rng.choice(_CONDITIONS)
+                   for _ in range(config.conditions_per_patient - len(_CONDITIONS))]):
+            encounter = pick_encounter()
+            onset = encounter_time(encounter)
+            conditions.append({
+                "resourceType": "Condition",
+                "id": f"{prefix}-cond{j}",
+                "meta": {"lastUpdated": format_fhir_instant(onset)},
+                "clinicalStatus": {"coding": [_coding(
+                    f"{_TERMINOLOGY}/condition-clinical", *(("active", "Active") if rng.random() < 0.8
+                                                           else ("resolved", "Resolved")))]},
+                "verificationStatus": {"coding": [_coding(
+                    f"{_TERMINOLOGY}/condition-ver-status", "confirmed", "Confirmed")]},
+                "category": _category("problem-list-item", f"{_TERMINOLOGY}/condition-category",
+                                      "Problem List Item"),
+                "code": {
+                    "coding": [_coding(SNOMED, snomed, display), _coding(ICD10, icd10, display)],
+                    "text": display,
+                },
+                "subject": subject,
+                **context(encounter),
+                "onsetDateTime": format_fhir_instant(onset),
+                "recordedDate": format_fhir_instant(onset),
+            })
+
+        observations = []
+        for j in range(config.observations_per_patient):
+            code, display, category, unit, mean, sd = rng.choice(_OBSERVATIONS)
+            encounter = pick_encounter()
+            effective = encounter_time(encounter)
+            observations.append({
+                "resourceType": "Observation",
+                "id": f"{prefix}-obs{j}",
+                "meta": {"lastUpdated": format_fhir_instant(effective)},
+                "status": "final",
+                "category": _category(category, f"{_TERMINOLOGY}/observation-category",
+                                      "Vital Signs" if category == "vital-signs" else "Laboratory"),
+                "code": {"coding": [_coding(LOINC, code, display)], "text": display},
+                "subject": subject,
+                **context(encounter),
+                "effectiveDateTime": format_fhir_instant(effective),
+                "issued": format_fhir_instant(effective + timedelta(hours=1)),
+                "valueQuantity": {
+                    "value": round(max(rng.gauss(mean, sd), 0), 1),
+                    "unit": unit,
+                    "system": UCUM,
+                    "code": unit,
+                },
+                "referenceRange": [{
+                    "low": {"value": round(mean - 2 * sd, 1), "unit": unit, "system": UCUM, "code": unit},
+                    "high": {"value": round(mean + 2 * sd, 1), "unit": unit, "system": UCUM, "code": unit},
+                }],
+            })
+
+        medications = []
+        for j in range(config.medications_per_patient):
+            code, display, dosage = rng.choice(_MEDICATIONS)
+            encounter = pick_encounter()
+            authored = encounter_time(encounter)
+            reason = {"reasonReference": [{"reference": f"Condition/{rng.choice(conditions)['id']}"}]} \
+                if conditions else {}
+            medications.append({
+                "resourceType": "MedicationRequest",
+                "id": f"{prefix}-med{j}",
+                "meta": {"lastUpdated": format_fhir_instant(authored)},
+                "status": "active" if rng.random() < 0.7 else "completed",
+                "intent": "order",
+                "medicationCodeableConcept": {"coding": [_coding(RXNORM, code, display)], "text": display},
+                "subject": subject,
+                **context(encounter),
+                "authoredOn": format_fhir_instant(authored),
+                **reason,
+                "dosageInstruction": [{"text": dosage}],
+            })
+
+        return {
+            "Patient": [patient],
+            "Encounter": encounters,
+            "Condition": conditions,
+            "Observation": observations,
+            "MedicationRequest": medications,
+        }
+
+    def iter_patients(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[Dict[str, List[Dict[str, Any]]]]:
+        """Generate a range of patients with their resources.
+
+        Args:
+            start: Index of the first patient.
+            stop: Index after the last patient. Defaults to all patients.
+
+        Yields:
+            One ``generate_patient`` result per patient.
+        """
+        stop = self.config.patient_count if stop is None else min(stop, self.config.patient_count)
+        for index in range(start, stop):
+            yield self.generate_patient(index)
+
+    def iter_resources(
+        self, resource_types: Optional[List[str]] = None, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Generate resources patient by patient.
+
+        Args:
+            resource_types: Types to yield. Defaults to RESOURCE_TYPES.
+            start: Index of the first patient.
+            stop: Index after the last patient. Defaults to all patients.
+
+        Yields:
+            FHIR resource dictionaries.
+        """
+        resource_types = resource_types or RESOURCE_TYPES
+        for resources in self.iter_patients(start, stop):
+            for resource_type in resource_types:
+                yield from resources.get(resource_type, [])
+
+    def write_ndjson(
+        self,
+        output_dir: Union[str, Path],
+        resource_types: Optional[List[str]] = None,
+        compression: Optional[str] = None,
+        max_file_bytes: int = 128 * 1024 * 1024,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Dict[str, List[NDJSONFile]]:
+        """Write bronze NDJSON, one directory per resource type.
+
+        The layout matches ``extract_all_resources_to_ndjson``, so the
+        output can stand in for an extraction.
+
+        Args:
+            output_dir: Root output directory.
+            resource_types: Types to write. Defaults to RESOURCE_TYPES.
+            compression: None, "gzip" or "zstd".
+            max_file_bytes: Size at which the writers rotate files.
+            start: Index of the first patient.
+            stop: Index after the last patient. Defaults to all patients.
+
+        Returns:
+            Dictionary mapping resource types to their output files.
+        """
+        resource_types = resource_types or RESOURCE_TYPES
+        writers = {
+            resource_type: NDJSONWriter(
+                Path(output_dir) / resource_type,
+                prefix=f"synthetic-{start}",
+                compression=compression,
+                max_file_bytes=max_file_bytes,
+                fsync=False,
+            )
+            for resource_type in resource_types
+        }
+        metadata = {"synthetic": True, "seed": self.config.seed}
+        try:
+            for resources in self.iter_patients(start, stop):
+                for resource_type, writer in writers.items():
+                    writer.write_many(resources[resource_type])
+        finally:
+            files = {
+                resource_type: writer.close(metadata={**metadata, "resource_type": resource_type})
+                for resource_type, writer in writers.items()
+            }
+
+        logger.info("Wrote synthetic NDJSON", output_dir=str(output_dir),
+                    records={t: w.records_written for t, w in writers.items()})
+        return files
+
+    def write_parquet(
+        self,
+        output_dir: Union[str, Path],
+        resource_types: Optional[List[str]] = None,
+        row_group_size: int = 50000,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Dict[str, Path]:
+        """Write bronze Parquet, one file per resource type.
+
+        Columns match the bronze DataFrames of ``resources_to_dataframe``:
+        json_data, ingest_timestamp, ingest_date, resource_type, resource_id
+        and last_updated.
+
+        Args:
+            output_dir: Root output directory; each type is written to
+                        ``<output_dir>/<type>/part-<start>.parquet``.
+            resource_types: Types to write. Defaults to RESOURCE_TYPES.
+            row_group_size: Rows buffered per type before a row group is written.
+            start: Index of the first patient.
+            stop: Index after the last patient. Defaults to all patients.
+
+        Returns:
+            Dictionary mapping resource types to their Parquet file.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        if pyarrow is None:
+            raise ImportError(
+                "pyarrow package is required for Parquet output. "
+                "Install it with 'pip install pyarrow'."
+            )
+
+        resource_types = resource_types or RESOURCE_TYPES
+        schema = pyarrow.schema([
+            ("json_data", pyarrow.string()),
+            ("ingest_timestamp", pyarrow.timestamp("us", tz="UTC")),
+            ("ingest_date", pyarrow.date32()),
+            ("resource_type", pyarrow.string()),
+            ("resource_id", pyarrow.string()),
+            ("last_updated", pyarrow.string()),
+        ])
+        ingest_time = datetime.now(timezone.utc)
+        paths = {}
+        writers = {}
+        buffers: Dict[str, List[Dict[str, Any]]] = {t: [] for t in resource_types}
+        for resource_type in resource_types:
+            paths[resource_type] = Path(output_dir) / resource_type / f"part-{start}.parquet"
+            paths[resource_type].parent.mkdir(parents=True, exist_ok=True)
+            writers[resource_type] = pq.ParquetWriter(paths[resource_type], schema)
+
+        def flush(resource_type: str) -> None:
+            rows = buffers[resource_type]
+            if not rows:
+                return
+            writers[resource_type].write_table(pyarrow.Table.from_pydict({
+                "json_data": [json.dumps(r, separators=(",", ":")) for r in rows],
+                "ingest_timestamp": [ingest_time] * len(rows),
+                "ingest_date": [ingest_time.date()] * len(rows),
+                "resource_type": [resource_type] * len(rows),
+                "resource_id": [r["id"] for r in rows],
+                "last_updated": [r["meta"]["lastUpdated"] for r in rows],
+            }, schema=schema))
+            buffers[resource_type] = []
+
+        try:
+            for resources in self.iter_patients(start, stop):
+                for resource_type in resource_types:
+                    buffers[resource_type].extend(resources[resource_type])
+                    if len(buffers[resource_type]) >= row_group_size:
+                        flush(resource_type)
+            for resource_type in resource_types:
+                flush(resource_type)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        logger.info("Wrote synthetic Parquet", output_dir=str(output_dir),
+                    files={t: str(p) for t, p in paths.items()})
+        return paths
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Generate synthetic bronze data from the command line."""
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Generate synthetic bronze FHIR data")
+    parser.add_argument("--output", required=True, help="Root output directory")
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson", help="Output format")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], help="NDJSON compression")
+    parser.add_argument("--patients", type=int, default=defaults.patients, help="Number of patients")
+    parser.add_argument("--encounters", type=int, default=defaults.encounters_per_patient,
+                        help="Encounters per patient")
+    parser.add_argument("--conditions", type=int, default=defaults.conditions_per_patient,
+                        help="Conditions per patient")
+    parser.add_argument("--observations", type=int, default=defaults.observations_per_patient,
+                        help="Observations per patient")
+    parser.add_argument("--medications", type=int, default=defaults.medications_per_patient,
+                        help="MedicationRequests per patient")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed")
+    parser.add_argument("--start", type=int, default=0, help="Index of the first patient of this shard")
+    parser.add_argument("--stop", type=int, help="Index after the last patient of this shard")
+    args = parser.parse_args(argv)
+
+    generator = SyntheticFHIRGenerator(SyntheticConfig(
+        patients=args.patients,
+        encounters_per_patient=args.encounters,
+        conditions_per_patient=args.conditions,
+        observations_per_patient=args.observations,
+        medications_per_patient=args.medications,
+        seed=args.seed,
+    ))
+    if args.format == "parquet":
+        generator.write_parquet(args.output, start=args.start, stop=args.stop)
+    else:
+        generator.write_ndjson(args.output, compression=args.compression,
+                               start=args.start, stop=args.stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -86,6 +86,10 @@ class ApiConfig(BaseModel):
     timeout_seconds: int = Field(default=30, description="API timeout in seconds")
     max_retries: int = Field(default=3, description="Maximum number of retries")
     retry_backoff_factor: float = Field(default=2.0, description="Retry backoff factor")
+    requests_per_minute: int = Field(default=300, description="Client-side request rate limit")
+    circuit_failure_threshold: int = Field(default=5, description="Consecutive failures that open an endpoint's circuit")
+    circuit_reset_seconds: float = Field(default=30.0, description="Seconds a circuit stays open before a probe request")
+    max_concurrency: int = Field(default=32, description="Upper bound of the adaptive request concurrency")
 
 
 class AppConfig(BaseModel):
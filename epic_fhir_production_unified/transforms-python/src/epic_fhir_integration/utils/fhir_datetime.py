@@ -0,0 +1,55 @@
+"""
+FHIR date/time helpers.
+
+This module provides parsing and formatting of FHIR ``instant`` values such as
+``meta.lastUpdated`` and the ``_lastUpdated`` search parameter, so that they
+are compared as points in time rather than as strings.
+"""
+
+from datetime import datetime, timezone
+from typing import Union
+
+from dateutil import parser as dateutil_parser
+
+
+def parse_fhir_instant(value: Union[str, datetime]) -> datetime:
+    """Parse a FHIR instant into a timezone-aware UTC datetime.
+
+    Values without a timezone are assumed to be UTC. Partial dates such as
+    ``2023`` or ``2023-05`` are accepted and resolve to their earliest instant.
+
+    Args:
+        value: ISO 8601 string or datetime.
+
+    Returns:
+        Timezone-aware datetime in UTC.
+
+    Raises:
+        ValueError: If the value cannot be parsed.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = dateutil_parser.isoparse(value.strip())
+        except (AttributeError, ValueError, OverflowError) as e:
+            raise ValueError(f"Invalid FHIR instant: {value!r}") from e
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def format_fhir_instant(value: Union[str, datetime]) -> str:
+    """Format a datetime as a FHIR instant in UTC.
+
+    Args:
+        value: Datetime or ISO 8601 string.
+
+    Returns:
+        Instant string such as ``2023-01-01T12:00:00Z``.
+    """
+    parsed = parse_fhir_instant(value)
+    if parsed.microsecond:
+        return parsed.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return parsed.strftime("%Y-%m-%dT%H:%M:%SZ")
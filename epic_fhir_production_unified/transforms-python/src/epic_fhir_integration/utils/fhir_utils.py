@@ -0,0 +1,605 @@
+"""
+Utility functions for working with FHIR resources.
+
+This module provides helper functions for common FHIR operations such as reference resolution,
+data extraction, and resource manipulation.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlparse
+
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Maximum number of IDs per batch Bundle or _id search
+REFERENCE_CHUNK_SIZE = 100
+
+
+def is_reference(value: Any) -> bool:
+    """
+    Check if a value is a FHIR reference.
+    
+    Args:
+        value: The value to check
+        
+    Returns:
+        True if the value is a FHIR reference, False otherwise
+    """
+    if not isinstance(value, dict):
+        return False
+        
+    # Check if the dictionary has a 'reference' key
+    if 'reference' not in value:
+        return False
+        
+    # Make sure it's not just an empty reference
+    if not value.get('reference'):
+        return False
+        
+    return True
+
+def _split_reference(ref_string: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split a literal reference string into resource type and ID."""
+    # Handle URLs vs. relative references
+    if ref_string.startswith('http'):
+        # Absolute references end in Type/id after the server base path
+        parts = urlparse(ref_string).path.strip('/').split('/')[-2:]
+    else:
+        parts = ref_string.split('/')
+    
+    # If the format is like "Patient/123"
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    return None, None
+
+def get_reference_type_and_id(reference: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract the resource type and ID from a FHIR reference.
+    
+    Args:
+        reference: A FHIR reference object
+        
+    Returns:
+        Tuple of (resource_type, resource_id)
+    """
+    if not is_reference(reference):
+        return None, None
+        
+    ref_string = reference.get('reference', '')
+    resource_type, resource_id = _split_reference(ref_string)
+    
+    # If the format doesn't match expected pattern
+    if resource_type is None:
+        logger.warning("Reference format not recognized", reference=ref_string)
+    return resource_type, resource_id
+
+def _format_path(node: Optional[tuple]) -> str:
+    """Build a path string such as ``performer[0].actor`` from a path node."""
+    keys = []
+    while node is not None:
+        node, key = node
+        keys.append(key)
+    
+    parts = []
+    for key in reversed(keys):
+        if isinstance(key, int):
+            parts.append(f"[{key}]")
+        elif parts:
+            parts.append(f".{key}")
+        else:
+            parts.append(key)
+    return "".join(parts)
+
+def _iter_references(resource: Dict[str, Any]) -> Iterator[Tuple[tuple, Dict[str, Any]]]:
+    """
+    Iterate over the reference objects of a resource, depth-first.
+    
+    Uses an explicit stack instead of recursion. Paths are kept as linked
+    ``(parent, key)`` nodes that cost one small tuple per step; they are only
+    turned into strings by callers that need them.
+    
+    Yields:
+        Tuples of (path node, reference object)
+    """
+    if not isinstance(resource, dict):
+        return
+    
+    # Frames: (iterator over items, path node, whether the container is a list, container)
+    stack = [(iter(resource.items()), None, False, resource)]
+    while stack:
+        items, node, is_list, container = stack[-1]
+        for key, value in items:
+            if is_list:
+                # Only dictionaries inside lists can hold references
+                if isinstance(value, dict):
+                    stack.append((iter(value.items()), (node, key), False, value))
+                    break
+                continue
+            
+            # A reference element itself
+            if key == "reference" and isinstance(value, str) and value:
+                yield (node, key), container
+            elif isinstance(value, dict):
+                if value.get("reference"):
+                    yield (node, key), value
+                else:
+                    stack.append((iter(value.items()), (node, key), False, value))
+                    break
+            elif isinstance(value, list):
+                stack.append((iter(enumerate(value)), (node, key), True, value))
+                break
+        else:
+            stack.pop()
+
+def find_references(resource: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Find all references within a FHIR resource.
+    
+    Args:
+        resource: The FHIR resource to search
+        
+    Returns:
+        List of reference objects found
+    """
+    return [
+        {'path': _format_path(node), 'reference': reference}
+        for node, reference in _iter_references(resource)
+    ]
+
+def build_reference_index(
+    resources: Iterable[Dict[str, Any]]
+) -> List[List[Tuple[str, str, str]]]:
+    """
+    Index the references of many resources in one pass.
+    
+    References that are not of the form ``Type/id`` (e.g. contained
+    ``#id`` references) are left out.
+    
+    Args:
+        resources: FHIR resources to index
+        
+    Returns:
+        For each resource, in input order, a list of (path, resource_type, resource_id) tuples
+    """
+    index = []
+    for resource in resources:
+        entries = []
+        for node, reference in _iter_references(resource):
+            ref_string = reference['reference']
+            if not isinstance(ref_string, str):
+                continue
+            resource_type, resource_id = _split_reference(ref_string)
+            if resource_type is not None:
+                entries.append((_format_path(node), resource_type, resource_id))
+        index.append(entries)
+    return index
+
+def reference_scope(client) -> str:
+    """Get the cache scope of the references a client resolves.
+    
+    Resources are only shared between clients of the same server and auth
+    scope (see ``FHIRClient.cache_scope``), so that two tenants in one
+    process never see each other's resources.
+    
+    Args:
+        client: A FHIR client instance
+        
+    Returns:
+        Scope string for ``ResourceCache``
+    """
+    return f"{getattr(client, 'base_url', '')}|{getattr(client, 'cache_scope', None) or ''}"
+
+class ResourceCache:
+    """Thread-safe LRU cache of resolved resources keyed by scope and ``Type/id``."""
+    
+    def __init__(self, max_size: int = 10000):
+        """Initialize a new cache.
+        
+        Args:
+            max_size: Maximum number of resources kept.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._resources: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        """Get a cached resource and mark it as recently used.
+        
+        Args:
+            key: ``Type/id`` of the resource.
+            scope: Server and credentials scope, see ``reference_scope``.
+        """
+        key = (scope, key)
+        with self._lock:
+            resource = self._resources.get(key)
+            if resource is None:
+                self.misses += 1
+                return None
+            self._resources.move_to_end(key)
+            self.hits += 1
+            return resource
+    
+    def put(self, key: str, resource: Dict[str, Any], scope: str = "") -> None:
+        """Store a resource, evicting the least recently used ones.
+        
+        Args:
+            key: ``Type/id`` of the resource.
+            resource: Resource to store.
+            scope: Server and credentials scope, see ``reference_scope``.
+        """
+        key = (scope, key)
+        with self._lock:
+            self._resources[key] = resource
+            self._resources.move_to_end(key)
+            while len(self._resources) > self.max_size:
+                self._resources.popitem(last=False)
+    
+    def contains(self, key: str, scope: str = "") -> bool:
+        """Check whether a resource is cached, without counting a hit or miss.
+        
+        Args:
+            key: ``Type/id`` of the resource.
+            scope: Server and credentials scope, see ``reference_scope``.
+        """
+        with self._lock:
+            return (scope, key) in self._resources
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._resources)
+    
+    def clear(self) -> None:
+        """Remove every cached resource."""
+        with self._lock:
+            self._resources.clear()
+
+
+class _MappingCache:
+    """ResourceCache interface over a caller's ``Type/id`` dictionary."""
+    
+    def __init__(self, resources: MutableMapping[str, Dict[str, Any]]):
+        self.resources = resources
+    
+    def get(self, key: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        return self.resources.get(key)
+    
+    def put(self, key: str, resource: Dict[str, Any], scope: str = "") -> None:
+        self.resources[key] = resource
+
+
+# Resources resolved by any caller in this process, scoped by server and credentials
+_reference_cache = ResourceCache()
+
+
+def get_reference_cache() -> ResourceCache:
+    """Get the process-wide cache of resolved references."""
+    return _reference_cache
+
+
+def fetch_references(
+    client,
+    keys: Iterable[str],
+    mode: str = "batch",
+    chunk_size: int = REFERENCE_CHUNK_SIZE,
+    max_workers: int = 4,
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch referenced resources in as few requests as possible.
+    
+    Args:
+        client: A FHIR client instance
+        keys: ``Type/id`` keys to fetch; duplicates are fetched once
+        mode: "batch" to read through batch Bundles, or "search" for
+              ``_id=a,b,c`` searches per resource type
+        chunk_size: Maximum number of IDs per Bundle or search
+        max_workers: Maximum number of requests in flight
+        
+    Returns:
+        Dictionary mapping ``Type/id`` keys to the resources found
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return {}
+    
+    if mode == "batch" and hasattr(client, "execute_batch"):
+        requests = [{"method": "GET", "url": key} for key in keys]
+        results = client.execute_batch(requests, max_entries=chunk_size, max_workers=max_workers)
+        return {
+            key: result.resource
+            for key, result in zip(keys, results)
+            if result.ok and result.resource
+        }
+    if mode not in ("batch", "search"):
+        raise ValueError(f"Unsupported fetch mode: {mode}")
+    
+    # Clients without a batch path use _id searches, one per chunk of a type
+    ids_by_type: Dict[str, List[str]] = {}
+    for key in keys:
+        resource_type, resource_id = key.split("/", 1)
+        ids_by_type.setdefault(resource_type, []).append(resource_id)
+    searches = [
+        (resource_type, ids[i:i + chunk_size])
+        for resource_type, ids in ids_by_type.items()
+        for i in range(0, len(ids), chunk_size)
+    ]
+    
+    def search(item: Tuple[str, List[str]]) -> List[Dict[str, Any]]:
+        resource_type, ids = item
+        try:
+            return client.get_all_resources(
+                resource_type=resource_type,
+                params={"_id": ",".join(ids), "_count": len(ids)},
+            )
+        except Exception as e:
+            logger.warning("Failed to fetch references",
+                           resource_type=resource_type, count=len(ids), error=str(e))
+            return []
+    
+    found = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for resources in executor.map(search, searches):
+            for resource in resources:
+                found[f"{resource.get('resourceType')}/{resource.get('id')}"] = resource
+    return found
+
+
+def resolve_references_batch(
+    client,
+    resources: List[Dict[str, Any]],
+    max_depth: int = 2,
+    include_types: Optional[List[str]] = None,
+    exclude_types: Optional[List[str]] = None,
+    cache: Optional[Union[ResourceCache, MutableMapping[str, Dict[str, Any]]]] = None,
+    mode: str = "batch",
+    chunk_size: int = REFERENCE_CHUNK_SIZE,
+    max_workers: int = 4,
+) -> List[Dict[str, Any]]:
+    """
+    Resolve references across many FHIR resources, level by level.
+    
+    All unresolved references found at one depth, across every resource, are
+    deduplicated by ``Type/id`` and fetched together before moving on to the
+    next depth, so the number of requests grows with the number of distinct
+    referenced resources rather than with the number of references.
+    
+    Args:
+        client: A FHIR client instance
+        resources: The resources containing references to resolve
+        max_depth: Maximum depth of references to resolve
+        include_types: List of resource types to include (if None, all types are included)
+        exclude_types: List of resource types to exclude (if None, no types are excluded)
+        cache: Cache of resolved resources. Defaults to the process-wide
+               cache. Entries of a ResourceCache are scoped by the client's
+               server and credentials; a plain dictionary is keyed by
+               ``Type/id`` only and must not be shared between servers
+        mode: "batch" or "search", see ``fetch_references``
+        chunk_size: Maximum number of IDs per request
+        max_workers: Maximum number of requests in flight
+        
+    Returns:
+        The resources, with a ``_resolved`` copy of the target added to each
+        resolvable reference object
+    """
+    if cache is None:
+        cache = _reference_cache
+    elif not isinstance(cache, ResourceCache):
+        cache = _MappingCache(cache)
+    scope = reference_scope(client)
+    
+    # Each frontier item carries its own key and those of its ancestors to break cycles
+    frontier: List[Tuple[Dict[str, Any], frozenset]] = [
+        (r, frozenset([f"{r['resourceType']}/{r['id']}"]) if r.get("resourceType") and r.get("id")
+         else frozenset())
+        for r in resources
+    ]
+    
+    for depth in range(max_depth):
+        pending: List[Tuple[Dict[str, Any], str, frozenset]] = []
+        for resource, ancestors in frontier:
+            for _, ref_obj in _iter_references(resource):
+                ref_string = ref_obj['reference']
+                if not isinstance(ref_string, str):
+                    continue
+                resource_type, resource_id = _split_reference(ref_string)
+                if not resource_type or not resource_id:
+                    continue
+                if exclude_types and resource_type in exclude_types:
+                    continue
+                if include_types and resource_type not in include_types:
+                    continue
+                ref_key = f"{resource_type}/{resource_id}"
+                if ref_key in ancestors:
+                    logger.debug(f"Skipping circular reference: {ref_key}")
+                    continue
+                pending.append((ref_obj, ref_key, ancestors))
+        
+        if not pending:
+            break
+        
+        unique_keys = {ref_key for _, ref_key, _ in pending}
+        resolved = {}
+        missing = []
+        for ref_key in unique_keys:
+            cached = cache.get(ref_key, scope)
+            if cached is None:
+                missing.append(ref_key)
+            else:
+                resolved[ref_key] = cached
+        
+        fetched = fetch_references(client, missing, mode=mode, chunk_size=chunk_size,
+                                   max_workers=max_workers)
+        for ref_key, resource in fetched.items():
+            cache.put(ref_key, resource, scope)
+        resolved.update(fetched)
+        
+        logger.info("Resolved references",
+                    depth=depth,
+                    references=len(pending),
+                    unique=len(unique_keys),
+                    fetched=len(fetched),
+                    unresolved=len(unique_keys) - len(resolved))
+        
+        # Attach copies so that nested resolution never mutates cached resources
+        next_frontier = []
+        for ref_obj, ref_key, ancestors in pending:
+            target = resolved.get(ref_key)
+            if target is None:
+                continue
+            ref_obj['_resolved'] = copy.deepcopy(target)
+            next_frontier.append((ref_obj['_resolved'], ancestors | {ref_key}))
+        frontier = next_frontier
+    
+    return resources
+
+
+def resolve_references(
+    client,
+    resource: Dict[str, Any],
+    max_depth: int = 2,
+    include_types: Optional[List[str]] = None,
+    exclude_types: Optional[List[str]] = None,
+    resolved_resources: Optional[Union[ResourceCache, MutableMapping[str, Dict[str, Any]]]] = None,
+) -> Dict[str, Any]:
+    """
+    Resolve references in a FHIR resource up to a specified depth.
+    
+    Args:
+        client: A FHIR client instance
+        resource: The resource containing references to resolve
+        max_depth: Maximum depth of references to resolve
+        include_types: List of resource types to include (if None, all types are included)
+        exclude_types: List of resource types to exclude (if None, no types are excluded)
+        resolved_resources: Cache of resolved resources, a ResourceCache or a
+                            ``Type/id`` dictionary that is filled in.
+                            Defaults to the process-wide cache
+        
+    Returns:
+        Resource with resolved references
+    """
+    resolve_references_batch(
+        client,
+        [resource],
+        max_depth=max_depth,
+        include_types=include_types,
+        exclude_types=exclude_types,
+        cache=resolved_resources,
+    )
+    return resource
+
+def extract_extensions(
+    resource: Dict[str, Any],
+    flatten: bool = False,
+    include_metadata: bool = True
+) -> Dict[str, Any]:
+    """
+    Extract and process extensions from a FHIR resource.
+    
+    Args:
+        resource: FHIR resource containing extensions
+        flatten: If True, flattens extensions into a simple key-value structure
+        include_metadata: If True, includes metadata about each extension
+        
+    Returns:
+        Dictionary of extracted extensions
+    """
+    if not isinstance(resource, dict):
+        return {}
+    
+    # Extract all extensions from the resource
+    extensions = resource.get('extension', [])
+    
+    # Create a mapping for Epic-specific extensions
+    epic_extension_map = {
+        'http://epic.com/fhir/extensions/patient/ethnicity': 'ethnicity',
+        'http://epic.com/fhir/extensions/patient/race': 'race',
+        'http://epic.com/fhir/extensions/patient/religion': 'religion',
+        'http://epic.com/fhir/extensions/observation/result-notes': 'result_notes',
+        'http://epic.com/fhir/extensions/document/description': 'document_description',
+    }
+    
+    result = {}
+    
+    for ext in extensions:
+        # Get extension URL (defines the type of extension)
+        url = ext.get('url', '')
+        
+        # Skip if no URL
+        if not url:
+            continue
+        
+        # Get a friendly name for the extension if available
+        name = epic_extension_map.get(url, '')
+        if not name:
+            # Create a friendly name from the URL if not in the mapping
+            name = url.split('/')[-1]
+        
+        # Extract the value based on its type
+        value = None
+        for key in ['valueString', 'valueCode', 'valueInteger', 'valueBoolean', 'valueDecimal', 
+                    'valueDate', 'valueDateTime', 'valueQuantity', 'valueReference']:
+            if key in ext:
+                value = ext[key]
+                break
+        
+        # Handle nested extensions
+        if 'extension' in ext and not value:
+            nested_exts = ext.get('extension', [])
+            nested_values = {}
+            
+            for nested_ext in nested_exts:
+                nested_url = nested_ext.get('url', '')
+                if not nested_url:
+                    continue
+                
+                # Extract the nested extension's value
+                nested_value = None
+                for key in ['valueString', 'valueCode', 'valueInteger', 'valueBoolean', 'valueDecimal', 
+                            'valueDate', 'valueDateTime', 'valueQuantity', 'valueReference']:
+                    if key in nested_ext:
+                        nested_value = nested_ext[key]
+                        break
+                
+                # Add to nested values
+                if nested_value is not None:
+                    nested_name = nested_url.split('/')[-1]
+                    nested_values[nested_name] = nested_value
+            
+            if nested_values:
+                value = nested_values
+        
+        # Store the extension value
+        if flatten:
+            # Use a flat structure with dot notation for nested values
+            if isinstance(value, dict):
+                for k, v in value.items():
+                    result[f"{name}.{k}"] = v
+            else:
+                result[name] = value
+        else:
+            # Store with metadata
+            ext_entry = {'value': value}
+            
+            if include_metadata:
+                ext_entry['url'] = url
+                if 'id' in ext:
+                    ext_entry['id'] = ext['id']
+            
+            result[name] = ext_entry
+    
+    return result 
\ No newline at end of file
@@ -3,9 +3,20 @@ FHIRPath adapter for querying FHIR resources.
 
 This module provides a wrapper around the fhirpathpy library to provide a more
 Pythonic interface for querying FHIR resources using FHIRPath expressions.
+
+Expressions are compiled once and kept in a bounded LRU cache, so repeated
+evaluation of the same paths over many resources does not re-parse them.
+Expressions in the simple subset handled by fhirpath_native (navigation,
+where(), first(), exists(), substring(), ...) are compiled to native
+closures; everything else is evaluated by fhirpathpy.
+Resources may be plain dictionaries or fhir.resources models; a model is
+converted to its JSON dictionary once per evaluation, so a path set
+(compile_paths, extract_many) converts it once for all of its expressions.
 """
 
-from typing import Any, Dict, List, Optional, Union, cast
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union, cast
+import functools
+import json
 import logging
 import re
 
@@ -19,10 +30,329 @@ except ImportError:
         "Install it with 'pip install fhirpathpy'."
     )
 
+from epic_fhir_integration.utils.fhirpath_native import (
+    UnsupportedExpression,
+    compile_native,
+    compile_native_steps,
+)
 from epic_fhir_integration.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Maximum number of compiled expressions kept by compile_path
+COMPILE_CACHE_SIZE = 1024
+
+# Engines accepted by compile_path
+ENGINES = ("auto", "native", "fhirpathpy")
+
+
+def _model_to_dict(model: Any) -> Dict[str, Any]:
+    if hasattr(model, "model_dump"):
+        return model.model_dump(mode="json", by_alias=True, exclude_none=True)
+    if hasattr(model, "json"):
+        # JSON round trip so dates and decimals are FHIR strings and numbers
+        return json.loads(model.json())
+    return model.dict()
+
+
+def to_fhir_dict(resource: Any) -> Dict[str, Any]:
+    """
+    Get the dictionary form of a FHIR resource.
+    
+    Dictionaries (and lists of resources) are returned as is. Models (e.g.
+    fhir.resources) are dumped to JSON-compatible dictionaries on every call;
+    use compile_paths to evaluate several expressions on one dump.
+    
+    Args:
+        resource: FHIR resource dictionary or model
+        
+    Returns:
+        FHIR resource dictionary
+    """
+    if isinstance(resource, (Mapping, list)):
+        return cast(Dict[str, Any], resource)
+    return _model_to_dict(resource)
+
+
+class CompiledFHIRPath:
+    """
+    A FHIRPath expression parsed once and reusable across resources.
+    """
+    
+    def __init__(
+        self,
+        expression: str,
+        evaluator: Callable[[Dict[str, Any]], Any],
+        engine: str = "fhirpathpy"
+    ):
+        """
+        Initialize a compiled expression.
+        
+        Args:
+            expression: FHIRPath expression string
+            evaluator: Function evaluating the parsed expression on a resource
+            engine: Name of the engine that compiled the expression
+        """
+        self.expression = expression
+        self.engine = engine
+        self._evaluator = evaluator
+    
+    def __call__(self, resource: Any) -> List[Any]:
+        """
+        Evaluate the expression against a FHIR resource.
+        
+        Args:
+            resource: FHIR resource dictionary or model
+            
+        Returns:
+            List of results
+        """
+        result = self._evaluator(to_fhir_dict(resource))
+        return result if isinstance(result, list) else [result]
+    
+    def first(self, resource: Any, default: Any = None) -> Any:
+        """
+        Evaluate the expression and return its first result.
+        
+        Args:
+            resource: FHIR resource dictionary or model
+            default: Default value to return if no results
+            
+        Returns:
+            First result, or default if none
+        """
+        results = self(resource)
+        return results[0] if results else default
+    
+    def __repr__(self) -> str:
+        return f"CompiledFHIRPath({self.expression!r}, engine={self.engine!r})"
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_path(fhirpath_expr: str, engine: str = "auto") -> CompiledFHIRPath:
+    """
+    Compile a FHIRPath expression, reusing earlier compilations.
+    
+    Args:
+        fhirpath_expr: FHIRPath expression string
+        engine: "native" for the fast subset evaluator, "fhirpathpy" for the
+                full engine, or "auto" to use the native evaluator whenever
+                the expression is in its subset
+        
+    Returns:
+        Reusable compiled expression
+        
+    Raises:
+        ValueError: If the engine is unknown, or "native" is requested for an
+                    expression outside the subset
+        Exception: If the expression cannot be parsed
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown FHIRPath engine: {engine}")
+    if engine != "fhirpathpy":
+        try:
+            return CompiledFHIRPath(fhirpath_expr, compile_native(fhirpath_expr), "native")
+        except UnsupportedExpression:
+            if engine == "native":
+                raise
+            logger.debug("Using fhirpathpy for expression", expression=fhirpath_expr)
+    return CompiledFHIRPath(fhirpath_expr, fhirpathpy.compile(fhirpath_expr), "fhirpathpy")
+
+
+class _StepNode:
+    """Node of a prefix tree of navigation steps."""
+    
+    __slots__ = ("evaluator", "aliases", "children")
+    
+    def __init__(self, evaluator: Optional[Callable[[List[Any]], List[Any]]] = None):
+        self.evaluator = evaluator
+        self.aliases: List[str] = []
+        self.children: Dict[str, "_StepNode"] = {}
+
+
+class CompiledPathSet:
+    """
+    A set of aliased FHIRPath expressions evaluated together.
+    
+    Natively supported expressions are merged into a prefix tree of
+    navigation steps, so a prefix shared by several expressions (e.g.
+    ``name.where(use='official')``) is evaluated once per resource. Other
+    expressions are evaluated one by one with fhirpathpy.
+    """
+    
+    def __init__(self, paths: Mapping[str, str]):
+        """
+        Compile a set of expressions.
+        
+        Args:
+            paths: Dictionary mapping aliases to FHIRPath expressions
+            
+        Raises:
+            Exception: If an expression cannot be parsed
+        """
+        self.paths = dict(paths)
+        self._root = _StepNode()
+        self._fallback: Dict[str, CompiledFHIRPath] = {}
+        
+        for alias, expression in self.paths.items():
+            try:
+                steps = compile_native_steps(expression)
+            except UnsupportedExpression:
+                self._fallback[alias] = compile_path(expression, engine="fhirpathpy")
+                continue
+            node = self._root
+            for key, evaluator in steps:
+                if key not in node.children:
+                    node.children[key] = _StepNode(evaluator)
+                node = node.children[key]
+            node.aliases.append(alias)
+    
+    def _walk(self, node: _StepNode, coll: List[Any], results: Dict[str, List[Any]]) -> None:
+        for child in node.children.values():
+            try:
+                value = child.evaluator(coll)
+            except Exception as e:
+                logger.warning(f"FHIRPath evaluation error: {e}", aliases=child.aliases)
+                continue
+            for alias in child.aliases:
+                results[alias] = value
+            if child.children:
+                self._walk(child, value, results)
+    
+    def evaluate(self, resource: Any) -> Dict[str, List[Any]]:
+        """
+        Evaluate every expression against a resource in one pass.
+        
+        Args:
+            resource: FHIR resource dictionary or model
+            
+        Returns:
+            Dictionary mapping aliases to result lists. Expressions that fail
+            to evaluate give an empty list.
+        """
+        data = to_fhir_dict(resource)
+        root = data if isinstance(data, list) else [data]
+        results: Dict[str, List[Any]] = {alias: [] for alias in self.paths}
+        # A bare "$this" has no steps and selects the input itself
+        for alias in self._root.aliases:
+            results[alias] = root
+        self._walk(self._root, root, results)
+        for alias, compiled in self._fallback.items():
+            try:
+                results[alias] = compiled(data)
+            except Exception as e:
+                logger.warning(f"FHIRPath evaluation error: {e}", expression=compiled.expression)
+        return results
+    
+    def first(self, resource: Any, default: Any = None) -> Dict[str, Any]:
+        """
+        Evaluate every expression and keep each first result.
+        
+        Args:
+            resource: FHIR resource dictionary or model
+            default: Value for expressions without results
+            
+        Returns:
+            Dictionary mapping aliases to first results
+        """
+        return {
+            alias: values[0] if values else default
+            for alias, values in self.evaluate(resource).items()
+        }
+    
+    def columns(
+        self,
+        resources: Iterable[Any],
+        first: bool = True,
+        default: Any = None
+    ) -> Dict[str, List[Any]]:
+        """
+        Evaluate every expression over a list of resources.
+        
+        Args:
+            resources: FHIR resource dictionaries or models
+            first: Whether each cell holds the first result (or default)
+                   rather than the full result list
+            default: Value of cells without results when first is True
+            
+        Returns:
+            Dictionary mapping aliases to one value per resource
+        """
+        columns: Dict[str, List[Any]] = {alias: [] for alias in self.paths}
+        appends = [(alias, columns[alias].append) for alias in self.paths]
+        for resource in resources:
+            results = self.evaluate(resource)
+            for alias, append in appends:
+                values = results[alias]
+                append((values[0] if values else default) if first else values)
+        return columns
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_path_set(paths: Tuple[Tuple[str, str], ...]) -> CompiledPathSet:
+    return CompiledPathSet(dict(paths))
+
+
+def compile_paths(paths: Mapping[str, str]) -> CompiledPathSet:
+    """
+    Compile a set of aliased expressions, reusing earlier compilations.
+    
+    Args:
+        paths: Dictionary mapping aliases to FHIRPath expressions
+        
+    Returns:
+        Reusable compiled path set
+    """
+    return _compile_path_set(tuple(paths.items()))
+
+
+def extract_many(
+    resource: Any,
+    paths: Mapping[str, str],
+    first: bool = False,
+    default: Any = None
+) -> Dict[str, Any]:
+    """
+    Evaluate several aliased expressions against a resource in one pass.
+    
+    Args:
+        resource: FHIR resource dictionary or model
+        paths: Dictionary mapping aliases to FHIRPath expressions
+        first: Whether to return each expression's first result (or default)
+               rather than its result list
+        default: Value for expressions without results when first is True
+        
+    Returns:
+        Dictionary mapping aliases to results
+        
+    Raises:
+        Exception: If an expression cannot be parsed
+    """
+    compiled = compile_paths(paths)
+    return compiled.first(resource, default) if first else compiled.evaluate(resource)
+
+
+def extract_many_columns(
+    resources: Iterable[Any],
+    paths: Mapping[str, str],
+    first: bool = True,
+    default: Any = None
+) -> Dict[str, List[Any]]:
+    """
+    Evaluate several aliased expressions over a list of resources.
+    
+    Args:
+        resources: FHIR resource dictionaries or models
+        paths: Dictionary mapping aliases to FHIRPath expressions
+        first: Whether each cell holds the first result (or default) rather
+               than the full result list
+        default: Value of cells without results when first is True
+        
+    Returns:
+        Dictionary mapping aliases to columns with one value per resource
+    """
+    return compile_paths(paths).columns(resources, first, default)
+
 
 class FHIRPathAdapter:
     """
@@ -58,9 +388,13 @@ class FHIRPathAdapter:
         """
         Evaluate a FHIRPath expression against a FHIR resource.
         
+        Models are converted to dictionaries on each call; use extract_many
+        to evaluate several expressions on one conversion.
+        
         Args:
             fhirpath_expr: FHIRPath expression string
-            resource: Optional resource to query (uses self.resource if None)
+            resource: Optional resource dictionary or model to query
+                      (uses self.resource if None)
             
         Returns:
             List of results from the FHIRPath query
@@ -74,8 +408,7 @@ class FHIRPathAdapter:
             raise ValueError("No FHIR resource provided for FHIRPath evaluation")
         
         try:
-            result = fhirpathpy.evaluate(target_resource, fhirpath_expr)
-            return result if isinstance(result, list) else [result]
+            return compile_path(fhirpath_expr)(target_resource)
         except Exception as e:
             logger.warning(
                 f"FHIRPath evaluation error: {e}",
@@ -83,6 +416,22 @@ class FHIRPathAdapter:
             )
             return []
     
+    @staticmethod
+    def compile(fhirpath_expr: str) -> CompiledFHIRPath:
+        """
+        Compile a FHIRPath expression for repeated evaluation.
+        
+        Args:
+            fhirpath_expr: FHIRPath expression string
+            
+        Returns:
+            Reusable compiled expression
+            
+        Raises:
+            Exception: If the expression cannot be parsed
+        """
+        return compile_path(fhirpath_expr)
+    
     def extract_first(
         self, 
         fhirpath_expr: str, 
@@ -107,6 +456,38 @@ class FHIRPathAdapter:
         
         return results[0]
     
+    def extract_many(
+        self,
+        paths: Mapping[str, str],
+        resource: Optional[Dict[str, Any]] = None,
+        first: bool = False,
+        default: Any = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluate several aliased FHIRPath expressions in one pass.
+        
+        Expressions sharing a prefix evaluate it once (see CompiledPathSet).
+        
+        Args:
+            paths: Dictionary mapping aliases to FHIRPath expressions
+            resource: Optional resource to query (uses self.resource if None)
+            first: Whether to return each expression's first result (or
+                   default) rather than its result list
+            default: Value for expressions without results when first is True
+            
+        Returns:
+            Dictionary mapping aliases to results
+            
+        Raises:
+            ValueError: If no resource is available to query
+        """
+        target_resource = resource if resource is not None else self.resource
+        
+        if target_resource is None:
+            raise ValueError("No FHIR resource provided for FHIRPath evaluation")
+        
+        return extract_many(target_resource, paths, first, default)
+    
     def extract_scalar(
         self, 
         fhirpath_expr: str, 
@@ -0,0 +1,144 @@
+"""
+Columnar FHIRPath evaluation over lists of resources.
+
+evaluate_batch evaluates a set of aliased expressions over a whole list of
+resources and returns one column per alias, as Arrow arrays, NumPy arrays or
+plain lists, without building row dictionaries in between. The columns can
+be passed straight to ``pyarrow.table``, ``pd.DataFrame`` or
+``spark.createDataFrame``. Large batches can be split across worker
+processes.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from epic_fhir_integration.utils.fhirpath_adapter import compile_paths
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Output formats accepted by evaluate_batch
+OUTPUTS = ("arrow", "numpy", "list")
+
+
+def _evaluate_chunk(
+    paths: Tuple[Tuple[str, str], ...],
+    resources: Sequence[Any],
+    first: bool,
+    default: Any,
+) -> Dict[str, List[Any]]:
+    """Evaluate a chunk in a worker process; module-level so it pickles."""
+    return compile_paths(dict(paths)).columns(resources, first, default)
+
+
+def _to_arrow(alias: str, values: List[Any]):
+    try:
+        return pyarrow.array(values)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+        # Mixed types in one column, e.g. valueQuantity and valueString
+        logger.debug("Encoding FHIRPath column as JSON", alias=alias, error=str(e))
+        return pyarrow.array(
+            [None if v is None else v if isinstance(v, str) else json.dumps(v) for v in values],
+            type=pyarrow.string(),
+        )
+
+
+def _to_numpy(values: List[Any]):
+    present = [v for v in values if v is not None]
+    if present and len(present) == len(values):
+        if all(isinstance(v, bool) for v in present):
+            return numpy.array(values, dtype=bool)
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+            return numpy.array(values, dtype=numpy.int64)
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return numpy.array([numpy.nan if v is None else v for v in values], dtype=numpy.float64)
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def evaluate_batch(
+    resources: Sequence[Any],
+    paths: Mapping[str, str],
+    first: bool = True,
+    default: Any = None,
+    output: str = "arrow",
+    processes: Optional[int] = None,
+    chunk_size: int = 10000,
+) -> Dict[str, Any]:
+    """Evaluate aliased FHIRPath expressions over a list of resources.
+
+    Expressions are compiled once for the whole batch and evaluated in a
+    single pass per resource (see CompiledPathSet).
+
+    Args:
+        resources: FHIR resource dictionaries or models.
+        paths: Dictionary mapping aliases (column names) to FHIRPath expressions.
+        first: Whether each cell holds the expression's first result (or
+               default) rather than its full result list.
+        default: Value of cells without results when first is True.
+        output: "arrow" for pyarrow arrays, "numpy" for NumPy arrays (numeric
+                and boolean columns get native dtypes, others object dtype;
+                missing numbers become NaN) or "list" for plain lists.
+        processes: Number of worker processes. Batches larger than
+                   chunk_size are split into chunks evaluated in parallel;
+                   resources are pickled to the workers, so this pays off
+                   only for large batches.
+        chunk_size: Number of resources per worker task.
+
+    Returns:
+        Dictionary mapping aliases to columns with one value per resource.
+
+    Raises:
+        ValueError: If the output format is unknown.
+        ImportError: If pyarrow or numpy is required for the output but not
+                     installed.
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"Unsupported output: {output}")
+    if output == "arrow" and pyarrow is None:
+        raise ImportError(
+            "pyarrow package is required for Arrow output. "
+            "Install it with 'pip install pyarrow'."
+        )
+    if output == "numpy" and numpy is None:
+        raise ImportError(
+            "numpy package is required for NumPy output. "
+            "Install it with 'pip install numpy'."
+        )
+
+    if processes and processes > 1 and len(resources) > chunk_size:
+        items = tuple(paths.items())
+        chunks = [resources[i:i + chunk_size] for i in range(0, len(resources), chunk_size)]
+        columns: Dict[str, List[Any]] = {alias: [] for alias in paths}
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for chunk_columns in executor.map(
+                _evaluate_chunk,
+                [items] * len(chunks),
+                chunks,
+                [first] * len(chunks),
+                [default] * len(chunks),
+            ):
+                for alias, values in chunk_columns.items():
+                    columns[alias].extend(values)
+        logger.debug("Evaluated FHIRPath batch in worker processes",
+                     resources=len(resources), chunks=len(chunks), processes=processes)
+    else:
+        columns = compile_paths(paths).columns(resources, first, default)
+
+    if output == "arrow":
+        return {alias: _to_arrow(alias, values) for alias, values in columns.items()}
+    if output == "numpy":
+        return {alias: _to_numpy(values) for alias, values in columns.items()}
+    return columns
@@ -0,0 +1,358 @@
+"""
+Native evaluator for the simple subset of FHIRPath.
+
+Most expressions in the transforms are navigations with a few functions,
+e.g. ``name.where(use='official').family.first()`` or
+``subject.reference.substring(8)``. This module tokenizes and parses such
+expressions once into closures over plain dictionary access, which evaluate
+far faster than the general fhirpathpy engine. Expressions outside the
+subset raise UnsupportedExpression, so callers can fall back to fhirpathpy.
+
+Supported:
+    - member navigation, including ``$this`` and a leading resource type
+      (``Patient.name``)
+    - indexers with an integer literal (``name[0]``)
+    - string, integer, decimal and boolean literals
+    - ``=``, ``!=``, ``and`` and ``or``
+    - where(criteria), exists([criteria]), empty(), first(), last(),
+      count(), not() and substring(start[, length]) with literal arguments
+
+Results match fhirpathpy without a model, including its handling of
+primitive extensions (``_element``) and of collection equality.
+"""
+
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+# A compiled (sub)expression: maps an input collection to an output collection
+Evaluator = Callable[[List[Any]], List[Any]]
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>'(?:[^'\\]|\\.)*')
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<this>\$this)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>!=|[=.(),\[\]])
+""", re.VERBOSE)
+
+_ESCAPES = {"'": "'", '"': '"', "`": "`", "\\": "\\", "/": "/",
+            "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class UnsupportedExpression(ValueError):
+    """Raised when an expression is outside the natively supported subset."""
+
+
+def tokenize(expression: str) -> List[Tuple[str, str]]:
+    """Split an expression into ``(kind, text)`` tokens.
+
+    Args:
+        expression: FHIRPath expression string.
+
+    Returns:
+        Tokens without whitespace.
+
+    Raises:
+        UnsupportedExpression: If the expression contains syntax outside the
+            subset, e.g. ``%`` variables, ``|`` or arithmetic.
+    """
+    tokens = []
+    position = 0
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if match is None:
+            raise UnsupportedExpression(
+                f"Unsupported syntax at {position}: {expression[position:position + 10]!r}")
+        if match.lastgroup != "ws":
+            tokens.append((match.lastgroup, match.group()))
+        position = match.end()
+    return tokens
+
+
+def _unescape(literal: str) -> str:
+    return re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), literal[1:-1])
+
+
+def _member(key: str) -> Evaluator:
+    extension_key = f"_{key}"
+    if key[0] == key[0].upper():
+        # A type name selects resources of that type, as fhirpathpy does
+        return lambda coll: [x for x in coll if isinstance(x, dict) and x.get("resourceType") == key]
+
+    def evaluate(coll: List[Any]) -> List[Any]:
+        result = []
+        for item in coll:
+            if not isinstance(item, dict):
+                continue
+            for value in (item.get(key), item.get(extension_key)):
+                if value is None:
+                    continue
+                if isinstance(value, list):
+                    result.extend(value)
+                else:
+                    result.append(value)
+        return result
+
+    return evaluate
+
+
+def _truth(coll: List[Any]) -> Optional[bool]:
+    return coll[0] if coll and isinstance(coll[0], bool) else None
+
+
+def _substring(start: int, length: Optional[int]) -> Evaluator:
+    def evaluate(coll: List[Any]) -> List[Any]:
+        if not coll:
+            return []
+        if len(coll) > 1 or not isinstance(coll[0], str):
+            raise ValueError(f"Expected string, but got {coll}")
+        if length is None:
+            return [coll[0][start:]]
+        return [coll[0][start:start + length]]
+
+    return evaluate
+
+
+class _Parser:
+    """Recursive descent parser producing evaluators."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, text: Optional[str] = None) -> Tuple[str, str]:
+        kind, value = self.peek()
+        if kind is None or (text is not None and value != text):
+            raise UnsupportedExpression(f"Expected {text or 'a token'} in {self.expression!r}")
+        self.position += 1
+        return kind, value
+
+    def parse(self) -> Evaluator:
+        evaluator = self.parse_or()
+        if self.position != len(self.tokens):
+            raise UnsupportedExpression(f"Unexpected {self.peek()[1]!r} in {self.expression!r}")
+        return evaluator
+
+    def parse_or(self) -> Evaluator:
+        left = self.parse_and()
+        while self.peek() == ("ident", "or"):
+            self.take()
+            left = self._logical(left, self.parse_and(), is_and=False)
+        return left
+
+    def parse_and(self) -> Evaluator:
+        left = self.parse_comparison()
+        while self.peek() == ("ident", "and"):
+            self.take()
+            left = self._logical(left, self.parse_comparison(), is_and=True)
+        return left
+
+    @staticmethod
+    def _logical(left: Evaluator, right: Evaluator, is_and: bool) -> Evaluator:
+        decisive = not is_and
+
+        def evaluate(coll: List[Any]) -> List[Any]:
+            a = _truth(left(coll))
+            if a is decisive:
+                return [decisive]
+            b = _truth(right(coll))
+            if b is decisive:
+                return [decisive]
+            if a is None or b is None:
+                return []
+            return [not decisive]
+
+        return evaluate
+
+    def parse_comparison(self) -> Evaluator:
+        left = self.parse_term()
+        kind, value = self.peek()
+        if kind != "op" or value not in ("=", "!="):
+            return left
+        self.take()
+        right = self.parse_term()
+        negate = value == "!="
+
+        def evaluate(coll: List[Any]) -> List[Any]:
+            a = left(coll)
+            b = right(coll)
+            if not a or not b:
+                return []
+            return [(a == b) != negate]
+
+        return evaluate
+
+    def parse_term(self) -> Evaluator:
+        kind, value = self.peek()
+        if kind == "string":
+            self.take()
+            literal = _unescape(value)
+            return lambda coll: [literal]
+        if kind == "number":
+            self.take()
+            number = float(value) if "." in value else int(value)
+            return lambda coll: [number]
+        if kind == "ident" and value in ("true", "false"):
+            self.take()
+            boolean = value == "true"
+            return lambda coll: [boolean]
+        return self.parse_path()
+
+    def parse_path(self) -> Evaluator:
+        steps = [step for _, step in self.parse_path_steps()]
+
+        def evaluate(coll: List[Any]) -> List[Any]:
+            for step in steps:
+                coll = step(coll)
+            return coll
+
+        if not steps:
+            return lambda coll: coll
+        return steps[0] if len(steps) == 1 else evaluate
+
+    def parse_path_steps(self) -> List[Tuple[str, Evaluator]]:
+        """Parse a path into its steps, each keyed by its normalized source."""
+        steps: List[Tuple[str, Evaluator]] = []
+        start = self.position
+        if self.peek()[0] == "this":
+            self.take()
+        else:
+            evaluator = self.parse_invocation()
+            steps.append((self._source(start), evaluator))
+
+        while True:
+            kind, value = self.peek()
+            start = self.position
+            if (kind, value) == ("op", "."):
+                self.take()
+                evaluator = self.parse_invocation()
+                steps.append((self._source(start + 1), evaluator))
+            elif (kind, value) == ("op", "["):
+                self.take()
+                index_kind, index = self.take()
+                if index_kind != "number" or "." in index:
+                    raise UnsupportedExpression(f"Unsupported indexer in {self.expression!r}")
+                self.take("]")
+                steps.append((self._source(start), lambda coll, i=int(index): coll[i:i + 1]))
+            else:
+                break
+        return steps
+
+    def _source(self, start: int) -> str:
+        return " ".join(text for _, text in self.tokens[start:self.position])
+
+    def parse_invocation(self) -> Evaluator:
+        kind, name = self.take()
+        if kind != "ident":
+            raise UnsupportedExpression(f"Unexpected {name!r} in {self.expression!r}")
+        if self.peek() != ("op", "("):
+            return _member(name)
+
+        self.take("(")
+        arguments: List[Evaluator] = []
+        literals: List[Any] = []
+        if self.peek() != ("op", ")"):
+            while True:
+                start = self.position
+                arguments.append(self.parse_or())
+                literal_kind, literal = self.tokens[start]
+                literals.append(int(literal) if literal_kind == "number" and self.position == start + 1
+                                and "." not in literal else None)
+                if self.peek() != ("op", ","):
+                    break
+                self.take(",")
+        self.take(")")
+        return self._function(name, arguments, literals)
+
+    def _function(self, name: str, arguments: List[Evaluator], literals: List[Any]) -> Evaluator:
+        arity = len(arguments)
+        if name == "where" and arity == 1:
+            criteria = arguments[0]
+
+            def where(coll: List[Any]) -> List[Any]:
+                result = []
+                for item in coll:
+                    value = criteria([item])
+                    if value and value[0]:
+                        result.append(item)
+                return result
+
+            return where
+        if name == "exists" and arity <= 1:
+            if arity == 0:
+                return lambda coll: [bool(coll)]
+            where = self._function("where", arguments, literals)
+            return lambda coll: [bool(where(coll))]
+        if arity == 0:
+            if name == "empty":
+                return lambda coll: [not coll]
+            if name == "first":
+                return lambda coll: coll[:1]
+            if name == "last":
+                return lambda coll: coll[-1:]
+            if name == "count":
+                return lambda coll: [len(coll)]
+            if name == "not":
+                return lambda coll: [not coll[0]] if len(coll) == 1 and isinstance(coll[0], bool) else []
+        if name == "substring" and arity in (1, 2) and None not in literals:
+            return _substring(literals[0], literals[1] if arity == 2 else None)
+        raise UnsupportedExpression(f"Unsupported function {name}() in {self.expression!r}")
+
+
+def compile_native(expression: str) -> Callable[[Any], List[Any]]:
+    """Compile an expression of the supported subset.
+
+    Args:
+        expression: FHIRPath expression string.
+
+    Returns:
+        Function evaluating the expression on a resource dictionary (or a
+        list of resources) and returning the result collection.
+
+    Raises:
+        UnsupportedExpression: If the expression is outside the subset.
+    """
+    evaluator = _Parser(expression).parse()
+
+    def evaluate(resource: Any) -> List[Any]:
+        return evaluator(resource if isinstance(resource, list) else [resource])
+
+    return evaluate
+
+
+def compile_native_steps(expression: str) -> List[Tuple[str, Evaluator]]:
+    """Compile an expression of the supported subset into navigation steps.
+
+    Applying the steps in order to the input collection (``[resource]``)
+    gives the expression's result. Steps are keyed by their normalized
+    source text, so expressions sharing a prefix (``name.where(use='official')``
+    in ``name.where(use='official').family`` and
+    ``name.where(use='official').given``) have equal keys for it and the
+    shared steps can be evaluated once. An expression that is not a plain
+    path, e.g. a comparison, is a single step.
+
+    Args:
+        expression: FHIRPath expression string.
+
+    Returns:
+        ``(key, evaluator)`` pairs in application order.
+
+    Raises:
+        UnsupportedExpression: If the expression is outside the subset.
+    """
+    whole = _Parser(expression)
+    evaluator = whole.parse()
+    parser = _Parser(expression)
+    try:
+        steps = parser.parse_path_steps()
+        if parser.position == len(parser.tokens):
+            return steps
+    except UnsupportedExpression:
+        pass
+    return [(whole._source(0), evaluator)]
@@ -59,9 +59,35 @@ def configure_logging():
     return logging.getLogger()
 
 
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger adapter that accepts structured context as keyword arguments.
+
+    Calls such as ``logger.info("Fetched page", page=3)`` are translated into
+    ``extra={"extras": {"page": 3}}`` so the JSON formatter can emit them as
+    top-level fields.
+    """
+
+    _RESERVED_KWARGS = {"exc_info", "stack_info", "stacklevel", "extra"}
+
+    def __init__(self, logger):
+        super().__init__(logger, {})
+
+    def process(self, msg, kwargs):
+        context = {
+            key: kwargs.pop(key)
+            for key in list(kwargs)
+            if key not in self._RESERVED_KWARGS
+        }
+        if context:
+            extra = dict(kwargs.get("extra") or {})
+            extra["extras"] = {**extra.get("extras", {}), **context}
+            kwargs["extra"] = extra
+        return msg, kwargs
+
+
 def get_logger(name):
     """Get a logger with the specified name, configured for JSON output."""
-    return logging.getLogger(name)
+    return StructuredLogger(logging.getLogger(name))
 
 
 def log_with_context(logger, level, message, **context):
@@ -0,0 +1,226 @@
+"""
+Client-side rate limiting for FHIR API requests.
+
+This module provides a token-bucket rate limiter that can be shared by threads
+and asyncio tasks, so that parallel extraction stays within the configured
+``requests_per_minute`` quota instead of discovering it through 429 responses.
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Mapping, Optional
+
+from epic_fhir_integration.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Reset values above this are absolute epoch seconds rather than deltas
+_EPOCH_THRESHOLD = 10 ** 9
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After header value into a delay in seconds.
+
+    Args:
+        value: Header value, either delta-seconds or an HTTP-date.
+        now: Optional current epoch time, used for HTTP-date values.
+
+    Returns:
+        Delay in seconds, or None if the value cannot be parsed.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+class TokenBucketRateLimiter:
+    """Thread-safe and asyncio-safe token-bucket rate limiter.
+
+    Each request reserves a token. When the bucket is empty the reservation
+    goes into debt and the caller waits until the debt is repaid, which keeps
+    concurrent callers in FIFO order without holding the lock while sleeping.
+    The limiter also adapts to server feedback: Retry-After pauses all callers,
+    rate-limit headers cap the available tokens, and 429 responses halve the
+    effective rate, which then recovers gradually on successful responses.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 300,
+        burst: Optional[int] = None,
+        min_rate_fraction: float = 0.1,
+        recovery_step: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a new rate limiter.
+
+        Args:
+            requests_per_minute: Target request rate.
+            burst: Maximum number of tokens that can accumulate. Defaults to
+                   one second's worth of requests (at least 1).
+            min_rate_fraction: Lowest fraction of the target rate that 429
+                               backoff can reduce the effective rate to.
+            recovery_step: Fraction of the target rate restored per successful
+                           response after a backoff.
+            clock: Monotonic clock function, injectable for testing.
+        """
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+
+        self.target_rate = requests_per_minute / 60.0
+        self.rate = self.target_rate
+        self.capacity = float(burst or max(1, int(self.target_rate)))
+        self.min_rate = self.target_rate * min_rate_fraction
+        self.recovery_step = self.target_rate * recovery_step
+        self._clock = clock
+
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def requests_per_minute(self) -> float:
+        """Current effective request rate per minute."""
+        return self.rate * 60.0
+
+    def _refill(self, now: float) -> None:
+        # No tokens accrue while paused, so callers queued behind a pause
+        # resume at the steady rate instead of as a burst
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(self.capacity, self._tokens + (now - start) * self.rate)
+        self._updated = max(self._updated, now)
+
+    def reserve(self) -> float:
+        """Reserve a token and return how long the caller must wait for it.
+
+        Returns:
+            Wait time in seconds (0 if a token is immediately available).
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(0.0, self._paused_until - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return wait
+
+    def acquire(self) -> float:
+        """Block the calling thread until a request may be sent.
+
+        Returns:
+            Time spent waiting in seconds.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Wait, without blocking the event loop, until a request may be sent.
+
+        Returns:
+            Time spent waiting in seconds.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds.
+
+        Args:
+            seconds: Pause duration.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+    def update_from_response(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Adapt the limiter to a server response.
+
+        Args:
+            status_code: HTTP status code of the response.
+            headers: Response headers.
+        """
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        remaining = headers.get("X-RateLimit-Remaining", headers.get("RateLimit-Remaining"))
+        reset = headers.get("X-RateLimit-Reset", headers.get("RateLimit-Reset"))
+
+        if status_code == 429:
+            with self._lock:
+                self.rate = max(self.min_rate, self.rate / 2)
+            logger.warning("Rate limited by server",
+                           retry_after=retry_after,
+                           requests_per_minute=self.requests_per_minute)
+            self.pause(retry_after if retry_after is not None else 60.0 / self.requests_per_minute)
+            return
+
+        if retry_after is not None and status_code == 503:
+            self.pause(retry_after)
+
+        if remaining is not None:
+            try:
+                remaining_count = float(remaining)
+            except ValueError:
+                remaining_count = None
+            if remaining_count is not None:
+                with self._lock:
+                    self._tokens = min(self._tokens, remaining_count)
+                if remaining_count <= 0 and reset is not None:
+                    try:
+                        reset_value = float(reset)
+                    except ValueError:
+                        reset_value = None
+                    if reset_value is not None:
+                        if reset_value > _EPOCH_THRESHOLD:
+                            reset_value -= time.time()
+                        self.pause(max(0.0, reset_value))
+
+        if status_code < 400 and self.rate < self.target_rate:
+            with self._lock:
+                self.rate = min(self.target_rate, self.rate + self.recovery_step)
+
+
+# Limiters shared by every client talking to the same API
+_shared_limiters: Dict[str, TokenBucketRateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(
+    name: str = "default",
+    requests_per_minute: float = 300,
+    burst: Optional[int] = None,
+) -> TokenBucketRateLimiter:
+    """Get a process-wide rate limiter, creating it on first use.
+
+    Args:
+        name: Limiter name, typically one per API endpoint.
+        requests_per_minute: Target rate used when the limiter is created.
+        burst: Optional burst capacity used when the limiter is created.
+
+    Returns:
+        Shared TokenBucketRateLimiter instance.
+    """
+    with _shared_lock:
+        if name not in _shared_limiters:
+            _shared_limiters[name] = TokenBucketRateLimiter(requests_per_minute, burst=burst)
+        return _shared_limiters[name]
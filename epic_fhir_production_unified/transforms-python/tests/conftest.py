@@ -0,0 +1,46 @@
+"""
+Shared fixtures for the transforms-python test suite.
+"""
+
+import pytest
+
+from epic_fhir_integration.testing.replay_server import Recording, ReplayFHIRServer
+
+
+def stub_server(resources=None, **options):
+    """Build a replay server with small pages and export files for the tests."""
+    options = {
+        "page_size": 2,
+        "export_file_size": 3,
+        "transaction_time": "2023-02-01T00:00:00Z",
+        **options,
+    }
+    return ReplayFHIRServer(Recording(resources), **options)
+
+
+@pytest.fixture
+def observation_resources():
+    """Provide a small set of Observation resources."""
+    return [
+        {
+            "resourceType": "Observation",
+            "id": f"obs-{i}",
+            "meta": {"lastUpdated": f"2023-01-0{1 + i % 9}T12:00:00Z"},
+            "status": "final",
+            "subject": {"reference": "Patient/patient-1"},
+        }
+        for i in range(7)
+    ]
+
+
+@pytest.fixture
+def fhir_stub_server(observation_resources):
+    """Run a replay FHIR server for the duration of a test."""
+    server = stub_server(
+        resources={
+            "Observation": observation_resources,
+            "Patient": [{"resourceType": "Patient", "id": "patient-1"}],
+        }
+    ).start()
+    yield server
+    server.stop()
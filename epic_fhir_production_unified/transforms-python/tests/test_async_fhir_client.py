@@ -0,0 +1,129 @@
+"""
+Tests for the asynchronous FHIR client against a local stub server.
+"""
+
+import asyncio
+
+import pytest
+
+from epic_fhir_integration.infrastructure.api_clients import async_fhir_client
+from epic_fhir_integration.infrastructure.api_clients.async_fhir_client import (
+    AsyncFHIRClient,
+)
+from epic_fhir_integration.infrastructure.api_clients.jwt_auth import TokenManager
+from tests.test_token_manager import counting_fetch
+
+pytestmark = pytest.mark.skipif(async_fhir_client.httpx is None, reason="httpx is not installed")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncFHIRClient:
+    """Tests for AsyncFHIRClient."""
+
+    def test_get_resource(self, fhir_stub_server):
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url, access_token="t") as client:
+                return await client.get_resource("Patient", "patient-1")
+
+        resource = run(scenario())
+        assert resource["id"] == "patient-1"
+        _, _, headers = fhir_stub_server.requests[0]
+        assert headers["Authorization"] == "Bearer t"
+
+    def test_search_resources_follows_pagination(self, fhir_stub_server, observation_resources):
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url) as client:
+                return [r async for r in client.search_resources("Observation")]
+
+        resources = run(scenario())
+        assert [r["id"] for r in resources] == [r["id"] for r in observation_resources]
+        assert len(fhir_stub_server.requests) == 4
+
+    def test_search_resources_limits(self, fhir_stub_server):
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url) as client:
+                by_page = [r async for r in client.search_resources("Observation", page_limit=2)]
+                by_total = [r async for r in client.search_resources("Observation", total_limit=3)]
+                return by_page, by_total
+
+        by_page, by_total = run(scenario())
+        assert len(by_page) == 4
+        assert len(by_total) == 3
+
+    def test_batch_get_resources_skips_missing(self, fhir_stub_server):
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url, max_retries=0) as client:
+                return await client.batch_get_resources(
+                    "Observation", ["obs-0", "obs-1", "missing"], max_concurrency=2
+                )
+
+        results = run(scenario())
+        assert set(results) == {"obs-0", "obs-1"}
+
+    def test_connections_are_reused(self, fhir_stub_server):
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url, max_connections=2) as client:
+                await client.batch_get_resources(
+                    "Observation", [f"obs-{i % 7}" for i in range(20)]
+                )
+
+        run(scenario())
+        assert len(fhir_stub_server.requests) == 20
+        assert len(fhir_stub_server.client_addresses) <= 2
+
+    def test_retries_retryable_status(self, fhir_stub_server):
+        fhir_stub_server.fail_next(503, headers={"Retry-After": "0"})
+
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url) as client:
+                return await client.get_resource("Patient", "patient-1")
+
+        assert run(scenario())["id"] == "patient-1"
+        assert len(fhir_stub_server.requests) == 2
+
+    def test_token_manager_is_asked_per_request(self, fhir_stub_server):
+        fetch, calls = counting_fetch()
+        manager = TokenManager(fetch, background_refresh=False)
+
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url, token_provider=manager) as client:
+                await client.batch_get_resources("Observation", ["obs-0", "obs-1", "obs-2"])
+                manager.get_token(force_refresh=True)
+                await client.get_resource("Patient", "patient-1")
+
+        run(scenario())
+        assert calls == [1, 2]
+        assert [r[2]["Authorization"] for r in fhir_stub_server.requests] == [
+            "Bearer token-1"] * 3 + ["Bearer token-2"]
+
+    def test_401_is_replayed_with_new_token(self, fhir_stub_server):
+        fetch, calls = counting_fetch()
+        manager = TokenManager(fetch, background_refresh=False)
+
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url, token_provider=manager,
+                                       max_retries=0) as client:
+                await client.get_resource("Patient", "patient-1")
+                fhir_stub_server.fail_next(401)
+                return await client.get_resource("Patient", "patient-1")
+
+        assert run(scenario())["id"] == "patient-1"
+        assert [r[2]["Authorization"] for r in fhir_stub_server.requests] == [
+            "Bearer token-1", "Bearer token-1", "Bearer token-2"]
+
+    def test_401_is_replayed_only_once(self, fhir_stub_server):
+        fetch, calls = counting_fetch()
+        manager = TokenManager(fetch, background_refresh=False)
+
+        async def scenario():
+            async with AsyncFHIRClient(fhir_stub_server.base_url, token_provider=manager) as client:
+                fhir_stub_server.fail_next(401, count=3)
+                await client.get_resource("Patient", "patient-1")
+
+        with pytest.raises(async_fhir_client.httpx.HTTPStatusError):
+            run(scenario())
+        assert calls == [1, 2]
+        assert len(fhir_stub_server.requests) == 2
@@ -0,0 +1,123 @@
+"""
+Tests for chunked FHIR batch execution.
+"""
+
+import pytest
+import requests
+
+from epic_fhir_integration.infrastructure.api_clients.batch_executor import (
+    BatchExecutor,
+    create_batch_bundle,
+    is_size_rejection,
+    process_batch_response,
+)
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from tests.conftest import stub_server
+
+
+@pytest.fixture
+def many_observations():
+    return [
+        {"resourceType": "Observation", "id": f"obs-{i}", "status": "final"}
+        for i in range(250)
+    ]
+
+
+class TestBatchBundles:
+    """Tests for building and reading batch Bundles."""
+
+    def test_create_batch_bundle(self):
+        bundle = create_batch_bundle([
+            {"method": "GET", "url": "Patient/1"},
+            {"method": "POST", "url": "Observation", "resource": {"resourceType": "Observation"}},
+        ])
+
+        assert bundle["type"] == "batch"
+        assert bundle["entry"][0] == {"request": {"method": "GET", "url": "Patient/1"}}
+        assert bundle["entry"][1]["fullUrl"].startswith("urn:uuid:")
+        assert bundle["entry"][1]["resource"] == {"resourceType": "Observation"}
+
+    def test_process_batch_response_rejects_short_response(self):
+        response = {"resourceType": "Bundle", "type": "batch-response",
+                    "entry": [{"response": {"status": "200 OK"}}]}
+
+        with pytest.raises(ValueError):
+            process_batch_response(response, [0, 1])
+
+
+class TestBatchExecutor:
+    """Tests for BatchExecutor against the stub server."""
+
+    def test_chunks_by_entries_and_payload(self):
+        executor = BatchExecutor(client=None, max_entries=3, max_payload_bytes=120)
+        requests = [{"method": "GET", "url": f"Patient/{i}"} for i in range(5)]
+        requests.append({"method": "PUT", "url": "Patient/x", "resource": {"text": "x" * 200}})
+
+        assert executor._chunk(requests) == [[0, 1, 2], [3, 4], [5]]
+
+    def test_results_keep_request_order(self, many_observations):
+        server = stub_server(resources={"Observation": many_observations}).start()
+        try:
+            client = FHIRClient(server.base_url)
+            ids = [f"obs-{i}" for i in reversed(range(250))] + ["missing"]
+
+            results = client.execute_batch(
+                [{"method": "GET", "url": f"Observation/{i}"} for i in ids],
+                max_entries=50,
+                max_workers=4,
+            )
+        finally:
+            server.stop()
+
+        assert [r.resource["id"] for r in results[:-1]] == ids[:-1]
+        assert results[-1].status.startswith("404")
+        assert [r.index for r in results] == list(range(251))
+        assert len(server.requests) == 6
+
+    def test_rejected_chunks_are_split(self, many_observations):
+        server = stub_server(resources={"Observation": many_observations},
+                                max_batch_entries=30).start()
+        try:
+            client = FHIRClient(server.base_url)
+            resources = client.batch_get_resources(
+                "Observation", [f"obs-{i}" for i in range(100)], use_batch=True
+            )
+        finally:
+            server.stop()
+
+        assert sorted(resources) == sorted(f"obs-{i}" for i in range(100))
+        # One chunk of 100 rejected, two of 50 rejected, four of 25 accepted
+        assert len(server.requests) == 7
+
+    def test_failing_chunk_is_reported_without_splitting(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=1)
+        fhir_stub_server.fail_next(503, count=2)
+
+        results = client.execute_batch(
+            [{"method": "GET", "url": "Observation/obs-0"},
+             {"method": "GET", "url": "Observation/obs-1"}],
+            max_workers=1,
+        )
+
+        assert [r.status for r in results] == ["error", "error"]
+        assert results[0].outcome["resourceType"] == "OperationOutcome"
+        # The original attempt and the client's one retry, no re-split halves
+        assert len(fhir_stub_server.requests) == 2
+
+    @pytest.mark.parametrize("status_code, body, expected", [
+        (413, "", True),
+        (400, '{"issue": [{"diagnostics": "Bundle contains too many entries"}]}', True),
+        (400, "Request entity exceeds the maximum size", True),
+        (400, '{"issue": [{"diagnostics": "Invalid resource"}]}', False),
+        (401, "", False),
+        (503, "too many requests", False),
+    ])
+    def test_is_size_rejection(self, status_code, body, expected):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = body.encode("utf-8")
+
+        assert is_size_rejection(requests.HTTPError(response=response)) is expected
+
+    def test_other_errors_are_not_size_rejections(self):
+        assert not is_size_rejection(ValueError("Invalid batch response bundle"))
@@ -0,0 +1,217 @@
+"""
+Tests for Bulk Data $export ingestion against the stub server.
+"""
+
+import json
+from datetime import date
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from epic_fhir_integration.domain.bronze.full_refresh import full_refresh
+from epic_fhir_integration.domain.bronze.ndjson_writer import iter_ndjson, read_manifest
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_all_resources_to_ndjson,
+    read_watermark,
+)
+from epic_fhir_integration.infrastructure.api_clients.bulk_export import (
+    BulkExportClient,
+    BulkExportError,
+    BulkExportNotSupported,
+)
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+
+INGEST_DATE = date(2023, 2, 1)
+
+
+def read_ndjson(paths):
+    resources = []
+    for path in paths:
+        with open(path) as f:
+            resources.extend(json.loads(line) for line in f if line.strip())
+    return resources
+
+
+class TestBulkExportClient:
+    """Tests for BulkExportClient."""
+
+    def test_export_downloads_files_into_bronze_layout(self, fhir_stub_server, tmp_path):
+        fhir_stub_server.export_polls = 2
+        delays = []
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url), sleep=delays.append)
+
+        result = exporter.export(tmp_path, resource_types=["Observation", "Patient"],
+                                 ingest_date=INGEST_DATE)
+
+        # 3 export files of Observations are written through one writer
+        partition = tmp_path / "Observation" / "ingest_date=2023-02-01"
+        assert result.files["Observation"] == [partition / "bulk-00000.ndjson"]
+        assert len(result.files["Patient"]) == 1
+        assert sorted(p.name for p in partition.iterdir()) == ["_manifest.json", "bulk-00000.ndjson"]
+        assert len(read_ndjson(result.files["Observation"])) == 7
+        assert result.resource_counts == {"Observation": 7, "Patient": 1}
+        assert result.transaction_time == "2023-02-01T00:00:00Z"
+        assert delays == [0, 0]
+
+    def test_export_commits_manifest_with_watermark(self, fhir_stub_server, tmp_path):
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url), sleep=lambda _: None)
+
+        exporter.export(tmp_path, resource_types=["Observation"], ingest_date=INGEST_DATE)
+
+        partition = tmp_path / "Observation" / "ingest_date=2023-02-01"
+        manifest = read_manifest(partition)
+        assert manifest["complete"]
+        assert [f["records"] for f in manifest["files"]] == [7]
+        assert manifest["metadata"]["transaction_time"] == "2023-02-01T00:00:00Z"
+        watermark = read_watermark(partition)
+        assert watermark.last_updated == "2023-02-01T00:00:00Z"
+        assert watermark.boundary_ids is None
+
+    def test_export_files_can_be_compressed(self, fhir_stub_server, tmp_path):
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url),
+                                    compression="gzip", sleep=lambda _: None)
+
+        result = exporter.export(tmp_path, resource_types=["Observation"],
+                                 ingest_date=INGEST_DATE)
+
+        [path] = result.files["Observation"]
+        assert path.name == "bulk-00000.ndjson.gz"
+        assert sorted(r["id"] for r in iter_ndjson(path)) == [f"obs-{i}" for i in range(7)]
+
+    def test_failed_download_keeps_previous_partition(self, fhir_stub_server, tmp_path):
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url, max_retries=0),
+                                    download_workers=1, sleep=lambda _: None)
+        first = exporter.export(tmp_path, resource_types=["Observation"], ingest_date=INGEST_DATE)
+        manifest = exporter.poll(exporter.kick_off(resource_types=["Observation"]))
+        fhir_stub_server.fail_next(500)
+
+        with pytest.raises(BulkExportError):
+            exporter.download(manifest, tmp_path, INGEST_DATE)
+
+        partition = tmp_path / "Observation" / "ingest_date=2023-02-01"
+        assert read_manifest(partition)["complete"]
+        assert len(read_ndjson(first.files["Observation"])) == 7
+        assert not read_manifest(tmp_path / "Observation" / "_ingest_date=2023-02-01.staging")["complete"]
+
+    def test_kick_off_sends_async_headers(self, fhir_stub_server):
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url))
+
+        exporter.kick_off(resource_types=["Observation"], since="2023-01-01T00:00:00Z",
+                          group_id="cohort-1")
+
+        _, path, headers = fhir_stub_server.requests[-1]
+        assert urlparse(path).path == "/Group/cohort-1/$export"
+        assert parse_qs(urlparse(path).query) == {
+            "_type": ["Observation"], "_since": ["2023-01-01T00:00:00Z"]}
+        assert headers["Prefer"] == "respond-async"
+        assert headers["Accept"] == "application/fhir+json"
+
+    def test_poll_backs_off_without_retry_after(self):
+        class Response:
+            def __init__(self, status_code):
+                self.status_code = status_code
+                self.headers = {}
+                self.text = ""
+
+            def json(self):
+                return {"output": []}
+
+        class Client:
+            responses = [Response(202), Response(202), Response(202), Response(200)]
+
+            def _request(self, method, url, **kwargs):
+                return self.responses.pop(0)
+
+        delays = []
+        exporter = BulkExportClient(Client(), poll_interval=1, max_poll_interval=3,
+                                    sleep=delays.append)
+
+        assert exporter.poll("status") == {"output": []}
+        assert delays == [1, 2, 3]
+
+    def test_poll_timeout_cancels_export(self, fhir_stub_server, tmp_path):
+        fhir_stub_server.export_polls = 100
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url),
+                                    poll_timeout=0, sleep=lambda _: None)
+
+        with pytest.raises(BulkExportError):
+            exporter.export(tmp_path)
+
+        assert any(method == "DELETE" for method, _, _ in fhir_stub_server.requests)
+
+    @pytest.mark.parametrize("status", [400, 404, 405, 501])
+    def test_rejected_kick_off(self, fhir_stub_server, status):
+        fhir_stub_server.fail_next(status)
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url, max_retries=0))
+
+        with pytest.raises(BulkExportNotSupported):
+            exporter.kick_off()
+
+    @pytest.mark.parametrize("status", [403, 429, 503])
+    def test_failed_kick_off_is_not_unsupported(self, fhir_stub_server, status):
+        fhir_stub_server.fail_next(status)
+        exporter = BulkExportClient(FHIRClient(fhir_stub_server.base_url, max_retries=0))
+
+        with pytest.raises(requests.HTTPError):
+            exporter.kick_off()
+
+
+class TestFullRefresh:
+    """Tests for the full-refresh entry point."""
+
+    def test_uses_bulk_export_by_default(self, fhir_stub_server, tmp_path):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        result = full_refresh(tmp_path, ["Observation"], client=client, ingest_date=INGEST_DATE)
+
+        assert len(read_ndjson(result.files["Observation"])) == 7
+        assert fhir_stub_server.exports
+
+    @pytest.mark.parametrize("use_bulk_export", [True, False])
+    def test_rerun_replaces_partition(self, fhir_stub_server, tmp_path, use_bulk_export):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        for _ in range(2):
+            result = full_refresh(tmp_path, ["Observation"], client=client,
+                                  use_bulk_export=use_bulk_export, ingest_date=INGEST_DATE)
+
+        partition = tmp_path / "Observation" / "ingest_date=2023-02-01"
+        assert result.resource_counts == {"Observation": 7}
+        assert sum(f["records"] for f in read_manifest(partition)["files"]) == 7
+        assert len(read_ndjson(sorted(partition.glob("*.ndjson")))) == 7
+        assert sorted(p.name for p in (tmp_path / "Observation").iterdir()) == [
+            "ingest_date=2023-02-01"]
+
+    def test_incremental_run_continues_from_full_refresh(self, fhir_stub_server, tmp_path):
+        client = FHIRClient(fhir_stub_server.base_url)
+        full_refresh(tmp_path, ["Observation"], client=client, ingest_date=INGEST_DATE)
+        fhir_stub_server.recording.add({"resourceType": "Observation", "id": "obs-new",
+                                        "meta": {"lastUpdated": "2023-02-02T00:00:00Z"}})
+
+        files = extract_all_resources_to_ndjson(tmp_path, client, ["Observation"],
+                                                incremental=True)["Observation"]
+
+        ids = [r["id"] for f in files for r in iter_ndjson(tmp_path / "Observation" / f.path)]
+        assert ids == ["obs-new"]
+        assert "_lastUpdated=ge2023-02-01T00%3A00%3A00Z" in fhir_stub_server.requests[-1][1]
+        assert read_watermark(tmp_path / "Observation").last_updated == "2023-02-02T00:00:00Z"
+
+    def test_outage_does_not_fall_back_to_paged_search(self, fhir_stub_server, tmp_path):
+        fhir_stub_server.fail_next(503)
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0)
+
+        with pytest.raises(requests.HTTPError):
+            full_refresh(tmp_path, ["Observation"], client=client, ingest_date=INGEST_DATE)
+
+        assert len(fhir_stub_server.requests) == 1
+
+    def test_falls_back_to_paged_search(self, fhir_stub_server, tmp_path):
+        fhir_stub_server.fail_next(404)
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0)
+
+        result = full_refresh(tmp_path, ["Observation"], client=client, ingest_date=INGEST_DATE)
+
+        resources = read_ndjson(result.files["Observation"])
+        assert [r["id"] for r in resources] == [f"obs-{i}" for i in range(7)]
+        assert not fhir_stub_server.exports
@@ -0,0 +1,152 @@
+"""
+Tests for durable extraction cursors and resumable extraction.
+"""
+
+import pytest
+
+from epic_fhir_integration.domain.bronze.checkpoint_store import (
+    CheckpointStore,
+    ExtractionCursor,
+)
+from epic_fhir_integration.domain.bronze.ndjson_writer import NDJSONWriter, iter_ndjson
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_resource_to_ndjson,
+)
+from epic_fhir_integration.domain.bronze.time_windows import extract_resource_windowed
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+
+
+def read_ids(directory, files):
+    return [r["id"] for f in files for r in iter_ndjson(directory / f.path)]
+
+
+class TestCheckpointStore:
+    """Tests for CheckpointStore."""
+
+    def test_round_trip_survives_reopen(self, tmp_path):
+        store = CheckpointStore(tmp_path / "checkpoints.db")
+        store.save(ExtractionCursor("Observation", window="w1", next_url="http://x/next",
+                                    records=4, writer_position={"file": "part-00000.ndjson"}))
+        store.close()
+
+        cursor = CheckpointStore(tmp_path / "checkpoints.db").get("Observation", "w1")
+
+        assert cursor.next_url == "http://x/next"
+        assert cursor.records == 4
+        assert cursor.writer_position == {"file": "part-00000.ndjson"}
+        assert not cursor.is_complete
+
+    def test_list_and_delete(self):
+        store = CheckpointStore(":memory:")
+        store.save(ExtractionCursor("Observation", window="a"))
+        store.save(ExtractionCursor("Observation", window="b"))
+        store.save(ExtractionCursor("Patient"))
+
+        assert [c.window for c in store.list_cursors("Observation")] == ["a", "b"]
+        store.delete("Observation")
+        assert [c.resource_type for c in store.list_cursors()] == ["Patient"]
+
+
+class TestResumableExtraction:
+    """Tests for resuming extraction from durable page cursors."""
+
+    @pytest.mark.parametrize("compression", [None, "gzip"])
+    def test_resumes_from_failed_page(self, fhir_stub_server, tmp_path, compression):
+        store = CheckpointStore(tmp_path / "checkpoints.db")
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0)
+        output = tmp_path / "Observation"
+
+        # Fail the third page: pages 1 and 2 (obs-0..obs-3) are persisted
+        original_fetch = client._fetch_pages
+
+        def failing_fetch(*args, **kwargs):
+            for number, page in enumerate(original_fetch(*args, **kwargs)):
+                if number == 2:
+                    raise ConnectionError("connection reset")
+                yield page
+
+        client._fetch_pages = failing_fetch
+        with pytest.raises(ConnectionError):
+            extract_resource_to_ndjson(client, output, "Observation", compression=compression,
+                                       checkpoint_store=store, max_file_bytes=120)
+        cursor = store.get("Observation")
+        assert cursor.records == 4
+        assert "_page=4" in cursor.next_url
+
+        client._fetch_pages = original_fetch
+        fhir_stub_server.requests.clear()
+        files = extract_resource_to_ndjson(client, output, "Observation", compression=compression,
+                                           checkpoint_store=store, max_file_bytes=120)
+
+        assert read_ids(output, files) == [f"obs-{i}" for i in range(7)]
+        assert len(fhir_stub_server.requests) == 2
+        assert store.get("Observation").is_complete
+
+    def test_complete_extraction_is_not_repeated(self, fhir_stub_server, tmp_path):
+        store = CheckpointStore(":memory:")
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        extract_resource_to_ndjson(client, tmp_path, "Observation", checkpoint_store=store)
+        fhir_stub_server.requests.clear()
+        files = extract_resource_to_ndjson(client, tmp_path, "Observation", checkpoint_store=store)
+
+        assert not fhir_stub_server.requests
+        assert sum(f.records for f in files) == 7
+
+    def test_writer_recover_discards_unsaved_records(self, tmp_path):
+        writer = NDJSONWriter(tmp_path, fsync=False)
+        writer.write_many({"id": str(i)} for i in range(3))
+        position = writer.checkpoint()
+        writer.write_many({"id": str(i)} for i in range(3, 5))
+        writer.checkpoint()
+        # Simulate a crash: the writer is never closed
+
+        recovered = NDJSONWriter(tmp_path, fsync=False)
+        recovered.recover(position)
+        recovered.write({"id": "3"})
+        files = recovered.close()
+
+        assert read_ids(tmp_path, files) == ["0", "1", "2", "3"]
+
+    def test_windowed_extraction_persists_windows(self, fhir_stub_server, tmp_path):
+        store = CheckpointStore(":memory:")
+        client = FHIRClient(fhir_stub_server.base_url)
+        window_args = dict(since="2023-01-01T00:00:00Z", until="2023-01-08T00:00:00Z",
+                           num_windows=7, checkpoint_store=store, output_dir=tmp_path)
+
+        extract_resource_windowed(client, "Observation", **window_args)
+        fhir_stub_server.requests.clear()
+        result = extract_resource_windowed(client, "Observation", **window_args)
+
+        assert len(store.list_cursors("Observation")) == 7
+        assert not fhir_stub_server.requests
+        assert result.resources == []
+        assert result.resource_count == 7
+        assert sorted(r["id"] for r in result.iter_resources()) == [f"obs-{i}" for i in range(7)]
+        assert result.max_last_updated == "2023-01-07T12:00:00Z"
+
+    def test_windowed_rerun_returns_persisted_and_retried_windows(self, fhir_stub_server, tmp_path):
+        store = CheckpointStore(":memory:")
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0)
+        window_args = dict(since="2023-01-01T00:00:00Z", until="2023-01-08T00:00:00Z",
+                           num_windows=7, max_workers=1, checkpoint_store=store,
+                           output_dir=tmp_path)
+        fhir_stub_server.fail_next(404)
+
+        first = extract_resource_windowed(client, "Observation", **window_args)
+        fhir_stub_server.requests.clear()
+        rerun = extract_resource_windowed(client, "Observation", **window_args)
+
+        assert len(first.failed_windows) == 1
+        assert first.resource_count == 6
+        assert not rerun.failed_windows
+        assert rerun.resource_count == 7
+        assert len(list(rerun.iter_resources())) == 7
+        assert len(fhir_stub_server.requests) == 1
+
+    def test_windowed_checkpoints_require_output_dir(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        with pytest.raises(ValueError):
+            extract_resource_windowed(client, "Observation", since="2023-01-01T00:00:00Z",
+                                      checkpoint_store=CheckpointStore(":memory:"))
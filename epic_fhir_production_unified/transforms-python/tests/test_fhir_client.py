@@ -0,0 +1,86 @@
+"""
+Tests for the synchronous FHIR client against a local stub server.
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import (
+    FHIRClient,
+    _prefetch,
+    get_next_link,
+)
+
+
+class TestSearchPrefetch:
+    """Tests for prefetching search pages."""
+
+    def test_prefetch_preserves_order(self, fhir_stub_server, observation_resources):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        resources = list(client.search_resources("Observation", prefetch_pages=2))
+
+        assert [r["id"] for r in resources] == [r["id"] for r in observation_resources]
+
+    @pytest.mark.parametrize("prefetch_pages", [0, 1, 3])
+    def test_limits_are_preserved(self, fhir_stub_server, prefetch_pages):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        by_page = list(client.search_resources(
+            "Observation", page_limit=2, prefetch_pages=prefetch_pages))
+        by_total = list(client.search_resources(
+            "Observation", total_limit=3, prefetch_pages=prefetch_pages))
+
+        assert len(by_page) == 4
+        assert [r["id"] for r in by_total] == ["obs-0", "obs-1", "obs-2"]
+
+    def test_prefetch_depth_bounds_read_ahead(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        search = client.search_resources("Observation", prefetch_pages=1)
+        next(search)
+        time.sleep(0.3)
+
+        # One page consumed, one buffered and at most one in flight
+        assert len(fhir_stub_server.requests) <= 3
+        search.close()
+
+    def test_get_all_resources_with_prefetch(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        assert len(client.get_all_resources("Observation", prefetch_pages=2)) == 7
+
+    def test_errors_reach_the_consumer(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0)
+        fhir_stub_server.fail_next(404)
+
+        with pytest.raises(requests.HTTPError):
+            list(client.search_resources("Observation", prefetch_pages=2))
+
+
+class TestPrefetchHelper:
+    """Tests for the background prefetch helper."""
+
+    def test_closing_stops_worker(self):
+        produced = []
+
+        def numbers():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        items = _prefetch(numbers(), depth=2)
+        assert next(items) == 0
+        items.close()
+        time.sleep(0.3)
+
+        assert len(produced) < 10
+        assert not any(t.name == "fhir-page-prefetch" for t in threading.enumerate())
+
+    def test_get_next_link(self):
+        bundle = {"link": [{"relation": "self", "url": "a"}, {"relation": "next", "url": "b"}]}
+        assert get_next_link(bundle) == "b"
+        assert get_next_link({}) is None
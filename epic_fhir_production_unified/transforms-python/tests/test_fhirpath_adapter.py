@@ -0,0 +1,151 @@
+"""
+Tests for the FHIRPath adapter.
+"""
+
+import pytest
+
+from epic_fhir_integration.utils import fhirpath_adapter
+from epic_fhir_integration.utils.fhirpath_adapter import (
+    CompiledFHIRPath,
+    FHIRPathAdapter,
+    compile_path,
+    compile_paths,
+    extract_many,
+    extract_many_columns,
+    to_fhir_dict,
+)
+from tests.test_fhirpath_conformance import EXPRESSIONS, RESOURCES
+
+
+@pytest.fixture
+def patient():
+    return {
+        "resourceType": "Patient",
+        "id": "p-1",
+        "gender": "female",
+        "name": [
+            {"use": "nickname", "given": ["Annie"]},
+            {"use": "official", "family": "Smith", "given": ["Anne", "Marie"]},
+        ],
+    }
+
+
+class TestCompilePath:
+    """Tests for compiled expressions."""
+
+    def test_compiles_once(self, patient):
+        compile_path.cache_clear()
+
+        first = compile_path("name.where(use='official').family")
+        again = FHIRPathAdapter.compile("name.where(use='official').family")
+
+        assert first is again
+        assert isinstance(first, CompiledFHIRPath)
+        assert compile_path.cache_info().misses == 1
+        assert first(patient) == ["Smith"]
+        assert first.first({"resourceType": "Patient"}, default="?") == "?"
+
+    def test_adapter_uses_compiled_expressions(self, patient):
+        compile_path.cache_clear()
+        adapter = FHIRPathAdapter()
+
+        for _ in range(3):
+            assert adapter.extract_first("name.given", patient) == "Annie"
+
+        assert compile_path.cache_info().hits == 2
+
+    def test_invalid_expression_returns_no_results(self, patient):
+        with pytest.raises(Exception):
+            compile_path("$$")
+
+        assert FHIRPathAdapter().evaluate("$$", patient) == []
+        assert FHIRPathAdapter().evaluate("name.unknown()", patient) == []
+
+
+class TestModelResources:
+    """Tests for evaluating fhir.resources models."""
+
+    @pytest.fixture
+    def model(self, patient):
+        from fhir.resources.patient import Patient
+
+        return Patient.parse_obj({**patient, "birthDate": "1980-02-29"})
+
+    def test_path_set_dumps_model_once(self, model, monkeypatch):
+        dumps = []
+        original = fhirpath_adapter._model_to_dict
+        monkeypatch.setattr(fhirpath_adapter, "_model_to_dict",
+                            lambda m: dumps.append(m) or original(m))
+
+        result = extract_many(model, {
+            "family": "name.where(use='official').family",
+            "birthDate": "birthDate",
+            "given": "name.given",
+        }, first=True)
+
+        assert result["family"] == "Smith"
+        assert result["birthDate"] == "1980-02-29"
+        assert len(dumps) == 1
+
+    def test_mutated_model_is_reevaluated(self, model):
+        adapter = FHIRPathAdapter(model)
+        assert adapter.evaluate("gender") == ["female"]
+
+        model.gender = "male"
+
+        assert adapter.evaluate("gender") == ["male"]
+
+    def test_dicts_are_used_as_is(self, patient):
+        assert to_fhir_dict(patient) is patient
+
+
+class TestExtractMany:
+    """Tests for evaluating several expressions in one pass."""
+
+    PATHS = {
+        "family": "name.where(use='official').family",
+        "given": "name.where(use='official').given.first()",
+        "nickname": "name.where(use='nickname').given",
+        "gender": "gender",
+        "is_female": "gender = 'female'",
+        "names": "name.given | name.family",
+        "missing": "telecom.value",
+    }
+
+    def test_shares_prefixes(self):
+        compiled = compile_paths(self.PATHS)
+
+        name = compiled._root.children["name"]
+        assert sorted(name.children) == ["where ( use = 'nickname' )", "where ( use = 'official' )"]
+        assert sorted(name.children["where ( use = 'official' )"].children) == ["family", "given"]
+        assert compile_paths(dict(self.PATHS)) is compiled
+
+    @pytest.mark.parametrize("resource_name", sorted(RESOURCES))
+    def test_matches_single_expressions(self, resource_name):
+        resource = RESOURCES[resource_name]
+        paths = {f"path_{i}": expression for i, expression in enumerate(EXPRESSIONS)}
+
+        results = extract_many(resource, paths)
+
+        assert results == {alias: compile_path(expression)(resource) for alias, expression in paths.items()}
+
+    def test_first_values_and_fallback(self, patient):
+        results = FHIRPathAdapter(patient).extract_many(self.PATHS, first=True, default="")
+
+        assert results == {
+            "family": "Smith",
+            "given": "Anne",
+            "nickname": "Annie",
+            "gender": "female",
+            "is_female": True,
+            "names": "Annie",
+            "missing": "",
+        }
+
+    def test_columns(self, patient):
+        other = {"resourceType": "Patient", "id": "p-2", "gender": "male"}
+
+        columns = extract_many_columns([patient, other], {"id": "id", "family": "name.family"})
+
+        assert columns == {"id": ["p-1", "p-2"], "family": ["Smith", None]}
+        assert extract_many_columns([other], {"given": "name.given"}, first=False) == {"given": [[]]}
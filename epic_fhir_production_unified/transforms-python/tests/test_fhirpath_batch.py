@@ -0,0 +1,83 @@
+"""
+Tests for columnar batch FHIRPath evaluation.
+"""
+
+import numpy as np
+import pytest
+
+from epic_fhir_integration.utils import fhirpath_batch
+from epic_fhir_integration.utils.fhirpath_adapter import extract_many_columns
+from epic_fhir_integration.utils.fhirpath_batch import evaluate_batch
+from tests.test_fhirpath_conformance import RESOURCES
+
+PATHS = {
+    "id": "id",
+    "family": "name.where(use='official').family",
+    "active": "active",
+    "heart_rate": "valueQuantity.value",
+    "components": "component.count()",
+    "names": "name.given | name.family",
+}
+
+
+@pytest.fixture
+def resources():
+    return [RESOURCES[name] for name in sorted(RESOURCES)] * 4
+
+
+class TestEvaluateBatch:
+    """Tests for evaluate_batch."""
+
+    def test_list_output_matches_extract_many_columns(self, resources):
+        columns = evaluate_batch(resources, PATHS, output="list")
+
+        assert columns == extract_many_columns(resources, PATHS)
+
+    def test_numpy_output(self):
+        observations = [
+            {"resourceType": "Observation", "id": "a", "valueQuantity": {"value": 72}, "status": "final"},
+            {"resourceType": "Observation", "id": "b", "valueQuantity": {"value": 80.5}, "status": "final"},
+            {"resourceType": "Observation", "id": "c", "status": "final"},
+        ]
+
+        columns = evaluate_batch(observations, {
+            "id": "id",
+            "value": "valueQuantity.value",
+            "final": "status = 'final'",
+            "count": "id.count()",
+        }, output="numpy")
+
+        assert columns["id"].dtype == object
+        assert list(columns["id"]) == ["a", "b", "c"]
+        assert columns["value"].dtype == np.float64
+        assert columns["value"][:2].tolist() == [72.0, 80.5]
+        assert np.isnan(columns["value"][2])
+        assert columns["final"].dtype == bool
+        assert columns["count"].dtype == np.int64
+
+    def test_processes(self, resources):
+        columns = evaluate_batch(resources, PATHS, output="list", processes=2, chunk_size=5)
+
+        assert columns == extract_many_columns(resources, PATHS)
+
+    def test_unknown_output(self, resources):
+        with pytest.raises(ValueError):
+            evaluate_batch(resources, PATHS, output="pandas")
+
+    def test_missing_dependency(self, resources, monkeypatch):
+        monkeypatch.setattr(fhirpath_batch, "pyarrow", None)
+
+        with pytest.raises(ImportError, match="pyarrow"):
+            evaluate_batch(resources, PATHS)
+
+    @pytest.mark.skipif(fhirpath_batch.pyarrow is None, reason="pyarrow is not installed")
+    def test_arrow_output(self, resources):
+        pa = fhirpath_batch.pyarrow
+        columns = evaluate_batch(resources, {**PATHS, "mixed": "identifier.value | valueQuantity.value"})
+        table = pa.table(columns)
+
+        assert table.num_rows == len(resources)
+        assert table.column("id").to_pylist() == [r["id"] for r in resources]
+        assert table.schema.field("heart_rate").type == pa.int64()
+        assert table.schema.field("mixed").type == pa.string()
+        assert table.column("mixed").to_pylist()[:3] == [None, "72", "MRN1"]
@@ -0,0 +1,172 @@
+"""
+Conformance tests comparing the native FHIRPath evaluator with fhirpathpy.
+"""
+
+import pytest
+
+from epic_fhir_integration.utils.fhirpath_adapter import compile_path
+from epic_fhir_integration.utils.fhirpath_native import (
+    UnsupportedExpression,
+    compile_native,
+    tokenize,
+)
+
+RESOURCES = {
+    "patient": {
+        "resourceType": "Patient",
+        "id": "p-1",
+        "active": True,
+        "gender": "female",
+        "birthDate": "1980-02-29",
+        "_birthDate": {"extension": [{"url": "http://example.org/precision", "valueCode": "day"}]},
+        "identifier": [
+            {"system": "urn:oid:1.2.3", "value": "MRN1"},
+            {"system": "http://hl7.org/fhir/sid/us-ssn", "value": "000-00-0000"},
+        ],
+        "name": [
+            {"use": "nickname", "given": ["Annie"]},
+            {"use": "official", "family": "O'Hara", "given": ["Anne", "Marie"]},
+        ],
+        "telecom": [],
+        "address": [{"city": "Madison", "state": "WI", "postalCode": "53703"}],
+    },
+    "observation": {
+        "resourceType": "Observation",
+        "id": "obs-1",
+        "status": "final",
+        "category": [{"coding": [{"system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                                  "code": "vital-signs"}]}],
+        "code": {"coding": [{"system": "http://loinc.org", "code": "8867-4", "display": "Heart rate"},
+                            {"system": "urn:local", "code": "HR"}],
+                 "text": "Heart rate"},
+        "subject": {"reference": "Patient/p-1"},
+        "effectiveDateTime": "2024-01-02T03:04:05Z",
+        "valueQuantity": {"value": 72, "unit": "/min"},
+        "component": [{"code": {"text": "a"}, "valueQuantity": {"value": 1.5}},
+                      {"code": {"text": "b"}, "valueQuantity": {"value": 2}}],
+    },
+    "condition": {
+        "resourceType": "Condition",
+        "id": "cond-1",
+        "clinicalStatus": {"coding": [{"code": "active"}]},
+        "code": {"coding": [{"system": "http://snomed.info/sct", "code": "44054006"}]},
+        "subject": {"reference": "Patient/p-1"},
+    },
+}
+
+EXPRESSIONS = [
+    "id",
+    "Patient.id",
+    "Observation.id",
+    "Patient.name.family",
+    "gender",
+    "birthDate",
+    "active",
+    "missing",
+    "name.given",
+    "name.given.first()",
+    "name.given.last()",
+    "name[1].given[0]",
+    "name[5]",
+    "name.where(use='official').family",
+    "name.where(use='official').given.first()",
+    "name.where(use != 'official').given",
+    "name.where(missing = 'x')",
+    "name.where(missing != 'x')",
+    "name.where(given = 'Annie')",
+    "name.where(family = 'O\\'Hara').use",
+    "name.where(use='official' and family.exists()).family",
+    "name.where(use='nickname' or use='official').given.count()",
+    "name.where(given.count() = 2).family",
+    "name.given.where($this = 'Marie')",
+    "identifier.where(system='urn:oid:1.2.3').value",
+    "identifier.where(system='urn:oid:1.2.3').value.first()",
+    "telecom.exists()",
+    "telecom.empty()",
+    "address.exists()",
+    "name.exists(use='official')",
+    "name.exists(use='usual')",
+    "active = true",
+    "active = false",
+    "active.not()",
+    "gender = 'female'",
+    "gender != 'female'",
+    "address.postalCode.substring(0, 3)",
+    "address.city.substring(3)",
+    "address.city.substring(30)",
+    "subject.reference.substring(8)",
+    "subject.reference",
+    "status",
+    "code.text",
+    "code.coding.where(system='http://loinc.org').code",
+    "code.coding.where(system='http://loinc.org').display.first()",
+    "code.coding.code",
+    "code.coding.system = 'http://loinc.org'",
+    "category.coding.code",
+    "category.where(coding.code = 'vital-signs').exists()",
+    "effectiveDateTime",
+    "valueQuantity.value",
+    "valueQuantity.value = 72",
+    "component.where(code.text='a').valueQuantity.value",
+    "component.valueQuantity.value",
+    "component.count()",
+    "clinicalStatus.coding.code.first()",
+    "code.coding.where(system='http://snomed.info/sct').code.first()",
+]
+
+
+class TestConformance:
+    """The native evaluator must agree with fhirpathpy on its subset."""
+
+    @pytest.mark.parametrize("expression", EXPRESSIONS)
+    @pytest.mark.parametrize("resource_name", sorted(RESOURCES))
+    def test_matches_fhirpathpy(self, expression, resource_name):
+        resource = RESOURCES[resource_name]
+
+        native = compile_path(expression, engine="native")
+        reference = compile_path(expression, engine="fhirpathpy")
+
+        assert native.engine == "native"
+        assert native(resource) == reference(resource)
+
+    def test_matches_on_lists_of_resources(self):
+        resources = list(RESOURCES.values())
+
+        for expression in ["Patient.id", "id", "subject.reference.first()"]:
+            assert compile_native(expression)(resources) == compile_path(expression, "fhirpathpy")(resources)
+
+    def test_both_engines_reject_non_singleton_substring(self):
+        resource = RESOURCES["patient"]
+
+        with pytest.raises(Exception):
+            compile_path("name.given.substring(1)", engine="native")(resource)
+        with pytest.raises(Exception):
+            compile_path("name.given.substring(1)", engine="fhirpathpy")(resource)
+
+
+class TestEngineSelection:
+    """Tests for choosing between the engines."""
+
+    @pytest.mark.parametrize("expression", [
+        "name.given | name.family",
+        "%resource.id",
+        "name.select(given)",
+        "valueQuantity.value > 5",
+        "name.given.substring(1 + 1)",
+        "identifier.where(system.startsWith('urn'))",
+    ])
+    def test_falls_back_outside_subset(self, expression):
+        with pytest.raises(UnsupportedExpression):
+            compile_native(expression)
+
+        assert compile_path(expression).engine == "fhirpathpy"
+
+    def test_prefers_native(self):
+        assert compile_path("name.where(use='official').family").engine == "native"
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            compile_path("id", engine="other")
+
+    def test_tokenizes_escaped_strings(self):
+        assert tokenize("name.where(family = 'O\\'Hara')")[-2] == ("string", "'O\\'Hara'")
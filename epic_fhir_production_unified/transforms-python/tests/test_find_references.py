@@ -0,0 +1,94 @@
+"""
+Tests for the iterative reference scanner.
+"""
+
+from epic_fhir_integration.utils.fhir_utils import (
+    build_reference_index,
+    find_references,
+    is_reference,
+)
+
+
+def recursive_find_references(resource):
+    """The previous recursive implementation, kept as an oracle."""
+    references = []
+
+    def search_dict(d, path=""):
+        for key, value in d.items():
+            current_path = f"{path}.{key}" if path else key
+            if key == "reference" and isinstance(value, str) and value:
+                references.append({"path": current_path, "reference": d})
+            elif is_reference(value):
+                references.append({"path": current_path, "reference": value})
+            elif isinstance(value, dict):
+                search_dict(value, current_path)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, dict):
+                        search_dict(item, f"{current_path}[{i}]")
+
+    search_dict(resource)
+    return references
+
+
+ENCOUNTER = {
+    "resourceType": "Encounter",
+    "id": "enc-1",
+    "subject": {"reference": "Patient/p-1", "display": "Jane"},
+    "participant": [
+        {"type": [{"text": "attender"}], "individual": {"reference": "Practitioner/pr-1"}},
+        {"individual": {"reference": "https://fhir.example.org/api/FHIR/R4/Practitioner/pr-2"}},
+        "not-a-dict",
+    ],
+    "diagnosis": [{"condition": {"reference": "#cond-1"}, "use": {"coding": [{"code": "AD"}]}}],
+    "hospitalization": {"origin": {"identifier": {"value": "x"}},
+                        "destination": {"reference": "Location/loc-1"}},
+    "serviceProvider": {"display": "no reference"},
+    "partOf": {"reference": ""},
+}
+
+
+class TestFindReferences:
+    """Tests for find_references and build_reference_index."""
+
+    def test_matches_recursive_scanner(self):
+        assert find_references(ENCOUNTER) == recursive_find_references(ENCOUNTER)
+        assert [r["path"] for r in find_references(ENCOUNTER)] == [
+            "subject",
+            "participant[0].individual",
+            "participant[1].individual",
+            "diagnosis[0].condition",
+            "hospitalization.destination",
+        ]
+
+    def test_reference_elements_in_lists(self):
+        resource = {"performer": [{"reference": "Practitioner/1"}, {"reference": "Organization/2"}]}
+
+        assert find_references(resource) == recursive_find_references(resource)
+        assert find_references(resource)[1] == {"path": "performer[1].reference",
+                                                 "reference": {"reference": "Organization/2"}}
+
+    def test_reference_index(self):
+        index = build_reference_index([ENCOUNTER, {"resourceType": "Patient"}])
+
+        assert index == [
+            [
+                ("subject", "Patient", "p-1"),
+                ("participant[0].individual", "Practitioner", "pr-1"),
+                ("participant[1].individual", "Practitioner", "pr-2"),
+                ("hospitalization.destination", "Location", "loc-1"),
+            ],
+            [],
+        ]
+
+    def test_deep_nesting_does_not_recurse(self):
+        resource = node = {}
+        for _ in range(5000):
+            node["item"] = [{}]
+            node = node["item"][0]
+        node["answer"] = {"reference": "Patient/deep"}
+
+        references = find_references(resource)
+
+        assert len(references) == 1
+        assert references[0]["path"].endswith("item[0].answer")
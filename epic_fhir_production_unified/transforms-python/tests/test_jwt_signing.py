@@ -0,0 +1,91 @@
+"""
+Tests for client assertion signing.
+"""
+
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from epic_fhir_integration.infrastructure.api_clients import jwt_auth
+from epic_fhir_integration.infrastructure.api_clients.jwt_auth import (
+    AssertionPool,
+    TokenManager,
+    build_jwt,
+    get_signing_config,
+)
+
+
+@pytest.fixture
+def signing_env(monkeypatch):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    monkeypatch.setenv("EPIC_PRIVATE_KEY", pem)
+    monkeypatch.setenv("EPIC_CLIENT_ID", "client-1")
+    monkeypatch.setenv("EPIC_BASE_URL", "https://fhir.example.org")
+    jwt_auth.clear_signing_config()
+    yield key.public_key()
+    jwt_auth.clear_signing_config()
+
+
+class TestSigning:
+    """Tests for cached key loading and pre-signed assertions."""
+
+    def test_key_is_parsed_once(self, signing_env, monkeypatch):
+        calls = []
+        original = jwt_auth.load_private_key
+        monkeypatch.setattr(jwt_auth, "load_private_key", lambda pem: calls.append(1) or original(pem))
+
+        first, second = build_jwt(), build_jwt()
+
+        assert len(calls) == 1
+        assert get_signing_config().client_id == "client-1"
+        claims = [jwt.decode(t, signing_env, algorithms=["RS384"],
+                             audience="https://fhir.example.org/oauth2/token")
+                  for t in (first, second)]
+        assert claims[0]["jti"] != claims[1]["jti"]
+
+    def test_pool_hands_out_each_assertion_once(self, signing_env):
+        pool = AssertionPool(size=3)
+        pool.fill()
+
+        assertions = {pool.take() for _ in range(5)}
+
+        assert len(assertions) == 5
+
+    def test_expiring_assertions_are_discarded(self):
+        signed = iter(["a", "b", "c"])
+        pool = AssertionPool(size=1, min_remaining=jwt_auth.ASSERTION_LIFETIME_SECONDS + 1,
+                             sign=lambda: next(signed))
+        pool.fill()
+
+        assert pool.take() == "b"
+
+
+class TestPrefill:
+    """Tests for signing assertions before the first token request."""
+
+    def test_first_token_does_not_wait_for_signing(self, signing_env):
+        signed = []
+        pool = AssertionPool(size=1, sign=lambda: signed.append(1) or build_jwt())
+        pool.prefill().join()
+
+        assert len(pool._assertions) == 1
+        signed.clear()
+
+        manager = TokenManager(
+            fetch_token=lambda: {"access_token": pool.take(),
+                                 "expiration_timestamp": time.time() + 3600},
+            background_refresh=False,
+        )
+        token = manager.get_token()
+
+        assert signed == []
+        assert jwt.decode(token, signing_env, algorithms=["RS384"],
+                          audience="https://fhir.example.org/oauth2/token")["iss"] == "client-1"
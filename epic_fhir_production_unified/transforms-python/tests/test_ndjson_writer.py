@@ -0,0 +1,126 @@
+"""
+Tests for the streaming NDJSON bronze writer.
+"""
+
+import gzip
+import json
+
+import pytest
+
+from epic_fhir_integration.domain.bronze.ndjson_writer import (
+    NDJSONWriter,
+    iter_ndjson,
+    read_manifest,
+)
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_resource_to_ndjson,
+)
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+
+
+def make_resources(count):
+    return [{"resourceType": "Observation", "id": f"obs-{i}", "valueString": "x" * 50}
+            for i in range(count)]
+
+
+class TestNDJSONWriter:
+    """Tests for NDJSONWriter."""
+
+    def test_writes_compact_lines(self, tmp_path):
+        with NDJSONWriter(tmp_path) as writer:
+            writer.write({"resourceType": "Patient", "id": "p1"})
+
+        content = (tmp_path / "part-00000.ndjson").read_text()
+        assert content == '{"resourceType":"Patient","id":"p1"}\n'
+        assert read_manifest(tmp_path)["complete"] is True
+
+    def test_rotates_files_and_lists_them_in_manifest(self, tmp_path):
+        writer = NDJSONWriter(tmp_path, max_file_bytes=500)
+        writer.write_many(make_resources(20))
+
+        # Finished files are visible before the writer is closed
+        manifest = read_manifest(tmp_path)
+        assert manifest["complete"] is False
+        assert len(manifest["files"]) >= 2
+
+        files = writer.close()
+        assert sum(f.records for f in files) == 20
+        resources = [r for f in files for r in iter_ndjson(tmp_path / f.path)]
+        assert [r["id"] for r in resources] == [f"obs-{i}" for i in range(20)]
+
+    def test_gzip_compression(self, tmp_path):
+        with NDJSONWriter(tmp_path, compression="gzip") as writer:
+            writer.write_many(make_resources(5))
+            writer.checkpoint()
+
+        path = tmp_path / "part-00000.ndjson.gz"
+        with gzip.open(path, "rt") as f:
+            assert len(f.readlines()) == 5
+        assert len(list(iter_ndjson(path))) == 5
+
+    def test_zstd_compression(self, tmp_path):
+        pytest.importorskip("zstandard")
+        with NDJSONWriter(tmp_path, compression="zstd") as writer:
+            writer.write_many(make_resources(5))
+
+        assert len(list(iter_ndjson(tmp_path / "part-00000.ndjson.zst"))) == 5
+
+    def test_checkpoint_makes_data_durable(self, tmp_path):
+        writer = NDJSONWriter(tmp_path)
+        writer.write_many(make_resources(3))
+
+        position = writer.checkpoint()
+
+        assert position == {"file": "part-00000.ndjson", "file_records": 3,
+                            "finished_files": 0, "records": 3}
+        assert len((tmp_path / "part-00000.ndjson").read_text().splitlines()) == 3
+        writer.close()
+
+    def test_reopening_appends_new_files(self, tmp_path):
+        with NDJSONWriter(tmp_path) as writer:
+            writer.write_many(make_resources(2))
+        with NDJSONWriter(tmp_path) as writer:
+            writer.write_many(make_resources(3))
+
+        manifest = read_manifest(tmp_path)
+        assert [f["path"] for f in manifest["files"]] == ["part-00000.ndjson", "part-00001.ndjson"]
+        assert manifest["records"] == 5
+
+    def test_failed_extraction_leaves_manifest_incomplete(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            with NDJSONWriter(tmp_path) as writer:
+                writer.write_many(make_resources(2))
+                raise RuntimeError("boom")
+
+        manifest = read_manifest(tmp_path)
+        assert manifest["complete"] is False
+        assert manifest["records"] == 2
+
+    def test_discard_restores_opened_manifest(self, tmp_path):
+        with NDJSONWriter(tmp_path) as writer:
+            writer.write_many(make_resources(2))
+        before = read_manifest(tmp_path)
+
+        writer = NDJSONWriter(tmp_path, max_file_bytes=200)
+        writer.write_many(make_resources(5))
+        writer.discard()
+
+        assert read_manifest(tmp_path) == before
+        assert [p.name for p in tmp_path.glob("*.ndjson")] == ["part-00000.ndjson"]
+
+    def test_unknown_compression(self, tmp_path):
+        with pytest.raises(ValueError):
+            NDJSONWriter(tmp_path, compression="lz4")
+
+
+class TestExtractResourceToNDJSON:
+    """Tests for streaming extraction to NDJSON."""
+
+    def test_streams_search_pages(self, fhir_stub_server, tmp_path):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        files = extract_resource_to_ndjson(client, tmp_path, "Observation", compression="gzip")
+
+        resources = [r for f in files for r in iter_ndjson(tmp_path / f.path)]
+        assert [r["id"] for r in resources] == [f"obs-{i}" for i in range(7)]
+        assert json.loads((tmp_path / "_manifest.json").read_text())["complete"] is True
@@ -0,0 +1,162 @@
+"""
+Tests for fetching a complete patient chart.
+"""
+
+import pytest
+import requests
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.llm.patient_narrative import (
+    MAX_REVINCLUDE_PAGES,
+    PatientChart,
+    fetch_patient_complete,
+)
+from tests.conftest import stub_server
+
+
+@pytest.fixture
+def chart_resources():
+    subject = {"reference": "Patient/p-1"}
+    return {
+        "Patient": [{"resourceType": "Patient", "id": "p-1"},
+                    {"resourceType": "Patient", "id": "p-2"}],
+        "Condition": [
+            {"resourceType": "Condition", "id": f"cond-{i}", "subject": subject}
+            for i in range(5)
+        ] + [{"resourceType": "Condition", "id": "other", "subject": {"reference": "Patient/p-2"}}],
+        "AllergyIntolerance": [
+            {"resourceType": "AllergyIntolerance", "id": "allergy-1", "patient": subject},
+        ],
+        "DiagnosticReport": [
+            {"resourceType": "DiagnosticReport", "id": "report-1", "subject": subject,
+             "result": [{"reference": "Observation/obs-9"}]},
+        ],
+        # Not linked to the patient, only reachable through the report
+        "Observation": [{"resourceType": "Observation", "id": "obs-9", "status": "final"}],
+    }
+
+
+def _paths(server):
+    return [path for _, path, _ in server.requests]
+
+
+class TestPatientChart:
+    """Tests for the PatientChart index."""
+
+    def test_deduplicates_and_indexes(self):
+        chart = PatientChart("p-1")
+        chart.add_bundle({"entry": [
+            {"resource": {"resourceType": "Patient", "id": "p-1"}},
+            {"resource": {"resourceType": "Condition", "id": "c-1"}},
+            {"resource": {"resourceType": "OperationOutcome"}},
+        ]})
+
+        assert not chart.add({"resourceType": "Condition", "id": "c-1"})
+        assert chart["Condition"] == [{"resourceType": "Condition", "id": "c-1"}]
+        assert chart.patient == {"resourceType": "Patient", "id": "p-1"}
+        assert chart.get_reference("Condition/c-1")["id"] == "c-1"
+        assert chart.resource_count == 2
+
+
+class TestFetchPatientComplete:
+    """Tests for fetch_patient_complete against the stub server."""
+
+    def test_uses_everything_with_paging(self, chart_resources):
+        server = stub_server(resources=chart_resources).start()
+        try:
+            chart = fetch_patient_complete(FHIRClient(server.base_url), "p-1")
+        finally:
+            server.stop()
+
+        assert sorted(r["id"] for r in chart["Condition"]) == [f"cond-{i}" for i in range(5)]
+        assert chart["AllergyIntolerance"][0]["id"] == "allergy-1"
+        assert chart.patient["id"] == "p-1"
+        # Eight resources in pages of two, then the report's missing result
+        everything = [p for p in _paths(server) if "$everything" in p]
+        assert len(everything) == 4
+        assert [o["id"] for o in chart["Observation"]] == ["obs-9"]
+
+    def test_falls_back_to_revinclude(self, chart_resources):
+        server = stub_server(resources=chart_resources, supports_everything=False).start()
+        try:
+            chart = fetch_patient_complete(
+                FHIRClient(server.base_url, max_retries=0), "p-1",
+                include_resources=["Condition", "AllergyIntolerance"],
+            )
+        finally:
+            server.stop()
+
+        assert sorted(r["id"] for r in chart["Condition"]) == [f"cond-{i}" for i in range(5)]
+        assert chart["AllergyIntolerance"][0]["id"] == "allergy-1"
+        assert chart["Patient"] == [{"resourceType": "Patient", "id": "p-1"}]
+        searches = [p for p in _paths(server) if "_revinclude" in p]
+        # Patient plus five Conditions is three pages; one page for the allergy
+        assert len(searches) == 4
+
+    def test_everything_server_error_is_not_treated_as_unsupported(self, chart_resources):
+        server = stub_server(resources=chart_resources).start()
+        server.fail_next(500)
+        try:
+            with pytest.raises(requests.HTTPError):
+                fetch_patient_complete(FHIRClient(server.base_url, max_retries=0), "p-1")
+        finally:
+            server.stop()
+
+        assert not [p for p in _paths(server) if "_revinclude" in p]
+
+    def test_failed_search_is_raised(self, chart_resources):
+        server = stub_server(resources=chart_resources).start()
+        server.fail_next(500)
+        try:
+            with pytest.raises(requests.HTTPError):
+                fetch_patient_complete(
+                    FHIRClient(server.base_url, max_retries=0), "p-1",
+                    include_resources=["Condition", "AllergyIntolerance"],
+                    use_everything=False, max_workers=1,
+                )
+        finally:
+            server.stop()
+
+    def test_other_clients_follow_next_links(self):
+        class Client:
+            def __init__(self):
+                self.calls = []
+
+            def get_resource(self, resource_type, resource_id=None, params=None):
+                self.calls.append((resource_type, resource_id, params))
+                if resource_id:
+                    return {"resourceType": "Patient", "id": resource_id}
+                if "page" not in params:
+                    return {"entry": [{"resource": {"resourceType": "Condition", "id": "c-1"}}],
+                            "link": [{"relation": "next",
+                                      "url": "https://fhir.test/Patient?_id=p-1&page=2"}]}
+                return {"entry": [{"resource": {"resourceType": "Condition", "id": "c-2"}}]}
+
+        client = Client()
+        chart = fetch_patient_complete(client, "p-1", include_resources=["Condition"])
+
+        assert [r["id"] for r in chart["Condition"]] == ["c-1", "c-2"]
+        assert client.calls[-1] == ("Patient", None, {"_id": "p-1", "page": "2"})
+
+    @pytest.mark.parametrize("next_url, expected_calls", [
+        (lambda page: "https://fhir.test/Patient?_id=p-1&page=2", 2),
+        (lambda page: f"https://fhir.test/Patient?_id=p-1&page={page + 1}", MAX_REVINCLUDE_PAGES),
+    ], ids=["repeated", "endless"])
+    def test_other_clients_stop_on_runaway_next_links(self, next_url, expected_calls):
+        class Client:
+            def __init__(self):
+                self.calls = 0
+
+            def get_resource(self, resource_type, resource_id=None, params=None):
+                if resource_id:
+                    return {"resourceType": "Patient", "id": resource_id}
+                self.calls += 1
+                page = int(params.get("page", 1))
+                return {"entry": [{"resource": {"resourceType": "Condition", "id": f"c-{page}"}}],
+                        "link": [{"relation": "next", "url": next_url(page)}]}
+
+        client = Client()
+        chart = fetch_patient_complete(client, "p-1", include_resources=["Condition"])
+
+        assert client.calls == expected_calls
+        assert [r["id"] for r in chart["Condition"]] == [f"c-{i}" for i in range(1, expected_calls + 1)]
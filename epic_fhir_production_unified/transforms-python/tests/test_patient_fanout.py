@@ -0,0 +1,130 @@
+"""
+Tests for the patient fan-out extraction scheduler.
+"""
+
+import json
+
+import pytest
+
+from epic_fhir_integration.domain.bronze.patient_fanout import (
+    PatientFanoutScheduler,
+    extract_patient_ids,
+    get_patient_scoped_resources,
+)
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.metrics.collector import MetricsCollector
+from tests.conftest import stub_server
+
+
+@pytest.fixture
+def cohort_server():
+    """Stub server with five patients, each with two observations and a condition."""
+    observations, conditions = [], []
+    for p in range(5):
+        for o in range(2):
+            observations.append({"resourceType": "Observation", "id": f"obs-{p}-{o}",
+                                 "subject": {"reference": f"Patient/p{p}"}})
+        conditions.append({"resourceType": "Condition", "id": f"cond-{p}",
+                           "subject": {"reference": f"Patient/p{p}"}})
+    server = stub_server(
+        resources={"Observation": observations, "Condition": conditions},
+        page_size=1,
+    ).start()
+    yield server
+    server.stop()
+
+
+class TestPatientFanoutScheduler:
+    """Tests for PatientFanoutScheduler."""
+
+    def test_fans_out_across_patients_and_types(self, cohort_server):
+        metrics = MetricsCollector()
+        scheduler = PatientFanoutScheduler(
+            FHIRClient(cohort_server.base_url),
+            resource_types=["Observation", "Condition"],
+            max_workers=4,
+            metrics=metrics,
+        )
+
+        result = scheduler.run(["p0", "p1", "p2", "p3", "p4", "p1"])
+
+        assert result.completed_patients == 5
+        assert len(result.resources["Observation"]) == 10
+        assert len(result.resources["Condition"]) == 5
+        assert result.resource_count == 15
+        assert result.resources_per_second > 0
+
+        recorded = {m["name"] for m in metrics.get_metrics()}
+        assert {"fanout_patients_per_second", "fanout_resources_per_second"} <= recorded
+
+    def test_client_retries_transient_failures(self, cohort_server):
+        cohort_server.fail_next(500)
+        scheduler = PatientFanoutScheduler(
+            FHIRClient(cohort_server.base_url, max_retries=1, retry_backoff_factor=0),
+            resource_types=["Condition"],
+            max_workers=1,
+            metrics=MetricsCollector(),
+        )
+
+        result = scheduler.run(["p0", "p1"])
+
+        assert result.completed_patients == 2
+        assert not result.failed_patients
+
+    def test_failed_patient_is_not_retried_on_top_of_client(self, cohort_server, tmp_path):
+        cohort_server.fail_next(500, count=2)
+        checkpoint = tmp_path / "fanout.json"
+        scheduler = PatientFanoutScheduler(
+            FHIRClient(cohort_server.base_url, max_retries=1, retry_backoff_factor=0),
+            resource_types=["Condition"],
+            max_workers=1,
+            checkpoint_path=checkpoint,
+            metrics=MetricsCollector(),
+        )
+
+        result = scheduler.run(["p0", "p1"])
+
+        assert list(result.failed_patients) == ["p0"]
+        assert result.completed_patients == 1
+        # The client's attempt and retry for p0, then one search for p1
+        assert len(cohort_server.requests) == 3
+        assert json.loads(checkpoint.read_text())["completed_patients"] == ["p1"]
+
+    def test_checkpoint_resumes_run(self, cohort_server, tmp_path):
+        checkpoint = tmp_path / "fanout.json"
+        checkpoint.write_text(json.dumps({"completed_patients": ["p0", "p1"]}))
+        scheduler = PatientFanoutScheduler(
+            FHIRClient(cohort_server.base_url),
+            resource_types=["Condition"],
+            checkpoint_path=checkpoint,
+            checkpoint_every=1,
+            metrics=MetricsCollector(),
+        )
+
+        result = scheduler.run(["p0", "p1", "p2", "p3"])
+
+        assert result.skipped_patients == 2
+        assert [r["id"] for r in result.resources["Condition"]] in (
+            ["cond-2", "cond-3"], ["cond-3", "cond-2"])
+        saved = json.loads(checkpoint.read_text())["completed_patients"]
+        assert saved == ["p0", "p1", "p2", "p3"]
+
+
+class TestFanoutHelpers:
+    """Tests for fan-out helper functions."""
+
+    def test_patient_scoped_resources_from_config(self, tmp_path):
+        config = tmp_path / "resources_config.yaml"
+        config.write_text(
+            "resources:\n"
+            "  Patient: {enabled: true, priority: 1}\n"
+            "  Condition: {enabled: true, patient_scoped: true, priority: 3}\n"
+            "  Encounter: {enabled: true, patient_scoped: true, priority: 2}\n"
+            "  Goal: {enabled: false, patient_scoped: true, priority: 1}\n"
+        )
+
+        assert get_patient_scoped_resources(config) == ["Encounter", "Condition"]
+
+    def test_extract_patient_ids(self):
+        patients = [{"id": "a"}, {"id": "b"}, {"id": "a"}, {}]
+        assert extract_patient_ids(patients) == ["a", "b"]
@@ -0,0 +1,87 @@
+"""
+Tests for element projection and HTTP compression.
+"""
+
+from epic_fhir_integration.domain.bronze.ndjson_writer import iter_ndjson
+from epic_fhir_integration.domain.bronze.projection import (
+    elements_for,
+    spec_expressions,
+    top_level_element,
+)
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_resource_to_ndjson,
+)
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from tests.conftest import stub_server
+
+
+class TestElementProjection:
+    """Tests for deriving _elements from extract specs."""
+
+    def test_top_level_element(self):
+        assert top_level_element("subject.reference.substring(8)") == "subject"
+        assert top_level_element("extension.where(url='x').value") == "extension"
+        assert top_level_element("valueQuantity.value") == "value"
+        assert top_level_element("birthDate.toString()") == "birthDate"
+        assert top_level_element("%resource.id") is None
+
+    def test_spec_expressions(self):
+        spec = "select:\n  - path: id\n  - path: code.text ; as: code_text # the text\n"
+
+        assert spec_expressions(spec) == ["id", "code.text"]
+
+    def test_elements_for_spec(self, tmp_path, monkeypatch):
+        (tmp_path / "Observation.yaml").write_text(
+            "select:\n"
+            "  - path: status\n"
+            "  - path: effectiveDateTime.toString() ; as: effective\n"
+        )
+
+        assert elements_for("Observation", tmp_path, opt_out=()) == ["effective", "id", "meta", "status"]
+        assert elements_for("Condition", tmp_path, opt_out=()) is None
+        monkeypatch.setenv("FHIR_ELEMENTS_OPT_OUT", "Patient, Observation")
+        assert elements_for("Observation", tmp_path) is None
+
+    def test_packaged_specs_keep_watermark_elements(self):
+        elements = elements_for("Observation", opt_out=())
+
+        assert {"meta", "subject", "value", "code"} <= set(elements)
+        assert "text" not in elements
+
+    def test_extraction_requests_projection(self, fhir_stub_server, tmp_path):
+        for resource in fhir_stub_server.recording.resources["Observation"]:
+            resource["text"] = {"div": "<div>" + "x" * 500 + "</div>"}
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        files = extract_resource_to_ndjson(client, tmp_path, "Observation",
+                                           elements=["status", "subject"])
+
+        resources = [r for f in files for r in iter_ndjson(tmp_path / f.path)]
+        assert len(resources) == 7
+        assert all("text" not in r and r["meta"]["lastUpdated"] for r in resources)
+        assert "_elements=status%2Csubject" in fhir_stub_server.requests[0][1]
+
+
+class TestCompression:
+    """Tests for compressed responses and request bodies."""
+
+    def test_gzip_responses_are_negotiated(self, observation_resources):
+        server = stub_server(resources={"Observation": observation_resources},
+                                compress_responses=True).start()
+        try:
+            resource = FHIRClient(server.base_url).get_resource("Observation", "obs-1")
+        finally:
+            server.stop()
+
+        assert resource["id"] == "obs-1"
+        assert "gzip" in server.requests[0][2]["Accept-Encoding"]
+
+    def test_large_request_bodies_are_gzipped(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url, compress_requests=True)
+        ids = [f"obs-{i}" for i in range(7)] * 10
+
+        results = client.execute_batch([{"method": "GET", "url": f"Observation/{i}"} for i in ids])
+
+        assert all(r.ok for r in results)
+        assert fhir_stub_server.requests[0][2]["Content-Encoding"] == "gzip"
+        assert b'"type": "batch"' in fhir_stub_server.request_bodies[0]
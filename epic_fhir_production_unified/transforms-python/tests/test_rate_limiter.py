@@ -0,0 +1,119 @@
+"""
+Tests for the token-bucket rate limiter and its FHIR client integration.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.utils.rate_limiter import (
+    TokenBucketRateLimiter,
+    get_shared_rate_limiter,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucketRateLimiter:
+    """Tests for TokenBucketRateLimiter."""
+
+    def test_burst_then_steady_rate(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(requests_per_minute=60, burst=2, clock=clock)
+
+        assert limiter.reserve() == 0
+        assert limiter.reserve() == 0
+        # Bucket is empty: callers queue one second apart at 1 request/s
+        assert limiter.reserve() == pytest.approx(1.0)
+        assert limiter.reserve() == pytest.approx(2.0)
+
+        clock.now += 10
+        assert limiter.reserve() == 0
+
+    def test_retry_after_pauses_and_halves_rate(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(requests_per_minute=120, burst=5, clock=clock)
+
+        limiter.update_from_response(429, {"Retry-After": "3"})
+
+        assert limiter.requests_per_minute == pytest.approx(60)
+        # Queued callers resume one by one after the pause, not as a burst
+        assert limiter.reserve() == pytest.approx(4.0)
+        assert limiter.reserve() == pytest.approx(5.0)
+
+    def test_rate_recovers_on_success(self):
+        limiter = TokenBucketRateLimiter(requests_per_minute=120, recovery_step=0.25)
+        limiter.update_from_response(429, {"Retry-After": "0"})
+
+        for _ in range(2):
+            limiter.update_from_response(200, {})
+
+        assert limiter.requests_per_minute == pytest.approx(120)
+
+    def test_rate_limit_headers_cap_tokens(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(requests_per_minute=60, burst=10, clock=clock)
+
+        limiter.update_from_response(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "5"})
+
+        assert limiter.reserve() == pytest.approx(6.0)
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after("7") == 7.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("not a date") is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10.0
+
+    def test_acquire_async(self):
+        limiter = TokenBucketRateLimiter(requests_per_minute=600, burst=1)
+
+        async def scenario():
+            start = time.monotonic()
+            await asyncio.gather(*(limiter.acquire_async() for _ in range(3)))
+            return time.monotonic() - start
+
+        assert asyncio.run(scenario()) >= 0.18
+
+    def test_shared_limiter_is_reused(self):
+        first = get_shared_rate_limiter("test-endpoint", requests_per_minute=100)
+        second = get_shared_rate_limiter("test-endpoint", requests_per_minute=999)
+        assert first is second
+
+
+class TestFHIRClientRateLimiting:
+    """Tests for rate limiting in FHIRClient."""
+
+    def test_batch_workers_share_limiter(self, fhir_stub_server):
+        limiter = TokenBucketRateLimiter(requests_per_minute=600, burst=1)
+        client = FHIRClient(fhir_stub_server.base_url, rate_limiter=limiter)
+
+        start = time.monotonic()
+        results = client.batch_get_resources(
+            "Observation", [f"obs-{i}" for i in range(6)], max_workers=6
+        )
+        elapsed = time.monotonic() - start
+
+        assert len(results) == 6
+        assert elapsed >= 0.45
+
+    def test_429_is_retried_through_limiter(self, fhir_stub_server):
+        limiter = TokenBucketRateLimiter(requests_per_minute=6000)
+        client = FHIRClient(fhir_stub_server.base_url, rate_limiter=limiter)
+        fhir_stub_server.fail_next(429, headers={"Retry-After": "0"})
+
+        resources = list(client.search_resources("Observation"))
+
+        assert len(resources) == 7
+        assert limiter.requests_per_minute < 6000
+        assert len(fhir_stub_server.requests) == 5
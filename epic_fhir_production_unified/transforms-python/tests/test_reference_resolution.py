@@ -0,0 +1,147 @@
+"""
+Tests for batched reference resolution.
+"""
+
+import pytest
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.utils.fhir_utils import (
+    ResourceCache,
+    reference_scope,
+    resolve_references,
+    resolve_references_batch,
+)
+from tests.conftest import stub_server
+
+
+@pytest.fixture
+def linked_server():
+    encounters = [
+        {"resourceType": "Encounter", "id": f"enc-{i}", "subject": {"reference": "Patient/p-1"}}
+        for i in range(5)
+    ]
+    patients = [{"resourceType": "Patient", "id": "p-1",
+                 "link": [{"other": {"reference": "Patient/p-1"}}]}]
+    server = stub_server(resources={"Encounter": encounters, "Patient": patients}).start()
+    yield server
+    server.stop()
+
+
+def observations(count):
+    return [
+        {"resourceType": "Observation", "id": f"obs-{i}",
+         "subject": {"reference": "Patient/p-1"},
+         "encounter": {"reference": f"Encounter/enc-{i % 5}"}}
+        for i in range(count)
+    ]
+
+
+class TestResourceCache:
+    """Tests for ResourceCache."""
+
+    def test_evicts_least_recently_used(self):
+        cache = ResourceCache(max_size=2)
+        cache.put("Patient/1", {"id": "1"})
+        cache.put("Patient/2", {"id": "2"})
+        cache.get("Patient/1")
+        cache.put("Patient/3", {"id": "3"})
+
+        assert not cache.contains("Patient/2")
+        assert cache.contains("Patient/1")
+        assert len(cache) == 2
+
+    def test_contains_is_scoped(self):
+        cache = ResourceCache()
+        cache.put("Patient/1", {"id": "1"}, scope="server-a|")
+
+        assert cache.contains("Patient/1", "server-a|")
+        assert not cache.contains("Patient/1", "server-b|")
+        assert not cache.contains("Patient/1")
+        assert cache.hits == cache.misses == 0
+
+
+class TestResolveReferences:
+    """Tests for breadth-first reference resolution."""
+
+    @pytest.mark.parametrize("mode", ["batch", "search"])
+    def test_one_request_round_per_depth(self, linked_server, mode):
+        client = FHIRClient(linked_server.base_url)
+        resources = observations(200)
+
+        resolve_references_batch(client, resources, max_depth=2, cache=ResourceCache(), mode=mode)
+
+        encounter = resources[7]["encounter"]["_resolved"]
+        assert encounter["id"] == "enc-2"
+        assert encounter["subject"]["_resolved"]["id"] == "p-1"
+        assert resources[0]["subject"]["_resolved"]["id"] == "p-1"
+        # Depth 0 needs 6 distinct resources in one batch or one search per
+        # type, depth 1 only the cached patient
+        if mode == "batch":
+            assert len(linked_server.requests) == 1
+        else:
+            assert len(linked_server.requests) == 2
+
+    def test_shared_cache_avoids_refetching(self, linked_server):
+        client = FHIRClient(linked_server.base_url)
+        cache = ResourceCache()
+
+        resolve_references_batch(client, observations(10), max_depth=1, cache=cache)
+        linked_server.requests.clear()
+        resources = resolve_references_batch(client, observations(10), max_depth=1, cache=cache)
+
+        assert not linked_server.requests
+        assert resources[3]["encounter"]["_resolved"]["id"] == "enc-3"
+
+    def test_cycles_stop_and_cache_is_not_mutated(self, linked_server):
+        client = FHIRClient(linked_server.base_url)
+        cache = ResourceCache()
+        observation = observations(1)[0]
+
+        resolve_references(client, observation, max_depth=5, resolved_resources=cache)
+
+        patient = observation["subject"]["_resolved"]
+        assert "_resolved" not in patient["link"][0]["other"]
+        assert "_resolved" not in cache.get("Patient/p-1", reference_scope(client))["link"][0]["other"]
+        assert observation["encounter"]["_resolved"]["subject"]["_resolved"]["id"] == "p-1"
+        assert len(linked_server.requests) == 1
+
+    def test_unresolvable_references_are_skipped(self, linked_server):
+        client = FHIRClient(linked_server.base_url)
+        resource = {"resourceType": "Observation", "id": "x",
+                    "subject": {"reference": "Patient/missing"},
+                    "performer": [{"reference": "#contained"}]}
+
+        resolve_references(client, resource, resolved_resources=ResourceCache())
+
+        assert "_resolved" not in resource["subject"]
+
+    def test_cache_is_scoped_by_server_and_credentials(self, linked_server):
+        other_patient = {"resourceType": "Patient", "id": "p-1", "gender": "male"}
+        other_server = stub_server(resources={"Patient": [other_patient]}).start()
+        try:
+            cache = ResourceCache()
+            clients = [FHIRClient(linked_server.base_url),
+                       FHIRClient(other_server.base_url),
+                       FHIRClient(linked_server.base_url, cache_scope="other-tenant")]
+            resolved = []
+            for client in clients:
+                resource = observations(1)[0]
+                resolve_references(client, resource, max_depth=1, resolved_resources=cache)
+                resolved.append(resource["subject"]["_resolved"])
+        finally:
+            other_server.stop()
+
+        assert "gender" not in resolved[0]
+        assert resolved[1]["gender"] == "male"
+        assert len(other_server.requests) == 1
+        # Same server, different credentials: fetched again
+        assert len(linked_server.requests) == 2
+
+    def test_plain_dict_is_filled_in(self, linked_server):
+        client = FHIRClient(linked_server.base_url)
+        resolved_resources = {}
+
+        resolve_references(client, observations(1)[0], max_depth=1,
+                           resolved_resources=resolved_resources)
+
+        assert sorted(resolved_resources) == ["Encounter/enc-0", "Patient/p-1"]
@@ -0,0 +1,126 @@
+"""
+Tests for the record/replay FHIR server and the offline harness.
+"""
+
+import json
+
+import pytest
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.testing import FaultProfile, Recording, ReplayFHIRServer
+from epic_fhir_integration.testing.harness import main as harness_main
+from epic_fhir_integration.testing.harness import run_benchmarks
+
+
+@pytest.fixture
+def recording():
+    return Recording({
+        "Patient": [{"resourceType": "Patient", "id": f"p-{i}"} for i in range(3)],
+        "Observation": [
+            {"resourceType": "Observation", "id": f"obs-{i}", "status": "final",
+             "subject": {"reference": f"Patient/p-{i % 3}"},
+             "meta": {"lastUpdated": f"2024-01-{i + 1:02d}T00:00:00Z"}}
+            for i in range(12)
+        ],
+    })
+
+
+class TestRecording:
+    """Tests for loading and saving recordings."""
+
+    def test_loads_bundles_and_ndjson(self, tmp_path, recording):
+        recording.save(tmp_path / "ndjson")
+        (tmp_path / "bundles").mkdir()
+        (tmp_path / "bundles" / "pipeline.json").write_text(json.dumps({
+            "metadata": {"resource_type": "Condition"},
+            "bundle": {"resourceType": "Bundle", "entry": [
+                {"resource": {"resourceType": "Condition", "id": "c-1"}},
+            ]},
+        }))
+
+        loaded = Recording.from_directory(tmp_path)
+
+        assert loaded.resource_count == 16
+        assert loaded.get("Condition", "c-1") == {"resourceType": "Condition", "id": "c-1"}
+        assert [o["id"] for o in loaded.resources["Observation"]] == [f"obs-{i}" for i in range(12)]
+
+
+class TestReplayFHIRServer:
+    """Tests for the replay server."""
+
+    def test_pages_and_filters_searches(self, recording):
+        with ReplayFHIRServer(recording, page_size=5) as server:
+            client = FHIRClient(server.base_url)
+            everything = list(client.search_resources("Observation"))
+            for_patient = list(client.search_resources(
+                "Observation", {"patient": "p-1", "_lastUpdated": "ge2024-01-05"}))
+            patient = client.get_resource("Patient", "p-2")
+
+        assert len(everything) == 12
+        assert server.stats["requests"] == 5
+        assert [o["id"] for o in for_patient] == ["obs-4", "obs-7", "obs-10"]
+        assert patient["id"] == "p-2"
+
+    def test_projects_elements_and_answers_batches(self, recording):
+        with ReplayFHIRServer(recording) as server:
+            client = FHIRClient(server.base_url)
+            projected = next(client.search_resources("Observation", {"_elements": "subject"}))
+            read = client.batch_get_resources("Observation", ["obs-1", "missing"], use_batch=True)
+
+        assert "status" not in projected and projected["subject"]
+        assert list(read) == ["obs-1"]
+
+    def test_faults_are_seeded_and_retried(self, recording):
+        faults = FaultProfile(rate_429=0.2, rate_5xx=0.2, seed=7)
+        stats = []
+        for _ in range(2):
+            with ReplayFHIRServer(recording, page_size=2, faults=faults) as server:
+                client = FHIRClient(server.base_url, max_retries=10, retry_backoff_factor=0.001)
+                resources = list(client.search_resources("Observation"))
+            stats.append(dict(server.stats))
+
+        assert len(resources) == 12
+        assert stats[0] == stats[1]
+        assert stats[0]["responses_429"] and stats[0]["responses_5xx"]
+        assert client.resilience_metrics()["retries"] == (
+            stats[0]["responses_429"] + stats[0]["responses_5xx"])
+
+
+class TestHarness:
+    """Tests for the offline performance harness."""
+
+    def test_benchmarks_fetch_every_resource(self, recording):
+        results = run_benchmarks(recording, faults=FaultProfile(rate_5xx=0.1, seed=1), page_size=4)
+
+        assert [r.name for r in results] == ["search", "batch_read", "extract_ndjson"]
+        assert all(r.resources == recording.resource_count for r in results)
+        assert all(r.to_dict()["resources_per_second"] > 0 for r in results)
+
+    def test_main_fails_below_min_throughput(self, tmp_path, recording):
+        recording.save(tmp_path / "recording")
+        report = tmp_path / "report.json"
+
+        code = harness_main(["--recording", str(tmp_path / "recording"), "--benchmarks", "search",
+                             "--report", str(report), "--min-throughput", "1e12"])
+
+        assert code == 1
+        assert json.loads(report.read_text())["results"][0]["resources"] == 15
+
+    def test_main_fails_on_regression_from_baseline(self, tmp_path, recording):
+        recording.save(tmp_path / "recording")
+        baseline = tmp_path / "baseline.json"
+        args = ["--recording", str(tmp_path / "recording"), "--benchmarks", "search",
+                "--baseline", str(baseline)]
+
+        baseline.write_text(json.dumps({"results": [
+            {"name": "search", "resources_per_second": 1e12},
+            {"name": "batch_read", "resources_per_second": 1e12},
+        ]}))
+        assert harness_main(args) == 1
+
+        baseline.write_text(json.dumps({"results": [
+            {"name": "search", "resources_per_second": 1e-3},
+        ]}))
+        assert harness_main(args + ["--report", str(tmp_path / "report.json")]) == 0
+        report = json.loads((tmp_path / "report.json").read_text())
+        assert report["baseline"]["median_resources_per_second"] == {"search": 1e-3}
@@ -0,0 +1,125 @@
+"""
+Tests for retry budgets, circuit breakers and adaptive concurrency.
+"""
+
+import pytest
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.infrastructure.api_clients.resilience import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilienceManager,
+    endpoint_for,
+)
+from epic_fhir_integration.metrics.collector import MetricsCollector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_and_probes(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+        assert not breaker.record_failure()
+        assert breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            breaker.allow("Patient")
+
+        clock.now = 10
+        breaker.allow("Patient")
+        # Only one probe at a time
+        with pytest.raises(CircuitOpenError):
+            breaker.allow("Patient")
+        breaker.record_success()
+        assert breaker.state == "closed"
+        breaker.allow("Patient")
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        breaker.allow()
+
+        assert breaker.record_failure()
+        assert breaker.state == "open"
+
+
+class TestAdaptiveConcurrency:
+    """Tests for AdaptiveConcurrencyLimiter."""
+
+    def test_decreases_once_per_episode_and_recovers(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=16)
+        tokens = [limiter.acquire() for _ in range(4)]
+
+        assert limiter.release(tokens[0], overloaded=True)
+        # Requests sent before the decrease do not shrink the limit again
+        assert not limiter.release(tokens[1], overloaded=True)
+        assert limiter.limit == 4
+
+        for token in tokens[2:]:
+            limiter.release(token, overloaded=False)
+        for _ in range(8):
+            limiter.release(limiter.acquire(), overloaded=False)
+        assert limiter.limit == 6
+        assert limiter.in_flight == 0
+
+
+class TestClientResilience:
+    """Tests for the resilience layer in FHIRClient."""
+
+    def test_endpoint_names(self):
+        assert endpoint_for("http://x/fhir", "http://x/fhir/Patient/1") == "Patient"
+        assert endpoint_for("http://x/fhir", "http://x/fhir") == "batch"
+        assert endpoint_for("http://x/fhir", "http://x/fhir/Observation?_page=2") == "Observation"
+
+    def test_one_retry_budget_per_request(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=2, retry_backoff_factor=0)
+        fhir_stub_server.fail_next(503, count=10)
+
+        with pytest.raises(Exception):
+            client.get_resource("Patient", "patient-1")
+
+        # One attempt plus two retries, not retries of retries
+        assert len(fhir_stub_server.requests) == 3
+        metrics = client.resilience_metrics()
+        assert metrics["retries"] == 2
+        assert metrics["retry_budget_exhausted"] == 1
+
+    def test_retries_recover(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url, retry_backoff_factor=0)
+        fhir_stub_server.fail_next(500)
+        fhir_stub_server.fail_next(429, headers={"Retry-After": "0"})
+
+        assert client.get_resource("Patient", "patient-1")["id"] == "patient-1"
+        assert client.resilience_metrics()["overloads"] == 2
+
+    def test_open_circuit_fails_fast(self, fhir_stub_server):
+        resilience = ResilienceManager(failure_threshold=2, reset_timeout=60)
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0, resilience=resilience)
+        fhir_stub_server.fail_next(502, count=2)
+        for _ in range(2):
+            with pytest.raises(Exception):
+                client.get_resource("Observation", "obs-1")
+
+        with pytest.raises(CircuitOpenError):
+            client.get_resource("Observation", "obs-1")
+        # Other endpoints are unaffected
+        assert client.get_resource("Patient", "patient-1")["id"] == "patient-1"
+        assert len(fhir_stub_server.requests) == 3
+
+        collector = MetricsCollector()
+        resilience.record_metrics(collector)
+        recorded = {m["name"]: m for m in collector.get_metrics()}
+        assert recorded["fhir_circuit_rejections"]["value"] == 1
+        assert recorded["fhir_open_circuits"]["value"] == 1
@@ -0,0 +1,69 @@
+"""
+Tests for the conditional-request response cache.
+"""
+
+from cryptography.fernet import Fernet
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.infrastructure.api_clients.response_cache import (
+    ResponseCache,
+    cache_key,
+)
+
+
+class TestResponseCache:
+    """Tests for ResponseCache."""
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ResponseCache(tmp_path, max_bytes=250)
+        for name in ("a", "b"):
+            cache.put(name, b"x" * 100, etag=f'"{name}"')
+        cache.get("a")
+        cache.put("c", b"x" * 100)
+
+        assert cache.get("b") is None
+        assert cache.get("a").etag == '"a"'
+        assert cache.get("c") is not None
+        assert cache.size == 200
+
+    def test_encrypts_at_rest(self, tmp_path):
+        key = Fernet.generate_key()
+        cache = ResponseCache(tmp_path, encryption_key=key)
+        cache.put("k", b'{"name": "Jane Doe"}')
+
+        assert b"Jane" not in (tmp_path / "k.bin").read_bytes()
+        assert cache.get("k").body == b'{"name": "Jane Doe"}'
+        # Entries written with another key are dropped, not returned
+        other = ResponseCache(tmp_path, encryption_key=Fernet.generate_key())
+        assert other.get("k") is None
+
+    def test_key_depends_on_scope(self):
+        assert cache_key("http://x/Patient/1", scope="a") != cache_key("http://x/Patient/1", scope="b")
+        assert cache_key("http://x/Patient", {"a": 1, "b": 2}) == cache_key("http://x/Patient", {"b": 2, "a": 1})
+
+
+class TestConditionalReads:
+    """Tests for cached reads in FHIRClient."""
+
+    def test_unchanged_resource_served_from_cache(self, fhir_stub_server, tmp_path):
+        cache = ResponseCache(tmp_path)
+        client = FHIRClient(fhir_stub_server.base_url, response_cache=cache, cache_scope="client-1")
+
+        first = client.get_resource("Patient", "patient-1")
+        second = client.get_resource("Patient", "patient-1")
+
+        assert first == second == {"resourceType": "Patient", "id": "patient-1"}
+        assert "If-None-Match" not in fhir_stub_server.requests[0][2]
+        assert fhir_stub_server.requests[1][2]["If-None-Match"].startswith('W/"')
+        assert cache.hits == 1
+
+    def test_changed_resource_is_refetched(self, fhir_stub_server, tmp_path):
+        client = FHIRClient(fhir_stub_server.base_url, response_cache=ResponseCache(tmp_path))
+
+        client.get_resource("Patient", "patient-1")
+        fhir_stub_server.recording.resources["Patient"][0]["active"] = True
+        resource = client.get_resource("Patient", "patient-1")
+        cached = client.get_resource("Patient", "patient-1")
+
+        assert resource["active"] is True
+        assert cached["active"] is True
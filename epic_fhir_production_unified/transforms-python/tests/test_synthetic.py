@@ -0,0 +1,116 @@
+"""
+Tests for the synthetic FHIR data generator.
+"""
+
+import json
+
+import pytest
+
+from epic_fhir_integration.domain.bronze.ndjson_writer import iter_ndjson, read_manifest
+from epic_fhir_integration.testing import (
+    SyntheticConfig,
+    SyntheticFHIRGenerator,
+    synthetic,
+)
+from epic_fhir_integration.testing.synthetic import RESOURCE_TYPES
+
+
+@pytest.fixture
+def generator():
+    return SyntheticFHIRGenerator(SyntheticConfig(
+        patients=4,
+        encounters_per_patient=3,
+        conditions_per_patient=2,
+        observations_per_patient=5,
+        medications_per_patient=2,
+        seed=7,
+    ))
+
+
+class TestSyntheticFHIRGenerator:
+    """Tests for generating resources."""
+
+    def test_is_deterministic_per_patient(self, generator):
+        again = SyntheticFHIRGenerator(generator.config)
+        other_seed = SyntheticFHIRGenerator(SyntheticConfig(patients=4, seed=8))
+
+        assert list(generator.iter_resources(start=2)) == list(again.iter_resources(start=2))
+        assert list(generator.iter_patients())[3] == again.generate_patient(3)
+        assert generator.generate_patient(0)["Patient"] != other_seed.generate_patient(0)["Patient"]
+
+    def test_cardinalities(self, generator):
+        counts = {t: 0 for t in RESOURCE_TYPES}
+        for resource in generator.iter_resources():
+            counts[resource["resourceType"]] += 1
+
+        assert counts == generator.config.resource_counts()
+        assert counts["Observation"] == 20
+
+    def test_references_are_consistent(self, generator):
+        for resources in generator.iter_patients():
+            patient_id = resources["Patient"][0]["id"]
+            encounters = {f"Encounter/{e['id']}" for e in resources["Encounter"]}
+            conditions = {f"Condition/{c['id']}" for c in resources["Condition"]}
+            for resource_type in RESOURCE_TYPES[1:]:
+                for resource in resources[resource_type]:
+                    assert resource["subject"]["reference"] == f"Patient/{patient_id}"
+                    if resource_type != "Encounter":
+                        assert resource["encounter"]["reference"] in encounters
+            for medication in resources["MedicationRequest"]:
+                assert medication["reasonReference"][0]["reference"] in conditions
+
+    @pytest.mark.parametrize("encounters", [3, 0])
+    def test_clinical_times_are_not_before_birth(self, encounters):
+        generator = SyntheticFHIRGenerator(SyntheticConfig(
+            patients=200, encounters_per_patient=encounters, conditions_per_patient=1,
+            observations_per_patient=2, medications_per_patient=1,
+        ))
+        times = {
+            "Encounter": lambda r: r["period"]["start"],
+            "Condition": lambda r: r["onsetDateTime"],
+            "Observation": lambda r: r["effectiveDateTime"],
+            "MedicationRequest": lambda r: r["authoredOn"],
+        }
+
+        for resources in generator.iter_patients():
+            birth_date = resources["Patient"][0]["birthDate"]
+            assert resources["Patient"][0]["meta"]["lastUpdated"][:10] >= birth_date
+            for resource_type, time in times.items():
+                for resource in resources[resource_type]:
+                    assert time(resource)[:10] >= birth_date
+
+    def test_uses_explicit_patient_ids(self):
+        generator = SyntheticFHIRGenerator(SyntheticConfig(patient_ids=["T1234"]))
+
+        resources = generator.generate_patient(0)
+
+        assert generator.config.patient_count == 1
+        assert resources["Patient"][0]["id"] == "T1234"
+        assert resources["Observation"][0]["subject"] == {"reference": "Patient/T1234"}
+
+
+class TestSyntheticOutput:
+    """Tests for writing bronze output."""
+
+    def test_writes_ndjson_layout(self, tmp_path, generator):
+        files = generator.write_ndjson(tmp_path, compression="gzip")
+
+        assert sorted(files) == sorted(RESOURCE_TYPES)
+        observations = [r for f in files["Observation"] for r in iter_ndjson(tmp_path / "Observation" / f.path)]
+        assert len(observations) == 20
+        manifest = read_manifest(tmp_path / "Observation")
+        assert manifest["complete"] and manifest["metadata"]["seed"] == 7
+
+    @pytest.mark.skipif(synthetic.pyarrow is None, reason="pyarrow is not installed")
+    def test_writes_parquet_in_row_groups(self, tmp_path, generator):
+        paths = generator.write_parquet(tmp_path, row_group_size=6)
+
+        parquet_file = synthetic.pq.ParquetFile(paths["Observation"])
+        table = parquet_file.read()
+        # Rows are buffered per patient, so each group holds two patients
+        assert parquet_file.num_row_groups == 2
+        assert table.column_names == ["json_data", "ingest_timestamp", "ingest_date",
+                                      "resource_type", "resource_id", "last_updated"]
+        first = json.loads(table.column("json_data")[0].as_py())
+        assert table.column("resource_id")[0].as_py() == first["id"]
+        assert table.column("last_updated")[0].as_py() == first["meta"]["lastUpdated"]
@@ -0,0 +1,185 @@
+"""
+Tests for time-sliced windowed extraction.
+"""
+
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from epic_fhir_integration.domain.bronze import time_windows
+from epic_fhir_integration.domain.bronze.checkpoint_store import CheckpointStore
+from epic_fhir_integration.domain.bronze.time_windows import (
+    WindowCheckpoint,
+    extract_resource_windowed,
+    plan_time_windows,
+)
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.utils.fhir_datetime import (
+    format_fhir_instant,
+    parse_fhir_instant,
+)
+
+
+def freeze_now(monkeypatch, value):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return parse_fhir_instant(value)
+
+    monkeypatch.setattr(time_windows, "datetime", FrozenDatetime)
+
+
+class TestPlanTimeWindows:
+    """Tests for plan_time_windows."""
+
+    def test_windows_are_contiguous_and_disjoint(self):
+        windows = plan_time_windows("2023-01-01T00:00:00Z", "2023-01-08T00:00:00Z", 7)
+
+        assert len(windows) == 7
+        assert windows[0].start == parse_fhir_instant("2023-01-01T00:00:00Z")
+        assert windows[-1].end == parse_fhir_instant("2023-01-08T00:00:00Z")
+        for previous, current in zip(windows, windows[1:]):
+            assert previous.end == current.start
+        assert all(w.end - w.start == timedelta(days=1) for w in windows)
+
+    def test_search_param_is_half_open(self):
+        window = plan_time_windows("2023-01-01T00:00:00Z", "2023-01-02T00:00:00Z", 1)[0]
+
+        assert window.to_search_param() == ["ge2023-01-01T00:00:00Z", "lt2023-01-02T00:00:00Z"]
+
+    def test_tiny_range_collapses_windows(self):
+        windows = plan_time_windows("2023-01-01T00:00:00Z", "2023-01-01T00:00:02Z", 10)
+
+        assert len(windows) == 2
+
+    def test_empty_and_invalid_ranges(self):
+        assert plan_time_windows("2023-01-02T00:00:00Z", "2023-01-01T00:00:00Z") == []
+        with pytest.raises(ValueError):
+            plan_time_windows("2023-01-01T00:00:00Z", num_windows=0)
+
+    def test_default_end_is_truncated(self, monkeypatch):
+        since = "2023-01-01T00:00:00Z"
+        freeze_now(monkeypatch, "2023-01-08T12:30:10.123456Z")
+        first = plan_time_windows(since, num_windows=4)
+        freeze_now(monkeypatch, "2023-01-08T12:30:11.654321Z")
+        second = plan_time_windows(since, num_windows=4)
+
+        assert [w.key for w in first] == [w.key for w in second]
+        assert first[-1].end == parse_fhir_instant("2023-01-08T12:30:00Z")
+
+    def test_format_fhir_instant_normalizes_to_utc(self):
+        assert format_fhir_instant("2023-01-01T02:00:00+02:00") == "2023-01-01T00:00:00Z"
+
+
+class TestExtractResourceWindowed:
+    """Tests for extract_resource_windowed against the stub server."""
+
+    def test_windows_cover_every_resource_once(self, fhir_stub_server, observation_resources):
+        client = FHIRClient(fhir_stub_server.base_url)
+
+        result = extract_resource_windowed(
+            client, "Observation",
+            since="2023-01-01T00:00:00Z", until="2023-01-08T00:00:00Z",
+            num_windows=3, max_workers=3,
+        )
+
+        assert sorted(r["id"] for r in result.resources) == sorted(
+            r["id"] for r in observation_resources)
+        assert len(result.checkpoints) == 3
+        assert sum(c.resource_count for c in result.checkpoints.values()) == 7
+        assert result.max_last_updated == "2023-01-07T12:00:00Z"
+        assert not result.failed_windows
+
+        # Every search carried its own ge/lt window
+        searches = [urlparse(path) for _, path, _ in fhir_stub_server.requests]
+        first_pages = [parse_qs(p.query) for p in searches if "_page" not in p.query]
+        assert len(first_pages) == 3
+        assert all(len(q["_lastUpdated"]) == 2 for q in first_pages)
+
+    def test_completed_windows_are_skipped(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url)
+        since, until = "2023-01-01T00:00:00Z", "2023-01-08T00:00:00Z"
+        first_window = plan_time_windows(since, until, 7)[0]
+        completed = {first_window.key: WindowCheckpoint(first_window.key, 1)}
+        seen = []
+
+        result = extract_resource_windowed(
+            client, "Observation", since=since, until=until, num_windows=7,
+            completed_windows=completed, on_window_complete=seen.append,
+        )
+
+        assert len(result.resources) == 6
+        assert len(seen) == 6
+        assert len(result.checkpoints) == 7
+
+    def test_failed_window_is_reported(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0)
+        fhir_stub_server.fail_next(404)
+
+        result = extract_resource_windowed(
+            client, "Observation",
+            since="2023-01-01T00:00:00Z", until="2023-01-08T00:00:00Z",
+            num_windows=7, max_workers=1,
+        )
+
+        assert len(result.failed_windows) == 1
+        assert len(result.checkpoints) == 6
+        assert len(result.resources) == 6
+
+    def test_newest_duplicate_wins(self):
+        class OverlappingClient:
+            def get_all_resources(self, resource_type, params, max_pages):
+                lower = params["_lastUpdated"][0]
+                version = "2023-01-01T00:00:00Z" if lower.startswith("ge2023-01-01") \
+                    else "2023-01-02T00:00:00Z"
+                return [{"id": "a", "meta": {"lastUpdated": version}}]
+
+        result = extract_resource_windowed(
+            OverlappingClient(), "Observation",
+            since="2023-01-01T00:00:00Z", until="2023-01-03T00:00:00Z", num_windows=2,
+        )
+
+        assert result.resources == [{"id": "a", "meta": {"lastUpdated": "2023-01-02T00:00:00Z"}}]
+
+    def test_output_dir_merges_windows_from_files(self, tmp_path):
+        class OverlappingClient:
+            def iter_pages(self, resource_type, params, max_pages, prefetch_pages, start_url=None):
+                lower = params["_lastUpdated"][0]
+                version = "2023-01-01T00:00:00Z" if lower.startswith("ge2023-01-01") \
+                    else "2023-01-02T00:00:00Z"
+                yield {"entry": [{"resource": {"id": "a", "meta": {"lastUpdated": version}}},
+                                 {"resource": {"id": lower}}]}
+
+        result = extract_resource_windowed(
+            OverlappingClient(), "Observation",
+            since="2023-01-01T00:00:00Z", until="2023-01-03T00:00:00Z", num_windows=2,
+            output_dir=tmp_path,
+        )
+
+        assert result.resources == []
+        assert result.resource_count == 3
+        assert all(path.parent == tmp_path / "merged" for path in result.files)
+        assert [r["id"] for r in result.iter_resources()] == [
+            "ge2023-01-01T00:00:00Z", "a", "ge2023-01-02T00:00:00Z"]
+        merged = {r["id"]: r for r in result.iter_resources()}
+        assert merged["a"]["meta"]["lastUpdated"] == "2023-01-02T00:00:00Z"
+
+    def test_range_end_is_pinned_in_checkpoint_store(self, fhir_stub_server, tmp_path, monkeypatch):
+        store = CheckpointStore(":memory:")
+        client = FHIRClient(fhir_stub_server.base_url)
+        args = dict(since="2023-01-01T00:00:00Z", num_windows=4,
+                    checkpoint_store=store, output_dir=tmp_path)
+
+        freeze_now(monkeypatch, "2023-01-08T12:30:10Z")
+        extract_resource_windowed(client, "Observation", **args)
+        freeze_now(monkeypatch, "2023-01-08T14:00:00Z")
+        fhir_stub_server.requests.clear()
+        result = extract_resource_windowed(client, "Observation", **args)
+
+        windows = [c.window for c in store.list_cursors("Observation") if c.is_complete]
+        assert len(windows) == 4
+        assert any(w.endswith("/2023-01-08T12:30:00Z") for w in windows)
+        assert not fhir_stub_server.requests
+        assert len(result.checkpoints) == 4
+        assert result.resource_count == 7
@@ -0,0 +1,126 @@
+"""
+Tests for the shared access token manager.
+"""
+
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+from epic_fhir_integration.infrastructure.api_clients.jwt_auth import TokenManager
+
+
+def counting_fetch(expires_in=3600, delay=0.0):
+    counter = itertools.count(1)
+    calls = []
+
+    def fetch():
+        time.sleep(delay)
+        number = next(counter)
+        calls.append(number)
+        return {"access_token": f"token-{number}",
+                "expiration_timestamp": time.time() + expires_in}
+
+    return fetch, calls
+
+
+def _fetch_in_process(cache_path, log_path):
+    def fetch():
+        with open(log_path, "a") as f:
+            f.write("fetch\n")
+        time.sleep(0.2)
+        return {"access_token": "shared", "expiration_timestamp": time.time() + 3600}
+
+    manager = TokenManager(fetch, cache_path=cache_path, background_refresh=False)
+    assert manager.get_token() == "shared"
+
+
+class TestTokenManager:
+    """Tests for TokenManager."""
+
+    def test_single_flight_across_threads(self):
+        fetch, calls = counting_fetch(delay=0.1)
+        manager = TokenManager(fetch, background_refresh=False)
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            tokens = list(executor.map(lambda _: manager.get_token(), range(32)))
+
+        assert set(tokens) == {"token-1"}
+        assert calls == [1]
+
+    @pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                        reason="requires fork")
+    def test_file_cache_shared_across_processes(self, tmp_path):
+        context = multiprocessing.get_context("fork")
+        cache_path, log_path = tmp_path / "token.json", tmp_path / "fetches.log"
+        processes = [context.Process(target=_fetch_in_process, args=(cache_path, log_path))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        assert [p.exitcode for p in processes] == [0, 0, 0, 0]
+        assert log_path.read_text().count("fetch") == 1
+        assert cache_path.stat().st_mode & 0o777 == 0o600
+
+    def test_refreshes_in_background_before_expiry(self):
+        fetch, calls = counting_fetch(expires_in=1.5)
+        manager = TokenManager(fetch, refresh_margin=0.3)
+
+        assert manager.get_token() == "token-1"
+        expires = time.time() + 1.5
+        deadline = time.time() + 3
+        while len(calls) < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        refreshed = time.time()
+        manager.close()
+
+        assert calls[:2] == [1, 2]
+        assert refreshed < expires
+
+    def test_short_lived_token_is_not_refreshed_in_a_loop(self):
+        fetch, calls = counting_fetch(expires_in=60)
+        manager = TokenManager(fetch)
+
+        assert manager.get_token() == "token-1"
+        time.sleep(0.3)
+        assert manager.get_token() == "token-1"
+        interval = manager._timer.interval
+        manager.close()
+
+        assert calls == [1]
+        # The 300 s default margin is clamped to half the 60 s lifetime
+        assert 29 < interval <= 30.2
+
+    def test_invalidate_ignores_stale_token(self):
+        fetch, calls = counting_fetch()
+        manager = TokenManager(fetch, background_refresh=False)
+        manager.get_token()
+
+        manager.invalidate("token-1")
+        assert manager.get_token() == "token-2"
+        # A late 401 for the old token must not discard the new one
+        manager.invalidate("token-1")
+        assert manager.get_token() == "token-2"
+        assert calls == [1, 2]
+
+
+class TestTokenReplay:
+    """Tests for 401 handling in FHIRClient."""
+
+    def test_401_is_replayed_with_new_token(self, fhir_stub_server):
+        fetch, calls = counting_fetch()
+        manager = TokenManager(fetch, background_refresh=False)
+        client = FHIRClient(fhir_stub_server.base_url, token_provider=manager)
+        client.get_resource("Patient", "patient-1")
+        fhir_stub_server.fail_next(401)
+
+        resource = client.get_resource("Patient", "patient-1")
+
+        assert resource["id"] == "patient-1"
+        assert [r[2]["Authorization"] for r in fhir_stub_server.requests] == [
+            "Bearer token-1", "Bearer token-1", "Bearer token-2"]
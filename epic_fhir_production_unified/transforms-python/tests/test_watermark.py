@@ -0,0 +1,136 @@
+"""
+Tests for incremental extraction watermarks.
+"""
+
+import pytest
+
+from epic_fhir_integration.domain.bronze.checkpoint_store import CheckpointStore
+from epic_fhir_integration.domain.bronze.ndjson_writer import iter_ndjson, read_manifest
+from epic_fhir_integration.domain.bronze.resource_extractor import (
+    extract_resource,
+    extract_resource_to_ndjson,
+    find_max_updated_time,
+    read_watermark,
+)
+from epic_fhir_integration.domain.bronze.watermark import Watermark
+from epic_fhir_integration.infrastructure.api_clients.fhir_client import FHIRClient
+
+
+def resource(resource_id, last_updated):
+    return {"resourceType": "Observation", "id": resource_id, "meta": {"lastUpdated": last_updated}}
+
+
+class TestWatermark:
+    """Tests for Watermark."""
+
+    def test_compares_instants_across_timezones(self):
+        resources = [
+            resource("a", "2023-01-01T12:00:00Z"),
+            # 11:30Z, later as a string but earlier in time
+            resource("b", "2023-01-01T13:30:00+02:00"),
+            resource("c", "2023-01-01T12:00:00.500Z"),
+        ]
+
+        assert find_max_updated_time(resources) == "2023-01-01T12:00:00.500Z"
+        assert Watermark().advance(resources).last_updated == "2023-01-01T12:00:00.500Z"
+
+    def test_boundary_ties_are_deduplicated(self):
+        watermark = Watermark().advance([
+            resource("a", "2023-01-01T12:00:00Z"),
+            resource("b", "2023-01-01T14:00:00+02:00"),
+        ])
+        assert watermark.boundary_ids == ["a", "b"]
+        assert watermark.search_param() == "ge2023-01-01T12:00:00Z"
+
+        delta = watermark.filter_new([
+            resource("a", "2023-01-01T12:00:00Z"),
+            resource("b", "2023-01-01T12:00:00Z"),
+            resource("c", "2023-01-01T12:00:00Z"),
+            resource("d", "2023-01-01T12:00:01Z"),
+        ])
+        assert [r["id"] for r in delta] == ["c", "d"]
+
+        advanced = watermark.advance(delta)
+        assert advanced.last_updated == "2023-01-01T12:00:01Z"
+        assert advanced.boundary_ids == ["d"]
+
+    def test_json_round_trip_and_legacy_instant(self):
+        watermark = Watermark("2023-01-01T12:00:00Z", ["a"])
+        assert Watermark.from_json(watermark.to_json()) == watermark
+        assert Watermark.from_json(None) == Watermark()
+
+        # Earlier runs stored a plain instant and searched with gt
+        legacy = Watermark.from_json("2023-01-01T12:00:00Z")
+        assert legacy.boundary_ids is None
+        assert not legacy.is_new(resource("z", "2023-01-01T12:00:00Z"))
+        assert legacy.advance([resource("y", "2023-01-01T12:00:00Z")]) == legacy
+        assert legacy.advance([resource("y", "2023-01-02T00:00:00Z")]).boundary_ids == ["y"]
+
+
+class TestIncrementalExtraction:
+    """Tests for delta extraction against the stub server."""
+
+    def test_extract_resource_filters_boundary(self, fhir_stub_server):
+        client = FHIRClient(fhir_stub_server.base_url)
+        watermark = Watermark("2023-01-07T12:00:00Z", ["obs-6"])
+
+        resources = extract_resource(client, "Observation", watermark=watermark)
+
+        assert resources == []
+        assert "_lastUpdated=ge2023-01-07T12%3A00%3A00Z" in fhir_stub_server.requests[0][1]
+
+    def test_rerun_pulls_only_delta(self, fhir_stub_server, tmp_path):
+        store = CheckpointStore(":memory:")
+        client = FHIRClient(fhir_stub_server.base_url)
+        output = tmp_path / "Observation"
+
+        first = extract_resource_to_ndjson(client, output, "Observation",
+                                           checkpoint_store=store, incremental=True)
+        assert sum(f.records for f in first) == 7
+        assert read_watermark(output) == Watermark("2023-01-07T12:00:00Z", ["obs-6"])
+
+        # A late arrival at the boundary instant and a newer update
+        fhir_stub_server.recording.add(resource("obs-late", "2023-01-07T12:00:00Z"))
+        fhir_stub_server.recording.add(resource("obs-new", "2023-01-08T00:00:00+01:00"))
+        files = extract_resource_to_ndjson(client, output, "Observation",
+                                           checkpoint_store=store, incremental=True)
+        ids = [r["id"] for f in files for r in iter_ndjson(output / f.path)]
+
+        assert sorted(ids) == sorted([f"obs-{i}" for i in range(7)] + ["obs-late", "obs-new"])
+        assert read_watermark(output) == Watermark("2023-01-08T00:00:00+01:00", ["obs-new"])
+
+        # Nothing changed since: the third run writes nothing
+        files = extract_resource_to_ndjson(client, output, "Observation",
+                                           checkpoint_store=store, incremental=True)
+        assert sum(f.records for f in files) == 9
+
+    def test_failed_run_without_store_is_not_duplicated(self, fhir_stub_server, tmp_path):
+        client = FHIRClient(fhir_stub_server.base_url, max_retries=0)
+        output = tmp_path / "Observation"
+        extract_resource_to_ndjson(client, output, "Observation", incremental=True,
+                                   max_pages=1)
+        fhir_stub_server.recording.add(resource("obs-new", "2023-01-08T00:00:00Z"))
+
+        # The third page fails after files have been rotated and checkpointed
+        fhir_stub_server.requests.clear()
+        original_fetch = client._fetch_pages
+
+        def failing_fetch(*args, **kwargs):
+            for number, page in enumerate(original_fetch(*args, **kwargs)):
+                if number == 2:
+                    raise ConnectionError("connection reset")
+                yield page
+
+        client._fetch_pages = failing_fetch
+        with pytest.raises(ConnectionError):
+            extract_resource_to_ndjson(client, output, "Observation", incremental=True,
+                                       max_file_bytes=100)
+        assert read_manifest(output)["records"] == 2
+
+        client._fetch_pages = original_fetch
+        files = extract_resource_to_ndjson(client, output, "Observation", incremental=True,
+                                           max_file_bytes=100)
+
+        ids = [r["id"] for f in files for r in iter_ndjson(output / f.path)]
+        assert sorted(ids) == sorted([f"obs-{i}" for i in range(7)] + ["obs-new"])
+        assert sorted(p.name for p in output.glob("*.ndjson")) == sorted(f.path for f in files)